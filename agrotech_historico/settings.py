@@ -181,6 +181,9 @@ CSRF_COOKIE_SAMESITE = 'Lax'
 # API EOSDA para datos satelitales
 EOSDA_API_KEY = os.getenv('EOSDA_API_KEY', '')
 EOSDA_BASE_URL = 'https://api-connect.eos.com'  # Sin /api al final para Field Management
+# Presupuesto de peticiones a EOSDA compartido por todos los procesos del host
+EOSDA_LIMITE_PETICIONES_MINUTO = int(os.getenv('EOSDA_LIMITE_PETICIONES_MINUTO', '10'))
+EOSDA_LIMITADOR_ESTADO = os.getenv('EOSDA_LIMITADOR_ESTADO', None)  # Archivo de estado (default: /tmp)
 
 # Configuración de informes
 INFORMES_PDF_STORAGE = MEDIA_ROOT / 'informes' / 'pdfs'
@@ -295,3 +298,10 @@ LOGGING = {
 # ============================================================================
 # API Key para Google Gemini AI (análisis inteligente de informes)
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
+
+# Caché de respuestas (MEDIA_ROOT/cache_gemini) y cuota del free tier de gemini-2.0-flash
+GEMINI_CACHE_TTL_DIAS = int(os.getenv('GEMINI_CACHE_TTL_DIAS', '30'))
+GEMINI_CACHE_MAX_MB = int(os.getenv('GEMINI_CACHE_MAX_MB', '64'))
+GEMINI_LIMITE_PETICIONES_MINUTO = int(os.getenv('GEMINI_LIMITE_PETICIONES_MINUTO', '15'))
+GEMINI_LIMITE_PETICIONES_DIA = int(os.getenv('GEMINI_LIMITE_PETICIONES_DIA', '1500'))
+GEMINI_LIMITADOR_ESTADO = os.getenv('GEMINI_LIMITADOR_ESTADO', None)  # Archivo de estado (default: /tmp)
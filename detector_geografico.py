@@ -1,72 +1,175 @@
 #!/usr/bin/env python
-"""Detector Geográfico Automático"""
+"""
+Detector Geográfico Automático
+==============================
+
+Ubica una parcela (departamento/municipio GADM) y entrega la red hídrica del
+municipio. Pensado para usarse como instancia compartida por proceso:
+
+- Las capas vienen del registro de capas (una lectura por worker)
+- Punto-en-polígono con el STRtree de la capa, no `contains` sobre todos
+- Resultados memorizados por hash de la geometría de la parcela
+- Red hídrica por municipio calculada una vez (precalentar() las deja todas
+  listas con una sola consulta al STRtree)
+
+Uso:
+    from detector_geografico import obtener_detector_geografico
+
+    detector = obtener_detector_geografico()
+    resultado = detector.proceso_completo(parcela.geometria)
+"""
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Dict, Optional
+import numpy as np
 import geopandas as gpd
 from shapely import wkt
+from shapely.geometry import box
+from registro_capas import obtener_registro_capas
+from paquetes_departamentales import ruta_capa_paquete
+
+ARCHIVOS_RED_HIDRICA = ['red_hidrica_casanare_meta_igac_2024.shp', 'Drenaje_Sencillo.shp']
+
 
 class DetectorGeografico:
+    MAX_UBICACIONES_MEMORIZADAS = 1024
+
     def __init__(self, directorio_datos: Optional[str] = None):
         if directorio_datos is None:
             directorio_datos = os.path.join(os.path.dirname(__file__), 'datos_geograficos')
         self.directorio_datos = Path(directorio_datos)
-        self.departamentos_gdf = None
-        self.municipios_gdf = None
+        gadm = self.directorio_datos / 'limites_departamentales' / 'gadm_extract'
+        self.ruta_departamentos = gadm / 'gadm41_COL_1.shp'
+        self.ruta_municipios = gadm / 'gadm41_COL_2.shp'
+        self._lock = threading.RLock()
+        self._ubicaciones = OrderedDict()  # (hash parcela, mtimes) → (índices dept, índices mun, centroide)
+        self._redes_municipales = {}  # (ruta, mtime, bounds, recortar) → GeoDataFrame
+        self.stats = {'hits': 0, 'misses': 0, 'redes_hits': 0, 'redes_misses': 0}
         self._cargar_capas_administrativas()
-    
+
     def _cargar_capas_administrativas(self):
         try:
-            dept_path = self.directorio_datos / 'limites_departamentales' / 'gadm_extract' / 'gadm41_COL_1.shp'
-            if dept_path.exists():
-                self.departamentos_gdf = gpd.read_file(dept_path)
+            if self.departamentos_gdf is not None:
                 print(f"✅ Departamentos: {len(self.departamentos_gdf)}")
-            mun_path = self.directorio_datos / 'limites_departamentales' / 'gadm_extract' / 'gadm41_COL_2.shp'
-            if mun_path.exists():
-                self.municipios_gdf = gpd.read_file(mun_path)
+            if self.municipios_gdf is not None:
                 print(f"✅ Municipios: {len(self.municipios_gdf)}")
         except Exception as e:
             print(f"❌ Error: {e}")
-    
+
+    # Las capas se piden al registro en cada uso: si el archivo cambia en
+    # disco el registro la recarga y las claves de memo (mtime) cambian
+    def _capa_departamentos(self):
+        return obtener_registro_capas().obtener(self.ruta_departamentos)
+
+    def _capa_municipios(self):
+        return obtener_registro_capas().obtener(self.ruta_municipios)
+
+    def _capa_red_hidrica(self, departamento: Optional[str] = None):
+        # Paquete departamental (GeoParquet) si está construido
+        paquete = ruta_capa_paquete(departamento, 'red_hidrica', self.directorio_datos) if departamento else None
+        if paquete is not None:
+            return obtener_registro_capas().obtener(paquete)
+        directorio = self.directorio_datos / 'red_hidrica'
+        for nombre in ARCHIVOS_RED_HIDRICA:
+            path = directorio / nombre
+            if path.exists():
+                return obtener_registro_capas().obtener(path)
+        return None
+
+    @property
+    def departamentos_gdf(self) -> Optional[gpd.GeoDataFrame]:
+        capa = self._capa_departamentos()
+        return capa.gdf if capa is not None else None
+
+    @property
+    def municipios_gdf(self) -> Optional[gpd.GeoDataFrame]:
+        capa = self._capa_municipios()
+        return capa.gdf if capa is not None else None
+
+    @staticmethod
+    def _indices_que_contienen(capa, punto) -> np.ndarray:
+        """Polígonos de la capa que contienen el punto, en orden de la capa"""
+        if capa is None:
+            return np.empty(0, dtype=np.intp)
+        return np.sort(capa.arbol.query(punto, predicate='within'))
+
     def detectar_ubicacion(self, geometria_parcela) -> Dict:
         if hasattr(geometria_parcela, 'wkt'):
             parcela_geom = wkt.loads(geometria_parcela.wkt)
         else:
             parcela_geom = geometria_parcela
-        parcela_gdf = gpd.GeoDataFrame([{'geometry': parcela_geom}], crs='EPSG:4326')
-        centroide = parcela_gdf.geometry.centroid.iloc[0]
+        capa_dept = self._capa_departamentos()
+        capa_mun = self._capa_municipios()
+        clave = (
+            hashlib.sha1(parcela_geom.wkb).hexdigest(),
+            capa_dept.mtime if capa_dept is not None else None,
+            capa_mun.mtime if capa_mun is not None else None,
+        )
+
+        with self._lock:
+            memo = self._ubicaciones.get(clave)
+            if memo is not None:
+                self._ubicaciones.move_to_end(clave)
+                self.stats['hits'] += 1
+        if memo is None:
+            centroide = parcela_geom.centroid
+            memo = (self._indices_que_contienen(capa_dept, centroide),
+                    self._indices_que_contienen(capa_mun, centroide),
+                    centroide)
+            with self._lock:
+                self.stats['misses'] += 1
+                self._ubicaciones[clave] = memo
+                while len(self._ubicaciones) > self.MAX_UBICACIONES_MEMORIZADAS:
+                    self._ubicaciones.popitem(last=False)
+
+        idx_dept, idx_mun, centroide = memo
         resultado = {'departamento': None, 'municipio': None, 'departamento_gdf': None, 'municipio_gdf': None, 'centroide': centroide}
-        if self.departamentos_gdf is not None:
-            dept_match = self.departamentos_gdf[self.departamentos_gdf.contains(centroide)]
-            if not dept_match.empty:
-                resultado['departamento'] = dept_match.iloc[0].get('NAME_1', 'Desconocido')
-                resultado['departamento_gdf'] = dept_match.copy()
-                print(f"🎯 Departamento: {resultado['departamento']}")
-        if self.municipios_gdf is not None:
-            mun_match = self.municipios_gdf[self.municipios_gdf.contains(centroide)]
-            if not mun_match.empty:
-                resultado['municipio'] = mun_match.iloc[0].get('NAME_2', 'Desconocido')
-                resultado['municipio_gdf'] = mun_match.copy()
-                print(f"🎯 Municipio: {resultado['municipio']}")
+        if len(idx_dept):
+            dept_match = capa_dept.gdf.iloc[idx_dept]
+            resultado['departamento'] = dept_match.iloc[0].get('NAME_1', 'Desconocido')
+            resultado['departamento_gdf'] = dept_match.copy()
+            print(f"🎯 Departamento: {resultado['departamento']}")
+        if len(idx_mun):
+            mun_match = capa_mun.gdf.iloc[idx_mun]
+            resultado['municipio'] = mun_match.iloc[0].get('NAME_2', 'Desconocido')
+            resultado['municipio_gdf'] = mun_match.copy()
+            print(f"🎯 Municipio: {resultado['municipio']}")
         return resultado
-    
-    def cargar_red_hidrica_municipal(self, municipio_gdf: gpd.GeoDataFrame) -> gpd.GeoDataFrame:
+
+    @staticmethod
+    def _clave_red(capa, bounds, recortar: bool):
+        return (capa.ruta, capa.mtime, tuple(float(v) for v in bounds), recortar)
+
+    def cargar_red_hidrica_municipal(
+        self,
+        municipio_gdf: gpd.GeoDataFrame,
+        recortar: bool = False,
+        departamento: Optional[str] = None
+    ) -> gpd.GeoDataFrame:
+        """
+        Red hídrica que toca el bbox del municipio (contexto del mapa) o,
+        con recortar=True, recortada al polígono municipal. Memorizada por
+        municipio: el GeoDataFrame devuelto es compartido (NO modificar in-place).
+        Con `departamento` se lee del paquete departamental si existe
+        """
         try:
-            directorio = self.directorio_datos / 'red_hidrica'
-            archivos = ['red_hidrica_casanare_meta_igac_2024.shp', 'Drenaje_Sencillo.shp']
-            archivo_sel = None
-            if directorio.exists():
-                for nombre in archivos:
-                    path = directorio / nombre
-                    if path.exists():
-                        archivo_sel = str(path)
-                        break
-            if archivo_sel:
-                red_completa = gpd.read_file(archivo_sel)
-                if red_completa.crs != 'EPSG:4326':
-                    red_completa = red_completa.to_crs('EPSG:4326')
-                bounds = municipio_gdf.total_bounds
-                red_municipal = red_completa.cx[bounds[0]:bounds[2], bounds[1]:bounds[3]]
+            capa = self._capa_red_hidrica(departamento)
+            if capa is not None:
+                clave = self._clave_red(capa, municipio_gdf.total_bounds, recortar)
+                with self._lock:
+                    red_municipal = self._redes_municipales.get(clave)
+                    self.stats['redes_hits' if red_municipal is not None else 'redes_misses'] += 1
+                if red_municipal is None:
+                    indices = np.sort(capa.arbol.query(box(*municipio_gdf.total_bounds), predicate='intersects'))
+                    red_municipal = capa.gdf.iloc[indices]
+                    if recortar:
+                        red_municipal = gpd.clip(red_municipal, municipio_gdf)
+                    with self._lock:
+                        self._redes_municipales[clave] = red_municipal
                 print(f"✅ Red hídrica: {len(red_municipal)} elementos")
                 for campo in ['NOMBRE', 'nombre', 'name', 'NOMBRE_GEO']:
                     if campo in red_municipal.columns:
@@ -77,14 +180,67 @@ class DetectorGeografico:
         except Exception as e:
             print(f"❌ Error red hídrica: {e}")
         return None
-    
+
+    def precalentar(self, departamento: Optional[str] = None) -> int:
+        """
+        Deja calculada la red hídrica de todos los municipios (o los de un
+        departamento) con una sola consulta masiva al STRtree
+
+        Returns:
+            Número de municipios indexados
+        """
+        capa_mun = self._capa_municipios()
+        capa_red = self._capa_red_hidrica(departamento)
+        if capa_mun is None or capa_red is None:
+            return 0
+        inicio = time.perf_counter()
+        municipios = capa_mun.gdf
+        if departamento is not None and 'NAME_1' in municipios.columns:
+            municipios = municipios[municipios['NAME_1'] == departamento]
+        limites = municipios.geometry.bounds.to_numpy()
+        cajas = [box(*fila) for fila in limites]
+        # pares[0] = municipio (posición en `municipios`), pares[1] = elemento de la red
+        pares = capa_red.arbol.query(cajas, predicate='intersects')
+        orden = np.lexsort((pares[1], pares[0]))
+        pares = pares[:, orden]
+        cortes = np.searchsorted(pares[0], np.arange(len(cajas) + 1))
+        with self._lock:
+            for i, fila in enumerate(limites):
+                clave = self._clave_red(capa_red, fila, False)
+                if clave not in self._redes_municipales:
+                    self._redes_municipales[clave] = capa_red.gdf.iloc[pares[1, cortes[i]:cortes[i + 1]]]
+        print(f"🔥 Red hídrica indexada para {len(cajas)} municipios en {time.perf_counter() - inicio:.2f}s")
+        return len(cajas)
+
+    def estadisticas(self) -> Dict:
+        with self._lock:
+            return {**self.stats, 'ubicaciones_memorizadas': len(self._ubicaciones),
+                    'redes_municipales': len(self._redes_municipales)}
+
     def proceso_completo(self, geometria_parcela) -> Dict:
         print("\n" + "="*70)
         print("🌍 DETECCIÓN AUTOMÁTICA")
         print("="*70)
         ubicacion = self.detectar_ubicacion(geometria_parcela)
         if ubicacion['municipio_gdf'] is not None:
-            red = self.cargar_red_hidrica_municipal(ubicacion['municipio_gdf'])
+            red = self.cargar_red_hidrica_municipal(ubicacion['municipio_gdf'], departamento=ubicacion['departamento'])
             ubicacion['red_hidrica'] = red
         print("="*70 + "\n")
         return ubicacion
+
+
+_detectores: Dict[str, DetectorGeografico] = {}
+_detectores_lock = threading.Lock()
+
+
+def obtener_detector_geografico(directorio_datos: Optional[str] = None) -> DetectorGeografico:
+    """Instancia única del detector por directorio de datos para este proceso/worker"""
+    clave = str(Path(directorio_datos).resolve()) if directorio_datos else None
+    detector = _detectores.get(clave)
+    if detector is None:
+        with _detectores_lock:
+            detector = _detectores.get(clave)
+            if detector is None:
+                detector = DetectorGeografico(directorio_datos)
+                _detectores[clave] = detector
+    return detector
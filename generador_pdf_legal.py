@@ -21,6 +21,7 @@ Incluye:
 
 import os
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from io import BytesIO
@@ -64,7 +65,10 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrotech_historico.settings')
 django.setup()
 
 from informes.models import Parcela
+from informes.services.planificador_figuras import PlanificadorFiguras
 from verificador_legal import VerificadorRestriccionesLegales, ResultadoVerificacion
+from registro_capas import CRS_METRICO
+from indice_cercania import IndiceCercania
 
 
 # Información de departamentos de Colombia
@@ -87,11 +91,17 @@ class GeneradorPDFLegal:
     Generador MEJORADO de informes PDF para verificación legal de parcelas
     """
     
+    # Elementos más cercanos que se reportan por capa en el análisis de proximidad
+    K_CERCANOS = 3
+    # En Casanare/Llano, 50+ km a un río es sospechoso: datos no concluyentes
+    DISTANCIA_MAX_CAUCE_KM = 50
+    
     def __init__(self):
         """Inicializa el generador de PDF"""
         self.width, self.height = A4
         self.margin = 2 * cm
         self.styles = getSampleStyleSheet()
+        self.tiempos_proximidad_ms = {}
         self._configurar_estilos()
     
     def _configurar_estilos(self):
@@ -161,6 +171,28 @@ class GeneradorPDFLegal:
             fontName='Helvetica-Bold'
         ))
     
+    def _indice_cercania(self, verificador: VerificadorRestriccionesLegales, nombre_capa: str, gdf) -> IndiceCercania:
+        """Índice de la capa del registro si el verificador la cargó de ahí; si no, uno temporal"""
+        capa = verificador.capas_registro.get(nombre_capa)
+        if capa is not None and capa.gdf is gdf:
+            return IndiceCercania.desde_capa(capa)
+        return IndiceCercania.desde_gdf(gdf)
+    
+    @staticmethod
+    def _resumen_cercanos(gdf, cercanos, campos_nombre=('NOMBRE', 'nombre')) -> List[Dict]:
+        """Los k más cercanos de una capa para el informe (nombre, distancia, rumbo)"""
+        resumen = []
+        for c in cercanos:
+            fila = gdf.iloc[c.posicion]
+            nombre = next((fila.get(campo) for campo in campos_nombre if fila.get(campo)), 'N/A')
+            resumen.append({
+                'nombre': str(nombre),
+                'distancia_km': round(c.distancia_km, 2),
+                'azimut_grados': c.azimut_grados,
+                'direccion': c.direccion,
+            })
+        return resumen
+    
     def _calcular_distancias_minimas(
         self, 
         parcela: Parcela, 
@@ -171,78 +203,59 @@ class GeneradorPDFLegal:
         Calcula las distancias mínimas a diferentes tipos de zonas protegidas
         FILTRADAS por departamento.
         
-        Usa proyección UTM 18N (EPSG:32618) para Colombia para cálculos precisos
-        en metros, evitando warnings de CRS geográfico.
+        Consulta de vecinos más cercanos (STRtree) sobre las geometrías
+        EPSG:3116 ya proyectadas del registro de capas: no reproyecta ni mide
+        contra todos los elementos de la capa. Además del más cercano, cada
+        capa trae sus K_CERCANOS elementos más próximos con distancia y rumbo,
+        y los tiempos por capa quedan en self.tiempos_proximidad_ms.
         
         Returns:
             Dict con distancias mínimas en km a cada tipo de zona
         """
-        # Proyección UTM 18N (mejor para Colombia central/oriental)
-        UTM_COLOMBIA = 'EPSG:32618'
-        
         # Convertir geometría de la parcela
         if hasattr(parcela.geometria, 'wkt'):
             parcela_geom = wkt.loads(parcela.geometria.wkt)
         else:
             parcela_geom = shape(parcela.geometria)
         
-        parcela_gdf = gpd.GeoDataFrame([{'geometry': parcela_geom}], crs='EPSG:4326')
-        
-        # Reproyectar a UTM para operaciones espaciales (evita warning de centroid)
-        parcela_utm = parcela_gdf.to_crs(UTM_COLOMBIA)
-        centroide_utm = parcela_utm.geometry.centroid.iloc[0]
-        centroide_geo = gpd.GeoSeries([centroide_utm], crs=UTM_COLOMBIA).to_crs('EPSG:4326').iloc[0]
+        parcela_metrica = gpd.GeoSeries([parcela_geom], crs='EPSG:4326').to_crs(CRS_METRICO).iloc[0]
+        centroide_metrico = parcela_metrica.centroid
         
         # Obtener bbox del departamento para filtrar
         dept_info = DEPARTAMENTOS_INFO.get(departamento, {})
         bbox = dept_info.get('bbox', None)
         
         distancias = {}
+        self.tiempos_proximidad_ms = {}
         
         # 1. Distancia a área protegida más cercana
         if verificador.areas_protegidas is not None and len(verificador.areas_protegidas) > 0:
             areas = verificador.areas_protegidas
-            # Filtrar por bbox si está disponible
-            if bbox:
-                areas = areas.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+            inicio = time.perf_counter()
+            cercanos = self._indice_cercania(verificador, 'areas_protegidas', areas).mas_cercanos(
+                centroide_metrico, k=self.K_CERCANOS, bbox=bbox
+            )
+            self.tiempos_proximidad_ms['areas_protegidas'] = (time.perf_counter() - inicio) * 1000
             
-            if len(areas) > 0:
-                # Reproyectar a UTM para cálculo de distancia
-                areas_utm = areas.to_crs(UTM_COLOMBIA)
-                
-                distancias_m = areas_utm.distance(centroide_utm)
-                idx_min = distancias_m.idxmin()
-                dist_min_km = distancias_m.min() / 1000
-                
-                nombre_cercana = areas.loc[idx_min].get('NOMBRE', areas.loc[idx_min].get('nombre', 'N/A'))
-                categoria = areas.loc[idx_min].get('CATEGORIA', areas.loc[idx_min].get('categoria', 'N/A'))
-                departamento_area = areas.loc[idx_min].get('DEPARTAMEN', areas.loc[idx_min].get('DEPARTAMENTO', 'N/A'))
-                municipio_area = areas.loc[idx_min].get('MUNICIPIO', areas.loc[idx_min].get('municipio', 'N/A'))
-                
-                # Calcular dirección hacia el área (usando coordenadas geográficas)
-                centroide_area_utm = areas_utm.loc[idx_min].geometry.centroid
-                centroide_area_geo = gpd.GeoSeries([centroide_area_utm], crs=UTM_COLOMBIA).to_crs('EPSG:4326').iloc[0]
+            if cercanos:
+                mas_cercana = cercanos[0]
+                fila = areas.iloc[mas_cercana.posicion]
+                dist_min_km = mas_cercana.distancia_km
                 
-                dx = centroide_area_geo.x - centroide_geo.x
-                dy = centroide_area_geo.y - centroide_geo.y
-                
-                # Determinar dirección cardinal
-                if abs(dy) > abs(dx) * 1.5:
-                    direccion = "Norte" if dy > 0 else "Sur"
-                elif abs(dx) > abs(dy) * 1.5:
-                    direccion = "Este" if dx > 0 else "Oeste"
-                else:
-                    direccion_ns = "Norte" if dy > 0 else "Sur"
-                    direccion_eo = "este" if dx > 0 else "oeste"
-                    direccion = f"{direccion_ns}{direccion_eo}"
+                nombre_cercana = fila.get('NOMBRE', fila.get('nombre', 'N/A'))
+                categoria = fila.get('CATEGORIA', fila.get('categoria', 'N/A'))
+                departamento_area = fila.get('DEPARTAMEN', fila.get('DEPARTAMENTO', 'N/A'))
+                municipio_area = fila.get('MUNICIPIO', fila.get('municipio', 'N/A'))
                 
                 distancias['areas_protegidas'] = {
                     'distancia_km': round(dist_min_km, 2),
                     'nombre': nombre_cercana,
                     'categoria': categoria,
                     'ubicacion': f"{municipio_area}, {departamento_area}" if municipio_area != 'N/A' else departamento_area,
-                    'direccion': direccion,
-                    'en_parcela': dist_min_km == 0
+                    'direccion': mas_cercana.direccion,
+                    'azimut_grados': mas_cercana.azimut_grados,
+                    'en_parcela': dist_min_km == 0,
+                    'mas_cercanos': self._resumen_cercanos(areas, cercanos),
                 }
             else:
                 distancias['areas_protegidas'] = {
@@ -265,44 +278,31 @@ class GeneradorPDFLegal:
         # 2. Distancia a resguardo indígena más cercano
         if verificador.resguardos_indigenas is not None and len(verificador.resguardos_indigenas) > 0:
             resguardos = verificador.resguardos_indigenas
-            if bbox:
-                resguardos = resguardos.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+            inicio = time.perf_counter()
+            cercanos = self._indice_cercania(verificador, 'resguardos_indigenas', resguardos).mas_cercanos(
+                centroide_metrico, k=self.K_CERCANOS, bbox=bbox
+            )
+            self.tiempos_proximidad_ms['resguardos_indigenas'] = (time.perf_counter() - inicio) * 1000
             
-            if len(resguardos) > 0:
-                resguardos_utm = resguardos.to_crs(UTM_COLOMBIA)
-                
-                distancias_m = resguardos_utm.distance(centroide_utm)
-                idx_min = distancias_m.idxmin()
-                dist_min_km = distancias_m.min() / 1000
-                
-                nombre_cercano = resguardos.loc[idx_min].get('NOMBRE', resguardos.loc[idx_min].get('nombre', 'N/A'))
-                pueblo = resguardos.loc[idx_min].get('PUEBLO', resguardos.loc[idx_min].get('pueblo', 'N/A'))
-                departamento_resg = resguardos.loc[idx_min].get('DEPARTAMEN', resguardos.loc[idx_min].get('DEPARTAMENTO', 'N/A'))
-                municipio_resg = resguardos.loc[idx_min].get('MUNICIPIO', resguardos.loc[idx_min].get('municipio', 'N/A'))
-                
-                # Calcular dirección
-                centroide_resg_utm = resguardos_utm.loc[idx_min].geometry.centroid
-                centroide_resg_geo = gpd.GeoSeries([centroide_resg_utm], crs=UTM_COLOMBIA).to_crs('EPSG:4326').iloc[0]
+            if cercanos:
+                mas_cercano = cercanos[0]
+                fila = resguardos.iloc[mas_cercano.posicion]
+                dist_min_km = mas_cercano.distancia_km
                 
-                dx = centroide_resg_geo.x - centroide_geo.x
-                dy = centroide_resg_geo.y - centroide_geo.y
-                
-                if abs(dy) > abs(dx) * 1.5:
-                    direccion = "Norte" if dy > 0 else "Sur"
-                elif abs(dx) > abs(dy) * 1.5:
-                    direccion = "Este" if dx > 0 else "Oeste"
-                else:
-                    direccion_ns = "Norte" if dy > 0 else "Sur"
-                    direccion_eo = "este" if dx > 0 else "oeste"
-                    direccion = f"{direccion_ns}{direccion_eo}"
+                nombre_cercano = fila.get('NOMBRE', fila.get('nombre', 'N/A'))
+                pueblo = fila.get('PUEBLO', fila.get('pueblo', 'N/A'))
+                departamento_resg = fila.get('DEPARTAMEN', fila.get('DEPARTAMENTO', 'N/A'))
+                municipio_resg = fila.get('MUNICIPIO', fila.get('municipio', 'N/A'))
                 
                 distancias['resguardos_indigenas'] = {
                     'distancia_km': round(dist_min_km, 2),
                     'nombre': nombre_cercano,
                     'pueblo': pueblo,
                     'ubicacion': f"{municipio_resg}, {departamento_resg}" if municipio_resg != 'N/A' else departamento_resg,
-                    'direccion': direccion,
-                    'en_parcela': dist_min_km == 0
+                    'direccion': mas_cercano.direccion,
+                    'azimut_grados': mas_cercano.azimut_grados,
+                    'en_parcela': dist_min_km == 0,
+                    'mas_cercanos': self._resumen_cercanos(resguardos, cercanos),
                 }
             else:
                 distancias['resguardos_indigenas'] = {
@@ -325,81 +325,17 @@ class GeneradorPDFLegal:
         # 3. Distancia a fuente de agua más cercana
         if verificador.red_hidrica is not None and len(verificador.red_hidrica) > 0:
             red = verificador.red_hidrica
-            if bbox:
-                red = red.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+            indice_red = self._indice_cercania(verificador, 'red_hidrica', red)
+            inicio = time.perf_counter()
+            # 🚨 Más allá de DISTANCIA_MAX_CAUCE_KM los datos NO son concluyentes:
+            # la búsqueda se acota a ese radio
+            cercanos = indice_red.mas_cercanos(
+                centroide_metrico, k=self.K_CERCANOS, bbox=bbox,
+                distancia_max_m=self.DISTANCIA_MAX_CAUCE_KM * 1000
+            )
+            self.tiempos_proximidad_ms['red_hidrica'] = (time.perf_counter() - inicio) * 1000
             
-            if len(red) > 0:
-                red_utm = red.to_crs(UTM_COLOMBIA)
-                
-                distancias_m = red_utm.distance(centroide_utm)
-                idx_min = distancias_m.idxmin()
-                dist_min_km = distancias_m.min() / 1000
-                dist_min_m = distancias_m.min()
-                
-                # 🚨 VALIDAR DISTANCIA: si es > 50 km, datos NO concluyentes
-                sin_cobertura = dist_min_km > 50  # En Casanare/Llano, 50+ km a un río es sospechoso
-                
-                if sin_cobertura:
-                    # 🔴 DATOS NO CONCLUYENTES - marcar como NO DETERMINABLE
-                    distancias['red_hidrica'] = {
-                        'distancia_km': None,
-                        'distancia_m': None,
-                        'nombre': 'Red hídrica no determinable con datos actuales',
-                        'tipo': 'NO CONCLUYENTE',
-                        'direccion': 'N/A',
-                        'requiere_retiro': None,  # No determinable
-                        'retiro_minimo_m': 30,
-                        'no_concluyente': True,
-                        'razon_no_concluyente': f'La cartografía disponible no permite determinar con certeza la ubicación de cauces en esta zona. Distancia al cauce más cercano registrado: {dist_min_km:.0f} km (fuera del área de análisis razonable).'
-                    }
-                else:
-                    # Distancia razonable - procesar normalmente
-                    # Intentar múltiples columnas para nombre (compatibilidad IGAC + OSM)
-                    nombre_rio = (red.loc[idx_min].get('NOMBRE_GEO') or 
-                                 red.loc[idx_min].get('NOMBRE') or 
-                                 red.loc[idx_min].get('name') or  # Campo OSM
-                                 red.loc[idx_min].get('NOM_GEO') or 
-                                 red.loc[idx_min].get('nombre') or 
-                                 'Cauce sin nombre oficial')
-                    
-                    # Intentar múltiples columnas para tipo (compatibilidad IGAC + OSM)
-                    tipo_rio = (red.loc[idx_min].get('TIPO') or 
-                               red.loc[idx_min].get('waterway') or  # Campo OSM
-                               red.loc[idx_min].get('CLASE_DREN') or 
-                               red.loc[idx_min].get('tipo') or 
-                               red.loc[idx_min].get('ORDEN') or 
-                               'Drenaje natural')
-                    
-                    # Calcular dirección hacia el cauce (usando geometría UTM)
-                    centroide_rio_utm = red_utm.loc[idx_min].geometry.centroid if hasattr(red_utm.loc[idx_min].geometry, 'centroid') else red_utm.loc[idx_min].geometry.representative_point()
-                    centroide_rio_geo = gpd.GeoSeries([centroide_rio_utm], crs=UTM_COLOMBIA).to_crs('EPSG:4326').iloc[0]
-                    
-                    dx = centroide_rio_geo.x - centroide_geo.x
-                    dy = centroide_rio_geo.y - centroide_geo.y
-                    
-                    # Determinar dirección cardinal
-                    if abs(dy) > abs(dx) * 1.5:
-                        direccion = "Norte" if dy > 0 else "Sur"
-                    elif abs(dx) > abs(dy) * 1.5:
-                        direccion = "Este" if dx > 0 else "Oeste"
-                    else:
-                        direccion_ns = "Norte" if dy > 0 else "Sur"
-                        direccion_eo = "este" if dx > 0 else "oeste"
-                        direccion = f"{direccion_ns}{direccion_eo}"
-                    
-                    # Determinar si está dentro del retiro mínimo (30m)
-                    requiere_retiro = dist_min_m < 30
-                    
-                    distancias['red_hidrica'] = {
-                        'distancia_km': round(dist_min_km, 2),
-                        'distancia_m': round(dist_min_m, 0),
-                        'nombre': str(nombre_rio),
-                        'tipo': str(tipo_rio).upper(),
-                        'direccion': direccion,
-                        'requiere_retiro': requiere_retiro,
-                        'retiro_minimo_m': 30
-                    }
-            else:
+            if not indice_red.hay_elementos(bbox):
                 distancias['red_hidrica'] = {
                     'distancia_km': None,
                     'distancia_m': None,
@@ -408,6 +344,56 @@ class GeneradorPDFLegal:
                     'requiere_retiro': False,
                     'retiro_minimo_m': 30
                 }
+            elif not cercanos:
+                # 🔴 DATOS NO CONCLUYENTES - marcar como NO DETERMINABLE
+                distancias['red_hidrica'] = {
+                    'distancia_km': None,
+                    'distancia_m': None,
+                    'nombre': 'Red hídrica no determinable con datos actuales',
+                    'tipo': 'NO CONCLUYENTE',
+                    'direccion': 'N/A',
+                    'requiere_retiro': None,  # No determinable
+                    'retiro_minimo_m': 30,
+                    'no_concluyente': True,
+                    'razon_no_concluyente': f'La cartografía disponible no permite determinar con certeza la ubicación de cauces en esta zona. No hay cauces registrados a menos de {self.DISTANCIA_MAX_CAUCE_KM} km (fuera del área de análisis razonable).'
+                }
+            else:
+                mas_cercano = cercanos[0]
+                fila = red.iloc[mas_cercano.posicion]
+                dist_min_m = mas_cercano.distancia_m
+                
+                # Intentar múltiples columnas para nombre (compatibilidad IGAC + OSM)
+                nombre_rio = (fila.get('NOMBRE_GEO') or 
+                             fila.get('NOMBRE') or 
+                             fila.get('name') or  # Campo OSM
+                             fila.get('NOM_GEO') or 
+                             fila.get('nombre') or 
+                             'Cauce sin nombre oficial')
+                
+                # Intentar múltiples columnas para tipo (compatibilidad IGAC + OSM)
+                tipo_rio = (fila.get('TIPO') or 
+                           fila.get('waterway') or  # Campo OSM
+                           fila.get('CLASE_DREN') or 
+                           fila.get('tipo') or 
+                           fila.get('ORDEN') or 
+                           'Drenaje natural')
+                
+                # Determinar si está dentro del retiro mínimo (30m)
+                requiere_retiro = dist_min_m < 30
+                
+                distancias['red_hidrica'] = {
+                    'distancia_km': round(mas_cercano.distancia_km, 2),
+                    'distancia_m': round(dist_min_m, 0),
+                    'nombre': str(nombre_rio),
+                    'tipo': str(tipo_rio).upper(),
+                    'direccion': mas_cercano.direccion,
+                    'azimut_grados': mas_cercano.azimut_grados,
+                    'requiere_retiro': requiere_retiro,
+                    'retiro_minimo_m': 30,
+                    'mas_cercanos': self._resumen_cercanos(
+                        red, cercanos, ('NOMBRE_GEO', 'NOMBRE', 'name', 'NOM_GEO', 'nombre')
+                    ),
+                }
         else:
             # Capas no cargadas
             distancias['red_hidrica'] = {
@@ -420,45 +406,31 @@ class GeneradorPDFLegal:
                 'retiro_minimo_m': 30
             }
         
-        # 4. Distancia a páramo más cercano
+        # 4. Distancia a páramo más cercano (desde el polígono de la parcela)
         if verificador.paramos is not None and len(verificador.paramos) > 0:
             paramos = verificador.paramos
-            if bbox:
-                paramos = paramos.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+            inicio = time.perf_counter()
+            cercanos = self._indice_cercania(verificador, 'paramos', paramos).mas_cercanos(
+                parcela_metrica, k=self.K_CERCANOS, bbox=bbox
+            )
+            self.tiempos_proximidad_ms['paramos'] = (time.perf_counter() - inicio) * 1000
             
-            if len(paramos) > 0:
-                paramos_proj = paramos.to_crs('EPSG:3116')
-                parcela_proj = parcela_gdf.to_crs('EPSG:3116')
+            if cercanos:
+                mas_cercano = cercanos[0]
+                fila = paramos.iloc[mas_cercano.posicion]
+                dist_min_km = mas_cercano.distancia_km
                 
-                distancias_m = paramos_proj.distance(parcela_proj.geometry.iloc[0])
-                idx_min = distancias_m.idxmin()
-                dist_min_km = distancias_m.min() / 1000
-                
-                nombre_paramo = paramos.loc[idx_min].get('NOMBRE', paramos.loc[idx_min].get('nombre', 'N/A'))
-                departamento_par = paramos.loc[idx_min].get('DEPARTAMEN', paramos.loc[idx_min].get('DEPARTAMENTO', 'N/A'))
-                
-                # Calcular dirección
-                centroide_par = paramos.loc[idx_min].geometry.centroid
-                centroide_parcela = parcela_gdf.geometry.centroid.iloc[0]
-                
-                dx = centroide_par.x - centroide_parcela.x
-                dy = centroide_par.y - centroide_parcela.y
-                
-                if abs(dy) > abs(dx) * 1.5:
-                    direccion = "Norte" if dy > 0 else "Sur"
-                elif abs(dx) > abs(dy) * 1.5:
-                    direccion = "Este" if dx > 0 else "Oeste"
-                else:
-                    direccion_ns = "Norte" if dy > 0 else "Sur"
-                    direccion_eo = "este" if dx > 0 else "oeste"
-                    direccion = f"{direccion_ns}{direccion_eo}"
+                nombre_paramo = fila.get('NOMBRE', fila.get('nombre', 'N/A'))
+                departamento_par = fila.get('DEPARTAMEN', fila.get('DEPARTAMENTO', 'N/A'))
                 
                 distancias['paramos'] = {
                     'distancia_km': round(dist_min_km, 2),
                     'nombre': nombre_paramo,
                     'ubicacion': departamento_par if departamento_par != 'N/A' else 'N/A',
-                    'direccion': direccion,
-                    'en_parcela': dist_min_km == 0
+                    'direccion': mas_cercano.direccion,
+                    'azimut_grados': mas_cercano.azimut_grados,
+                    'en_parcela': dist_min_km == 0,
+                    'mas_cercanos': self._resumen_cercanos(paramos, cercanos),
                 }
             else:
                 # Para Casanare, es correcto que no haya páramos
@@ -478,6 +450,10 @@ class GeneradorPDFLegal:
                 'en_parcela': False
             }
         
+        if self.tiempos_proximidad_ms:
+            detalle = ', '.join(f"{capa} {ms:.1f} ms" for capa, ms in self.tiempos_proximidad_ms.items())
+            print(f"⏱️  Proximidad (k={self.K_CERCANOS}): {detalle}")
+        
         return distancias
     
     def _crear_portada(self, parcela: Parcela, resultado: ResultadoVerificacion, departamento: str = "Casanare") -> List:
@@ -1167,7 +1143,16 @@ class GeneradorPDFLegal:
         ax.text(x_base - tam_flecha * 1.1, y_base, 'O', 
                fontsize=9, ha='right', va='center', color='gray', zorder=102)
     
-    def _crear_seccion_mapa(self, parcela: Parcela, verificador: VerificadorRestriccionesLegales, departamento: str = "Casanare", distancias: Dict = None) -> List:
+    @staticmethod
+    def _mapa(figuras: Optional[PlanificadorFiguras], nombre: str, generador, parcela: Parcela,
+              verificador: VerificadorRestriccionesLegales) -> BytesIO:
+        """Buffer del mapa: del planificador si ya se lanzó en paralelo, si no se genera aquí"""
+        if figuras is None:
+            return generador(parcela, verificador)
+        return figuras.obtener(nombre, lambda: generador(parcela, verificador))
+    
+    def _crear_seccion_mapa(self, parcela: Parcela, verificador: VerificadorRestriccionesLegales, departamento: str = "Casanare", distancias: Dict = None,
+                            figuras: Optional[PlanificadorFiguras] = None) -> List:
         """
         Crea la sección COMPLETA de mapas profesionales para el informe legal
         
@@ -1186,6 +1171,7 @@ class GeneradorPDFLegal:
             verificador: Instancia del VerificadorRestriccionesLegales
             departamento: Nombre del departamento para filtrado (usado en análisis de proximidad)
             distancias: Diccionario con distancias calculadas (usado para flechas técnicas)
+            figuras: Planificador con los 3 mapas ya lanzados en paralelo (opcional)
         
         Returns:
             Lista de elementos ReportLab para insertar en el PDF
@@ -1220,7 +1206,8 @@ class GeneradorPDFLegal:
         elementos.append(Spacer(1, 0.3*cm))
         
         try:
-            img_buffer_depto = generar_mapa_departamental_profesional(parcela, verificador)
+            img_buffer_depto = self._mapa(figuras, 'mapa_departamental', generar_mapa_departamental_profesional,
+                                          parcela, verificador)
             
             if img_buffer_depto:
                 img_depto = Image(img_buffer_depto, width=16*cm, height=14*cm)
@@ -1267,7 +1254,8 @@ class GeneradorPDFLegal:
         elementos.append(Spacer(1, 0.5*cm))
         
         try:
-            img_buffer_municipal = generar_mapa_ubicacion_municipal_profesional(parcela, verificador)
+            img_buffer_municipal = self._mapa(figuras, 'mapa_municipal', generar_mapa_ubicacion_municipal_profesional,
+                                              parcela, verificador)
             
             if img_buffer_municipal:
                 img_municipal = Image(img_buffer_municipal, width=16*cm, height=14*cm)
@@ -1329,7 +1317,8 @@ class GeneradorPDFLegal:
         
         try:
             # Generar mapa de influencia legal directa (IMPLEMENTADO)
-            img_buffer_influencia = generar_mapa_influencia_legal_directa(parcela, verificador)
+            img_buffer_influencia = self._mapa(figuras, 'mapa_influencia_legal', generar_mapa_influencia_legal_directa,
+                                               parcela, verificador)
             
             if img_buffer_influencia:
                 img_influencia = Image(img_buffer_influencia, width=16*cm, height=14*cm)
@@ -1819,23 +1808,32 @@ class GeneradorPDFLegal:
         # 7. Próximos Pasos → 8. Alcance y Limitaciones
         # =====================================================================
         
-        # 1. PORTADA - Impacto inicial
-        print("📋 Generando portada...")
-        elementos.extend(self._crear_portada(parcela, resultado, departamento))
-        
-        # 2. RESUMEN EJECUTIVO - Dashboard de decisión
-        print("📊 Generando resumen ejecutivo...")
-        elementos.extend(self._crear_conclusion_ejecutiva(resultado, parcela, departamento))
-        elementos.append(Spacer(1, 0.3*cm))  # Spacer reducido
-        
-        # 3. ANÁLISIS DE PROXIMIDAD - Contexto geográfico clave
-        print("📍 Generando análisis de proximidad...")
-        elementos.extend(self._crear_seccion_proximidad(distancias, departamento))
-        elementos.append(PageBreak())  # Nueva página para mapas
-        
-        # 4. MAPAS VISUALES - Comprensión espacial
-        print(f"🗺️  Generando mapas profesionales...")
-        elementos.extend(self._crear_seccion_mapa(parcela, verificador, departamento, distancias))
+        # Los 3 mapas se renderizan en procesos hijos mientras se arman las secciones 1-3
+        figuras = PlanificadorFiguras()
+        figuras.agregar('mapa_departamental', generar_mapa_departamental_profesional, parcela, verificador)
+        figuras.agregar('mapa_municipal', generar_mapa_ubicacion_municipal_profesional, parcela, verificador)
+        figuras.agregar('mapa_influencia_legal', generar_mapa_influencia_legal_directa, parcela, verificador)
+        figuras.iniciar()
+        try:
+            # 1. PORTADA - Impacto inicial
+            print("📋 Generando portada...")
+            elementos.extend(self._crear_portada(parcela, resultado, departamento))
+            
+            # 2. RESUMEN EJECUTIVO - Dashboard de decisión
+            print("📊 Generando resumen ejecutivo...")
+            elementos.extend(self._crear_conclusion_ejecutiva(resultado, parcela, departamento))
+            elementos.append(Spacer(1, 0.3*cm))  # Spacer reducido
+            
+            # 3. ANÁLISIS DE PROXIMIDAD - Contexto geográfico clave
+            print("📍 Generando análisis de proximidad...")
+            elementos.extend(self._crear_seccion_proximidad(distancias, departamento))
+            elementos.append(PageBreak())  # Nueva página para mapas
+            
+            # 4. MAPAS VISUALES - Comprensión espacial
+            print(f"🗺️  Generando mapas profesionales...")
+            elementos.extend(self._crear_seccion_mapa(parcela, verificador, departamento, distancias, figuras))
+        finally:
+            print(figuras.finalizar())
         
         # 5. TABLA DE RESTRICCIONES - Detalle técnico
         print("📊 Generando tabla de restricciones...")
@@ -1917,12 +1915,9 @@ def main():
     print(f"\n🔍 Iniciando verificación legal para {departamento}...")
     verificador = VerificadorRestriccionesLegales()
     
-    # 2.1 Cargar todas las capas geográficas
+    # 2.1 Cargar todas las capas geográficas (paquete departamental si existe)
     print(f"\n📥 Cargando capas geográficas...")
-    verificador.cargar_red_hidrica()
-    verificador.cargar_areas_protegidas()
-    verificador.cargar_resguardos_indigenas()
-    verificador.cargar_paramos()
+    verificador.cargar_capas(departamento, limites_parcela=parcela.geometria.extent)
     
     # 3. Ejecutar verificación completa
     print(f"\n📊 Ejecutando verificación de restricciones legales...")
@@ -20,14 +20,18 @@ django.setup()
 from informes.models import Parcela, IndiceMensual
 from informes.processors.timeline_processor import TimelineProcessor
 from informes.exporters.video_exporter import TimelineVideoExporter
+from informes.exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
 
 
-def generar_videos_completos(parcela_id: int = 6):
+def generar_videos_completos(parcela_id: int = 6, perfil: str = 'archive', una_pasada: bool = False):
     """
     Genera los 3 videos del timeline (NDVI, NDMI, SAVI) para una parcela
     
     Args:
         parcela_id: ID de la parcela
+        perfil: Perfil de codificación ('draft', 'web', 'archive')
+        una_pasada: Videos multi-escena de los 3 índices en una sola
+                    invocación de FFmpeg (en vez de un FFmpeg por índice)
     """
     print("=" * 80)
     print(f"🎬 GENERACIÓN BATCH DE VIDEOS DEL TIMELINE")
@@ -63,9 +67,12 @@ def generar_videos_completos(parcela_id: int = 6):
     frames_data = timeline_data.get('frames', [])
     print(f"✅ {len(frames_data)} frames generados")
     
+    if una_pasada:
+        return _generar_videos_una_pasada(frames_data, parcela, perfil)
+    
     # 4. Inicializar exportador (una sola vez)
-    print(f"\n🎬 Inicializando exportador de video...")
-    exporter = TimelineVideoExporter()
+    print(f"\n🎬 Inicializando exportador de video (perfil {perfil})...")
+    exporter = TimelineVideoExporter(perfil=perfil)
     
     # 5. Generar los 3 videos
     indices = ['ndvi', 'ndmi', 'savi']
@@ -160,15 +167,48 @@ def generar_videos_completos(parcela_id: int = 6):
     return videos_generados
 
 
+def _generar_videos_una_pasada(frames_data, parcela, perfil: str):
+    """Los 3 videos multi-escena con un solo FFmpeg (escenas apiladas + crop)"""
+    indices = [
+        indice for indice in ('ndvi', 'ndmi', 'savi')
+        if any(f.get('imagenes', {}).get(indice) for f in frames_data)
+    ]
+    if not indices:
+        print("❌ ERROR: No hay imágenes para ningún índice")
+        return []
+    
+    print(f"\n🎬 Exportando {', '.join(i.upper() for i in indices)} en una pasada (perfil {perfil})...")
+    exporter = TimelineVideoExporterMultiScene(perfil=perfil)
+    inicio = datetime.now()
+    rutas = exporter.export_timeline_multi(
+        frames_data=frames_data,
+        indices=tuple(indices),
+        parcela_info={'nombre': parcela.nombre}
+    )
+    duracion = (datetime.now() - inicio).total_seconds()
+    
+    videos_generados = []
+    for indice, ruta in rutas.items():
+        file_size = os.path.getsize(ruta) / (1024 * 1024)
+        print(f"   ✅ {indice.upper()}: {ruta} ({file_size:.2f} MB)")
+        videos_generados.append({'indice': indice, 'path': ruta, 'size_mb': file_size, 'duration_s': duracion})
+    print(f"⏱️  Tiempo total: {duracion:.1f}s")
+    return videos_generados
+
+
 if __name__ == '__main__':
     import argparse
     
     parser = argparse.ArgumentParser(description='Generar los 3 videos del timeline de una parcela')
     parser.add_argument('--parcela', type=int, default=6, help='ID de la parcela')
+    parser.add_argument('--perfil', choices=['draft', 'web', 'archive'], default='archive',
+                        help='Perfil de codificación (draft = revisión rápida)')
+    parser.add_argument('--una-pasada', action='store_true',
+                        help='Videos multi-escena de los 3 índices en una sola invocación de FFmpeg')
     
     args = parser.parse_args()
     
-    videos = generar_videos_completos(args.parcela)
+    videos = generar_videos_completos(args.parcela, perfil=args.perfil, una_pasada=args.una_pasada)
     
     if videos:
         print("\n" + "=" * 80)
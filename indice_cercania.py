@@ -0,0 +1,165 @@
+"""
+Índice de Cercanía sobre Capas Legales
+======================================
+
+Consultas "k elementos más cercanos" sobre las geometrías ya proyectadas
+(EPSG:3116) de una capa del registro, con el STRtree métrico de la capa:
+
+- `query_nearest` con distancia máxima para el más cercano; si se piden
+  más, `dwithin` con radio creciente hasta reunir k candidatos
+- Filtro opcional por bbox (mismo criterio que `.cx[...]`), memorizado
+  por capa y bbox
+- Distancia en metros, azimut (0° = Norte, sentido horario) y dirección
+  cardinal hacia el punto más cercano del elemento
+
+Uso:
+    from indice_cercania import IndiceCercania
+
+    indice = IndiceCercania.desde_capa(capa)
+    cercanos = indice.mas_cercanos(parcela_3116.centroid, k=3, bbox=bbox_departamento)
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import shapely
+from shapely.geometry import box
+from shapely.ops import nearest_points
+from shapely.strtree import STRtree
+
+from registro_capas import CRS_METRICO
+
+
+@dataclass
+class ElementoCercano:
+    """Elemento de una capa y su relación con la geometría consultada"""
+    posicion: int  # Posición (iloc) en la capa
+    distancia_m: float
+    azimut_grados: float
+    direccion: str
+
+    @property
+    def distancia_km(self) -> float:
+        return self.distancia_m / 1000
+
+
+def direccion_cardinal(dx: float, dy: float) -> str:
+    """Norte/Sur/Este/Oeste o combinación (Noreste, Suroeste, ...)"""
+    if abs(dy) > abs(dx) * 1.5:
+        return "Norte" if dy > 0 else "Sur"
+    if abs(dx) > abs(dy) * 1.5:
+        return "Este" if dx > 0 else "Oeste"
+    return f"{'Norte' if dy > 0 else 'Sur'}{'este' if dx > 0 else 'oeste'}"
+
+
+class IndiceCercania:
+    """K vecinos más cercanos sobre las geometrías métricas de una capa"""
+
+    def __init__(self, gdf, geometrias_metricas: np.ndarray, arbol_metrico: STRtree, arbol: Optional[STRtree] = None):
+        self.gdf = gdf
+        self.geometrias_metricas = geometrias_metricas
+        self.arbol_metrico = arbol_metrico
+        self.arbol = arbol if arbol is not None else STRtree(gdf.geometry.values)
+        self._permitidos_por_bbox: Dict[tuple, np.ndarray] = {}
+
+    @classmethod
+    def desde_capa(cls, capa) -> 'IndiceCercania':
+        """Índice sobre una CapaEspacial del registro (sin reproyectar ni reconstruir árboles)"""
+        indice = getattr(capa, '_indice_cercania', None)
+        if indice is None:
+            indice = cls(capa.gdf, np.asarray(capa.gdf_metrico.geometry.values), capa.arbol_metrico, capa.arbol)
+            capa._indice_cercania = indice  # Vive lo mismo que la capa (se descarta al recargar)
+        return indice
+
+    @classmethod
+    def desde_gdf(cls, gdf) -> 'IndiceCercania':
+        """Índice sobre un GeoDataFrame WGS84 que no viene del registro"""
+        geometrias = np.asarray(gdf.geometry.to_crs(CRS_METRICO).values)
+        return cls(gdf, geometrias, STRtree(geometrias))
+
+    def __len__(self) -> int:
+        return len(self.geometrias_metricas)
+
+    def _permitidos(self, bbox: Sequence[float]) -> np.ndarray:
+        """Máscara de elementos que tocan el bbox WGS84 (equivale a gdf.cx[...])"""
+        clave = tuple(float(v) for v in bbox)
+        mascara = self._permitidos_por_bbox.get(clave)
+        if mascara is None:
+            mascara = np.zeros(len(self), dtype=bool)
+            mascara[self.arbol.query(box(*clave), predicate='intersects')] = True
+            self._permitidos_por_bbox[clave] = mascara
+        return mascara
+
+    def hay_elementos(self, bbox: Optional[Sequence[float]] = None) -> bool:
+        return bool(len(self)) if bbox is None else bool(self._permitidos(bbox).any())
+
+    def mas_cercanos(
+        self,
+        geometria,
+        k: int = 1,
+        distancia_max_m: Optional[float] = None,
+        bbox: Optional[Sequence[float]] = None
+    ) -> List[ElementoCercano]:
+        """
+        Los k elementos más cercanos a `geometria` (EPSG:3116), ordenados
+        por distancia
+
+        Args:
+            geometria: Geometría de consulta en EPSG:3116
+            k: Número de elementos a devolver
+            distancia_max_m: Ignorar elementos más lejos que esto
+            bbox: [min_lon, min_lat, max_lon, max_lat]; solo elementos que lo tocan
+
+        Returns:
+            Hasta k ElementoCercano (lista vacía si no hay ninguno en rango)
+        """
+        if len(self) == 0 or k < 1:
+            return []
+        permitidos = self._permitidos(bbox) if bbox is not None else None
+        if permitidos is not None and not permitidos.any():
+            return []
+
+        # Distancia al más cercano de toda la capa: cota inferior del radio
+        indices, distancias = self.arbol_metrico.query_nearest(
+            geometria, max_distance=distancia_max_m, return_distance=True, all_matches=True
+        )
+        if len(indices) == 0:
+            return []
+        indices = np.asarray(indices[1] if np.ndim(indices) == 2 else indices)
+        radio = float(np.min(distancias))
+
+        if k > 1 or (permitidos is not None and not permitidos[indices].any()):
+            # Radio creciente hasta reunir k candidatos permitidos (o agotar la distancia máxima)
+            limite = distancia_max_m if distancia_max_m is not None else math.inf
+            buscados = min(k, int(permitidos.sum()) if permitidos is not None else len(self))
+            radio = max(radio, 1.0)
+            while True:
+                indices = self.arbol_metrico.query(geometria, predicate='dwithin', distance=radio)
+                if permitidos is not None:
+                    indices = indices[permitidos[indices]]
+                if len(indices) >= buscados or radio >= limite:
+                    break
+                radio = min(radio * 2, limite)
+        elif permitidos is not None:
+            indices = indices[permitidos[indices]]
+
+        distancias = shapely.distance(self.geometrias_metricas[indices], geometria)
+        if distancia_max_m is not None:
+            dentro = distancias <= distancia_max_m
+            indices, distancias = indices[dentro], distancias[dentro]
+        orden = np.lexsort((indices, distancias))[:k]
+        return [self._elemento(int(indices[i]), float(distancias[i]), geometria) for i in orden]
+
+    def _elemento(self, posicion: int, distancia_m: float, geometria) -> ElementoCercano:
+        objetivo = self.geometrias_metricas[posicion]
+        origen = geometria.centroid
+        if distancia_m > 0:
+            destino = nearest_points(origen, objetivo)[1]
+        else:
+            destino = objetivo.centroid  # La parcela toca el elemento: hacia su centro
+        dx, dy = destino.x - origen.x, destino.y - origen.y
+        azimut = (math.degrees(math.atan2(dx, dy)) + 360) % 360
+        return ElementoCercano(posicion, distancia_m, round(azimut, 1), direccion_cardinal(dx, dy))
+
@@ -14,6 +14,7 @@ from .models_configuracion import (
     CacheDatosEOSDA,
     EstadisticaUsoEOSDA
 )
+from .models_trabajos import TrabajoGeneracion, EstadoTrabajo
 
 
 @admin.register(Parcela)
@@ -218,6 +219,34 @@ class ConfiguracionAPIAdmin(admin.ModelAdmin):
     readonly_fields = ('fecha_ultima_consulta', 'consultas_realizadas')
 
 
+@admin.register(TrabajoGeneracion)
+class TrabajoGeneracionAdmin(admin.ModelAdmin):
+    """
+    Administrador de la cola de trabajos de generación
+    """
+    list_display = ('id', 'tipo', 'parcela', 'estado', 'intentos', 'tiempo_cola',
+                    'tiempo_ejecucion', 'worker', 'creado_en')
+    list_filter = ('estado', 'tipo', 'creado_en')
+    search_fields = ('parcela__nombre', 'usuario__username', 'mensaje_error')
+    date_hierarchy = 'creado_en'
+    readonly_fields = ('clave_dedup', 'creado_en', 'iniciado_en', 'finalizado_en',
+                       'tiempo_cola', 'tiempo_ejecucion', 'worker')
+    
+    actions = ['reintentar_trabajos']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('parcela', 'usuario')
+    
+    def reintentar_trabajos(self, request, queryset):
+        """Devuelve a la cola trabajos fallidos"""
+        from django.utils import timezone
+        updated = queryset.filter(estado=EstadoTrabajo.FALLIDO).update(
+            estado=EstadoTrabajo.PENDIENTE, intentos=0, disponible_desde=timezone.now()
+        )
+        self.message_user(request, f'{updated} trabajos devueltos a la cola.')
+    reintentar_trabajos.short_description = "Reintentar trabajos fallidos"
+
+
 # Personalización del admin site
 admin.site.site_header = "AgroTech Histórico - Administración"
 admin.site.site_title = "AgroTech Admin"
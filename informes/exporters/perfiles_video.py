@@ -0,0 +1,88 @@
+"""
+Perfiles de codificación para los exportadores de video del timeline
+
+Los videos del timeline son presentaciones de imágenes fijas: casi todos los
+frames son idénticos al anterior. Un preset veryslow con CRF 18 gasta
+minutos de CPU sin ganancia visible, así que cada perfil fija preset, CRF,
+longitud de GOP, resolución máxima de salida y ``-tune stillimage``:
+
+- ``draft``: revisión interna, segundos por video (720p, ultrafast)
+- ``web``: entrega en la plataforma (1080p, medium, GOP corto para buscar)
+- ``archive``: calidad de entrega comercial (1080p, veryslow, CRF 18)
+
+Las escenas se siguen dibujando a la resolución del exportador (el diseño
+usa coordenadas absolutas de 1920x1080); el perfil solo reduce la salida
+cuando el lienzo es más grande, sin ampliar ni deformar lienzos de otra
+proporción.
+
+@author: AgroTech Team
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class PerfilCodificacion:
+    """Parámetros de x264 para un tipo de entrega"""
+    nombre: str
+    preset: str
+    crf: int
+    gop_segundos: float
+    ancho: int
+    alto: int
+    tune: Optional[str] = 'stillimage'
+    bitrate_maximo: Optional[str] = None  # Tope VBV (None = solo CRF)
+
+    def argumentos_x264(self, fps: int) -> List[str]:
+        """Argumentos de codificación (después de los filtros)"""
+        argumentos = ['-c:v', 'libx264', '-preset', self.preset, '-crf', str(self.crf)]
+        if self.tune:
+            argumentos += ['-tune', self.tune]
+        argumentos += ['-g', str(max(int(round(self.gop_segundos * fps)), 1))]
+        if self.bitrate_maximo:
+            kbps = int(self.bitrate_maximo.rstrip('k'))
+            argumentos += ['-maxrate', self.bitrate_maximo, '-bufsize', f'{kbps * 2}k']
+        return argumentos + ['-pix_fmt', 'yuv420p', '-movflags', '+faststart']
+
+    def _factor_reduccion(self, ancho: int, alto: int) -> float:
+        return min(self.ancho / ancho, self.alto / alto)
+
+    def dimensiones_salida(self, ancho: int, alto: int) -> Tuple[int, int]:
+        """Tamaño de salida: el lienzo, reducido a la resolución del perfil si la supera"""
+        factor = self._factor_reduccion(ancho, alto)
+        if factor >= 1:
+            return ancho, alto
+        # x264 con yuv420p exige dimensiones pares
+        return int(round(ancho * factor / 2)) * 2, int(round(alto * factor / 2)) * 2
+
+    def filtro_escala(self, ancho: int, alto: int) -> Optional[str]:
+        """Filtro que reduce el lienzo al perfil conservando la proporción (nunca amplía)"""
+        if self._factor_reduccion(ancho, alto) >= 1:
+            return None
+        if self.alto / alto <= self.ancho / ancho:
+            return f'scale=-2:{self.alto}:flags=lanczos'
+        return f'scale={self.ancho}:-2:flags=lanczos'
+
+
+PERFILES_CODIFICACION: Dict[str, PerfilCodificacion] = {
+    'draft': PerfilCodificacion('draft', preset='ultrafast', crf=30, gop_segundos=10,
+                                ancho=1280, alto=720),
+    'web': PerfilCodificacion('web', preset='medium', crf=23, gop_segundos=2,
+                              ancho=1920, alto=1080, bitrate_maximo='4000k'),
+    'archive': PerfilCodificacion('archive', preset='veryslow', crf=18, gop_segundos=10,
+                                  ancho=1920, alto=1080, bitrate_maximo='10000k'),
+}
+
+PERFIL_POR_DEFECTO = 'archive'
+
+
+def obtener_perfil(perfil) -> PerfilCodificacion:
+    """Acepta un nombre de perfil o una instancia de PerfilCodificacion"""
+    if isinstance(perfil, PerfilCodificacion):
+        return perfil
+    nombre = (perfil or PERFIL_POR_DEFECTO).lower()
+    if nombre not in PERFILES_CODIFICACION:
+        raise ValueError(f"Perfil de video desconocido: {perfil} "
+                         f"(opciones: {', '.join(PERFILES_CODIFICACION)})")
+    return PERFILES_CODIFICACION[nombre]
@@ -0,0 +1,73 @@
+"""
+Render paralelo de escenas/frames de video en un pool de procesos
+
+Los exportadores dibujan cada escena con PIL (CPU puro, sujeto al GIL).
+Con ``procesos > 1`` las escenas se reparten en un ``ProcessPoolExecutor``:
+
+- Cada worker recibe UNA copia del exportador al arrancar (initializer),
+  no una por tarea.
+- Las imágenes satelitales llegan ya decodificadas dentro de los argumentos
+  de cada tarea: el worker no vuelve a leer disco ni red.
+- ``Executor.map`` devuelve los resultados en el orden del plan, así que el
+  orden de los frames es determinista sin importar qué worker termina antes.
+
+@author: AgroTech Team
+"""
+
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Exportador del proceso worker (uno por proceso, fijado por el initializer)
+_EXPORTADOR = None
+
+
+def _inicializar_worker(exportador) -> None:
+    global _EXPORTADOR
+    _EXPORTADOR = exportador
+
+
+def _ejecutar_tarea(metodo: str, argumentos: tuple) -> Tuple[Any, float, Optional[str]]:
+    """Ejecuta un método de dibujo en el worker → (resultado, segundos, error)"""
+    inicio = time.perf_counter()
+    try:
+        resultado = getattr(_EXPORTADOR, metodo)(*argumentos)
+        return resultado, time.perf_counter() - inicio, None
+    except Exception as e:
+        return None, time.perf_counter() - inicio, f"{type(e).__name__}: {e}"
+
+
+def normalizar_procesos(procesos: Optional[int]) -> int:
+    """None/0 → un proceso por CPU; negativos → 1 (secuencial)"""
+    if not procesos:
+        return os.cpu_count() or 1
+    return max(int(procesos), 1)
+
+
+def renderizar_en_paralelo(exportador,
+                           tareas: Sequence[Tuple[str, tuple]],
+                           procesos: int) -> List[Tuple[Any, float, Optional[str]]]:
+    """
+    Ejecuta ``[(método, argumentos), ...]`` del exportador en un pool
+
+    Args:
+        exportador: Instancia picklable (sin memmaps ni sesiones abiertas)
+        tareas: Plan de dibujo en el orden final del video
+        procesos: Número de workers
+
+    Returns:
+        Lista de (resultado, segundos, error) en el mismo orden que ``tareas``
+    """
+    if not tareas:
+        return []
+    procesos = min(procesos, len(tareas))
+    with ProcessPoolExecutor(max_workers=procesos,
+                             initializer=_inicializar_worker,
+                             initargs=(exportador,)) as pool:
+        return list(pool.map(_ejecutar_tarea,
+                             [metodo for metodo, _ in tareas],
+                             [argumentos for _, argumentos in tareas]))
@@ -14,6 +14,7 @@ Características:
 """
 
 import os
+import time
 import subprocess
 import tempfile
 import shutil
@@ -21,12 +22,16 @@ import logging
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
+from dataclasses import replace
 from io import BytesIO
 
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import requests
 from django.conf import settings
 
+from .render_paralelo import normalizar_procesos, renderizar_en_paralelo
+from .perfiles_video import obtener_perfil
+
 logger = logging.getLogger(__name__)
 
 
@@ -54,8 +59,10 @@ class TimelineVideoExporter:
                  width: int = DEFAULT_WIDTH,
                  height: int = DEFAULT_HEIGHT,
                  fps: int = DEFAULT_FPS,
-                 bitrate: str = DEFAULT_BITRATE,
-                 crf: int = DEFAULT_CRF):
+                 bitrate: Optional[str] = None,
+                 crf: Optional[int] = None,
+                 procesos: int = 1,
+                 perfil: str = 'archive'):
         """
         Inicializa el exportador con parámetros de calidad
         
@@ -63,20 +70,27 @@ class TimelineVideoExporter:
             width: Ancho del video en píxeles
             height: Alto del video en píxeles
             fps: Frames por segundo (velocidad del video)
-            bitrate: Bitrate del video (calidad)
-            crf: Constant Rate Factor (0-51, menor = mejor calidad)
+            bitrate: Bitrate máximo del video (None = el del perfil)
+            crf: Constant Rate Factor (0-51, menor = mejor calidad; None = el del perfil)
+            procesos: Workers para dibujar frames en paralelo
+                      (1 = secuencial, 0/None = uno por CPU)
+            perfil: 'draft', 'web' o 'archive' (preset, CRF, GOP, resolución
+                    de salida y tune; ver perfiles_video)
         """
         self.width = width
         self.height = height
         self.fps = fps
-        self.bitrate = bitrate
-        self.crf = crf
+        self.perfil = obtener_perfil(perfil)
+        self.bitrate = bitrate or self.perfil.bitrate_maximo
+        self.crf = crf if crf is not None else self.perfil.crf
+        self.procesos = normalizar_procesos(procesos)
         
         # Verificar FFmpeg
         if not self._check_ffmpeg():
             raise RuntimeError("FFmpeg no está instalado o no está disponible en PATH")
         
-        logger.info(f"TimelineVideoExporter inicializado: {width}x{height} @ {fps}fps, bitrate={bitrate}, CRF={crf}")
+        logger.info(f"TimelineVideoExporter inicializado: {width}x{height} @ {fps}fps, bitrate={self.bitrate}, CRF={self.crf}, "
+                    f"perfil={self.perfil.nombre}, procesos={self.procesos}")
     
     def _check_ffmpeg(self) -> bool:
         """Verifica que FFmpeg esté disponible"""
@@ -135,14 +149,11 @@ class TimelineVideoExporter:
         temp_dir = tempfile.mkdtemp(prefix='agrotech_video_')
         
         try:
-            # Generar todas las escenas del video
-            frame_paths = self._generate_all_scenes(
+            # Generar un frame por mes
+            frame_paths = self._generate_frames(
                 frames_data=frames_data,
                 indice=indice,
-                temp_dir=temp_dir,
-                parcela_info=parcela_info,
-                analisis_texto=analisis_texto,
-                recomendaciones_texto=recomendaciones_texto
+                output_dir=temp_dir
             )
             
             if not frame_paths:
@@ -180,6 +191,9 @@ class TimelineVideoExporter:
         Returns:
             Lista de rutas de los frames generados
         """
+        if self.procesos > 1 and len(frames_data) > 1:
+            return self._generate_frames_paralelo(frames_data, indice, output_dir)
+        
         frame_paths = []
         
         for i, frame_data in enumerate(frames_data):
@@ -187,7 +201,9 @@ class TimelineVideoExporter:
                 frame_path = os.path.join(output_dir, f'frame_{i:04d}.png')
                 
                 # Generar frame individual
+                inicio = time.perf_counter()
                 self._generate_single_frame(frame_data, indice, frame_path)
+                logger.info(f"   ⏱️ Frame {i + 1}/{len(frames_data)}: {(time.perf_counter() - inicio) * 1000:.0f} ms")
                 
                 frame_paths.append(frame_path)
                 
@@ -201,6 +217,37 @@ class TimelineVideoExporter:
         
         return frame_paths
     
+    def _generate_frames_paralelo(self,
+                                  frames_data: List[Dict],
+                                  indice: str,
+                                  output_dir: str) -> List[str]:
+        """
+        Igual que _generate_frames pero repartiendo los frames en un pool de
+        procesos. Las imágenes satelitales se decodifican aquí una sola vez y
+        viajan ya decodificadas; cada worker dibuja y guarda su PNG. El orden
+        de frame_paths es el de frames_data.
+        """
+        tareas = []
+        for i, frame_data in enumerate(frames_data):
+            frame_path = os.path.join(output_dir, f'frame_{i:04d}.png')
+            sat_img = self._cargar_imagen_frame(frame_data, indice)
+            tareas.append(('_dibujar_frame', (frame_data, indice, sat_img, frame_path)))
+        
+        inicio = time.perf_counter()
+        resultados = renderizar_en_paralelo(self, tareas, self.procesos)
+        
+        frame_paths = []
+        for i, ((_, argumentos), (_, segundos, error)) in enumerate(zip(tareas, resultados)):
+            if error:
+                logger.error(f"Error generando frame {i}: {error}")
+                continue
+            logger.info(f"   ⏱️ Frame {i + 1}/{len(frames_data)}: {segundos * 1000:.0f} ms")
+            frame_paths.append(argumentos[-1])
+        
+        logger.info(f"Progreso: {len(frame_paths)}/{len(frames_data)} frames generados en "
+                    f"{time.perf_counter() - inicio:.1f}s ({self.procesos} procesos)")
+        return frame_paths
+    
     def _generate_single_frame(self,
                               frame_data: Dict,
                               indice: str,
@@ -215,27 +262,38 @@ class TimelineVideoExporter:
         6. Texto interpretativo
         SIN emojis, narrativa clara para agricultores
         """
+        self._dibujar_frame(frame_data, indice, self._cargar_imagen_frame(frame_data, indice), output_path)
+    
+    def _cargar_imagen_frame(self, frame_data: Dict, indice: str) -> Optional[Image.Image]:
+        """Imagen satelital del frame decodificada, o None si no hay o falla"""
+        imagen_url = frame_data.get('imagenes', {}).get(indice)
+        if not imagen_url:
+            return None
+        try:
+            return self._load_satellite_image(imagen_url)
+        except Exception as e:
+            logger.warning(f"Error cargando imagen satelital: {e}")
+            return None
+    
+    def _dibujar_frame(self,
+                       frame_data: Dict,
+                       indice: str,
+                       sat_img: Optional[Image.Image],
+                       output_path: str):
+        """Dibuja y guarda el frame con la imagen ya decodificada (sin E/S de lectura)"""
         # Crear imagen base con fondo neutro profesional (#1a1a1a más oscuro que #2a2a2a)
         img = Image.new('RGB', (self.width, self.height), color='#1a1a1a')
         draw = ImageDraw.Draw(img)
         
-        # Obtener imagen satelital
-        imagen_url = frame_data.get('imagenes', {}).get(indice)
-        
-        if imagen_url:
+        if sat_img:
             try:
-                sat_img = self._load_satellite_image(imagen_url)
-                if sat_img:
-                    # Aplicar suavizado de raster para calidad profesional vendible
-                    sat_img_suavizada = sat_img.filter(ImageFilter.SMOOTH_MORE)
-                    # Raster suavizado LANCZOS, polígono centrado, proporción real
-                    sat_img_resized = self._resize_and_center(sat_img_suavizada, self.width, self.height)
-                    img.paste(sat_img_resized, (0, 0))
-                else:
-                    # Placeholder profesional cuando no hay imagen
-                    self._draw_placeholder(img, draw, frame_data, indice)
+                # Aplicar suavizado de raster para calidad profesional vendible
+                sat_img_suavizada = sat_img.filter(ImageFilter.SMOOTH_MORE)
+                # Raster suavizado LANCZOS, polígono centrado, proporción real
+                sat_img_resized = self._resize_and_center(sat_img_suavizada, self.width, self.height)
+                img.paste(sat_img_resized, (0, 0))
             except Exception as e:
-                logger.warning(f"Error cargando imagen satelital: {e}")
+                logger.warning(f"Error procesando imagen satelital: {e}")
                 self._draw_placeholder(img, draw, frame_data, indice)
         else:
             # Sin imagen disponible - usar placeholder
@@ -670,10 +728,11 @@ class TimelineVideoExporter:
         
         logger.info(f"Lista de frames creada: {list_file} (duración: {self.FRAME_DURATION}s/frame)")
         
-        # Comando FFmpeg OPTIMIZADO para MÁXIMA CALIDAD de imágenes satelitales
-        # Configuración broadcast-quality para entrega comercial
+        # Preset, CRF, GOP, tune stillimage y resolución de salida según el perfil
         # CRÍTICO: Agregar transiciones suaves fade in/out entre frames
         fade_duration = 0.3  # 300ms de fade para transiciones profesionales
+        perfil = replace(self.perfil, crf=self.crf, bitrate_maximo=self.bitrate)
+        ancho_salida, alto_salida = perfil.dimensiones_salida(self.width, self.height)
         
         ffmpeg_cmd = [
             'ffmpeg',
@@ -681,21 +740,14 @@ class TimelineVideoExporter:
             '-f', 'concat',
             '-safe', '0',
             '-i', list_file,
-            '-c:v', 'libx264',  # Codec H.264 (máxima compatibilidad)
-            '-preset', 'veryslow',  # VERYSLOW = máxima calidad (lento pero vale la pena)
-            '-crf', str(self.crf),  # CRF 18 = calidad broadcast
-            '-b:v', self.bitrate,  # Bitrate alto para preservar detalles raster
-            '-maxrate', str(int(self.bitrate.replace('k', '')) * 1.5) + 'k',  # Picos de bitrate permitidos
-            '-bufsize', str(int(self.bitrate.replace('k', '')) * 3) + 'k',  # Buffer grande
-            '-pix_fmt', 'yuv420p',  # Formato de píxel compatible con todos los reproductores
             # CRÍTICO: Filtros de video para calidad profesional
             '-vf', (
                 f'fps={self.fps},'  # FPS fijo
-                f'scale={self.width}:{self.height}:flags=lanczos,'  # Escalado LANCZOS para máxima calidad
+                f'scale={ancho_salida}:{alto_salida}:flags=lanczos,'  # Escalado LANCZOS para máxima calidad
                 f'fade=t=in:st=0:d={fade_duration},'  # Fade in al inicio
                 f'fade=t=out:st={len(frame_paths) * self.FRAME_DURATION - fade_duration}:d={fade_duration}'  # Fade out al final
             ),
-            '-movflags', '+faststart',  # Optimización para streaming (meta al inicio del archivo)
+        ] + perfil.argumentos_x264(self.fps) + [
             '-profile:v', 'high',  # Profile High (mejor compresión/calidad)
             '-level', '4.2',  # Level 4.2 (soporta 4K)
             output_path
@@ -2,6 +2,10 @@
 Exportador de video profesional MULTI-ESCENA para Timeline de AgroTech Histórico
 Genera videos MP4 con estructura completa: Portada + Mapas Mensuales + Análisis + Recomendaciones + Cierre
 
+Cada escena es una imagen fija: se dibuja UNA vez y se envía a FFmpeg como
+RGB crudo por un pipe, con su duración expresada en los timestamps
+(setpts). Sin PNGs intermedios ni directorio temporal.
+
 ESTRICTAMENTE SIGUE LAS ESPECIFICACIONES DE finalizando_timeline.md
 - NO inventa valores
 - NO analiza datos
@@ -12,15 +16,18 @@ ESTRICTAMENTE SIGUE LAS ESPECIFICACIONES DE finalizando_timeline.md
 """
 
 import os
+import copy
 import subprocess
-import tempfile
-import shutil
 import logging
+import time
+from dataclasses import dataclass, replace
+from functools import lru_cache
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from io import BytesIO
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import requests
 from django.conf import settings
@@ -35,9 +42,36 @@ from .video_content_helpers import (
     parsear_recomendaciones_desde_texto,
     calcular_estadisticas_periodo
 )
+from .render_paralelo import normalizar_procesos, renderizar_en_paralelo
+from .perfiles_video import obtener_perfil
 
 logger = logging.getLogger(__name__)
 
+RUTA_FUENTE = "/System/Library/Fonts/Helvetica.ttc"
+
+
+@lru_cache(maxsize=None)
+def _fuente(tamaño: int):
+    """Fuente del video (cargada una vez por tamaño)"""
+    try:
+        return ImageFont.truetype(RUTA_FUENTE, tamaño)
+    except OSError:
+        return ImageFont.load_default()
+
+
+@dataclass
+class Escena:
+    """Imagen fija que se muestra `duracion` segundos"""
+    nombre: str
+    imagen: Image.Image
+    duracion: float
+
+
+# Rampa rojo → amarillo → verde para pintar capas del cubo temporal
+RAMPA_INDICE = np.array([
+    [165, 0, 38], [244, 109, 67], [254, 224, 139], [217, 239, 139], [102, 189, 99], [0, 104, 55]
+], dtype=np.float32)
+
 
 class TimelineVideoExporterMultiScene:
     """
@@ -59,23 +93,37 @@ class TimelineVideoExporterMultiScene:
     UNAVAILABLE_IMAGE_DURATION = 2.5      # Imagen no disponible por nubosidad
     RECOMMENDATIONS_DURATION = 5.0        # Recomendaciones o resumen
     CLOSING_DURATION = 3.0                # Cierre
+    COVER_DURATION = 3.0                  # Portada simple (estructura anterior)
+    ANALYSIS_DURATION = 5.0               # Análisis breve (estructura anterior)
     
     def __init__(self, 
                  width: int = DEFAULT_WIDTH,
                  height: int = DEFAULT_HEIGHT,
                  fps: int = DEFAULT_FPS,
-                 bitrate: str = DEFAULT_BITRATE,
-                 crf: int = DEFAULT_CRF):
+                 bitrate: Optional[str] = None,
+                 crf: Optional[int] = None,
+                 procesos: int = 1,
+                 perfil: str = 'archive'):
+        """
+        procesos: workers para dibujar escenas en paralelo (1 = secuencial,
+        0/None = uno por CPU). Opcional: solo compensa con muchos meses.
+        perfil: 'draft', 'web' o 'archive' (ver perfiles_video); bitrate y
+        crf explícitos reemplazan los del perfil.
+        """
         self.width = width
         self.height = height
         self.fps = fps
-        self.bitrate = bitrate
-        self.crf = crf
+        self.perfil = obtener_perfil(perfil)
+        self.bitrate = bitrate or self.perfil.bitrate_maximo
+        self.crf = crf if crf is not None else self.perfil.crf
+        self.procesos = normalizar_procesos(procesos)
+        self._cubo_temporal = None
         
         if not self._check_ffmpeg():
             raise RuntimeError("FFmpeg no está instalado")
         
-        logger.info(f"✅ TimelineVideoExporterMultiScene inicializado: {width}x{height} @ {fps}fps")
+        logger.info(f"✅ TimelineVideoExporterMultiScene inicializado: {width}x{height} @ {fps}fps, "
+                    f"perfil={self.perfil.nombre}, procesos={self.procesos}")
     
     def _check_ffmpeg(self) -> bool:
         try:
@@ -90,9 +138,13 @@ class TimelineVideoExporterMultiScene:
                        output_path: Optional[str] = None,
                        parcela_info: Optional[Dict] = None,
                        analisis_texto: Optional[str] = None,
-                       recomendaciones_texto: Optional[str] = None) -> str:
+                       recomendaciones_texto: Optional[str] = None,
+                       cubo_temporal=None) -> str:
         """
         Exporta video multi-escena completo
+
+        cubo_temporal: CuboTemporalParcela opcional; los meses sin imagen
+        PNG guardada se pintan desde su capa del cubo (memmap, sin copia)
         """
         if not frames_data:
             raise ValueError("No hay frames para exportar")
@@ -102,44 +154,104 @@ class TimelineVideoExporterMultiScene:
         
         logger.info(f"🎬 Iniciando exportación multi-escena: {len(frames_data)} meses, índice={indice}")
         
-        temp_dir = tempfile.mkdtemp(prefix='agrotech_video_')
+        self._cubo_temporal = cubo_temporal
         
         try:
-            frame_paths = self._generate_all_scenes(
+            escenas = self._generate_all_scenes(
                 frames_data=frames_data,
                 indice=indice,
-                temp_dir=temp_dir,
                 parcela_info=parcela_info,
                 analisis_texto=analisis_texto,
                 recomendaciones_texto=recomendaciones_texto
             )
-            
-            if not frame_paths:
-                raise RuntimeError("No se generaron frames")
-            
-            if output_path is None:
-                output_path = self._get_default_output_path(indice)
-            
-            self._create_video_ffmpeg(frame_paths, output_path)
-            
-            logger.info(f"✅ Video generado: {output_path}")
-            return output_path
-            
         finally:
-            try:
-                shutil.rmtree(temp_dir)
-            except:
-                pass
+            self._cubo_temporal = None
+        
+        if not escenas:
+            raise RuntimeError("No se generaron frames")
+        
+        if output_path is None:
+            output_path = self._get_default_output_path(indice)
+        
+        self._create_video_ffmpeg(escenas, output_path)
+        
+        logger.info(f"✅ Video generado: {output_path}")
+        return output_path
     
-    def _generate_all_scenes(self,
+    def export_timeline_multi(self,
+                              frames_data: List[Dict],
+                              indices: Tuple[str, ...] = ('ndvi', 'ndmi', 'savi'),
+                              output_paths: Optional[Dict[str, str]] = None,
+                              parcela_info: Optional[Dict] = None,
+                              analisis_texto: Optional[str] = None,
+                              recomendaciones_texto: Optional[str] = None,
+                              cubo_temporal=None) -> Dict[str, str]:
+        """
+        Exporta un video por índice en UNA sola invocación de FFmpeg
+
+        Las escenas de los índices se apilan en cada frame de entrada y se
+        separan con crop dentro del grafo de filtros: una lectura del pipe
+        y un cálculo de tiempos para todos los videos. Si las escenas de
+        algún índice no tienen las mismas duraciones (no debería pasar: el
+        plan solo depende de los meses y los textos) se codifica por
+        separado.
+
+        Returns:
+            {indice: ruta del video}
+        """
+        if not frames_data:
+            raise ValueError("No hay frames para exportar")
+        
+        invalidos = [indice for indice in indices if indice not in ['ndvi', 'ndmi', 'savi']]
+        if invalidos or not indices:
+            raise ValueError(f"Índices inválidos: {invalidos or indices}")
+        
+        logger.info(f"🎬 Exportación multi-índice ({', '.join(i.upper() for i in indices)}): "
+                    f"{len(frames_data)} meses, perfil={self.perfil.nombre}")
+        
+        self._cubo_temporal = cubo_temporal
+        try:
+            escenas_por_indice = {
+                indice: self._generate_all_scenes(
+                    frames_data=frames_data,
+                    indice=indice,
+                    parcela_info=parcela_info,
+                    analisis_texto=analisis_texto,
+                    recomendaciones_texto=recomendaciones_texto
+                )
+                for indice in indices
+            }
+        finally:
+            self._cubo_temporal = None
+        
+        output_paths = dict(output_paths or {})
+        for indice in indices:
+            output_paths.setdefault(indice, self._get_default_output_path(indice))
+        
+        duraciones = {indice: [e.duracion for e in escenas] for indice, escenas in escenas_por_indice.items()}
+        if len({tuple(d) for d in duraciones.values()}) > 1:
+            logger.warning("⚠️ Escenas con duraciones distintas entre índices: un FFmpeg por índice")
+            for indice in indices:
+                self._create_video_ffmpeg(escenas_por_indice[indice], output_paths[indice])
+        else:
+            primeras = escenas_por_indice[indices[0]]
+            comando = self._comando_ffmpeg_multiple(primeras, [output_paths[indice] for indice in indices])
+            frames = [[escenas_por_indice[indice][n] for indice in indices] for n in range(len(primeras))]
+            self._ejecutar_ffmpeg(comando, frames)
+        
+        rutas = {indice: output_paths[indice] for indice in indices}
+        for indice, ruta in rutas.items():
+            logger.info(f"✅ Video {indice.upper()} generado: {ruta}")
+        return rutas
+    
+    def _planificar_escenas(self,
                             frames_data: List[Dict],
                             indice: str,
-                            temp_dir: str,
                             parcela_info: Optional[Dict] = None,
                             analisis_texto: Optional[str] = None,
-                            recomendaciones_texto: Optional[str] = None) -> List[str]:
+                            recomendaciones_texto: Optional[str] = None) -> List[Tuple[str, tuple]]:
         """
-        Genera TODAS las escenas del video en NUEVO ORDEN:
+        Orden de escenas del video como (método, argumentos):
         1. Portada completa (4s)
         2. Explicación del índice (5s)
         3. Análisis completo del motor (7s) - si existe
@@ -147,61 +259,85 @@ class TimelineVideoExporterMultiScene:
         5. Recomendaciones o resumen (5s)
         6. Cierre (3s)
         """
-        all_frames = []
-        counter = 0
-        
-        # 1️⃣ PORTADA COMPLETA
-        logger.info("📝 Generando portada completa...")
-        cover_frames = self._generate_cover_complete_scene(parcela_info, frames_data, indice, temp_dir, counter)
-        all_frames.extend(cover_frames)
-        counter += len(cover_frames)
-        logger.info(f"✅ Portada completa: {len(cover_frames)} frames")
-        
-        # 2️⃣ EXPLICACIÓN DEL ÍNDICE
-        logger.info(f"� Generando explicación del índice {indice.upper()}...")
-        explanation_frames = self._generate_index_explanation_scene(indice, parcela_info, temp_dir, counter)
-        all_frames.extend(explanation_frames)
-        counter += len(explanation_frames)
-        logger.info(f"✅ Explicación: {len(explanation_frames)} frames")
-        
-        # 3️⃣ ANÁLISIS COMPLETO DEL MOTOR (solo si existe)
+        plan = [
+            ('_generate_cover_complete_scene', (parcela_info, frames_data, indice)),
+            ('_generate_index_explanation_scene', (indice, parcela_info)),
+        ]
         if analisis_texto and analisis_texto.strip():
-            logger.info("📊 Generando análisis completo del motor...")
-            analysis_frames = self._generate_full_analysis_scene(analisis_texto, indice, temp_dir, counter)
-            all_frames.extend(analysis_frames)
-            counter += len(analysis_frames)
-            logger.info(f"✅ Análisis completo: {len(analysis_frames)} frames")
-        
-        # 4️⃣ MAPAS MENSUALES (con detección de imágenes no disponibles)
-        logger.info(f"🗺️ Generando {len(frames_data)} mapas mensuales...")
+            plan.append(('_generate_full_analysis_scene', (analisis_texto, indice)))
         for i, frame_data in enumerate(frames_data):
-            monthly_frames = self._generate_monthly_map_or_unavailable(frame_data, indice, frames_data, i, temp_dir, counter)
-            all_frames.extend(monthly_frames)
-            counter += len(monthly_frames)
-        logger.info(f"✅ Mapas mensuales: {len(frames_data)} escenas")
-        
-        # 5️⃣ RECOMENDACIONES O RESUMEN
-        logger.info("💡 Generando recomendaciones o resumen...")
+            plan.append(('_generate_monthly_map_or_unavailable', (frame_data, indice, frames_data, i)))
         if recomendaciones_texto and recomendaciones_texto.strip():
-            reco_frames = self._generate_recommendations_scene(recomendaciones_texto, indice, temp_dir, counter)
+            plan.append(('_generate_recommendations_scene', (recomendaciones_texto, indice)))
         else:
-            # Generar resumen si no hay recomendaciones
-            reco_frames = self._generate_summary_scene(frames_data, indice, temp_dir, counter)
-        all_frames.extend(reco_frames)
-        counter += len(reco_frames)
-        logger.info(f"✅ Recomendaciones/Resumen: {len(reco_frames)} frames")
-        
-        # 6️⃣ CIERRE
-        logger.info("🎬 Generando cierre...")
-        closing_frames = self._generate_closing_scene(indice, temp_dir, counter)
-        all_frames.extend(closing_frames)
-        counter += len(closing_frames)
-        logger.info(f"✅ Cierre: {len(closing_frames)} frames")
-        
-        logger.info(f"🎞️ TOTAL: {len(all_frames)} frames generados")
-        return all_frames
+            # Resumen si no hay recomendaciones
+            plan.append(('_generate_summary_scene', (frames_data, indice)))
+        plan.append(('_generate_closing_scene', (indice,)))
+        return plan
     
-    def _generate_cover_scene(self, indice, frames_data, parcela_info, temp_dir, start_idx) -> List[str]:
+    def _generate_all_scenes(self,
+                            frames_data: List[Dict],
+                            indice: str,
+                            parcela_info: Optional[Dict] = None,
+                            analisis_texto: Optional[str] = None,
+                            recomendaciones_texto: Optional[str] = None) -> List[Escena]:
+        """
+        Dibuja cada escena una sola vez (ver _planificar_escenas). Con
+        procesos > 1 las escenas se reparten en un pool; el orden del video
+        es siempre el del plan.
+        """
+        plan = self._planificar_escenas(frames_data, indice, parcela_info, analisis_texto, recomendaciones_texto)
+        inicio = time.perf_counter()
+        
+        if self.procesos > 1 and len(plan) > 1:
+            escenas, tiempos = self._dibujar_en_paralelo(plan)
+        else:
+            escenas, tiempos = [], []
+            for metodo, argumentos in plan:
+                inicio_escena = time.perf_counter()
+                escenas.append(getattr(self, metodo)(*argumentos))
+                tiempos.append(time.perf_counter() - inicio_escena)
+        
+        for n, (escena, segundos) in enumerate(zip(escenas, tiempos), 1):
+            logger.info(f"   ⏱️ Escena {n}/{len(escenas)} {escena.nombre}: {segundos * 1000:.0f} ms")
+        
+        duracion = sum(escena.duracion for escena in escenas)
+        logger.info(f"🎞️ {len(escenas)} escenas dibujadas ({len(frames_data)} mapas mensuales), "
+                    f"{duracion:.1f}s de video en {time.perf_counter() - inicio:.1f}s "
+                    f"({self.procesos if self.procesos > 1 else 1} proceso(s))")
+        return escenas
+    
+    def _dibujar_en_paralelo(self, plan: List[Tuple[str, tuple]]) -> Tuple[List[Escena], List[float]]:
+        """
+        Reparte el plan en un pool de procesos. Las imágenes de los mapas
+        mensuales se decodifican aquí (una vez) y viajan en los argumentos;
+        los workers solo dibujan.
+        """
+        tareas = []
+        for metodo, argumentos in plan:
+            if metodo == '_generate_monthly_map_or_unavailable':
+                frame_data, indice, frames_data, frame_index = argumentos
+                if self._mes_con_imagen(frame_data, indice):
+                    sat_img = self._cargar_imagen_mes(frame_data, indice)
+                    tareas.append(('_dibujar_mapa_mensual', (frame_data, indice, sat_img)))
+                else:
+                    tareas.append(('_generate_unavailable_image_scene', (frame_data, frames_data, frame_index, indice)))
+            else:
+                tareas.append((metodo, argumentos))
+        
+        # El cubo (memmap) no viaja a los workers: sus capas ya están en las tareas
+        exportador = copy.copy(self)
+        exportador._cubo_temporal = None
+        
+        escenas, tiempos = [], []
+        for (metodo, _), (escena, segundos, error) in zip(tareas, renderizar_en_paralelo(exportador, tareas, self.procesos)):
+            if error:
+                raise RuntimeError(f"Error dibujando escena {metodo}: {error}")
+            escenas.append(escena)
+            tiempos.append(segundos)
+        return escenas, tiempos
+    
+    def _generate_cover_scene(self, indice, frames_data, parcela_info) -> Escena:
         """
         ESCENA 1: PORTADA
         - Logo AgroTech
@@ -209,9 +345,6 @@ class TimelineVideoExporterMultiScene:
         - Parcela/lote
         - Rango temporal
         """
-        num_frames = int(self.COVER_DURATION * self.fps)
-        frames = []
-        
         # Obtener rango temporal
         if frames_data:
             primer_mes = frames_data[0].get('periodo_texto', '')
@@ -223,44 +356,35 @@ class TimelineVideoExporterMultiScene:
         # Nombre de parcela
         parcela_nombre = parcela_info.get('nombre', 'Parcela') if parcela_info else 'Parcela'
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 80)
-                font_subtitle = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 40)
-                font_info = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 32)
-            except:
-                font_title = font_subtitle = font_info = ImageFont.load_default()
-            
-            center_x = self.width // 2
-            y_pos = 300
-            
-            # Logo/Título AgroTech
-            draw.text((center_x, y_pos), "AGROTECH", font=font_title, fill='#00ff88', anchor='mm')
-            y_pos += 100
-            
-            # Índice analizado
-            indice_texto = f"Análisis {indice.upper()}"
-            draw.text((center_x, y_pos), indice_texto, font=font_subtitle, fill='white', anchor='mm')
-            y_pos += 80
-            
-            # Parcela
-            draw.text((center_x, y_pos), parcela_nombre, font=font_info, fill='#cccccc', anchor='mm')
-            y_pos += 60
-            
-            # Rango temporal
-            draw.text((center_x, y_pos), rango_temporal, font=font_info, fill='#999999', anchor='mm')
-            
-            # Guardar frame
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(80)
+        font_subtitle = _fuente(40)
+        font_info = _fuente(32)
+        
+        center_x = self.width // 2
+        y_pos = 300
+        
+        # Logo/Título AgroTech
+        draw.text((center_x, y_pos), "AGROTECH", font=font_title, fill='#00ff88', anchor='mm')
+        y_pos += 100
         
-        return frames
+        # Índice analizado
+        indice_texto = f"Análisis {indice.upper()}"
+        draw.text((center_x, y_pos), indice_texto, font=font_subtitle, fill='white', anchor='mm')
+        y_pos += 80
+        
+        # Parcela
+        draw.text((center_x, y_pos), parcela_nombre, font=font_info, fill='#cccccc', anchor='mm')
+        y_pos += 60
+        
+        # Rango temporal
+        draw.text((center_x, y_pos), rango_temporal, font=font_info, fill='#999999', anchor='mm')
+        
+        return Escena('portada', img, self.COVER_DURATION)
     
-    def _generate_monthly_map_scene(self, frame_data, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_monthly_map_scene(self, frame_data, indice) -> Escena:
         """
         ESCENA 2: MAPA MENSUAL
         - Imagen NDVI (sin modificar estilo)
@@ -270,46 +394,45 @@ class TimelineVideoExporterMultiScene:
         - Calidad de imagen
         - Clima del mes
         """
-        num_frames = int(self.MONTHLY_MAP_DURATION * self.fps)
-        frames = []
+        return self._dibujar_mapa_mensual(frame_data, indice, self._cargar_imagen_mes(frame_data, indice))
+    
+    def _cargar_imagen_mes(self, frame_data, indice) -> Optional[Image.Image]:
+        """Imagen satelital del mes (o la capa del cubo temporal si no hay PNG)"""
+        imagen_url = frame_data.get('imagenes', {}).get(indice)
+        try:
+            sat_img = self._load_satellite_image(imagen_url) if imagen_url else None
+            if sat_img is None:
+                sat_img = self._imagen_desde_cubo(frame_data, indice)
+            return sat_img
+        except:
+            return None
+    
+    def _dibujar_mapa_mensual(self, frame_data, indice, sat_img: Optional[Image.Image]) -> Escena:
+        """Dibuja el mapa mensual con la imagen ya decodificada (sin E/S)"""
+        img = Image.new('RGB', (self.width, self.height), color='#1a1a1a')
+        draw = ImageDraw.Draw(img)
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#1a1a1a')
-            draw = ImageDraw.Draw(img)
-            
-            # Cargar imagen satelital
-            imagen_url = frame_data.get('imagenes', {}).get(indice)
-            if imagen_url:
-                try:
-                    sat_img = self._load_satellite_image(imagen_url)
-                    if sat_img:
-                        sat_img = sat_img.filter(ImageFilter.SMOOTH_MORE)
-                        sat_img_resized = self._resize_and_center(sat_img, self.width, self.height)
-                        img.paste(sat_img_resized, (0, 0))
-                except:
-                    pass
-            
-            # Overlay de información
-            self._draw_monthly_overlay(img, draw, frame_data, indice)
-            
-            # Guardar
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        if sat_img:
+            try:
+                sat_img = sat_img.filter(ImageFilter.SMOOTH_MORE)
+                sat_img_resized = self._resize_and_center(sat_img, self.width, self.height)
+                img.paste(sat_img_resized, (0, 0))
+            except:
+                pass
+        
+        # Overlay de información
+        self._draw_monthly_overlay(img, draw, frame_data, indice)
         
-        return frames
+        return Escena('mapa_mensual', img, self.MONTHLY_MAP_DURATION)
     
     def _draw_monthly_overlay(self, img, draw, frame_data, indice):
         """
         Dibuja overlay de información mensual sobre el mapa
         INCLUYE: Leyenda de colores en lenguaje natural
         """
-        try:
-            font_header = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 26)
-            font_data = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 22)
-            font_small = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 18)
-        except:
-            font_header = font_data = font_small = ImageFont.load_default()
+        font_header = _fuente(26)
+        font_data = _fuente(22)
+        font_small = _fuente(18)
         
         # Header: NDVI · Mes Año
         periodo = frame_data.get('periodo_texto', '')
@@ -419,7 +542,7 @@ class TimelineVideoExporterMultiScene:
             label = rango['label']
             draw.text((legend_x + box_size + 10, y_pos + box_size // 2), label, font=font, fill='white', anchor='lm')
     
-    def _generate_analysis_scene(self, analisis_texto, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_analysis_scene(self, analisis_texto, indice) -> Escena:
         """
         ESCENA 3: ANÁLISIS IA
         - Muestra SOLO el texto generado por el motor
@@ -430,35 +553,24 @@ class TimelineVideoExporterMultiScene:
         
         ESTRICTAMENTE según finalizando_timeline.md
         """
-        num_frames = int(self.ANALYSIS_DURATION * self.fps)
-        frames = []
-        
         # Limpiar y limitar el texto a 2-3 frases máximo
         frases = self._limpiar_analisis_texto(analisis_texto, max_frases=3)
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 52)
-                font_text = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 36)
-            except:
-                font_title = font_text = ImageFont.load_default()
-            
-            # Título centrado
-            draw.text((self.width // 2, 180), "ANÁLISIS", font=font_title, fill='#00ff88', anchor='mm')
-            
-            # Texto del análisis limpio y claro
-            self._draw_wrapped_text(draw, frases, font_text, 'white', y_start=350, max_width=1650, line_spacing=50)
-            
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(52)
+        font_text = _fuente(36)
+        
+        # Título centrado
+        draw.text((self.width // 2, 180), "ANÁLISIS", font=font_title, fill='#00ff88', anchor='mm')
         
-        return frames
+        # Texto del análisis limpio y claro
+        self._draw_wrapped_text(draw, frases, font_text, 'white', y_start=350, max_width=1650, line_spacing=50)
+        
+        return Escena('analisis', img, self.ANALYSIS_DURATION)
     
-    def _generate_recommendations_scene(self, recomendaciones_texto, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_recommendations_scene(self, recomendaciones_texto, indice) -> Escena:
         """
         ESCENA 4: RECOMENDACIONES
         - Muestra SOLO las recomendaciones del motor
@@ -469,84 +581,62 @@ class TimelineVideoExporterMultiScene:
         
         ESTRICTAMENTE según finalizando_timeline.md
         """
-        num_frames = int(self.RECOMMENDATIONS_DURATION * self.fps)
-        frames = []
-        
         # Parsear y limpiar recomendaciones
         recos = self._parsear_recomendaciones(recomendaciones_texto, max_recos=3)
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 52)
-                font_bullet = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 34)
-            except:
-                font_title = font_bullet = ImageFont.load_default()
-            
-            # Título centrado
-            draw.text((self.width // 2, 180), "RECOMENDACIONES", font=font_title, fill='#00ff88', anchor='mm')
-            
-            # Bullets de recomendaciones
-            y_pos = 350
-            spacing_entre_bullets = 140
-            
-            for idx, reco in enumerate(recos, 1):
-                # Número de prioridad + bullet
-                bullet_text = f"{idx}. {reco}"
-                self._draw_wrapped_text(
-                    draw, 
-                    bullet_text, 
-                    font_bullet, 
-                    'white', 
-                    y_start=y_pos, 
-                    max_width=1650,
-                    line_spacing=45,
-                    align='left',
-                    x_start=200
-                )
-                y_pos += spacing_entre_bullets
-            
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(52)
+        font_bullet = _fuente(34)
+        
+        # Título centrado
+        draw.text((self.width // 2, 180), "RECOMENDACIONES", font=font_title, fill='#00ff88', anchor='mm')
+        
+        # Bullets de recomendaciones
+        y_pos = 350
+        spacing_entre_bullets = 140
+        
+        for idx, reco in enumerate(recos, 1):
+            # Número de prioridad + bullet
+            bullet_text = f"{idx}. {reco}"
+            self._draw_wrapped_text(
+                draw, 
+                bullet_text, 
+                font_bullet, 
+                'white', 
+                y_start=y_pos, 
+                max_width=1650,
+                line_spacing=45,
+                align='left',
+                x_start=200
+            )
+            y_pos += spacing_entre_bullets
         
-        return frames
+        return Escena('recomendaciones', img, self.RECOMMENDATIONS_DURATION)
     
-    def _generate_closing_scene(self, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_closing_scene(self, indice) -> Escena:
         """
         ESCENA 5: CIERRE
         - Logo AgroTech
         - Mensaje de cierre
         - Estilo sobrio
         """
-        num_frames = int(self.CLOSING_DURATION * self.fps)
-        frames = []
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_logo = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 80)
-                font_msg = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 32)
-            except:
-                font_logo = font_msg = ImageFont.load_default()
-            
-            center_x = self.width // 2
-            
-            # Logo
-            draw.text((center_x, 400), "AGROTECH", font=font_logo, fill='#00ff88', anchor='mm')
-            
-            # Mensaje
-            draw.text((center_x, 550), "Análisis satelital para agricultura de precisión", font=font_msg, fill='#888888', anchor='mm')
-            
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        font_logo = _fuente(80)
+        font_msg = _fuente(32)
+        
+        center_x = self.width // 2
         
-        return frames
+        # Logo
+        draw.text((center_x, 400), "AGROTECH", font=font_logo, fill='#00ff88', anchor='mm')
+        
+        # Mensaje
+        draw.text((center_x, 550), "Análisis satelital para agricultura de precisión", font=font_msg, fill='#888888', anchor='mm')
+        
+        return Escena('cierre', img, self.CLOSING_DURATION)
     
     def _draw_wrapped_text(self, draw, text, font, fill, y_start, max_width, line_spacing=10, align='center', x_start=None):
         """
@@ -609,6 +699,26 @@ class TimelineVideoExporterMultiScene:
             pass
         return None
     
+    def _capa_cubo(self, frame_data: Dict, indice: str) -> Optional[np.ndarray]:
+        """Capa del mes en el cubo temporal (vista sobre el memmap) o None"""
+        if self._cubo_temporal is None or not frame_data.get('año') or not frame_data.get('mes'):
+            return None
+        return self._cubo_temporal.mes(indice, f"{frame_data['año']}-{frame_data['mes']:02d}")
+    
+    def _imagen_desde_cubo(self, frame_data: Dict, indice: str) -> Optional[Image.Image]:
+        """Pinta la capa del cubo con la rampa rojo-verde; sin dato → negro"""
+        capa = self._capa_cubo(frame_data, indice)
+        if capa is None:
+            return None
+        capa = np.asarray(capa, dtype=np.float32)
+        valores = np.clip(np.nan_to_num((capa + 1.0) / 2.0, nan=0.0), 0.0, 1.0)
+        posicion = valores * (len(RAMPA_INDICE) - 1)
+        base = np.clip(np.floor(posicion).astype(np.int64), 0, len(RAMPA_INDICE) - 2)
+        fraccion = (posicion - base)[..., None]
+        rgb = RAMPA_INDICE[base] * (1 - fraccion) + RAMPA_INDICE[base + 1] * fraccion
+        rgb[~np.isfinite(capa)] = 0
+        return Image.fromarray(rgb.astype(np.uint8), mode='RGB')
+    
     def _resize_and_center(self, img: Image.Image, target_w: int, target_h: int) -> Image.Image:
         """Redimensiona y centra imagen satelital"""
         img_w, img_h = img.size
@@ -630,28 +740,86 @@ class TimelineVideoExporterMultiScene:
         canvas.paste(img_resized, (offset_x, offset_y))
         return canvas
     
-    def _create_video_ffmpeg(self, frame_paths: List[str], output_path: str):
-        """Crea video con FFmpeg"""
-        frames_dir = os.path.dirname(frame_paths[0])
-        list_file = os.path.join(frames_dir, 'frames.txt')
-        
-        with open(list_file, 'w') as f:
-            for i, frame_path in enumerate(frame_paths):
-                f.write(f"file '{frame_path}'\n")
-                # Última escena no necesita duración
-                if i < len(frame_paths) - 1:
-                    f.write(f"duration {1.0 / self.fps}\n")
-        
-        ffmpeg_cmd = [
-            'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', list_file,
-            '-c:v', 'libx264', '-preset', 'veryslow', '-crf', str(self.crf),
-            '-b:v', self.bitrate, '-pix_fmt', 'yuv420p',
-            '-vf', f'fps={self.fps}',
-            '-movflags', '+faststart',
-            output_path
+    def _comando_ffmpeg(self, escenas: List[Escena], output_path: str) -> List[str]:
+        """Comando FFmpeg para un video (ver _comando_ffmpeg_multiple)"""
+        return self._comando_ffmpeg_multiple(escenas, [output_path])
+    
+    def _comando_ffmpeg_multiple(self, escenas: List[Escena], salidas: List[str]) -> List[str]:
+        """
+        Entrada: un frame RGB crudo por escena más uno de cierre. setpts ubica
+        cada frame en el inicio de su escena y fps=N rellena la salida a
+        cadencia constante; el frame de cierre (en el instante final) marca
+        dónde termina la última escena y -t recorta exactamente ahí.
+        
+        Con varias salidas cada frame de entrada trae las escenas apiladas
+        en vertical (una franja por video): los tiempos se calculan una vez,
+        split reparte el stream y crop separa cada franja para su encoder.
+        """
+        perfil = replace(self.perfil, crf=self.crf, bitrate_maximo=self.bitrate)
+        duracion_total = sum(escena.duracion for escena in escenas)
+        # PTS del frame N = inicio de la escena N (suma de duraciones anteriores)
+        expresion = '+'.join(['0'] + [f'{escena.duracion:g}*gte(N,{n})' for n, escena in enumerate(escenas, 1)])
+        tiempos = f"settb=AVTB,setpts='({expresion})/TB',fps={self.fps}"
+        escala = perfil.filtro_escala(self.width, self.height)
+        
+        comando = [
+            'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-nostats',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{self.width}x{self.height * len(salidas)}',
+            '-framerate', '1', '-i', 'pipe:0',
         ]
-        
-        subprocess.run(ffmpeg_cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if len(salidas) == 1:
+            comando += ['-vf', tiempos + (f',{escala}' if escala else ''),
+                        '-t', f'{duracion_total:g}'] + perfil.argumentos_x264(self.fps) + salidas
+            return comando
+        
+        ramas = ''.join(f'[s{i}]' for i in range(len(salidas)))
+        recortes = ';'.join(
+            f'[s{i}]crop={self.width}:{self.height}:0:{i * self.height}' + (f',{escala}' if escala else '') + f'[v{i}]'
+            for i in range(len(salidas))
+        )
+        comando += ['-filter_complex', f'[0:v]{tiempos},split={len(salidas)}{ramas};{recortes}']
+        for i, salida in enumerate(salidas):
+            comando += ['-map', f'[v{i}]', '-t', f'{duracion_total:g}'] + perfil.argumentos_x264(self.fps) + [salida]
+        return comando
+    
+    def _create_video_ffmpeg(self, escenas: List[Escena], output_path: str):
+        """Crea video con FFmpeg: cada escena se envía una sola vez por stdin"""
+        self._ejecutar_ffmpeg(self._comando_ffmpeg(escenas, output_path), [[escena] for escena in escenas])
+    
+    def _ejecutar_ffmpeg(self, comando: List[str], frames: List[List[Escena]]):
+        """
+        Envía cada frame (escenas apiladas en vertical, una por salida) como
+        RGB crudo por stdin. El último frame va dos veces: la segunda es el
+        frame de cierre.
+        """
+        inicio = time.time()
+        proceso = subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        try:
+            for grupo in frames + frames[-1:]:
+                if len(grupo) == 1:
+                    proceso.stdin.write(self._rgb_escena(grupo[0]).tobytes())
+                    continue
+                apiladas = Image.new('RGB', (self.width, self.height * len(grupo)))
+                for i, escena in enumerate(grupo):
+                    apiladas.paste(self._rgb_escena(escena), (0, i * self.height))
+                proceso.stdin.write(apiladas.tobytes())
+            proceso.stdin.close()
+        except BrokenPipeError:
+            pass  # FFmpeg terminó antes: el error queda en stderr
+        errores = proceso.stderr.read().decode('utf-8', errors='replace')
+        proceso.stderr.close()
+        if proceso.wait() != 0:
+            raise RuntimeError(f"FFmpeg falló (código {proceso.returncode}): {errores.strip()[-2000:]}")
+        
+        salidas = max(len(frames[0]), 1) if frames else 1
+        logger.info(f"🎞️ FFmpeg ({self.perfil.nombre}): {len(frames)} escenas x {salidas} video(s) "
+                    f"codificadas en {time.time() - inicio:.1f}s")
+    
+    def _rgb_escena(self, escena: Escena) -> Image.Image:
+        imagen = escena.imagen
+        if imagen.mode != 'RGB' or imagen.size != (self.width, self.height):
+            imagen = imagen.convert('RGB').resize((self.width, self.height))
+        return imagen
     
     def _get_default_output_path(self, indice: str) -> str:
         """Genera ruta de salida por defecto"""
@@ -747,7 +915,7 @@ class TimelineVideoExporterMultiScene:
         
         return recos_limpias
     
-    def _generate_cover_complete_scene(self, parcela_info, frames_data, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_cover_complete_scene(self, parcela_info, frames_data, indice) -> Escena:
         """
         ESCENA 1: PORTADA COMPLETA
         - Logo AgroTech Histórico
@@ -759,9 +927,6 @@ class TimelineVideoExporterMultiScene:
         - Índice a analizar
         - Total de meses analizados
         """
-        num_frames = int(self.COVER_COMPLETE_DURATION * self.fps)
-        frames = []
-        
         # Obtener información de la parcela
         parcela_nombre = parcela_info.get('nombre', 'Parcela') if parcela_info else 'Parcela'
         area = parcela_info.get('area_hectareas', 0) if parcela_info else 0
@@ -782,68 +947,59 @@ class TimelineVideoExporterMultiScene:
             rango_temporal = "Sin datos"
             total_meses = 0
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 72)
-                font_subtitle = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 42)
-                font_info = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 32)
-                font_small = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 28)
-            except:
-                font_title = font_subtitle = font_info = font_small = ImageFont.load_default()
-            
-            center_x = self.width // 2
-            y_pos = 200
-            
-            # Logo/Título
-            draw.text((center_x, y_pos), "AGROTECH HISTÓRICO", font=font_title, fill='#00ff88', anchor='mm')
-            y_pos += 100
-            
-            # Subtítulo: Análisis Satelital - INDICE
-            indice_texto = f"Análisis Satelital - {indice.upper()}"
-            draw.text((center_x, y_pos), indice_texto, font=font_subtitle, fill='white', anchor='mm')
-            y_pos += 90
-            
-            # Información de la parcela (alineado a la izquierda)
-            left_x = 150
-            
-            # Parcela
-            draw.text((left_x, y_pos), f"• Parcela: {parcela_nombre}", font=font_info, fill='white', anchor='lm')
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(72)
+        font_subtitle = _fuente(42)
+        font_info = _fuente(32)
+        font_small = _fuente(28)
+        
+        center_x = self.width // 2
+        y_pos = 200
+        
+        # Logo/Título
+        draw.text((center_x, y_pos), "AGROTECH HISTÓRICO", font=font_title, fill='#00ff88', anchor='mm')
+        y_pos += 100
+        
+        # Subtítulo: Análisis Satelital - INDICE
+        indice_texto = f"Análisis Satelital - {indice.upper()}"
+        draw.text((center_x, y_pos), indice_texto, font=font_subtitle, fill='white', anchor='mm')
+        y_pos += 90
+        
+        # Información de la parcela (alineado a la izquierda)
+        left_x = 150
+        
+        # Parcela
+        draw.text((left_x, y_pos), f"• Parcela: {parcela_nombre}", font=font_info, fill='white', anchor='lm')
+        y_pos += 50
+        
+        # Coordenadas
+        draw.text((left_x, y_pos), f"• Centro: {lat_texto}, {lon_texto}", font=font_small, fill='#cccccc', anchor='lm')
+        y_pos += 45
+        
+        # Área
+        if area > 0:
+            draw.text((left_x, y_pos), f"• Área: {area:.2f} hectáreas", font=font_info, fill='white', anchor='lm')
             y_pos += 50
-            
-            # Coordenadas
-            draw.text((left_x, y_pos), f"• Centro: {lat_texto}, {lon_texto}", font=font_small, fill='#cccccc', anchor='lm')
-            y_pos += 45
-            
-            # Área
-            if area > 0:
-                draw.text((left_x, y_pos), f"• Área: {area:.2f} hectáreas", font=font_info, fill='white', anchor='lm')
-                y_pos += 50
-            
-            # Cultivo
-            if cultivo and cultivo.lower() != 'sin especificar':
-                draw.text((left_x, y_pos), f"• Cultivo: {cultivo}", font=font_info, fill='white', anchor='lm')
-                y_pos += 50
-            
-            y_pos += 20
-            
-            # Período
-            draw.text((left_x, y_pos), f"• Período: {rango_temporal}", font=font_info, fill='#00ff88', anchor='lm')
+        
+        # Cultivo
+        if cultivo and cultivo.lower() != 'sin especificar':
+            draw.text((left_x, y_pos), f"• Cultivo: {cultivo}", font=font_info, fill='white', anchor='lm')
             y_pos += 50
-            
-            # Total meses
-            draw.text((left_x, y_pos), f"• Total meses analizados: {total_meses}", font=font_info, fill='#00ff88', anchor='lm')
-            
-            # Guardar frame
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
         
-        return frames
+        y_pos += 20
+        
+        # Período
+        draw.text((left_x, y_pos), f"• Período: {rango_temporal}", font=font_info, fill='#00ff88', anchor='lm')
+        y_pos += 50
+        
+        # Total meses
+        draw.text((left_x, y_pos), f"• Total meses analizados: {total_meses}", font=font_info, fill='#00ff88', anchor='lm')
+        
+        return Escena('portada', img, self.COVER_COMPLETE_DURATION)
     
-    def _generate_index_explanation_scene(self, indice, parcela_info, temp_dir, start_idx) -> List[str]:
+    def _generate_index_explanation_scene(self, indice, parcela_info) -> Escena:
         """
         ESCENA 2: EXPLICACIÓN DEL ÍNDICE
         - Título: ¿Qué es el INDICE?
@@ -852,110 +1008,95 @@ class TimelineVideoExporterMultiScene:
         - Rangos de valores
         - Aplicación en este terreno
         """
-        num_frames = int(self.INDEX_EXPLANATION_DURATION * self.fps)
-        frames = []
-        
         # Obtener información del índice
         info_indice = obtener_info_indice(indice)
         aplicacion_terreno = generar_texto_aplicacion_terreno(indice, parcela_info or {})
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 56)
-                font_subtitle = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 38)
-                font_text = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 30)
-                font_small = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 28)
-            except:
-                font_title = font_subtitle = font_text = font_small = ImageFont.load_default()
-            
-            center_x = self.width // 2
-            y_pos = 150
-            
-            # Título
-            titulo = f"¿Qué es el {info_indice['siglas']}?"
-            draw.text((center_x, y_pos), titulo, font=font_title, fill='#00ff88', anchor='mm')
-            y_pos += 90
-            
-            # Nombre completo
-            draw.text((center_x, y_pos), info_indice['nombre_completo'], font=font_subtitle, fill='white', anchor='mm')
-            y_pos += 70
-            
-            # Cómo funciona (en lenguaje natural)
-            for linea in info_indice.get('como_funciona', []):
-                draw.text((center_x, y_pos), linea, font=font_text, fill='#cccccc', anchor='mm')
-                y_pos += 42
-            
-            y_pos += 30
-            
-            # Rangos de valores en lenguaje natural
-            draw.text((center_x, y_pos), "¿Cómo se interpretan los valores?", font=font_subtitle, fill='white', anchor='mm')
-            y_pos += 55
-            
-            for rango_texto in info_indice.get('rangos_texto', []):
-                draw.text((center_x, y_pos), rango_texto, font=font_small, fill='#999999', anchor='mm')
-                y_pos += 40
-            
-            y_pos += 30
-            
-            # Aplicación en este terreno
-            draw.text((center_x, y_pos), "En su terreno:", font=font_text, fill='#00ff88', anchor='mm')
-            y_pos += 48
-            
-            # Wrap del texto de aplicación
-            self._draw_wrapped_text(draw, aplicacion_terreno, font_small, '#cccccc', y_pos, max_width=1600, line_spacing=40)
-            
-            # Guardar frame
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(56)
+        font_subtitle = _fuente(38)
+        font_text = _fuente(30)
+        font_small = _fuente(28)
+        
+        center_x = self.width // 2
+        y_pos = 150
+        
+        # Título
+        titulo = f"¿Qué es el {info_indice['siglas']}?"
+        draw.text((center_x, y_pos), titulo, font=font_title, fill='#00ff88', anchor='mm')
+        y_pos += 90
+        
+        # Nombre completo
+        draw.text((center_x, y_pos), info_indice['nombre_completo'], font=font_subtitle, fill='white', anchor='mm')
+        y_pos += 70
+        
+        # Cómo funciona (en lenguaje natural)
+        for linea in info_indice.get('como_funciona', []):
+            draw.text((center_x, y_pos), linea, font=font_text, fill='#cccccc', anchor='mm')
+            y_pos += 42
+        
+        y_pos += 30
+        
+        # Rangos de valores en lenguaje natural
+        draw.text((center_x, y_pos), "¿Cómo se interpretan los valores?", font=font_subtitle, fill='white', anchor='mm')
+        y_pos += 55
+        
+        for rango_texto in info_indice.get('rangos_texto', []):
+            draw.text((center_x, y_pos), rango_texto, font=font_small, fill='#999999', anchor='mm')
+            y_pos += 40
+        
+        y_pos += 30
+        
+        # Aplicación en este terreno
+        draw.text((center_x, y_pos), "En su terreno:", font=font_text, fill='#00ff88', anchor='mm')
+        y_pos += 48
+        
+        # Wrap del texto de aplicación
+        self._draw_wrapped_text(draw, aplicacion_terreno, font_small, '#cccccc', y_pos, max_width=1600, line_spacing=40)
         
-        return frames
+        return Escena('explicacion_indice', img, self.INDEX_EXPLANATION_DURATION)
     
-    def _generate_full_analysis_scene(self, analisis_texto, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_full_analysis_scene(self, analisis_texto, indice) -> Escena:
         """
         ESCENA 3: ANÁLISIS COMPLETO DEL MOTOR
         - Análisis generado por el motor de informes
         - Tendencias del período
         - Conclusiones principales
         """
-        num_frames = int(self.FULL_ANALYSIS_DURATION * self.fps)
-        frames = []
-        
         # Limpiar y truncar texto
         texto_limpio = limpiar_texto_analisis(analisis_texto, max_lineas=14)
         texto_truncado = truncar_texto(texto_limpio, max_chars=700)
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 52)
-                font_text = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 32)
-            except:
-                font_title = font_text = ImageFont.load_default()
-            
-            # Título centrado
-            draw.text((self.width // 2, 180), "ANÁLISIS INTEGRAL DEL PERÍODO", font=font_title, fill='#00ff88', anchor='mm')
-            
-            # Texto del análisis
-            self._draw_wrapped_text(draw, texto_truncado, font_text, 'white', y_start=320, max_width=1650, line_spacing=45)
-            
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(52)
+        font_text = _fuente(32)
         
-        return frames
+        # Título centrado
+        draw.text((self.width // 2, 180), "ANÁLISIS INTEGRAL DEL PERÍODO", font=font_title, fill='#00ff88', anchor='mm')
+        
+        # Texto del análisis
+        self._draw_wrapped_text(draw, texto_truncado, font_text, 'white', y_start=320, max_width=1650, line_spacing=45)
+        
+        return Escena('analisis_completo', img, self.FULL_ANALYSIS_DURATION)
     
-    def _generate_monthly_map_or_unavailable(self, frame_data, indice, frames_data, frame_index, temp_dir, start_idx) -> List[str]:
+    def _generate_monthly_map_or_unavailable(self, frame_data, indice, frames_data, frame_index) -> Escena:
         """
         ESCENA 4-N: MAPA MENSUAL o IMAGEN NO DISPONIBLE
         Detecta si hay imagen satelital disponible o si hay alta nubosidad
         """
-        # Verificar disponibilidad de imagen
+        if not self._mes_con_imagen(frame_data, indice):
+            # Generar escena de "imagen no disponible"
+            return self._generate_unavailable_image_scene(frame_data, frames_data, frame_index, indice)
+        else:
+            # Generar escena normal con mapa
+            return self._generate_monthly_map_scene(frame_data, indice)
+    
+    def _mes_con_imagen(self, frame_data, indice) -> bool:
+        """El mes tiene imagen (PNG o capa del cubo) y nubosidad ≤ 70%"""
         imagen_url = frame_data.get('imagenes', {}).get(indice)
         metadata = frame_data.get('imagen_metadata', {})
         nubosidad = metadata.get('nubosidad')
@@ -970,22 +1111,14 @@ class TimelineVideoExporterMultiScene:
         else:
             nubosidad_pct = nubosidad
         
-        # Decidir si mostrar imagen o "no disponible"
-        if not imagen_url or nubosidad_pct > 70:
-            # Generar escena de "imagen no disponible"
-            return self._generate_unavailable_image_scene(frame_data, frames_data, frame_index, indice, temp_dir, start_idx)
-        else:
-            # Generar escena normal con mapa
-            return self._generate_monthly_map_scene(frame_data, indice, temp_dir, start_idx)
+        tiene_imagen = bool(imagen_url) or self._capa_cubo(frame_data, indice) is not None
+        return tiene_imagen and nubosidad_pct <= 70
     
-    def _generate_unavailable_image_scene(self, frame_data, frames_data, frame_index, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_unavailable_image_scene(self, frame_data, frames_data, frame_index, indice) -> Escena:
         """
         ESCENA: IMAGEN NO DISPONIBLE
         Pantalla informativa cuando no hay imagen por alta nubosidad
         """
-        num_frames = int(self.UNAVAILABLE_IMAGE_DURATION * self.fps)
-        frames = []
-        
         periodo = frame_data.get('periodo_texto', 'Mes desconocido')
         metadata = frame_data.get('imagen_metadata', {})
         nubosidad = metadata.get('nubosidad')
@@ -1003,60 +1136,48 @@ class TimelineVideoExporterMultiScene:
         # Detectar próximo mes disponible
         proximo_mes = detectar_proximo_mes_disponible(frames_data, frame_index)
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#1a1a1a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 48)
-                font_text = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 32)
-                font_small = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 28)
-            except:
-                font_title = font_text = font_small = ImageFont.load_default()
-            
-            center_x = self.width // 2
-            y_pos = 300
-            
-            # Título
-            draw.text((center_x, y_pos), "IMAGEN NO DISPONIBLE", font=font_title, fill='#ff6666', anchor='mm')
-            y_pos += 80
-            
-            # Mes
-            draw.text((center_x, y_pos), f"Mes: {periodo}", font=font_text, fill='white', anchor='mm')
-            y_pos += 80
-            
-            # Razón
-            razon = f"Debido a alta nubosidad durante este período ({nubosidad_pct:.0f}%),"
-            draw.text((center_x, y_pos), razon, font=font_small, fill='#cccccc', anchor='mm')
-            y_pos += 45
-            
-            draw.text((center_x, y_pos), "no fue posible obtener imágenes satelitales de", font=font_small, fill='#cccccc', anchor='mm')
+        img = Image.new('RGB', (self.width, self.height), color='#1a1a1a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(48)
+        font_text = _fuente(32)
+        font_small = _fuente(28)
+        
+        center_x = self.width // 2
+        y_pos = 300
+        
+        # Título
+        draw.text((center_x, y_pos), "IMAGEN NO DISPONIBLE", font=font_title, fill='#ff6666', anchor='mm')
+        y_pos += 80
+        
+        # Mes
+        draw.text((center_x, y_pos), f"Mes: {periodo}", font=font_text, fill='white', anchor='mm')
+        y_pos += 80
+        
+        # Razón
+        razon = f"Debido a alta nubosidad durante este período ({nubosidad_pct:.0f}%),"
+        draw.text((center_x, y_pos), razon, font=font_small, fill='#cccccc', anchor='mm')
+        y_pos += 45
+        
+        draw.text((center_x, y_pos), "no fue posible obtener imágenes satelitales de", font=font_small, fill='#cccccc', anchor='mm')
+        y_pos += 45
+        
+        draw.text((center_x, y_pos), "calidad suficiente para el análisis.", font=font_small, fill='#cccccc', anchor='mm')
+        y_pos += 80
+        
+        # Próximo mes disponible
+        if proximo_mes:
+            draw.text((center_x, y_pos), "La siguiente imagen disponible", font=font_small, fill='#999999', anchor='mm')
             y_pos += 45
-            
-            draw.text((center_x, y_pos), "calidad suficiente para el análisis.", font=font_small, fill='#cccccc', anchor='mm')
-            y_pos += 80
-            
-            # Próximo mes disponible
-            if proximo_mes:
-                draw.text((center_x, y_pos), "La siguiente imagen disponible", font=font_small, fill='#999999', anchor='mm')
-                y_pos += 45
-                draw.text((center_x, y_pos), f"corresponde a: {proximo_mes}", font=font_text, fill='#00ff88', anchor='mm')
-            
-            # Guardar frame
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+            draw.text((center_x, y_pos), f"corresponde a: {proximo_mes}", font=font_text, fill='#00ff88', anchor='mm')
         
-        return frames
+        return Escena('imagen_no_disponible', img, self.UNAVAILABLE_IMAGE_DURATION)
     
-    def _generate_summary_scene(self, frames_data, indice, temp_dir, start_idx) -> List[str]:
+    def _generate_summary_scene(self, frames_data, indice) -> Escena:
         """
         ESCENA: ANÁLISIS PROFESIONAL Y DETALLADO DEL PERÍODO
         Análisis técnico pero en lenguaje natural, completo y preciso
         """
-        num_frames = int(self.RECOMMENDATIONS_DURATION * self.fps)
-        frames = []
-        
         # Calcular estadísticas completas
         stats = calcular_estadisticas_periodo(frames_data, indice)
         
@@ -1154,49 +1275,40 @@ class TimelineVideoExporterMultiScene:
                 estado = "Sin Cobertura Vegetal Significativa"
                 analisis = f"Los valores de SAVI registrados (promedio {stats['promedio']:.3f}) indican ausencia de cobertura vegetal activa. Este nivel sugiere que el área analizada corresponde principalmente a suelo desnudo, agua, o vegetación en etapa muy temprana de germinación. El rango entre {stats['minimo']:.3f} y {stats['maximo']:.3f} confirma que no existe dosel vegetal establecido. Si se esperaba tener cultivo en desarrollo, se recomienda verificar las fechas de siembra, evaluar problemas de germinación o emergencia, y revisar las condiciones del suelo."
         
-        for i in range(num_frames):
-            img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
-            draw = ImageDraw.Draw(img)
-            
-            try:
-                font_title = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 48)
-                font_subtitle = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 34)
-                font_text = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 26)
-            except:
-                font_title = font_subtitle = font_text = ImageFont.load_default()
-            
-            center_x = self.width // 2
-            y_pos = 120
-            
-            # Título
-            draw.text((center_x, y_pos), "ANÁLISIS DEL PERÍODO", font=font_title, fill='#00ff88', anchor='mm')
-            y_pos += 80
-            
-            # Estado general
-            draw.text((center_x, y_pos), f"Estado General: {estado}", font=font_subtitle, fill='white', anchor='mm')
-            y_pos += 65
-            
-            # Análisis detallado (wrapped text)
-            self._draw_wrapped_text(draw, analisis, font_text, '#cccccc', y_pos, max_width=1700, line_spacing=38)
-            y_pos += 160
-            
-            # Estadísticas técnicas
-            draw.text((center_x, y_pos), "Datos del Análisis:", font=font_subtitle, fill='#00ff88', anchor='mm')
-            y_pos += 55
-            
-            stats_text = [
-                f"• Meses analizados: {stats['meses_con_datos']} de {stats['total_meses']}",
-                f"• Valor promedio: {stats['promedio']:.3f}  |  Rango: {stats['minimo']:.3f} - {stats['maximo']:.3f}",
-                f"• Tendencia: {tendencia_texto.capitalize()} ({cambio_pct:+.1f}%)  |  Comportamiento: {variabilidad.capitalize()}"
-            ]
-            
-            for stat in stats_text:
-                draw.text((center_x, y_pos), stat, font=font_text, fill='white', anchor='mm')
-                y_pos += 42
-            
-            # Guardar frame
-            frame_path = os.path.join(temp_dir, f'frame_{start_idx + i:05d}.png')
-            img.save(frame_path, 'PNG')
-            frames.append(frame_path)
+        img = Image.new('RGB', (self.width, self.height), color='#0a0a0a')
+        draw = ImageDraw.Draw(img)
+        
+        font_title = _fuente(48)
+        font_subtitle = _fuente(34)
+        font_text = _fuente(26)
+        
+        center_x = self.width // 2
+        y_pos = 120
+        
+        # Título
+        draw.text((center_x, y_pos), "ANÁLISIS DEL PERÍODO", font=font_title, fill='#00ff88', anchor='mm')
+        y_pos += 80
+        
+        # Estado general
+        draw.text((center_x, y_pos), f"Estado General: {estado}", font=font_subtitle, fill='white', anchor='mm')
+        y_pos += 65
+        
+        # Análisis detallado (wrapped text)
+        self._draw_wrapped_text(draw, analisis, font_text, '#cccccc', y_pos, max_width=1700, line_spacing=38)
+        y_pos += 160
+        
+        # Estadísticas técnicas
+        draw.text((center_x, y_pos), "Datos del Análisis:", font=font_subtitle, fill='#00ff88', anchor='mm')
+        y_pos += 55
+        
+        stats_text = [
+            f"• Meses analizados: {stats['meses_con_datos']} de {stats['total_meses']}",
+            f"• Valor promedio: {stats['promedio']:.3f}  |  Rango: {stats['minimo']:.3f} - {stats['maximo']:.3f}",
+            f"• Tendencia: {tendencia_texto.capitalize()} ({cambio_pct:+.1f}%)  |  Comportamiento: {variabilidad.capitalize()}"
+        ]
+        
+        for stat in stats_text:
+            draw.text((center_x, y_pos), stat, font=font_text, fill='white', anchor='mm')
+            y_pos += 42
         
-        return frames
+        return Escena('resumen', img, self.RECOMMENDATIONS_DURATION)
@@ -18,7 +18,7 @@ FUENTES DE DATOS:
 import os
 import re
 from datetime import datetime, date
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 from io import BytesIO
 from dateutil.relativedelta import relativedelta
 
@@ -47,6 +47,11 @@ from django.conf import settings
 
 # Modelos locales
 from informes.models import Parcela, IndiceMensual
+from informes.services.cache_secciones_pdf import (
+    CacheSeccionesPDF, RegistroSecciones, descriptor_modelo, huella
+)
+from informes.services.miniaturas_pdf import MiniaturasPDF
+from informes.services.planificador_figuras import PlanificadorFiguras
 
 # Analizadores
 from informes.analizadores.ndvi_analyzer import AnalizadorNDVI
@@ -128,9 +133,29 @@ class GeneradorPDFProfesional:
     - Gráficos matplotlib
     - Recomendaciones accionables
     - Diseño moderno y profesional
+    
+    Las secciones se guardan en un caché en disco direccionado por el hash
+    de sus entradas (ver informes/services/cache_secciones_pdf.py): al
+    regenerar un informe solo se renderizan las que cambiaron.
+    
+    Args:
+        cache_secciones: Caché a usar (default: MEDIA_ROOT/cache_secciones_pdf)
+        usar_cache_secciones: False renderiza todo siempre
+        miniaturas: Derivados de las imágenes de la galería a resolución de
+            impresión (default: PDF_MINIATURAS_DPI / PDF_MINIATURAS_FORMATO)
+        procesos_figuras: Procesos para renderizar gráficos y miniaturas
+            (default: PDF_PROCESOS_FIGURAS; 1 = todo en este proceso)
     """
     
-    def __init__(self):
+    def __init__(self, cache_secciones: Optional[CacheSeccionesPDF] = None,
+                 usar_cache_secciones: bool = True, miniaturas: Optional[MiniaturasPDF] = None,
+                 procesos_figuras: Optional[int] = None):
+        self.cache_secciones = (cache_secciones or CacheSeccionesPDF()) if usar_cache_secciones else None
+        self.miniaturas = miniaturas or MiniaturasPDF()
+        self.procesos_figuras = procesos_figuras
+        self.figuras = PlanificadorFiguras(max_procesos=1)  # Se reemplaza en cada informe
+        self.registro_secciones = RegistroSecciones()
+        self._diagnostico_desde_cache = False
         self.pagesize = A4
         self.ancho, self.alto = A4
         self.margen = 2*cm
@@ -320,6 +345,76 @@ class GeneradorPDFProfesional:
         
         return estilos
     
+    def _planificar_figuras(self, parcela: Parcela, indices: List[IndiceMensual],
+                            datos_analisis: List[Dict]) -> PlanificadorFiguras:
+        """
+        Figuras a renderizar en paralelo: solo las de secciones que no están
+        en el caché (gráfico de evolución y miniaturas de la galería)
+        """
+        figuras = PlanificadorFiguras(self.procesos_figuras)
+        cache = self.cache_secciones
+        if cache is None or not cache.contiene('grafico_evolucion', (datos_analisis,)):
+            figuras.agregar('grafico_evolucion', self._png_evolucion, datos_analisis)
+        for idx, rutas, con_separador, entradas in self._meses_galeria(parcela, indices):
+            if cache is not None and cache.contiene('galeria_mes', entradas):
+                continue
+            for tipo, ruta in rutas.items():
+                if ruta:
+                    figuras.agregar(self._nombre_miniatura(idx, tipo), self._renderizar_miniatura, ruta)
+        return figuras
+    
+    @staticmethod
+    def _nombre_miniatura(idx: IndiceMensual, tipo: str) -> str:
+        return f"miniatura {idx.año}-{idx.mes:02d} {tipo}"
+    
+    def _renderizar_miniatura(self, ruta: str) -> Tuple[bytes, Dict]:
+        """Miniatura de galería y lo que sumó a las estadísticas (para el proceso principal)"""
+        antes = dict(self.miniaturas.stats)
+        datos = self.miniaturas.miniatura(ruta, 5*cm, 5*cm)
+        return datos, {clave: valor - antes[clave] for clave, valor in self.miniaturas.stats.items()}
+    
+    def _miniatura(self, idx: IndiceMensual, tipo: str, ruta: str) -> bytes:
+        """Bytes de la miniatura: del planificador si ya se renderizó, si no aquí"""
+        datos, stats = self.figuras.obtener(self._nombre_miniatura(idx, tipo),
+                                            lambda: self._renderizar_miniatura(ruta))
+        if self.figuras.figuras[self._nombre_miniatura(idx, tipo)].proceso != os.getpid():
+            for clave, valor in stats.items():
+                self.miniaturas.stats[clave] += valor
+        return datos
+    
+    def _meses_galeria(self, parcela: Parcela, indices: List[IndiceMensual]):
+        """(idx, rutas por índice, con_separador, entradas de caché) de los meses con imágenes"""
+        meses_procesados = 0
+        for idx in indices:
+            rutas = {
+                'ndvi': self._obtener_path_imagen_correcto(idx.imagen_ndvi),
+                'ndmi': self._obtener_path_imagen_correcto(idx.imagen_ndmi),
+                'savi': self._obtener_path_imagen_correcto(idx.imagen_savi),
+            }
+            if not any(rutas.values()):
+                continue
+            meses_procesados += 1
+            con_separador = meses_procesados > 1
+            entradas = (descriptor_modelo(idx), descriptor_modelo(parcela), rutas['ndvi'], rutas['ndmi'],
+                        rutas['savi'], con_separador, self.miniaturas.perfil)
+            yield idx, rutas, con_separador, entradas
+    
+    def _seccion(self, nombre: str, entradas: tuple, constructor: Callable[[], Any],
+                 seccion_cache: Optional[str] = None) -> Any:
+        """
+        Resultado de `constructor` (flowables o PNG) desde el caché de
+        secciones si `entradas` no cambiaron desde el último informe
+        
+        `seccion_cache` agrupa en disco secciones que se registran con
+        nombres distintos (p. ej. un bloque de galería por mes).
+        """
+        if self.cache_secciones is None:
+            return self.registro_secciones.medir(nombre, lambda: (constructor(), False))
+        return self.registro_secciones.medir(
+            nombre,
+            lambda: self.cache_secciones.obtener_o_generar(seccion_cache or nombre, entradas, constructor)
+        )
+    
     def generar_informe_completo(self, parcela_id: int, 
                                 meses_atras: int = 12,
                                 output_path: str = None) -> str:
@@ -350,11 +445,36 @@ class GeneradorPDFProfesional:
         # Preparar datos para análisis
         datos_analisis = self._preparar_datos_analisis(indices)
         
-        # Ejecutar análisis (pasando los índices originales para caché)
-        analisis_completo = self._ejecutar_analisis(datos_analisis, parcela, indices)
+        # Entradas de las secciones para el caché: filas y parcela tal como están en BD
+        self.registro_secciones = RegistroSecciones()
+        indices = list(indices)
+        parcela_desc = descriptor_modelo(parcela)
+        filas = [descriptor_modelo(idx) for idx in indices]
+        
+        # Gráficos y miniaturas en procesos hijos mientras aquí corren el
+        # análisis y el diagnóstico (cuyo mapa se dibuja en este proceso)
+        self.figuras = self._planificar_figuras(parcela, indices, datos_analisis).iniciar()
+        diagnostico_unificado = None
+        try:
+            # Ejecutar análisis (pasando los índices originales para caché)
+            analisis_completo = self._ejecutar_analisis(datos_analisis, parcela, indices)
+            
+            # 🧠 EJECUTAR DIAGNÓSTICO UNIFICADO PRIMERO (para usar en resumen ejecutivo)
+            try:
+                diagnostico_unificado = self.figuras.ejecutar_local(
+                    'diagnostico (mapa)', self.registro_secciones.medir, 'diagnostico',
+                    lambda: (self._ejecutar_diagnostico_cerebro(parcela, indices), self._diagnostico_desde_cache)
+                )
+                if diagnostico_unificado:
+                    logger.info(f"✅ Diagnóstico unificado ejecutado: {diagnostico_unificado.get('eficiencia_lote', 0):.1f}% eficiencia")
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo generar diagnóstico unificado: {str(e)}")
+        finally:
+            self.figuras.finalizar()
         
         # Generar gráficos
         graficos = self._generar_graficos(datos_analisis)
+        graficos_png = {nombre: buffer.getvalue() for nombre, buffer in graficos.items()}
         
         # Crear PDF
         if not output_path:
@@ -377,31 +497,27 @@ class GeneradorPDFProfesional:
         # Contenido del documento
         story = []
         
-        # 🧠 EJECUTAR DIAGNÓSTICO UNIFICADO PRIMERO (para usar en resumen ejecutivo)
-        diagnostico_unificado = None
-        try:
-            diagnostico_unificado = self._ejecutar_diagnostico_cerebro(parcela, indices)
-            if diagnostico_unificado:
-                logger.info(f"✅ Diagnóstico unificado ejecutado: {diagnostico_unificado.get('eficiencia_lote', 0):.1f}% eficiencia")
-        except Exception as e:
-            logger.warning(f"⚠️ No se pudo generar diagnóstico unificado: {str(e)}")
-        
         # ========================================
         # SECCIÓN 1: PORTADA
         # ========================================
-        story.extend(self._crear_portada(parcela, fecha_inicio, fecha_fin))
+        story.extend(self._seccion('portada', (parcela_desc, fecha_inicio, fecha_fin, date.today()),
+                                   lambda: self._crear_portada(parcela, fecha_inicio, fecha_fin)))
         story.append(PageBreak())
         
         # ========================================
         # SECCIÓN 2: RESUMEN EJECUTIVO PROFESIONAL
         # ========================================
-        story.extend(self._crear_resumen_ejecutivo(analisis_completo, parcela, datos_analisis, diagnostico_unificado))
+        story.extend(self._seccion(
+            'resumen_ejecutivo', (analisis_completo, parcela_desc, datos_analisis, diagnostico_unificado),
+            lambda: self._crear_resumen_ejecutivo(analisis_completo, parcela, datos_analisis, diagnostico_unificado)
+        ))
         # NO PageBreak - permitir que fluya con recomendaciones si hay espacio
         
         # ========================================
         # SECCIÓN 3: RECOMENDACIONES GENERALES
         # ========================================
-        story.extend(self._crear_seccion_recomendaciones(analisis_completo['recomendaciones']))
+        story.extend(self._seccion('recomendaciones', (analisis_completo['recomendaciones'],),
+                                   lambda: self._crear_seccion_recomendaciones(analisis_completo['recomendaciones'])))
         story.append(PageBreak())
         
         # ========================================
@@ -418,30 +534,35 @@ class GeneradorPDFProfesional:
         ))
         story.append(Spacer(1, 0.5*cm))
         
-        story.extend(self._crear_info_parcela(parcela))
+        story.extend(self._seccion('info_parcela', (parcela_desc,), lambda: self._crear_info_parcela(parcela)))
         story.append(Spacer(1, 0.8*cm))  # Usar Spacer en vez de PageBreak
         
         # Anexo B: Metodología de Análisis
-        story.extend(self._crear_seccion_metodologia(parcela, indices, analisis_completo))
+        story.extend(self._seccion('metodologia', (parcela_desc, filas, analisis_completo),
+                                   lambda: self._crear_seccion_metodologia(parcela, indices, analisis_completo)))
         story.append(PageBreak())
         
         # Anexo C: Análisis mensual detallado (índices espectrales)
-        story.extend(self._crear_seccion_ndvi(analisis_completo['ndvi'], graficos))
+        story.extend(self._seccion('ndvi', (analisis_completo['ndvi'], graficos_png),
+                                   lambda: self._crear_seccion_ndvi(analisis_completo['ndvi'], graficos)))
         story.append(Spacer(1, 1*cm))  # Spacer dinámico - permitir que NDMI comparta página si es corto
         
-        story.extend(self._crear_seccion_ndmi(analisis_completo['ndmi'], graficos))
+        story.extend(self._seccion('ndmi', (analisis_completo['ndmi'], graficos_png),
+                                   lambda: self._crear_seccion_ndmi(analisis_completo['ndmi'], graficos)))
         story.append(PageBreak())
         
         if 'savi' in analisis_completo and analisis_completo['savi']:
-            story.extend(self._crear_seccion_savi(analisis_completo['savi'], graficos))
+            story.extend(self._seccion('savi', (analisis_completo['savi'], graficos_png),
+                                       lambda: self._crear_seccion_savi(analisis_completo['savi'], graficos)))
             story.append(Spacer(1, 1*cm))
         
         # Anexo D: Análisis de tendencias
-        story.extend(self._crear_seccion_tendencias(analisis_completo['tendencias'], graficos))
+        story.extend(self._seccion('tendencias', (analisis_completo['tendencias'], graficos_png),
+                                   lambda: self._crear_seccion_tendencias(analisis_completo['tendencias'], graficos)))
         story.append(PageBreak())
         
         # Anexo E: Tabla de datos (compacta)
-        story.extend(self._crear_tabla_datos(datos_analisis))
+        story.extend(self._seccion('tabla_datos', (datos_analisis,), lambda: self._crear_tabla_datos(datos_analisis)))
         story.append(Spacer(1, 1*cm))  # Spacer en vez de PageBreak
         
         # Anexo F: Galería de imágenes satelitales
@@ -452,17 +573,22 @@ class GeneradorPDFProfesional:
         # SECCIÓN FINAL: DIAGNÓSTICO DETALLADO Y PLAN DE ACCIÓN
         # ========================================
         if diagnostico_unificado:
-            story.extend(self._crear_seccion_guia_intervencion(diagnostico_unificado, parcela))
+            story.extend(self._seccion(
+                'guia_intervencion', (diagnostico_unificado, parcela_desc),
+                lambda: self._crear_seccion_guia_intervencion(diagnostico_unificado, parcela)
+            ))
             # NO PageBreak al final - es la última sección
         
         # Página de créditos (opcional - solo si hay espacio)
         story.append(Spacer(1, 2*cm))
-        story.extend(self._crear_pagina_creditos())
+        story.extend(self._seccion('creditos', (), self._crear_pagina_creditos))
         
         # Construir PDF con headers y footers
         doc.build(story, onFirstPage=self._crear_header_footer, 
                  onLaterPages=self._crear_header_footer)
         
+        logger.info(f"♻️ Caché de secciones: {self.registro_secciones.resumen()}")
+        logger.info(f"🖼️ Miniaturas de galería: {self.miniaturas.resumen()}")
         return output_path
     
     def _preparar_datos_analisis(self, indices: List[IndiceMensual]) -> List[Dict]:
@@ -523,11 +649,16 @@ class GeneradorPDFProfesional:
         """Genera todos los gráficos necesarios"""
         graficos = {}
         
-        # Gráfico de evolución temporal
-        graficos['evolucion_temporal'] = self._grafico_evolucion_temporal(datos)
+        # Gráfico de evolución temporal (PNG desde el caché si la serie no cambió)
+        png = self._seccion('grafico_evolucion', (datos,),
+                            lambda: self.figuras.obtener('grafico_evolucion', lambda: self._png_evolucion(datos)))
+        graficos['evolucion_temporal'] = BytesIO(png)
         
         return graficos
     
+    def _png_evolucion(self, datos: List[Dict]) -> bytes:
+        return self._grafico_evolucion_temporal(datos).getvalue()
+    
     def _grafico_evolucion_temporal(self, datos: List[Dict]) -> BytesIO:
         """Genera gráfico de evolución temporal"""
         fig, ax = plt.subplots(figsize=(12, 6))
@@ -1787,158 +1918,18 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
         
         # Contador de imágenes
         imagenes_encontradas = 0
-        meses_procesados = 0
         
-        # Procesar cada mes
-        for idx in indices:
-            path_ndvi = self._obtener_path_imagen_correcto(idx.imagen_ndvi)
-            path_ndmi = self._obtener_path_imagen_correcto(idx.imagen_ndmi)
-            path_savi = self._obtener_path_imagen_correcto(idx.imagen_savi)
-            
-            tiene_imagenes = path_ndvi or path_ndmi or path_savi
-            
-            if tiene_imagenes:
-                meses_procesados += 1
-                
-                # Separador visual entre meses
-                if meses_procesados > 1:
-                    elements.append(Spacer(1, 0.5*cm))
-                    from reportlab.platypus import HRFlowable
-                    elements.append(HRFlowable(
-                        width="100%", 
-                        thickness=1, 
-                        color=self.colores['verde_claro'],
-                        spaceAfter=0.3*cm,
-                        spaceBefore=0.3*cm
-                    ))
-                
-                # Título del mes
-                titulo_mes = Paragraph(
-                    f'<strong>{idx.periodo_texto}</strong>',
-                    self.estilos['SubtituloSeccion']
-                )
-                elements.append(titulo_mes)
-                elements.append(Spacer(1, 0.3*cm))
-                
-                # Metadatos del mes
-                coord_texto = 'N/A'
-                if parcela.centroide:
-                    coord_texto = f"{parcela.centroide.y:.4f}, {parcela.centroide.x:.4f}"
-                
-                metadatos = Paragraph(
-                    f"""
-                    <strong>Fecha:</strong> {idx.fecha_imagen.strftime('%d/%m/%Y') if idx.fecha_imagen else 'N/A'} | 
-                    <strong>Satélite:</strong> {idx.satelite_imagen or 'Sentinel-2'} | 
-                    <strong>Nubosidad:</strong> {idx.nubosidad_imagen or 0:.1f}%
-                    """,
-                    self.estilos['TextoNormal']
-                )
-                elements.append(metadatos)
-                elements.append(Spacer(1, 0.3*cm))
-                
-                # Crear tabla de 3 imágenes
-                imagenes_fila = []
-                labels_fila = []
-                stats_fila = []
-                
-                # NDVI
-                if path_ndvi:
-                    imagenes_encontradas += 1
-                    try:
-                        img_ndvi = Image(path_ndvi, width=5*cm, height=5*cm, kind='proportional')
-                        imagenes_fila.append(img_ndvi)
-                        labels_fila.append(Paragraph('<strong>NDVI</strong>', self.estilos['TextoNormal']))
-                        stats = Paragraph(
-                            f'Prom: {idx.ndvi_promedio:.3f}<br/>Min: {idx.ndvi_minimo:.3f} | Max: {idx.ndvi_maximo:.3f}',
-                            self.estilos['PieImagen']
-                        )
-                        stats_fila.append(stats)
-                    except Exception as e:
-                        logger.warning(f"Error cargando NDVI: {e}")
-                else:
-                    imagenes_fila.append(Paragraph('<i>Sin imagen NDVI</i>', self.estilos['PieImagen']))
-                    labels_fila.append(Paragraph('', self.estilos['TextoNormal']))
-                    stats_fila.append(Paragraph('', self.estilos['TextoNormal']))
-                
-                # NDMI
-                if path_ndmi:
-                    imagenes_encontradas += 1
-                    try:
-                        img_ndmi = Image(path_ndmi, width=5*cm, height=5*cm, kind='proportional')
-                        imagenes_fila.append(img_ndmi)
-                        labels_fila.append(Paragraph('<strong>NDMI</strong>', self.estilos['TextoNormal']))
-                        stats = Paragraph(
-                            f'Prom: {idx.ndmi_promedio:.3f}<br/>Min: {idx.ndmi_minimo:.3f} | Max: {idx.ndmi_maximo:.3f}',
-                            self.estilos['PieImagen']
-                        )
-                        stats_fila.append(stats)
-                    except Exception as e:
-                        logger.warning(f"Error cargando NDMI: {e}")
-                else:
-                    imagenes_fila.append(Paragraph('<i>Sin imagen NDMI</i>', self.estilos['PieImagen']))
-                    labels_fila.append(Paragraph('', self.estilos['TextoNormal']))
-                    stats_fila.append(Paragraph('', self.estilos['TextoNormal']))
-                
-                # SAVI
-                if path_savi:
-                    imagenes_encontradas += 1
-                    try:
-                        img_savi = Image(path_savi, width=5*cm, height=5*cm, kind='proportional')
-                        imagenes_fila.append(img_savi)
-                        labels_fila.append(Paragraph('<strong>SAVI</strong>', self.estilos['TextoNormal']))
-                        stats = Paragraph(
-                            f'Prom: {idx.savi_promedio:.3f}<br/>Min: {idx.savi_minimo:.3f} | Max: {idx.savi_maximo:.3f}',
-                            self.estilos['PieImagen']
-                        )
-                        stats_fila.append(stats)
-                    except Exception as e:
-                        logger.warning(f"Error cargando SAVI: {e}")
-                else:
-                    imagenes_fila.append(Paragraph('<i>Sin imagen SAVI</i>', self.estilos['PieImagen']))
-                    labels_fila.append(Paragraph('', self.estilos['TextoNormal']))
-                    stats_fila.append(Paragraph('', self.estilos['TextoNormal']))
-                
-                # Tabla de imágenes
-                if len(imagenes_fila) == 3:
-                    tabla_img = Table([labels_fila, imagenes_fila, stats_fila], colWidths=[5.2*cm, 5.2*cm, 5.2*cm])
-                    tabla_img.setStyle(TableStyle([
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                        ('TOPPADDING', (0, 0), (-1, -1), 5),
-                        ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-                    ]))
-                    elements.append(tabla_img)
-                    elements.append(Spacer(1, 0.5*cm))
-                    
-                    # AGREGAR ANÁLISIS INTEGRADO DEL MES
-                    # Preparar datos de imágenes para el análisis
-                    imagenes_datos = []
-                    if path_ndvi and idx.ndvi_promedio is not None:
-                        imagenes_datos.append({
-                            'tipo': 'NDVI',
-                            'promedio': idx.ndvi_promedio,
-                            'minimo': idx.ndvi_minimo or 0,
-                            'maximo': idx.ndvi_maximo or 0
-                        })
-                    if path_ndmi and idx.ndmi_promedio is not None:
-                        imagenes_datos.append({
-                            'tipo': 'NDMI',
-                            'promedio': idx.ndmi_promedio,
-                            'minimo': idx.ndmi_minimo or 0,
-                            'maximo': idx.ndmi_maximo or 0
-                        })
-                    if path_savi and idx.savi_promedio is not None:
-                        imagenes_datos.append({
-                            'tipo': 'SAVI',
-                            'promedio': idx.savi_promedio,
-                            'minimo': idx.savi_minimo or 0,
-                            'maximo': idx.savi_maximo or 0
-                        })
-                    
-                    # Generar análisis integrado si hay datos
-                    if imagenes_datos:
-                        analisis_mes = self._crear_analisis_integrado_mes(idx, imagenes_datos, parcela)
-                        elements.extend(analisis_mes)
+        # Procesar cada mes con imágenes
+        for idx, rutas, con_separador, entradas in self._meses_galeria(parcela, indices):
+            # Bloque del mes desde el caché si la fila y sus imágenes no cambiaron
+            bloque, imagenes = self._seccion(
+                f'galeria_{idx.año}-{idx.mes:02d}', entradas,
+                lambda: self._crear_bloque_galeria_mes(idx, rutas['ndvi'], rutas['ndmi'], rutas['savi'],
+                                                       parcela, con_separador),
+                seccion_cache='galeria_mes'
+            )
+            elements.extend(bloque)
+            imagenes_encontradas += imagenes
         
         # Si no hay imágenes
         if imagenes_encontradas == 0:
@@ -1960,6 +1951,158 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
         
         return elements
     
+    def _crear_bloque_galeria_mes(self, idx: IndiceMensual, path_ndvi: Optional[str], path_ndmi: Optional[str],
+                                  path_savi: Optional[str], parcela: Parcela,
+                                  con_separador: bool) -> Tuple[List, int]:
+        """Bloque de un mes de la galería: imágenes, estadísticas y análisis integrado"""
+        elements = []
+        imagenes = 0
+        
+        # Separador visual entre meses
+        if con_separador:
+            elements.append(Spacer(1, 0.5*cm))
+            from reportlab.platypus import HRFlowable
+            elements.append(HRFlowable(
+                width="100%", 
+                thickness=1, 
+                color=self.colores['verde_claro'],
+                spaceAfter=0.3*cm,
+                spaceBefore=0.3*cm
+            ))
+
+        # Título del mes
+        titulo_mes = Paragraph(
+            f'<strong>{idx.periodo_texto}</strong>',
+            self.estilos['SubtituloSeccion']
+        )
+        elements.append(titulo_mes)
+        elements.append(Spacer(1, 0.3*cm))
+
+        # Metadatos del mes
+        coord_texto = 'N/A'
+        if parcela.centroide:
+            coord_texto = f"{parcela.centroide.y:.4f}, {parcela.centroide.x:.4f}"
+
+        metadatos = Paragraph(
+            f"""
+            <strong>Fecha:</strong> {idx.fecha_imagen.strftime('%d/%m/%Y') if idx.fecha_imagen else 'N/A'} | 
+            <strong>Satélite:</strong> {idx.satelite_imagen or 'Sentinel-2'} | 
+            <strong>Nubosidad:</strong> {idx.nubosidad_imagen or 0:.1f}%
+            """,
+            self.estilos['TextoNormal']
+        )
+        elements.append(metadatos)
+        elements.append(Spacer(1, 0.3*cm))
+
+        # Crear tabla de 3 imágenes
+        imagenes_fila = []
+        labels_fila = []
+        stats_fila = []
+
+        # NDVI
+        if path_ndvi:
+            imagenes += 1
+            try:
+                img_ndvi = Image(BytesIO(self._miniatura(idx, 'ndvi', path_ndvi)),
+                                 width=5*cm, height=5*cm, kind='proportional')
+                imagenes_fila.append(img_ndvi)
+                labels_fila.append(Paragraph('<strong>NDVI</strong>', self.estilos['TextoNormal']))
+                stats = Paragraph(
+                    f'Prom: {idx.ndvi_promedio:.3f}<br/>Min: {idx.ndvi_minimo:.3f} | Max: {idx.ndvi_maximo:.3f}',
+                    self.estilos['PieImagen']
+                )
+                stats_fila.append(stats)
+            except Exception as e:
+                logger.warning(f"Error cargando NDVI: {e}")
+        else:
+            imagenes_fila.append(Paragraph('<i>Sin imagen NDVI</i>', self.estilos['PieImagen']))
+            labels_fila.append(Paragraph('', self.estilos['TextoNormal']))
+            stats_fila.append(Paragraph('', self.estilos['TextoNormal']))
+
+        # NDMI
+        if path_ndmi:
+            imagenes += 1
+            try:
+                img_ndmi = Image(BytesIO(self._miniatura(idx, 'ndmi', path_ndmi)),
+                                 width=5*cm, height=5*cm, kind='proportional')
+                imagenes_fila.append(img_ndmi)
+                labels_fila.append(Paragraph('<strong>NDMI</strong>', self.estilos['TextoNormal']))
+                stats = Paragraph(
+                    f'Prom: {idx.ndmi_promedio:.3f}<br/>Min: {idx.ndmi_minimo:.3f} | Max: {idx.ndmi_maximo:.3f}',
+                    self.estilos['PieImagen']
+                )
+                stats_fila.append(stats)
+            except Exception as e:
+                logger.warning(f"Error cargando NDMI: {e}")
+        else:
+            imagenes_fila.append(Paragraph('<i>Sin imagen NDMI</i>', self.estilos['PieImagen']))
+            labels_fila.append(Paragraph('', self.estilos['TextoNormal']))
+            stats_fila.append(Paragraph('', self.estilos['TextoNormal']))
+
+        # SAVI
+        if path_savi:
+            imagenes += 1
+            try:
+                img_savi = Image(BytesIO(self._miniatura(idx, 'savi', path_savi)),
+                                 width=5*cm, height=5*cm, kind='proportional')
+                imagenes_fila.append(img_savi)
+                labels_fila.append(Paragraph('<strong>SAVI</strong>', self.estilos['TextoNormal']))
+                stats = Paragraph(
+                    f'Prom: {idx.savi_promedio:.3f}<br/>Min: {idx.savi_minimo:.3f} | Max: {idx.savi_maximo:.3f}',
+                    self.estilos['PieImagen']
+                )
+                stats_fila.append(stats)
+            except Exception as e:
+                logger.warning(f"Error cargando SAVI: {e}")
+        else:
+            imagenes_fila.append(Paragraph('<i>Sin imagen SAVI</i>', self.estilos['PieImagen']))
+            labels_fila.append(Paragraph('', self.estilos['TextoNormal']))
+            stats_fila.append(Paragraph('', self.estilos['TextoNormal']))
+
+        # Tabla de imágenes
+        if len(imagenes_fila) == 3:
+            tabla_img = Table([labels_fila, imagenes_fila, stats_fila], colWidths=[5.2*cm, 5.2*cm, 5.2*cm])
+            tabla_img.setStyle(TableStyle([
+                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+                ('TOPPADDING', (0, 0), (-1, -1), 5),
+                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+            ]))
+            elements.append(tabla_img)
+            elements.append(Spacer(1, 0.5*cm))
+
+            # AGREGAR ANÁLISIS INTEGRADO DEL MES
+            # Preparar datos de imágenes para el análisis
+            imagenes_datos = []
+            if path_ndvi and idx.ndvi_promedio is not None:
+                imagenes_datos.append({
+                    'tipo': 'NDVI',
+                    'promedio': idx.ndvi_promedio,
+                    'minimo': idx.ndvi_minimo or 0,
+                    'maximo': idx.ndvi_maximo or 0
+                })
+            if path_ndmi and idx.ndmi_promedio is not None:
+                imagenes_datos.append({
+                    'tipo': 'NDMI',
+                    'promedio': idx.ndmi_promedio,
+                    'minimo': idx.ndmi_minimo or 0,
+                    'maximo': idx.ndmi_maximo or 0
+                })
+            if path_savi and idx.savi_promedio is not None:
+                imagenes_datos.append({
+                    'tipo': 'SAVI',
+                    'promedio': idx.savi_promedio,
+                    'minimo': idx.savi_minimo or 0,
+                    'maximo': idx.savi_maximo or 0
+                })
+
+            # Generar análisis integrado si hay datos
+            if imagenes_datos:
+                analisis_mes = self._crear_analisis_integrado_mes(idx, imagenes_datos, parcela)
+                elements.extend(analisis_mes)
+        
+        return elements, imagenes
+    
     def _crear_analisis_integrado_mes(self, indice: IndiceMensual, imagenes_mes: List[Dict], parcela: Parcela) -> List:
         """
         Análisis integrado histórico de las 3 imágenes satelitales del mes (NDVI, NDMI, SAVI).
@@ -2146,11 +2289,56 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
         
         return elements
     
+    def _construir_cubos_sinteticos(self, indices_validos: List[IndiceMensual], size) -> tuple:
+        """
+        Cubos [meses, alto, ancho] con variación gaussiana alrededor de los
+        promedios mensuales. Solo se usa cuando no hay rasters reales de EOSDA
+        (parcela sin field_id o Field Imagery no disponible).
+        
+        Returns:
+            (data_cubes, fechas_meses)
+        """
+        import numpy as np
+        
+        num_meses = len(indices_validos)
+        data_cubes = {
+            'ndvi': np.zeros((num_meses, size[0], size[1]), dtype=np.float32),
+            'ndmi': np.zeros((num_meses, size[0], size[1]), dtype=np.float32),
+            'savi': np.zeros((num_meses, size[0], size[1]), dtype=np.float32)
+        }
+        fechas_meses = []
+        
+        for mes_idx, idx_mensual in enumerate(indices_validos):
+            fechas_meses.append(f"{idx_mensual.año}-{idx_mensual.mes:02d}")
+            
+            for indice_nombre, valor_promedio in [
+                ('ndvi', idx_mensual.ndvi_promedio),
+                ('ndmi', idx_mensual.ndmi_promedio),
+                ('savi', idx_mensual.savi_promedio)
+            ]:
+                # Generar capa con variación espacial gaussiana
+                capa_2d = np.random.normal(valor_promedio, 0.08, size).astype(np.float32)
+                
+                # Agregar zonas con variación adicional (heterogeneidad del campo)
+                num_manchas = np.random.randint(2, 4)
+                for _ in range(num_manchas):
+                    x = np.random.randint(0, size[0] - 50)
+                    y = np.random.randint(0, size[1] - 50)
+                    size_mancha = np.random.randint(30, 70)
+                    factor = np.random.uniform(0.6, 0.95)
+                    capa_2d[x:x+size_mancha, y:y+size_mancha] *= factor
+                
+                data_cubes[indice_nombre][mes_idx, :, :] = np.clip(capa_2d, -1.0, 1.0)
+        
+        return data_cubes, fechas_meses
+    
     def _ejecutar_diagnostico_cerebro(self, parcela: Parcela, indices: List[IndiceMensual]) -> Optional[Dict]:
         """
         Ejecuta el Cerebro de Diagnóstico Unificado usando datos del caché (IndiceMensual)
         
         🔧 MEJORAS INTEGRADAS:
+        - Píxeles reales: cubo temporal persistente de la parcela (memmap,
+          rasters Field Imagery de EOSDA); cubos sintéticos solo si no hay rasters
         - Generación de máscara de cultivo desde geometría de parcela
         - Sistema de KPIs unificados con validación matemática
         - Formateo estándar de decimales (1 decimal para ha y %)
@@ -2162,6 +2350,7 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
         Returns:
             Dict con resultados del diagnóstico + KPIs unificados, o None si falla
         """
+        self._diagnostico_desde_cache = False
         try:
             import numpy as np
             from pathlib import Path
@@ -2232,8 +2421,6 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
             # ==================================================================
             # ARQUITECTURA DE DATA CUBE 3D: [Meses, Altura, Ancho]
             # ==================================================================
-            size = (256, 256)  # Tamaño espacial estándar
-            
             # Filtrar solo índices con datos válidos y ordenar cronológicamente
             indices_validos = [
                 idx for idx in indices 
@@ -2241,59 +2428,58 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
             ]
             indices_validos.sort(key=lambda x: (x.año, x.mes))
             
-            num_meses = len(indices_validos)
-            logger.info(f"📊 Construyendo Data Cube 3D con {num_meses} meses de datos...")
-            
-            # Crear Data Cubes 3D para cada índice [Meses, Lat, Lon]
-            data_cubes = {
-                'ndvi': np.zeros((num_meses, size[0], size[1]), dtype=np.float32),
-                'ndmi': np.zeros((num_meses, size[0], size[1]), dtype=np.float32),
-                'savi': np.zeros((num_meses, size[0], size[1]), dtype=np.float32)
-            }
-            
-            # Metadata temporal para cada capa
-            fechas_meses = []
+            # Píxeles reales: cubo temporal persistente de la parcela (memmap).
+            # Solo se descargan los rasters de los meses que aún no tiene.
+            cubos_reales = None
+            if parcela.eosda_field_id:
+                try:
+                    from informes.services.eosda_api import eosda_service
+                    from informes.services.cubo_temporal import CuboTemporalParcela
+                    cubo_temporal = CuboTemporalParcela.para_parcela(parcela.id, geometria=parcela.geometria)
+                    sincronizacion = cubo_temporal.sincronizar_desde_rasters(
+                        indices_validos, parcela.eosda_field_id, eosda_service.descargador_rasters
+                    )
+                    if sincronizacion['sin_raster']:
+                        logger.warning(f"⚠️ Meses sin raster real (omitidos del cubo): "
+                                       f"{', '.join(sincronizacion['sin_raster'])}")
+                    cubos_reales = cubo_temporal.rebanada(
+                        [f"{idx.año}-{idx.mes:02d}" for idx in indices_validos]
+                    )
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudieron obtener rasters reales: {str(e)}")
+            
+            geo_transform = None
+            if cubos_reales:
+                data_cubes = cubos_reales['cubos']
+                fechas_meses = cubos_reales['fechas']
+                size = cubos_reales['shape']
+                geo_transform = cubos_reales['geo_transform']
+                fuente_pixeles = 'eosda'
+            else:
+                logger.warning("⚠️ Sin rasters reales para la parcela: cubos sintéticos desde promedios mensuales")
+                size = (256, 256)  # Tamaño espacial estándar
+                data_cubes, fechas_meses = self._construir_cubos_sinteticos(indices_validos, size)
+                fuente_pixeles = 'sintetico'
             
-            # PROCESAMIENTO VECTORIZADO: Construir el cubo mes a mes
-            for mes_idx, idx_mensual in enumerate(indices_validos):
-                fecha_str = f"{idx_mensual.año}-{idx_mensual.mes:02d}"
-                fechas_meses.append(fecha_str)
-                
-                # Para cada índice, generar capa 2D con variación realista
-                for indice_nombre, valor_promedio in [
-                    ('ndvi', idx_mensual.ndvi_promedio),
-                    ('ndmi', idx_mensual.ndmi_promedio),
-                    ('savi', idx_mensual.savi_promedio)
-                ]:
-                    # Generar capa con variación espacial gaussiana
-                    capa_2d = np.random.normal(valor_promedio, 0.08, size).astype(np.float32)
-                    
-                    # Agregar zonas con variación adicional (heterogeneidad del campo)
-                    num_manchas = np.random.randint(2, 4)
-                    for _ in range(num_manchas):
-                        x = np.random.randint(0, size[0] - 50)
-                        y = np.random.randint(0, size[1] - 50)
-                        size_mancha = np.random.randint(30, 70)
-                        factor = np.random.uniform(0.6, 0.95)
-                        capa_2d[x:x+size_mancha, y:y+size_mancha] *= factor
-                    
-                    # Clip a rango válido
-                    capa_2d = np.clip(capa_2d, -1.0, 1.0)
-                    
-                    # Asignar al data cube
-                    data_cubes[indice_nombre][mes_idx, :, :] = capa_2d
-            
-            logger.info(f"✅ Data Cubes construidos:")
+            num_meses = len(fechas_meses)
+            logger.info(f"✅ Data Cubes construidos ({fuente_pixeles}, {num_meses} meses):")
             for nombre, cubo in data_cubes.items():
                 logger.info(f"   {nombre.upper()}: shape {cubo.shape}, "
-                          f"rango temporal [{cubo.min():.3f}, {cubo.max():.3f}]")
-            
-            # Crear estructura para pasar al cerebro (mantener compatibilidad)
-            arrays_indices = {
-                'ndvi': data_cubes['ndvi'][-1, :, :],  # Última capa para compatibilidad
-                'ndmi': data_cubes['ndmi'][-1, :, :],
-                'savi': data_cubes['savi'][-1, :, :]
-            }
+                          f"rango último mes [{np.nanmin(cubo[-1]):.3f}, {np.nanmax(cubo[-1]):.3f}]")
+            
+            # Píxeles sin dato (nubes, fuera del recorte) en la última escena:
+            # se excluyen de la máscara y se rellenan con la mediana de su capa
+            # para que el cerebro (que no maneja NaN) opere sobre valores finitos.
+            # Se copia solo la última capa: el cubo es un memmap de solo lectura.
+            pixeles_validos = np.ones(size, dtype=bool)
+            arrays_indices = {}
+            for nombre in ('ndvi', 'ndmi', 'savi'):
+                capa = np.array(data_cubes[nombre][-1], dtype=np.float32)
+                faltantes = ~np.isfinite(capa)
+                pixeles_validos &= ~faltantes
+                if faltantes.any():
+                    capa[faltantes] = np.nanmedian(capa) if not faltantes.all() else 0.0
+                arrays_indices[nombre] = capa
             
             # NUEVO: Pasar data cubes completos para análisis temporal
             data_cubes_temporales = {
@@ -2304,41 +2490,42 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
                 'num_meses': num_meses
             }
             
-            # Preparar geometría y transformación geográfica
-            try:
-                if hasattr(parcela, 'geometria') and parcela.geometria:
-                    bbox = parcela.geometria.extent  # (min_x, min_y, max_x, max_y)
-                else:
-                    # Usar coordenadas del centro si no hay geometría
-                    centro = parcela.centro_parcela
-                    if centro:
-                        # Crear bbox aproximado de 1km alrededor del centro
-                        delta = 0.005  # ~500m
-                        bbox = (
-                            centro['lng'] - delta,
-                            centro['lat'] - delta,
-                            centro['lng'] + delta,
-                            centro['lat'] + delta
-                        )
+            if geo_transform is None:
+                # Preparar geometría y transformación geográfica desde el bbox de la parcela
+                try:
+                    if hasattr(parcela, 'geometria') and parcela.geometria:
+                        bbox = parcela.geometria.extent  # (min_x, min_y, max_x, max_y)
                     else:
-                        logger.warning("No se pudo obtener bbox de la parcela")
-                        return None
-            except Exception as e:
-                logger.error(f"Error obteniendo bbox: {str(e)}")
-                return None
-            
-            # Convertir bbox a geo_transform GDAL (formato de 6 elementos)
-            width, height = size[1], size[0]  # (cols, rows)
-            delta_lon = (bbox[2] - bbox[0]) / width
-            delta_lat = (bbox[3] - bbox[1]) / height
-            geo_transform = (
-                bbox[0],      # Longitud origen (esquina superior izquierda)
-                delta_lon,    # Paso en X (grados por pixel)
-                0,            # Rotación X
-                bbox[3],      # Latitud origen (esquina superior izquierda)
-                0,            # Rotación Y
-                -delta_lat    # Paso en Y (negativo porque va de norte a sur)
-            )
+                        # Usar coordenadas del centro si no hay geometría
+                        centro = parcela.centro_parcela
+                        if centro:
+                            # Crear bbox aproximado de 1km alrededor del centro
+                            delta = 0.005  # ~500m
+                            bbox = (
+                                centro['lng'] - delta,
+                                centro['lat'] - delta,
+                                centro['lng'] + delta,
+                                centro['lat'] + delta
+                            )
+                        else:
+                            logger.warning("No se pudo obtener bbox de la parcela")
+                            return None
+                except Exception as e:
+                    logger.error(f"Error obteniendo bbox: {str(e)}")
+                    return None
+                
+                # Convertir bbox a geo_transform GDAL (formato de 6 elementos)
+                width, height = size[1], size[0]  # (cols, rows)
+                delta_lon = (bbox[2] - bbox[0]) / width
+                delta_lat = (bbox[3] - bbox[1]) / height
+                geo_transform = (
+                    bbox[0],      # Longitud origen (esquina superior izquierda)
+                    delta_lon,    # Paso en X (grados por pixel)
+                    0,            # Rotación X
+                    bbox[3],      # Latitud origen (esquina superior izquierda)
+                    0,            # Rotación Y
+                    -delta_lat    # Paso en Y (negativo porque va de norte a sur)
+                )
             
             # GENERAR MÁSCARA DE CULTIVO desde geometría de parcela
             mascara_cultivo = None
@@ -2352,6 +2539,31 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
             except Exception as e:
                 logger.warning(f"⚠️  No se pudo generar máscara de cultivo: {str(e)}. Continuando sin máscara.")
                 mascara_cultivo = None
+            if not pixeles_validos.all():
+                mascara_cultivo = pixeles_validos if mascara_cultivo is None else (mascara_cultivo & pixeles_validos)
+            
+            # Mismo cubo, máscara y umbrales que en el último informe: reutilizar el
+            # diagnóstico. Los cubos sintéticos se derivan de las filas (con ruido no
+            # reproducible), así que entran por las filas y no por sus píxeles.
+            clave_diagnostico = None
+            if self.cache_secciones is not None:
+                from informes.models import UmbralesCultivo
+                clave_diagnostico = huella(
+                    'diagnostico',
+                    descriptor_modelo(parcela),
+                    [descriptor_modelo(idx) for idx in indices_validos],
+                    UmbralesCultivo.obtener_umbrales(parcela.tipo_cultivo or 'generico', 'general'),
+                    fuente_pixeles,
+                    data_cubes if fuente_pixeles == 'eosda' else list(size),
+                    list(geo_transform),
+                    mascara_cultivo,
+                )
+                encontrado, resultado = self.cache_secciones.obtener('diagnostico', clave_diagnostico)
+                mapa = resultado.get('mapa_diagnostico_path') if encontrado else None
+                if encontrado and (not mapa or os.path.exists(mapa)):
+                    self._diagnostico_desde_cache = True
+                    logger.info(f"♻️ Diagnóstico desde caché: {resultado['eficiencia_lote']:.1f}% eficiencia")
+                    return resultado
             
             # Crear directorio de salida
             output_dir = Path(settings.MEDIA_ROOT) / 'diagnosticos' / f'parcela_{parcela.id}'
@@ -2402,7 +2614,8 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
                 'desglose_severidad': diagnostico_obj.desglose_severidad,
                 'zona_prioritaria': None,
                 'kpis': kpis,  # 🔧 AGREGAR: Sistema de KPIs unificados
-                'crisis_historicas': crisis_detectadas  # 🆕 MEMORIA DE CRISIS
+                'crisis_historicas': crisis_detectadas,  # 🆕 MEMORIA DE CRISIS
+                'fuente_pixeles': fuente_pixeles  # 'eosda' (rasters reales) o 'sintetico'
             }
             
             # Agregar zona prioritaria si existe
@@ -2424,6 +2637,8 @@ y algoritmos científicamente validados para el análisis de vegetación.</i>
                 logger.info(f"✅ Diagnóstico completado: {kpis.formatear_eficiencia()} eficiencia, {kpis.formatear_area_afectada()} afectadas")
             else:
                 logger.info(f"✅ Diagnóstico completado: {resultado['eficiencia_lote']:.1f}% eficiencia, {resultado['area_afectada_total']:.1f} ha afectadas")
+            if clave_diagnostico:
+                self.cache_secciones.guardar('diagnostico', clave_diagnostico, resultado)
             return resultado
             
         except Exception as e:
@@ -0,0 +1,62 @@
+"""
+Management Command: construye los paquetes departamentales de capas legales
+Convierte las capas nacionales (red hídrica, RUNAP, resguardos, páramos) en
+un GeoParquet por departamento con la geometría EPSG:3116 precalculada y
+columnas normalizadas. Ver paquetes_departamentales.py.
+
+Uso:
+    python manage.py construir_paquetes_legales                          # todos
+    python manage.py construir_paquetes_legales --departamentos Casanare Meta
+    python manage.py construir_paquetes_legales --margen 0.5
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Construye los paquetes GeoParquet por departamento para el verificador legal'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--departamentos',
+            nargs='+',
+            help='Departamentos (nombre GADM, default: todos)'
+        )
+        parser.add_argument(
+            '--margen',
+            type=float,
+            help='Margen en grados alrededor del bbox departamental (default: 0.25)'
+        )
+        parser.add_argument(
+            '--directorio-datos',
+            help='Directorio de capas fuente (default: datos_geograficos/)'
+        )
+
+    def handle(self, *args, **options):
+        # Los módulos legales viven en la raíz del proyecto
+        base_dir = Path(__file__).resolve().parent.parent.parent.parent
+        if str(base_dir) not in sys.path:
+            sys.path.insert(0, str(base_dir))
+
+        from paquetes_departamentales import MARGEN_PAQUETE_GRADOS, construir_paquetes
+
+        margen = options['margen'] if options['margen'] is not None else MARGEN_PAQUETE_GRADOS
+        inicio = time.perf_counter()
+        try:
+            manifiestos = construir_paquetes(
+                directorio_datos=options['directorio_datos'],
+                departamentos=options['departamentos'],
+                margen_grados=margen,
+            )
+        except (ImportError, FileNotFoundError) as e:
+            raise CommandError(str(e))
+
+        if not manifiestos:
+            raise CommandError('No se construyó ningún paquete')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(manifiestos)} paquetes construidos en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,171 @@
+"""
+Management Command: worker de la cola de trabajos de generación
+Ejecuta los PDF, PDF legales y videos que las vistas encolan
+
+Uso:
+    python manage.py procesar_trabajos                    # 1 worker, bucle infinito
+    python manage.py procesar_trabajos --workers 3        # pool de 3 procesos
+    python manage.py procesar_trabajos --hasta-vaciar     # procesa lo pendiente y termina
+    python manage.py procesar_trabajos --tipos video_timeline
+"""
+
+import multiprocessing
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from informes.models_trabajos import TrabajoGeneracion, TipoTrabajo, EstadoTrabajo
+from informes.services.trabajos_generacion import (
+    procesar_cola, nombre_worker, liberar_huerfanos, INTERVALO_REVISION_HUERFANOS
+)
+
+
+def _bucle_worker(indice, tipos, intervalo, hasta_vaciar, max_trabajos, minutos_huerfanos):
+    """Punto de entrada de cada proceso del pool"""
+    # Cada proceso abre sus propias conexiones a la BD
+    connections.close_all()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # El padre coordina el apagado
+    procesar_cola(
+        worker=nombre_worker(indice),
+        tipos=tipos,
+        intervalo=intervalo,
+        hasta_vaciar=hasta_vaciar,
+        max_trabajos=max_trabajos,
+        minutos_huerfanos=minutos_huerfanos
+    )
+
+
+class Command(BaseCommand):
+    help = 'Procesa la cola de trabajos de generación (PDF, PDF legal, video)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Número de procesos worker (default: 1)'
+        )
+        parser.add_argument(
+            '--tipos',
+            nargs='+',
+            choices=TipoTrabajo.values,
+            help='Procesar solo estos tipos de trabajo'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos entre consultas cuando la cola está vacía (default: 2)'
+        )
+        parser.add_argument(
+            '--hasta-vaciar',
+            action='store_true',
+            help='Terminar cuando no queden trabajos pendientes'
+        )
+        parser.add_argument(
+            '--max-trabajos',
+            type=int,
+            help='Reciclar cada worker después de N trabajos (libera memoria de matplotlib/ffmpeg)'
+        )
+        parser.add_argument(
+            '--liberar-huerfanos',
+            type=int,
+            default=5,
+            metavar='MINUTOS',
+            help='Devolver a la cola (al arrancar y periódicamente) trabajos cuyo worker '
+                 'no registra latido hace más de N minutos (default: 5)'
+        )
+
+    def handle(self, *args, **options):
+        num_workers = options['workers']
+        if num_workers < 1:
+            raise CommandError('❌ --workers debe ser al menos 1')
+
+        self.stdout.write(self.style.SUCCESS('\n' + '=' * 80))
+        self.stdout.write(self.style.SUCCESS('⚙️  WORKER DE TRABAJOS DE GENERACIÓN'))
+        self.stdout.write(self.style.SUCCESS('=' * 80 + '\n'))
+
+        self._liberar_huerfanos(options['liberar_huerfanos'])
+
+        pendientes = TrabajoGeneracion.objects.filter(estado=EstadoTrabajo.PENDIENTE).count()
+        self.stdout.write(f'📋 Trabajos pendientes: {pendientes}')
+        self.stdout.write(f'👷 Workers: {num_workers} | Tipos: {", ".join(options["tipos"] or ["todos"])}\n')
+
+        argumentos = (
+            options['tipos'],
+            options['intervalo'],
+            options['hasta_vaciar'],
+            options['max_trabajos'],
+            options['liberar_huerfanos'],
+        )
+        inicio = time.time()
+
+        if num_workers == 1 and not options['max_trabajos']:
+            # Un solo worker: en el mismo proceso (más fácil de depurar)
+            try:
+                contadores = procesar_cola(nombre_worker(0), *argumentos)
+            except KeyboardInterrupt:
+                self.stdout.write(self.style.WARNING('\n⏹️  Worker detenido'))
+                return
+            self._resumen(contadores, time.time() - inicio)
+            return
+
+        # Pool de procesos: ni matplotlib ni ReportLab son seguros entre hilos.
+        # Se cierran las conexiones antes del fork para no compartir sockets.
+        connections.close_all()
+        procesos = {}
+        ultima_revision = time.monotonic()
+        try:
+            while True:
+                # Un worker muerto deja su trabajo EN_PROCESO sin latido: el
+                # supervisor lo libera sin esperar a que se reinicie el comando
+                if time.monotonic() - ultima_revision >= INTERVALO_REVISION_HUERFANOS:
+                    self._liberar_huerfanos(options['liberar_huerfanos'])
+                    connections.close_all()  # Los workers que se arranquen no heredan el socket
+                    ultima_revision = time.monotonic()
+
+                for indice in range(num_workers):
+                    proceso = procesos.get(indice)
+                    if proceso is not None and proceso.is_alive():
+                        continue
+                    if proceso is not None and options['hasta_vaciar']:
+                        continue
+                    # Arrancar (o reciclar) el worker
+                    proceso = multiprocessing.Process(
+                        target=_bucle_worker,
+                        args=(indice, *argumentos),
+                        daemon=False
+                    )
+                    proceso.start()
+                    procesos[indice] = proceso
+
+                if options['hasta_vaciar'] and not any(p.is_alive() for p in procesos.values()):
+                    break
+                time.sleep(1)
+
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⏹️  Deteniendo workers...'))
+            for proceso in procesos.values():
+                proceso.terminate()
+            for proceso in procesos.values():
+                proceso.join(timeout=10)
+            return
+
+        self.stdout.write(self.style.SUCCESS(f'\n✅ Cola vacía tras {time.time() - inicio:.1f}s'))
+
+    def _liberar_huerfanos(self, minutos):
+        resumen = liberar_huerfanos(minutos)
+        if resumen['devueltos']:
+            self.stdout.write(self.style.WARNING(f"♻️  {resumen['devueltos']} trabajo(s) huérfano(s) devueltos a la cola"))
+        if resumen['fallidos']:
+            self.stdout.write(self.style.ERROR(
+                f"❌ {resumen['fallidos']} trabajo(s) huérfano(s) sin intentos restantes marcados como fallidos"
+            ))
+
+    def _resumen(self, contadores, duracion):
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✅ Worker terminado en {duracion:.1f}s - "
+            f"{contadores['completados']} completados, {contadores['fallidos']} fallidos"
+        ))
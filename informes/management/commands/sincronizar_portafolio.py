@@ -0,0 +1,197 @@
+"""
+Management Command: sincroniza todo el portafolio con la Statistics API de EOSDA
+Envía las tareas de todas las parcelas activas en paralelo dentro de un
+presupuesto de peticiones/minuto y guarda IndiceMensual a medida que terminan.
+Si se interrumpe, volver a ejecutar el mismo comando reanuda la corrida.
+
+Uso:
+    python manage.py sincronizar_portafolio                      # últimos 12 meses
+    python manage.py sincronizar_portafolio --meses 24 --max-concurrentes 8
+    python manage.py sincronizar_portafolio --fecha-inicio 2024-01-01 --fecha-fin 2024-12-31
+    python manage.py sincronizar_portafolio --parcelas 3 7 12 --peticiones-minuto 5
+    python manage.py sincronizar_portafolio --reiniciar          # ignora el checkpoint
+"""
+
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from informes.models import Parcela
+from informes.services.eosda_poller import LimitadorTokenBucket, obtener_limitador_eosda
+from informes.services.sincronizacion_portafolio import (
+    CheckpointSincronizacion, PresupuestoSincronizacion, SincronizadorPortafolio,
+    INDICES_POR_DEFECTO
+)
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza los índices mensuales de todas las parcelas activas con EOSDA'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses',
+            type=int,
+            default=12,
+            help='Meses hacia atrás desde hoy (default: 12)'
+        )
+        parser.add_argument(
+            '--fecha-inicio',
+            type=date.fromisoformat,
+            help='Inicio del rango (YYYY-MM-DD); reemplaza --meses'
+        )
+        parser.add_argument(
+            '--fecha-fin',
+            type=date.fromisoformat,
+            help='Fin del rango (YYYY-MM-DD, default: hoy)'
+        )
+        parser.add_argument(
+            '--parcelas',
+            nargs='+',
+            type=int,
+            help='IDs de parcelas (default: todas las activas)'
+        )
+        parser.add_argument(
+            '--indices',
+            nargs='+',
+            default=INDICES_POR_DEFECTO,
+            help='Índices a pedir (default: NDVI NDMI SAVI)'
+        )
+        parser.add_argument(
+            '--max-nubosidad',
+            type=int,
+            default=50,
+            help='Nubosidad máxima de las escenas (default: 50)'
+        )
+        parser.add_argument(
+            '--peticiones-minuto',
+            type=float,
+            help='Presupuesto de peticiones/minuto para esta corrida '
+                 '(además del límite global EOSDA_LIMITE_PETICIONES_MINUTO)'
+        )
+        parser.add_argument(
+            '--max-concurrentes',
+            type=int,
+            default=4,
+            help='Tareas EOSDA en vuelo a la vez (default: 4)'
+        )
+        parser.add_argument(
+            '--sin-clima',
+            action='store_true',
+            help='No agregar datos climáticos de Open-Meteo'
+        )
+        parser.add_argument(
+            '--usuario',
+            help='Usuario al que se imputa el consumo (default: primer superusuario)'
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Descartar el checkpoint de una corrida anterior con los mismos parámetros'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('\n' + '=' * 80))
+        self.stdout.write(self.style.SUCCESS('🛰️  SINCRONIZACIÓN DEL PORTAFOLIO CON EOSDA'))
+        self.stdout.write(self.style.SUCCESS('=' * 80 + '\n'))
+
+        fecha_fin = options['fecha_fin'] or date.today()
+        fecha_inicio = options['fecha_inicio'] or (fecha_fin - timedelta(days=30 * options['meses']))
+        if fecha_inicio >= fecha_fin:
+            raise CommandError('❌ La fecha de inicio debe ser anterior a la fecha de fin')
+        if options['max_concurrentes'] < 1:
+            raise CommandError('❌ --max-concurrentes debe ser al menos 1')
+
+        parcelas = Parcela.objects.filter(activa=True).order_by('id')
+        if options['parcelas']:
+            parcelas = parcelas.filter(id__in=options['parcelas'])
+        parcelas = list(parcelas)
+        if not parcelas:
+            raise CommandError('❌ No hay parcelas activas para sincronizar')
+
+        usuario = self._obtener_usuario(options['usuario'])
+
+        indices = [indice.upper() for indice in options['indices']]
+        firma = CheckpointSincronizacion.calcular_firma(
+            [p.id for p in parcelas], fecha_inicio, fecha_fin, indices, options['max_nubosidad']
+        )
+        checkpoint = CheckpointSincronizacion.para_corrida(firma)
+        if options['reiniciar']:
+            checkpoint.eliminar()
+
+        propio = None
+        if options['peticiones_minuto']:
+            propio = LimitadorTokenBucket(peticiones_por_minuto=options['peticiones_minuto'])
+        limitador = PresupuestoSincronizacion(propio, obtener_limitador_eosda())
+
+        self.stdout.write(f'📅 Rango: {fecha_inicio} → {fecha_fin} | Índices: {", ".join(indices)}')
+        self.stdout.write(f'🌾 Parcelas: {len(parcelas)} | En vuelo: {options["max_concurrentes"]} | '
+                          f'Presupuesto: {options["peticiones_minuto"] or "global"} req/min')
+        if checkpoint.parcelas_completadas or checkpoint.tareas:
+            self.stdout.write(self.style.WARNING(
+                f'♻️  Reanudando corrida {firma}: {len(checkpoint.parcelas_completadas)} parcela(s) '
+                f'terminadas, {len(checkpoint.tareas)} tarea(s) por retomar'
+            ))
+        self.stdout.write(f'💾 Checkpoint: {checkpoint.ruta}\n')
+
+        sincronizador = SincronizadorPortafolio(
+            parcelas, fecha_inicio, fecha_fin, checkpoint,
+            indices=indices,
+            max_nubosidad=options['max_nubosidad'],
+            max_concurrentes=options['max_concurrentes'],
+            limitador=limitador,
+            incluir_clima=not options['sin_clima'],
+            usuario=usuario
+        )
+
+        try:
+            metricas = sincronizador.ejecutar()
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING(
+                '\n⏹️  Sincronización interrumpida - ejecuta el mismo comando para reanudar'
+            ))
+            self._resumen(sincronizador.metricas)
+            return
+
+        self._resumen(metricas)
+        if metricas.parcelas_fallidas:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️  {metricas.parcelas_fallidas} parcela(s) pendientes - ejecuta de nuevo para reintentarlas'
+            ))
+        else:
+            checkpoint.eliminar()
+
+    def _obtener_usuario(self, username):
+        if username:
+            usuario = User.objects.filter(username=username).first()
+            if not usuario:
+                raise CommandError(f'❌ Usuario {username} no encontrado')
+            return usuario
+        usuario = User.objects.filter(is_superuser=True).order_by('id').first()
+        if not usuario:
+            self.stdout.write(self.style.WARNING('⚠️  Sin superusuario: el consumo no se registrará'))
+        return usuario
+
+    def _resumen(self, metricas):
+        self.stdout.write(self.style.SUCCESS('\n' + '=' * 80))
+        self.stdout.write(self.style.SUCCESS('📊 RESUMEN'))
+        self.stdout.write(self.style.SUCCESS('=' * 80))
+        self.stdout.write(
+            f'🌾 Parcelas: {metricas.parcelas_completadas} completadas, '
+            f'{metricas.parcelas_omitidas} ya sincronizadas, {metricas.parcelas_fallidas} fallidas '
+            f'(de {metricas.parcelas_total})'
+        )
+        self.stdout.write(
+            f'🗓️  Meses: {metricas.meses_desde_cache}/{metricas.meses_solicitados} desde caché | '
+            f'{metricas.registros_guardados} registros IndiceMensual | {metricas.escenas} escenas'
+        )
+        self.stdout.write(
+            f'📡 Peticiones: {metricas.tareas_creadas} tareas creadas (facturables), '
+            f'{metricas.tareas_reanudadas} retomadas, {metricas.consultas_estado} consultas de estado, '
+            f'{metricas.rate_limits} respuestas 429'
+        )
+        self.stdout.write(
+            f'⚡ Throughput: {metricas.parcelas_por_minuto:.1f} parcelas/min | '
+            f'{metricas.requests_por_parcela:.1f} requests/parcela | '
+            f'{metricas.requests_totales} requests en {metricas.duracion_s:.1f}s'
+        )
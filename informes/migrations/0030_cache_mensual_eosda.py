@@ -0,0 +1,54 @@
+# Generated by Django - AgroTech Histórico
+# Migración para el caché mensual de la Statistics API de EOSDA
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informes', '0029_add_verificacion_legal'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheMesEOSDA',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('field_id', models.CharField(db_index=True, max_length=100, verbose_name='Field ID de EOSDA')),
+                ('año', models.IntegerField(verbose_name='Año')),
+                ('mes', models.IntegerField(verbose_name='Mes')),
+                ('indices', models.CharField(help_text='Formato: NDMI,NDVI,SAVI (ordenados)', max_length=100, verbose_name='Índices Almacenados')),
+                ('max_nubosidad', models.IntegerField(default=50, help_text='Filtro max_cloud_cover_in_aoi con el que se pidieron las escenas', verbose_name='Nubosidad Máxima Consultada')),
+                ('cubre_desde', models.DateField(verbose_name='Cubre Desde')),
+                ('cubre_hasta', models.DateField(verbose_name='Cubre Hasta')),
+                ('escenas_json', models.JSONField(default=list, help_text='Escenas crudas de EOSDA (result) con fecha dentro del mes', verbose_name='Escenas')),
+                ('num_escenas', models.IntegerField(default=0, verbose_name='Número de Escenas')),
+                ('task_id', models.CharField(blank=True, max_length=100, null=True, verbose_name='Task ID de EOSDA')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('usado_en', models.DateTimeField(auto_now=True, verbose_name='Último Uso')),
+                ('veces_usado', models.IntegerField(default=0, verbose_name='Veces Reutilizado')),
+                ('valido_hasta', models.DateTimeField(verbose_name='Válido Hasta')),
+            ],
+            options={
+                'verbose_name': 'Caché Mensual EOSDA',
+                'verbose_name_plural': 'Caché Mensual EOSDA',
+                'ordering': ['field_id', 'año', 'mes'],
+                'indexes': [
+                    models.Index(fields=['field_id', 'año', 'mes'], name='informes_ca_field_i_d5bd5f_idx'),
+                    models.Index(fields=['valido_hasta'], name='informes_ca_valido__3388a1_idx'),
+                ],
+                'unique_together': {('field_id', 'año', 'mes', 'indices')},
+            },
+        ),
+        migrations.AddField(
+            model_name='estadisticausoeosda',
+            name='meses_solicitados',
+            field=models.IntegerField(default=0, help_text='Meses que abarca el rango pedido (caché mensual)', verbose_name='Meses Solicitados'),
+        ),
+        migrations.AddField(
+            model_name='estadisticausoeosda',
+            name='meses_desde_cache',
+            field=models.IntegerField(default=0, help_text='Meses respondidos por CacheMesEOSDA sin consultar EOSDA', verbose_name='Meses desde Caché'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django - AgroTech Histórico
+# Migración para la cola de trabajos de generación (PDF, PDF legal, video)
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('informes', '0030_cache_mensual_eosda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoGeneracion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('informe_pdf', 'Informe PDF'), ('informe_legal_pdf', 'Informe Legal PDF'), ('video_timeline', 'Video Timeline')], db_index=True, max_length=30, verbose_name='Tipo de Trabajo')),
+                ('parametros', models.JSONField(default=dict, help_text='Parámetros de la generación (meses, índice, fps, ...)', verbose_name='Parámetros')),
+                ('clave_dedup', models.CharField(db_index=True, help_text='Hash de tipo + parcela + parámetros', max_length=64, verbose_name='Clave de Deduplicación')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En Proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], db_index=True, default='pendiente', max_length=20, verbose_name='Estado')),
+                ('intentos', models.IntegerField(default=0, verbose_name='Intentos')),
+                ('max_intentos', models.IntegerField(default=3, verbose_name='Máximo de Intentos')),
+                ('disponible_desde', models.DateTimeField(default=django.utils.timezone.now, help_text='Los reintentos esperan hasta esta fecha antes de volver a ejecutarse', verbose_name='Disponible Desde')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('archivo_resultado', models.CharField(blank=True, help_text='Ruta absoluta del PDF/MP4 generado', max_length=500, verbose_name='Archivo Generado')),
+                ('nombre_descarga', models.CharField(blank=True, max_length=255, verbose_name='Nombre de Descarga')),
+                ('resultado', models.JSONField(blank=True, default=dict, verbose_name='Resultado')),
+                ('mensaje_error', models.TextField(blank=True, verbose_name='Mensaje de Error')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_en', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado')),
+                ('finalizado_en', models.DateTimeField(blank=True, null=True, verbose_name='Finalizado')),
+                ('tiempo_cola', models.FloatField(blank=True, null=True, verbose_name='Espera en Cola (s)')),
+                ('tiempo_ejecucion', models.FloatField(blank=True, null=True, verbose_name='Tiempo de Ejecución (s)')),
+                ('parcela', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trabajos_generacion', to='informes.parcela', verbose_name='Parcela')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos_generacion', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Generación',
+                'verbose_name_plural': 'Trabajos de Generación',
+                'ordering': ['-creado_en'],
+                'indexes': [
+                    models.Index(fields=['estado', 'disponible_desde'], name='informes_tr_estado_97ba5c_idx'),
+                    models.Index(fields=['clave_dedup', 'estado'], name='informes_tr_clave_d_642781_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django - AgroTech Histórico
+# Latido del worker: solo se liberan trabajos cuyo worker dejó de latir
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('informes', '0031_trabajogeneracion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajogeneracion',
+            name='latido',
+            field=models.DateTimeField(blank=True, help_text='El worker lo actualiza periódicamente mientras ejecuta el trabajo', null=True, verbose_name='Último Latido'),
+        ),
+    ]
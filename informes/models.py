@@ -17,9 +17,13 @@ from .models_clientes import ClienteInvitacion, RegistroEconomico
 from .models_configuracion import (
     ConfiguracionReporte, 
     CacheDatosEOSDA, 
+    CacheMesEOSDA,
     EstadisticaUsoEOSDA
 )
 
+# Importar cola de trabajos de generación (PDF, PDF legal, video)
+from .models_trabajos import TrabajoGeneracion, TipoTrabajo, EstadoTrabajo
+
 from django.contrib.gis.db import models as gis_models
 from django.db import models
 from django.contrib.auth.models import User
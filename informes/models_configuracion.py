@@ -410,6 +410,261 @@ class CacheDatosEOSDA(models.Model):
         return count
 
 
+class CacheMesEOSDA(models.Model):
+    """
+    Caché mensual de escenas de la Statistics API de EOSDA
+    
+    A diferencia de CacheDatosEOSDA (clave = rango exacto), guarda las escenas
+    de cada mes por separado. Un rango nuevo se arma con los meses ya
+    guardados y solo se piden a EOSDA los huecos que faltan, así que un rango
+    de 12 meses contenido en uno de 24 ya consultado no consume requests.
+    """
+    # Validez según el mes esté cerrado (datos estables) o aún en curso
+    DIAS_VALIDEZ_MES_CERRADO = 90
+    DIAS_VALIDEZ_MES_ABIERTO = 7
+    
+    field_id = models.CharField(
+        max_length=100,
+        verbose_name='Field ID de EOSDA',
+        db_index=True
+    )
+    año = models.IntegerField(verbose_name='Año')
+    mes = models.IntegerField(verbose_name='Mes')
+    indices = models.CharField(
+        max_length=100,
+        verbose_name='Índices Almacenados',
+        help_text='Formato: NDMI,NDVI,SAVI (ordenados)'
+    )
+    max_nubosidad = models.IntegerField(
+        default=50,
+        verbose_name='Nubosidad Máxima Consultada',
+        help_text='Filtro max_cloud_cover_in_aoi con el que se pidieron las escenas'
+    )
+    
+    # Días del mes efectivamente consultados (los extremos de un rango
+    # pueden cubrir el mes solo parcialmente)
+    cubre_desde = models.DateField(verbose_name='Cubre Desde')
+    cubre_hasta = models.DateField(verbose_name='Cubre Hasta')
+    
+    escenas_json = models.JSONField(
+        default=list,
+        verbose_name='Escenas',
+        help_text='Escenas crudas de EOSDA (result) con fecha dentro del mes'
+    )
+    num_escenas = models.IntegerField(default=0, verbose_name='Número de Escenas')
+    task_id = models.CharField(
+        max_length=100,
+        null=True,
+        blank=True,
+        verbose_name='Task ID de EOSDA'
+    )
+    
+    # Control de caché
+    creado_en = models.DateTimeField(auto_now_add=True)
+    usado_en = models.DateTimeField(auto_now=True, verbose_name='Último Uso')
+    veces_usado = models.IntegerField(default=0, verbose_name='Veces Reutilizado')
+    valido_hasta = models.DateTimeField(verbose_name='Válido Hasta')
+    
+    class Meta:
+        verbose_name = 'Caché Mensual EOSDA'
+        verbose_name_plural = 'Caché Mensual EOSDA'
+        ordering = ['field_id', 'año', 'mes']
+        unique_together = [['field_id', 'año', 'mes', 'indices']]
+        indexes = [
+            models.Index(fields=['field_id', 'año', 'mes']),
+            models.Index(fields=['valido_hasta']),
+        ]
+    
+    def __str__(self):
+        return f"Cache mes {self.field_id} {self.año}-{self.mes:02d} ({self.num_escenas} escenas) - {self.indices}"
+    
+    @property
+    def es_valido(self):
+        from django.utils import timezone
+        return timezone.now() < self.valido_hasta
+    
+    @staticmethod
+    def normalizar_indices(indices: list) -> str:
+        return ','.join(sorted(i.upper() for i in indices))
+    
+    @staticmethod
+    def meses_en_rango(fecha_inicio: date, fecha_fin: date) -> list:
+        """Lista [(año, mes), ...] de todos los meses que toca el rango"""
+        meses = []
+        año, mes = fecha_inicio.year, fecha_inicio.month
+        while (año, mes) <= (fecha_fin.year, fecha_fin.month):
+            meses.append((año, mes))
+            año, mes = (año + 1, 1) if mes == 12 else (año, mes + 1)
+        return meses
+    
+    @staticmethod
+    def limites_mes(año: int, mes: int):
+        """(primer día, último día) del mes"""
+        import calendar
+        return date(año, mes, 1), date(año, mes, calendar.monthrange(año, mes)[1])
+    
+    @classmethod
+    def tramo_requerido(cls, año: int, mes: int, fecha_inicio: date, fecha_fin: date):
+        """
+        Parte del mes que un rango necesita (recortada a hoy: no hay escenas futuras)
+        """
+        primer_dia, ultimo_dia = cls.limites_mes(año, mes)
+        return max(primer_dia, fecha_inicio), min(ultimo_dia, fecha_fin, date.today())
+    
+    @staticmethod
+    def fecha_escena(escena: dict):
+        """Fecha (date) de una escena cruda de EOSDA o None"""
+        fecha_str = escena.get('date')
+        if not fecha_str:
+            return None
+        try:
+            return date.fromisoformat(str(fecha_str)[:10])
+        except ValueError:
+            return None
+    
+    @classmethod
+    def obtener_cubiertos(cls, field_id: str, fecha_inicio: date, fecha_fin: date,
+                          indices: list, max_nubosidad: int = 50) -> dict:
+        """
+        Busca los meses del rango que el caché ya puede responder
+        
+        Un registro sirve si está vigente, incluye todos los índices pedidos,
+        se consultó con una nubosidad máxima >= la pedida y cubre la parte
+        del mes que el rango necesita.
+        
+        Returns:
+            {(año, mes): CacheMesEOSDA}
+        """
+        from django.utils import timezone
+        
+        requeridos = set(i.upper() for i in indices)
+        meses = cls.meses_en_rango(fecha_inicio, fecha_fin)
+        
+        candidatos = cls.objects.filter(
+            field_id=field_id,
+            valido_hasta__gt=timezone.now(),
+            max_nubosidad__gte=max_nubosidad,
+            año__gte=meses[0][0],
+            año__lte=meses[-1][0],
+        )
+        
+        cubiertos = {}
+        for registro in candidatos:
+            clave = (registro.año, registro.mes)
+            if clave not in meses or clave in cubiertos:
+                continue
+            if not requeridos.issubset(registro.indices.split(',')):
+                continue
+            desde, hasta = cls.tramo_requerido(registro.año, registro.mes, fecha_inicio, fecha_fin)
+            if registro.cubre_desde <= desde and registro.cubre_hasta >= hasta:
+                cubiertos[clave] = registro
+        
+        return cubiertos
+    
+    @classmethod
+    def calcular_huecos(cls, fecha_inicio: date, fecha_fin: date, cubiertos: dict) -> list:
+        """
+        Agrupa los meses no cubiertos en rangos contiguos de fechas
+        
+        Cada hueco se pide a EOSDA en una sola tarea.
+        
+        Returns:
+            [(desde, hasta), ...] recortados al rango pedido
+        """
+        huecos = []
+        actual = None
+        for año, mes in cls.meses_en_rango(fecha_inicio, fecha_fin):
+            if (año, mes) in cubiertos:
+                actual = None
+                continue
+            desde, hasta = cls.tramo_requerido(año, mes, fecha_inicio, fecha_fin)
+            if desde > hasta:
+                continue  # Mes futuro: nada que pedir
+            if actual is None:
+                actual = [desde, hasta]
+                huecos.append(actual)
+            else:
+                actual[1] = hasta
+        return [tuple(h) for h in huecos]
+    
+    @classmethod
+    def guardar_escenas(cls, field_id: str, desde: date, hasta: date, indices: list,
+                        escenas: list, max_nubosidad: int = 50, task_id: str = None):
+        """
+        Reparte las escenas de una consulta [desde, hasta] en registros mensuales
+        
+        Los meses sin escenas también se guardan (lista vacía) para no volver
+        a pedirlos. Si ya existe un registro vigente contiguo o solapado con
+        el mismo filtro, se fusionan escenas y cobertura.
+        """
+        from django.utils import timezone
+        from datetime import timedelta
+        
+        indices_str = cls.normalizar_indices(indices)
+        hasta = min(hasta, date.today())
+        
+        por_mes = {clave: [] for clave in cls.meses_en_rango(desde, hasta)}
+        for escena in escenas:
+            fecha = cls.fecha_escena(escena)
+            if fecha and (fecha.year, fecha.month) in por_mes:
+                por_mes[(fecha.year, fecha.month)].append(escena)
+        
+        ahora = timezone.now()
+        guardados = []
+        for (año, mes), escenas_mes in por_mes.items():
+            primer_dia, ultimo_dia = cls.limites_mes(año, mes)
+            cubre_desde, cubre_hasta = max(primer_dia, desde), min(ultimo_dia, hasta)
+            
+            existente = cls.objects.filter(
+                field_id=field_id, año=año, mes=mes, indices=indices_str
+            ).first()
+            if (existente and existente.es_valido
+                    and existente.max_nubosidad == max_nubosidad
+                    and existente.cubre_desde <= cubre_hasta + timedelta(days=1)
+                    and cubre_desde <= existente.cubre_hasta + timedelta(days=1)):
+                vistas = {(e.get('date'), e.get('view_id')) for e in escenas_mes}
+                escenas_mes = escenas_mes + [
+                    e for e in existente.escenas_json
+                    if (e.get('date'), e.get('view_id')) not in vistas
+                ]
+                cubre_desde = min(cubre_desde, existente.cubre_desde)
+                cubre_hasta = max(cubre_hasta, existente.cubre_hasta)
+            
+            escenas_mes.sort(key=lambda e: str(e.get('date', '')))
+            mes_cerrado = ultimo_dia < (ahora.date() - timedelta(days=30))
+            dias_validez = cls.DIAS_VALIDEZ_MES_CERRADO if mes_cerrado else cls.DIAS_VALIDEZ_MES_ABIERTO
+            
+            registro, _ = cls.objects.update_or_create(
+                field_id=field_id,
+                año=año,
+                mes=mes,
+                indices=indices_str,
+                defaults={
+                    'max_nubosidad': max_nubosidad,
+                    'cubre_desde': cubre_desde,
+                    'cubre_hasta': cubre_hasta,
+                    'escenas_json': escenas_mes,
+                    'num_escenas': len(escenas_mes),
+                    'task_id': task_id,
+                    'valido_hasta': ahora + timedelta(days=dias_validez),
+                }
+            )
+            guardados.append(registro)
+        
+        return guardados
+    
+    @classmethod
+    def limpiar_expirados(cls):
+        """
+        Elimina meses expirados (ejecutar periódicamente)
+        """
+        from django.utils import timezone
+        expirados = cls.objects.filter(valido_hasta__lt=timezone.now())
+        count = expirados.count()
+        expirados.delete()
+        return count
+
+
 class EstadisticaUsoEOSDA(models.Model):
     """
     Registro de uso de la API de EOSDA para monitoreo de costos
@@ -475,6 +730,16 @@ class EstadisticaUsoEOSDA(models.Model):
         blank=True,
         verbose_name='Clave de Caché'
     )
+    meses_solicitados = models.IntegerField(
+        default=0,
+        verbose_name='Meses Solicitados',
+        help_text='Meses que abarca el rango pedido (caché mensual)'
+    )
+    meses_desde_cache = models.IntegerField(
+        default=0,
+        verbose_name='Meses desde Caché',
+        help_text='Meses respondidos por CacheMesEOSDA sin consultar EOSDA'
+    )
     
     # Timestamp
     creado_en = models.DateTimeField(auto_now_add=True)
@@ -499,7 +764,8 @@ class EstadisticaUsoEOSDA(models.Model):
                      exitoso: bool = True, parcela=None, tiempo_respuesta: float = None,
                      requests_consumidos: int = 1, desde_cache: bool = False,
                      cache_key: str = None, codigo_respuesta: int = None,
-                     mensaje_error: str = None, metodo: str = 'POST'):
+                     mensaje_error: str = None, metodo: str = 'POST',
+                     meses_solicitados: int = 0, meses_desde_cache: int = 0):
         """
         Registra un uso de la API de EOSDA
         """
@@ -515,7 +781,9 @@ class EstadisticaUsoEOSDA(models.Model):
             tiempo_respuesta=tiempo_respuesta,
             requests_consumidos=requests_consumidos if not desde_cache else 0,
             desde_cache=desde_cache,
-            cache_key=cache_key
+            cache_key=cache_key,
+            meses_solicitados=meses_solicitados,
+            meses_desde_cache=meses_desde_cache
         )
     
     @classmethod
@@ -529,6 +797,17 @@ class EstadisticaUsoEOSDA(models.Model):
         fecha_inicio = timezone.now() - timedelta(days=dias)
         stats = cls.objects.filter(usuario=usuario, creado_en__gte=fecha_inicio)
         
+        # Ratios del caché mensual (solo consultas statistics con meses registrados)
+        consultas_mensuales = stats.filter(tipo_operacion='statistics', meses_solicitados__gt=0)
+        total_consultas = consultas_mensuales.count()
+        meses = consultas_mensuales.aggregate(
+            solicitados=models.Sum('meses_solicitados'),
+            desde_cache=models.Sum('meses_desde_cache')
+        )
+        hits_parciales = consultas_mensuales.filter(
+            desde_cache=False, meses_desde_cache__gt=0
+        ).count()
+        
         return {
             'total_requests': stats.filter(desde_cache=False).aggregate(
                 total=models.Sum('requests_consumidos')
@@ -540,4 +819,13 @@ class EstadisticaUsoEOSDA(models.Model):
             'tiempo_promedio': stats.aggregate(
                 avg=models.Avg('tiempo_respuesta')
             )['avg'] or 0,
+            'tasa_hit_cache': (
+                consultas_mensuales.filter(desde_cache=True).count() / total_consultas
+                if total_consultas else 0
+            ),
+            'tasa_hit_parcial': hits_parciales / total_consultas if total_consultas else 0,
+            'tasa_meses_desde_cache': (
+                (meses['desde_cache'] or 0) / meses['solicitados']
+                if meses['solicitados'] else 0
+            ),
         }
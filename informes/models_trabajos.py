@@ -0,0 +1,323 @@
+"""
+Cola de trabajos de generación (PDF, PDF legal, video timeline)
+Saca de la petición HTTP las tareas largas: las vistas encolan un trabajo
+y el comando `procesar_trabajos` lo ejecuta en un pool de workers locales
+"""
+
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import json
+
+
+class TipoTrabajo(models.TextChoices):
+    INFORME_PDF = 'informe_pdf', 'Informe PDF'
+    INFORME_LEGAL_PDF = 'informe_legal_pdf', 'Informe Legal PDF'
+    VIDEO_TIMELINE = 'video_timeline', 'Video Timeline'
+
+
+class EstadoTrabajo(models.TextChoices):
+    PENDIENTE = 'pendiente', 'Pendiente'
+    EN_PROCESO = 'en_proceso', 'En Proceso'
+    COMPLETADO = 'completado', 'Completado'
+    FALLIDO = 'fallido', 'Fallido'
+
+
+class TrabajoGeneracion(models.Model):
+    """
+    Trabajo de generación en cola (respaldado por la BD)
+
+    - Deduplicación: dos peticiones idénticas (mismo tipo, parcela y
+      parámetros) mientras la primera sigue pendiente o en proceso
+      devuelven el mismo trabajo
+    - Reintentos: un fallo vuelve a la cola con espera creciente hasta
+      agotar max_intentos
+    - Tiempos: espera en cola y duración de la ejecución por trabajo
+    - Latido: el worker lo actualiza mientras ejecuta; solo se devuelven a
+      la cola los trabajos cuyo worker dejó de latir (y quedan fallidos si ya
+      agotaron sus intentos: un trabajo que tumba a su worker no se repite
+      para siempre)
+    - El resultado solo lo guarda el worker que sigue siendo dueño del
+      trabajo: si fue liberado y otro lo reclamó, no se pisa su estado
+    """
+    # Segundos de espera antes del reintento N: BASE * 2^(N-1)
+    ESPERA_BASE_REINTENTO = 30
+
+    tipo = models.CharField(
+        max_length=30,
+        choices=TipoTrabajo.choices,
+        verbose_name='Tipo de Trabajo',
+        db_index=True
+    )
+    parcela = models.ForeignKey(
+        'informes.Parcela',
+        on_delete=models.CASCADE,
+        related_name='trabajos_generacion',
+        verbose_name='Parcela'
+    )
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='trabajos_generacion',
+        verbose_name='Usuario'
+    )
+    parametros = models.JSONField(
+        default=dict,
+        verbose_name='Parámetros',
+        help_text='Parámetros de la generación (meses, índice, fps, ...)'
+    )
+    clave_dedup = models.CharField(
+        max_length=64,
+        db_index=True,
+        verbose_name='Clave de Deduplicación',
+        help_text='Hash de tipo + parcela + parámetros'
+    )
+
+    # Estado y reintentos
+    estado = models.CharField(
+        max_length=20,
+        choices=EstadoTrabajo.choices,
+        default=EstadoTrabajo.PENDIENTE,
+        verbose_name='Estado',
+        db_index=True
+    )
+    intentos = models.IntegerField(default=0, verbose_name='Intentos')
+    max_intentos = models.IntegerField(default=3, verbose_name='Máximo de Intentos')
+    disponible_desde = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Disponible Desde',
+        help_text='Los reintentos esperan hasta esta fecha antes de volver a ejecutarse'
+    )
+    worker = models.CharField(max_length=100, blank=True, verbose_name='Worker')
+    latido = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Último Latido',
+        help_text='El worker lo actualiza periódicamente mientras ejecuta el trabajo'
+    )
+
+    # Resultado
+    archivo_resultado = models.CharField(
+        max_length=500,
+        blank=True,
+        verbose_name='Archivo Generado',
+        help_text='Ruta absoluta del PDF/MP4 generado'
+    )
+    nombre_descarga = models.CharField(max_length=255, blank=True, verbose_name='Nombre de Descarga')
+    resultado = models.JSONField(default=dict, blank=True, verbose_name='Resultado')
+    mensaje_error = models.TextField(blank=True, verbose_name='Mensaje de Error')
+
+    # Tiempos
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True, verbose_name='Iniciado')
+    finalizado_en = models.DateTimeField(null=True, blank=True, verbose_name='Finalizado')
+    tiempo_cola = models.FloatField(null=True, blank=True, verbose_name='Espera en Cola (s)')
+    tiempo_ejecucion = models.FloatField(null=True, blank=True, verbose_name='Tiempo de Ejecución (s)')
+
+    class Meta:
+        verbose_name = 'Trabajo de Generación'
+        verbose_name_plural = 'Trabajos de Generación'
+        ordering = ['-creado_en']
+        indexes = [
+            models.Index(fields=['estado', 'disponible_desde']),
+            models.Index(fields=['clave_dedup', 'estado']),
+        ]
+
+    def __str__(self):
+        return f"Trabajo #{self.pk} {self.get_tipo_display()} - {self.parcela_id} ({self.get_estado_display()})"
+
+    @property
+    def activo(self):
+        return self.estado in (EstadoTrabajo.PENDIENTE, EstadoTrabajo.EN_PROCESO)
+
+    @staticmethod
+    def generar_clave_dedup(tipo: str, parcela_id: int, parametros: dict) -> str:
+        contenido = json.dumps(
+            {'tipo': tipo, 'parcela': parcela_id, 'parametros': parametros},
+            sort_keys=True
+        )
+        return hashlib.sha256(contenido.encode()).hexdigest()
+
+    @classmethod
+    def encolar(cls, tipo: str, parcela, usuario=None, parametros: dict = None,
+                max_intentos: int = 3):
+        """
+        Encola un trabajo o devuelve el idéntico que ya está en curso
+
+        Returns:
+            (trabajo, creado)
+        """
+        parametros = parametros or {}
+        clave = cls.generar_clave_dedup(tipo, parcela.pk, parametros)
+        activos = (EstadoTrabajo.PENDIENTE, EstadoTrabajo.EN_PROCESO)
+
+        with transaction.atomic():
+            # Bloquear la parcela serializa los encolados concurrentes de la
+            # misma parcela, así la comprobación de duplicados no tiene carreras
+            type(parcela).objects.select_for_update().filter(pk=parcela.pk).first()
+
+            existente = cls.objects.filter(clave_dedup=clave, estado__in=activos).first()
+            if existente:
+                return existente, False
+
+            trabajo = cls.objects.create(
+                tipo=tipo,
+                parcela=parcela,
+                usuario=usuario,
+                parametros=parametros,
+                clave_dedup=clave,
+                max_intentos=max_intentos
+            )
+        return trabajo, True
+
+    @classmethod
+    def reclamar_siguiente(cls, worker: str, tipos: list = None):
+        """
+        Toma el trabajo pendiente más antiguo y lo marca en proceso
+
+        Usa SELECT ... FOR UPDATE SKIP LOCKED para que varios workers puedan
+        consultar la cola a la vez sin tomar el mismo trabajo.
+
+        Returns:
+            TrabajoGeneracion o None si la cola está vacía
+        """
+        ahora = timezone.now()
+        with transaction.atomic():
+            consulta = cls.objects.select_for_update(skip_locked=True).filter(
+                estado=EstadoTrabajo.PENDIENTE,
+                disponible_desde__lte=ahora
+            )
+            if tipos:
+                consulta = consulta.filter(tipo__in=tipos)
+
+            trabajo = consulta.order_by('disponible_desde', 'pk').first()
+            if trabajo is None:
+                return None
+
+            trabajo.estado = EstadoTrabajo.EN_PROCESO
+            trabajo.intentos += 1
+            trabajo.worker = worker
+            trabajo.iniciado_en = ahora
+            trabajo.latido = ahora
+            if trabajo.tiempo_cola is None:
+                trabajo.tiempo_cola = (ahora - trabajo.creado_en).total_seconds()
+            trabajo.save(update_fields=['estado', 'intentos', 'worker', 'iniciado_en', 'latido', 'tiempo_cola'])
+        return trabajo
+
+    def registrar_latido(self) -> bool:
+        """
+        Marca que el worker sigue vivo
+
+        Returns:
+            False si el trabajo ya no está en proceso con este worker
+        """
+        self.latido = timezone.now()
+        return type(self).objects.filter(
+            pk=self.pk, estado=EstadoTrabajo.EN_PROCESO, worker=self.worker
+        ).update(latido=self.latido) > 0
+
+    def _guardar_si_propio(self, campos: list) -> bool:
+        """
+        Guarda `campos` solo si el trabajo sigue en proceso con este worker
+
+        Returns:
+            False si entretanto fue liberado (y quizá reclamado por otro worker)
+        """
+        valores = {campo: getattr(self, campo) for campo in campos}
+        return type(self).objects.filter(
+            pk=self.pk, estado=EstadoTrabajo.EN_PROCESO, worker=self.worker
+        ).update(**valores) > 0
+
+    def marcar_completado(self, archivo: str, nombre_descarga: str = '', resultado: dict = None) -> bool:
+        ahora = timezone.now()
+        self.estado = EstadoTrabajo.COMPLETADO
+        self.archivo_resultado = archivo
+        self.nombre_descarga = nombre_descarga
+        self.resultado = resultado or {}
+        self.mensaje_error = ''
+        self.finalizado_en = ahora
+        self.tiempo_ejecucion = (ahora - self.iniciado_en).total_seconds() if self.iniciado_en else None
+        return self._guardar_si_propio([
+            'estado', 'archivo_resultado', 'nombre_descarga', 'resultado',
+            'mensaje_error', 'finalizado_en', 'tiempo_ejecucion'
+        ])
+
+    def marcar_fallido(self, mensaje: str) -> bool:
+        """
+        Registra un fallo: reintenta con espera exponencial o queda fallido
+
+        Returns:
+            False si el trabajo ya no pertenecía a este worker (no se guarda)
+        """
+        ahora = timezone.now()
+        self.mensaje_error = mensaje[:5000]
+        self.tiempo_ejecucion = (ahora - self.iniciado_en).total_seconds() if self.iniciado_en else None
+
+        if self.intentos < self.max_intentos:
+            espera = self.ESPERA_BASE_REINTENTO * (2 ** (self.intentos - 1))
+            self.estado = EstadoTrabajo.PENDIENTE
+            self.disponible_desde = ahora + timedelta(seconds=espera)
+        else:
+            self.estado = EstadoTrabajo.FALLIDO
+            self.finalizado_en = ahora
+        return self._guardar_si_propio([
+            'estado', 'intentos', 'mensaje_error', 'tiempo_ejecucion', 'disponible_desde', 'finalizado_en'
+        ])
+
+    @classmethod
+    def liberar_huerfanos(cls, minutos: int = 5) -> dict:
+        """
+        Devuelve a la cola los trabajos en proceso de un worker que murió
+
+        Un trabajo se considera abandonado si su worker no registra latido
+        hace más de `minutos`; un render largo con el worker vivo sigue
+        latiendo y no se ejecuta dos veces. Si ya agotó sus intentos (p. ej.
+        un render que tumba al worker por memoria) queda fallido en lugar de
+        volver a la cola.
+
+        Returns:
+            {'devueltos': N, 'fallidos': M}
+        """
+        ahora = timezone.now()
+        limite = ahora - timedelta(minutes=minutos)
+        abandonados = cls.objects.filter(
+            Q(latido__lt=limite) | Q(latido__isnull=True, iniciado_en__lt=limite),
+            estado=EstadoTrabajo.EN_PROCESO
+        )
+        fallidos = abandonados.filter(intentos__gte=F('max_intentos')).update(
+            estado=EstadoTrabajo.FALLIDO,
+            worker='',
+            finalizado_en=ahora,
+            mensaje_error=(
+                f'El worker dejó de registrar latido hace más de {minutos} min en el último intento '
+                f'(posible caída del proceso, p. ej. por falta de memoria)'
+            )
+        )
+        devueltos = abandonados.filter(intentos__lt=F('max_intentos')).update(
+            estado=EstadoTrabajo.PENDIENTE, worker='', disponible_desde=ahora
+        )
+        return {'devueltos': devueltos, 'fallidos': fallidos}
+
+    def a_dict(self) -> dict:
+        """Representación JSON para el endpoint de estado"""
+        return {
+            'trabajo_id': self.pk,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'parcela_id': self.parcela_id,
+            'intentos': self.intentos,
+            'max_intentos': self.max_intentos,
+            'creado_en': self.creado_en.isoformat() if self.creado_en else None,
+            'iniciado_en': self.iniciado_en.isoformat() if self.iniciado_en else None,
+            'latido': self.latido.isoformat() if self.latido else None,
+            'finalizado_en': self.finalizado_en.isoformat() if self.finalizado_en else None,
+            'tiempo_cola': self.tiempo_cola,
+            'tiempo_ejecucion': self.tiempo_ejecucion,
+            'mensaje_error': self.mensaje_error or None,
+            'resultado': self.resultado,
+        }
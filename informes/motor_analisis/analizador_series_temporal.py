@@ -81,7 +81,32 @@ class AnalizadorSeriesTemporal:
     def __init__(self):
         """Inicializa el analizador"""
         self.logger = logging.getLogger(__name__)
-    
+
+    def serie_desde_cubo(
+        self,
+        cubo,
+        indice: str,
+        fechas: Optional[List[str]] = None,
+        mascara: Optional[np.ndarray] = None
+    ) -> Tuple[List[float], List[datetime]]:
+        """
+        Serie de promedios espaciales mensuales leída del cubo temporal.
+
+        Lee el memmap mes a mes (sin cargar el cubo completo); el resultado
+        se pasa directo a descomponer_serie() o detectar_puntos_cambio().
+
+        Args:
+            cubo: CuboTemporalParcela de la parcela
+            indice: 'ndvi', 'ndmi' o 'savi'
+            fechas: Meses 'YYYY-MM' a incluir (None = todos)
+            mascara: Píxeles a promediar (p. ej. máscara de cultivo)
+
+        Returns:
+            (valores, fechas) con NaN en meses sin píxeles válidos
+        """
+        fechas_cubo, valores = cubo.serie_promedio(indice, fechas=fechas, mascara=mascara)
+        return valores.tolist(), [datetime.strptime(f, '%Y-%m') for f in fechas_cubo]
+
     def descomponer_serie(
         self,
         valores: List[float],
@@ -20,9 +20,10 @@ Fecha: Enero 2026
 import numpy as np
 import cv2
 from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 import logging
+import tracemalloc
 from pathlib import Path
 
 # Matplotlib para visualizaciones profesionales
@@ -39,6 +40,38 @@ from .config_umbrales import UmbralesIndice
 logger = logging.getLogger(__name__)
 
 
+def _pico_rss_proceso_mb() -> Optional[float]:
+    """
+    Pico de memoria residente de todo el proceso desde que arrancó (MB) o
+    None si no está disponible; no es atribuible a un diagnóstico concreto
+    """
+    try:
+        import resource
+        import sys
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reporta KB; macOS, bytes
+        return round(pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024, 1)
+    except (ImportError, OSError):
+        return None
+
+
+def _medir_pico_mb(funcion):
+    """
+    Ejecuta funcion() y devuelve (resultado, pico MB de asignaciones NumPy/Python
+    durante la llamada) medido con tracemalloc. Si tracemalloc ya estaba activo
+    (p. ej. un benchmark midiendo por fuera) no se toca y el pico es None.
+    """
+    if tracemalloc.is_tracing():
+        return funcion(), None
+    tracemalloc.start()
+    try:
+        resultado = funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return resultado, round(pico / (1024 * 1024), 1)
+
+
 @dataclass
 class ZonaCritica:
     """Representa una zona detectada que requiere intervención"""
@@ -53,6 +86,154 @@ class ZonaCritica:
     valores_indices: Dict[str, float]  # Promedios de NDVI, NDMI, SAVI en la zona
     confianza: float  # 0.0 a 1.0
     recomendaciones: List[str]
+    # Referencia a la imagen de etiquetas del patrón (compartida, sin copia)
+    # y etiqueta de esta zona: máscara exacta sin guardar un raster por zona
+    imagen_etiquetas: Optional[np.ndarray] = field(default=None, repr=False, compare=False)
+    etiqueta: int = 0
+    origen_etiquetas: Tuple[int, int] = (0, 0)  # (x, y) del píxel [0, 0] de imagen_etiquetas
+    
+    @property
+    def mascara(self) -> Optional[np.ndarray]:
+        """Máscara exacta de la zona recortada a su bbox (None sin etiquetas)"""
+        if self.imagen_etiquetas is None:
+            return None
+        x_min, y_min, x_max, y_max = self.bbox
+        ox, oy = self.origen_etiquetas
+        return self.imagen_etiquetas[y_min - oy:y_max - oy, x_min - ox:x_max - ox] == self.etiqueta
+    
+    def mascara_completa(self, shape: Tuple[int, int]) -> np.ndarray:
+        """Máscara de la zona en el raster completo (bbox si no hay máscara exacta)"""
+        completa = np.zeros(shape, dtype=bool)
+        self.pintar(completa, True)
+        return completa
+    
+    def pintar(self, raster: np.ndarray, valor) -> None:
+        """Escribe `valor` en los píxeles de la zona (solo toca su bbox)"""
+        x_min, y_min, x_max, y_max = self.bbox
+        x_min, y_min = max(0, x_min), max(0, y_min)
+        x_max, y_max = min(raster.shape[1], x_max), min(raster.shape[0], y_max)
+        mascara = self.mascara
+        if mascara is None:
+            raster[y_min:y_max, x_min:x_max] = valor
+        else:
+            raster[y_min:y_max, x_min:x_max][mascara[:y_max - y_min, :x_max - x_min]] = valor
+
+
+@dataclass
+class ClustersEtiquetados:
+    """Resultado de connectedComponentsWithStats filtrado por área mínima"""
+    etiquetas: np.ndarray  # int32 (alto, ancho); 0 = fondo
+    estadisticas: np.ndarray  # (n, 5) LEFT, TOP, WIDTH, HEIGHT, AREA por etiqueta
+    centroides: np.ndarray  # (n, 2) x, y por etiqueta
+    validas: np.ndarray  # Etiquetas que superan el área mínima
+    
+    @property
+    def num_etiquetas(self) -> int:
+        return len(self.estadisticas)
+    
+    def bbox(self, etiqueta: int) -> Tuple[int, int, int, int]:
+        x, y, w, h = (int(v) for v in self.estadisticas[etiqueta, :4])
+        return (x, y, x + w, y + h)
+
+
+class _ClustersPorFranjas:
+    """
+    Etiquetado de un patrón franja a franja, unido en las costuras
+    
+    Cada franja se etiqueta con su fila anterior (solape): las etiquetas de
+    esa fila se unen (union-find) con las de la franja previa. Las sumas por
+    etiqueta solo cuentan las filas propias de la franja, así nada se cuenta
+    dos veces. Ids globales: 0 = fondo, 1..N en orden de aparición, y cada
+    componente queda representado por su id menor (= orden raster, igual que
+    connectedComponents sobre el raster completo).
+    """
+    
+    CAMPOS = ('area', 'suma_x', 'suma_y',
+              'suma_ndvi', 'suma_ndmi', 'suma_savi', 'cuadrados_ndvi', 'cuadrados_ndmi')
+    
+    def __init__(self):
+        self.padre = [0]
+        self.bases: List[int] = []  # Id global - 1 de la etiqueta local 1, por franja
+        self.frontera: Optional[np.ndarray] = None  # Ids globales de la última fila
+        self.partes: Dict[str, List[np.ndarray]] = {campo: [] for campo in self.CAMPOS + ('bbox',)}
+    
+    def _raiz(self, i: int) -> int:
+        while self.padre[i] != i:
+            self.padre[i] = self.padre[self.padre[i]]
+            i = self.padre[i]
+        return i
+    
+    def agregar(self, etiquetas: np.ndarray, estadisticas: np.ndarray, fila_ventana: int,
+                solape: int, valores: Dict[str, np.ndarray]) -> None:
+        """Suma una franja ya etiquetada (`valores`: índices de sus filas propias)"""
+        n = len(estadisticas)
+        base = len(self.padre) - 1
+        self.bases.append(base)
+        self.padre.extend(range(base + 1, base + n))
+        globales = np.arange(base, base + n)
+        globales[0] = 0
+        
+        if solape and self.frontera is not None:
+            fila = etiquetas[0]
+            activos = fila > 0
+            pares = np.unique(np.stack([self.frontera[activos], globales[fila[activos]]]), axis=1)
+            for a, b in pares.T:
+                ra, rb = self._raiz(int(a)), self._raiz(int(b))
+                if ra != rb:
+                    self.padre[max(ra, rb)] = min(ra, rb)
+        self.frontera = globales[etiquetas[-1]]
+        
+        propias = etiquetas[solape:]
+        plano = propias.ravel()
+        seleccion = np.flatnonzero(plano)
+        locales = plano[seleccion]
+        filas, columnas = np.divmod(seleccion, propias.shape[1])
+        
+        suma = lambda pesos=None: np.bincount(locales, weights=pesos, minlength=n)[1:]
+        self.partes['area'].append(suma())
+        self.partes['suma_x'].append(suma(columnas.astype(np.float64)))
+        self.partes['suma_y'].append(suma((filas + fila_ventana + solape).astype(np.float64)))
+        for nombre, array in valores.items():
+            v = array.ravel()[seleccion].astype(np.float64)
+            self.partes[f'suma_{nombre}'].append(suma(v))
+            if f'cuadrados_{nombre}' in self.partes:
+                self.partes[f'cuadrados_{nombre}'].append(suma(v * v))
+        
+        x = estadisticas[1:, cv2.CC_STAT_LEFT]
+        y = estadisticas[1:, cv2.CC_STAT_TOP] + fila_ventana
+        self.partes['bbox'].append(np.stack([x, y, x + estadisticas[1:, cv2.CC_STAT_WIDTH],
+                                             y + estadisticas[1:, cv2.CC_STAT_HEIGHT]], axis=1))
+    
+    def resolver(self, min_area_pixeles: int) -> Tuple[np.ndarray, Dict[str, np.ndarray], np.ndarray]:
+        """
+        Une las estadísticas por componente
+        
+        Returns:
+            (raíz por id global, estadísticas indexadas por raíz, raíces válidas en orden)
+        """
+        raices = np.asarray(self.padre, dtype=np.int64)
+        while True:  # Saltos de puntero hasta que cada id apunte a su raíz
+            siguiente = raices[raices]
+            if np.array_equal(siguiente, raices):
+                break
+            raices = siguiente
+        
+        n = len(raices)
+        destino = raices[1:]
+        unidas = {campo: np.bincount(destino, weights=np.concatenate(self.partes[campo]), minlength=n)
+                  for campo in self.CAMPOS}
+        bboxes = np.concatenate(self.partes['bbox']).astype(np.int64)
+        bbox = np.zeros((n, 4), dtype=np.int64)
+        bbox[:, :2] = np.iinfo(np.int64).max
+        np.minimum.at(bbox[:, 0], destino, bboxes[:, 0])
+        np.minimum.at(bbox[:, 1], destino, bboxes[:, 1])
+        np.maximum.at(bbox[:, 2], destino, bboxes[:, 2])
+        np.maximum.at(bbox[:, 3], destino, bboxes[:, 3])
+        unidas['bbox'] = bbox
+        
+        ids = np.arange(n)
+        validas = np.flatnonzero((raices == ids) & (ids > 0) & (unidas['area'] >= min_area_pixeles))
+        return raices, unidas, validas
 
 
 @dataclass
@@ -127,7 +308,9 @@ class CerebroDiagnosticoUnificado:
         fase_fenologica: str = 'general',
         resolucion_pixel_m: float = 10.0,
         mascara_cultivo: Optional[np.ndarray] = None,
-        geometria_parcela: Optional[any] = None
+        geometria_parcela: Optional[any] = None,
+        filas_por_tile: Optional[int] = None,
+        medir_memoria: bool = False
     ):
         """
         Inicializa cerebro de diagnóstico CON configuración dinámica
@@ -140,6 +323,13 @@ class CerebroDiagnosticoUnificado:
             mascara_cultivo: Máscara booleana del polígono real del lote (opcional)
                             Si se provee, TODOS los cálculos se recortarán a esta máscara
             geometria_parcela: Geometría del polígono de la parcela (opcional, para mapa georef)
+            filas_por_tile: Si se indica, la detección recorre el raster en franjas
+                            de este número de filas (con 1 fila de solape) y une
+                            los clusters que cruzan las costuras. Mismo resultado
+                            que el modo completo con memoria acotada (lotes 500+ ha)
+            medir_memoria: Mide con tracemalloc el pico de la detección
+                           (metadata['memoria']['pico_deteccion_mb']). Desactivado
+                           por defecto: tracemalloc encarece cada asignación
         """
         # MEJORA 3: Forzar área de parcela con 2 decimales (61.42 ha)
         self.area_parcela_ha = round(area_parcela_ha, 2)
@@ -149,6 +339,8 @@ class CerebroDiagnosticoUnificado:
         self.area_pixel_ha = (resolucion_pixel_m ** 2) / 10000  # m² a ha
         self.mascara_cultivo = mascara_cultivo  # NUEVO: Máscara del polígono
         self.geometria_parcela = geometria_parcela  # NUEVO ENERO 2026: Geometría para mapa
+        self.filas_por_tile = filas_por_tile
+        self.medir_memoria = medir_memoria
         
         # NUEVO ENERO 23, 2026: Cargar umbrales dinámicos desde BD (NO hardcoded)
         self._cargar_umbrales_dinamicos()
@@ -243,10 +435,19 @@ class CerebroDiagnosticoUnificado:
         assert ndvi_array.shape == ndmi_array.shape == savi_array.shape, \
             "Los arrays de índices deben tener las mismas dimensiones"
         
-        # 1. DETECCIÓN DE ZONAS CRÍTICAS
-        zonas_criticas = self._detectar_zonas_criticas(
-            ndvi_array, ndmi_array, savi_array, geo_transform
-        )
+        # 1. DETECCIÓN DE ZONAS CRÍTICAS (completa o por franjas)
+        if self.filas_por_tile:
+            detectar = lambda: self._detectar_zonas_criticas_por_tiles(
+                ndvi_array, ndmi_array, savi_array, geo_transform, self.filas_por_tile
+            )
+        else:
+            detectar = lambda: self._detectar_zonas_criticas(
+                ndvi_array, ndmi_array, savi_array, geo_transform
+            )
+        if self.medir_memoria:
+            zonas_criticas, memoria_deteccion_mb = _medir_pico_mb(detectar)
+        else:
+            zonas_criticas, memoria_deteccion_mb = detectar(), None
         
         logger.info(f"✅ Detectadas {len(zonas_criticas)} zonas críticas")
         
@@ -380,6 +581,13 @@ class CerebroDiagnosticoUnificado:
                 'resolucion_m': self.resolucion_pixel_m,
                 'area_parcela_ha': self.area_parcela_ha,
                 'evidencias_tecnicas': evidencias_tecnicas,  # NUEVO: Evidencias para tabla PDF
+                'memoria': {
+                    'modo': 'tiles' if self.filas_por_tile else 'completo',
+                    'filas_por_tile': self.filas_por_tile,
+                    'raster_mpx': round(ndvi_array.size / 1e6, 2),
+                    'pico_deteccion_mb': memoria_deteccion_mb,  # Solo la detección (tracemalloc)
+                    'pico_proceso_mb': _pico_rss_proceso_mb()  # RSS máximo del proceso entero
+                },
                 'validacion_pixel_ha': {
                     'area_pixel_ha': self.area_pixel_ha,
                     'es_sentinel2': abs(self.area_pixel_ha - 0.01) < 0.001,
@@ -390,6 +598,9 @@ class CerebroDiagnosticoUnificado:
             zonas_por_severidad=zonas_por_severidad
         )
         
+        memoria = diagnostico.metadata['memoria']
+        logger.info(f"   🧮 Memoria: detección {memoria['pico_deteccion_mb']} MB, "
+                    f"pico del proceso {memoria['pico_proceso_mb']} MB (modo {memoria['modo']})")
         logger.info("✅ Diagnóstico unificado completado")
         return diagnostico
     
@@ -422,24 +633,129 @@ class CerebroDiagnosticoUnificado:
         
         patrones_deteccion = self._construir_patrones_deteccion_dinamicos()
         
-        for patron in patrones_deteccion:
-            # Crear máscara según condiciones del patrón
-            mascara = self._crear_mascara_condicion_dinamica(ndvi, ndmi, savi, patron)
+        # Una pasada sobre NDVI/NDMI/SAVI: bit i = el píxel cumple el patrón i
+        bits = self._evaluar_patrones_bitmask(ndvi, ndmi, savi, patrones_deteccion)
+        
+        for i, patron in enumerate(patrones_deteccion):
+            mascara = np.bitwise_and(bits, bits.dtype.type(1 << i))
             
             if not mascara.any():
                 continue  # No hay píxeles que cumplan esta condición
             
-            # Encontrar clusters espaciales
+            # Encontrar clusters espaciales (una pasada de etiquetado)
             clusters = self._encontrar_clusters(mascara)
-            
-            for cluster_mask, bbox in clusters:
+            zonas.extend(self._analizar_clusters(clusters, ndvi, ndmi, savi, geo_transform, patron))
+        
+        return sorted(zonas, key=lambda z: z.severidad * z.area_hectareas, reverse=True)
+    
+    def _detectar_zonas_criticas_por_tiles(
+        self,
+        ndvi: np.ndarray,
+        ndmi: np.ndarray,
+        savi: np.ndarray,
+        geo_transform: Tuple,
+        filas_por_tile: int
+    ) -> List[ZonaCritica]:
+        """
+        Igual que _detectar_zonas_criticas, recorriendo el raster por franjas
+        
+        Para lotes grandes: ningún temporal (máscara de bits, imagen de
+        etiquetas int32) tiene el tamaño del raster completo.
+        
+        1. Cada franja de `filas_por_tile` filas se evalúa y etiqueta junto con
+           la última fila de la anterior; los clusters que cruzan la costura se
+           unen por esa fila compartida (_ClustersPorFranjas).
+        2. Con las zonas válidas ya conocidas, una segunda pasada vuelve a
+           etiquetar cada franja y copia la máscara exacta de cada zona en un
+           recorte del tamaño de su bbox.
+        
+        Área, bbox, centroide y máscaras son idénticos al modo completo; los
+        promedios difieren solo por el orden de las sumas (~1e-12).
+        """
+        patrones = self._construir_patrones_deteccion_dinamicos()
+        alto = ndvi.shape[0]
+        filas = max(1, int(filas_por_tile))
+        franjas = [(inicio, min(inicio + filas, alto)) for inicio in range(0, alto, filas)]
+        min_area_pixeles = self._area_minima_pixeles()
+        
+        def etiquetar_franjas(indices_franjas):
+            """(franja, ventana, solape, [(etiquetas, estadísticas) por patrón])"""
+            for k in indices_franjas:
+                inicio, fin = franjas[k]
+                solape = 1 if k > 0 else 0
+                ventana = slice(inicio - solape, fin)
+                bits = self._evaluar_patrones_bitmask(ndvi[ventana], ndmi[ventana], savi[ventana], patrones)
+                if self.mascara_cultivo is not None:
+                    bits[np.logical_not(self.mascara_cultivo[ventana])] = 0
+                etiquetados = []
+                for i in range(len(patrones)):
+                    mascara = np.bitwise_and(bits, bits.dtype.type(1 << i))
+                    np.minimum(mascara, 1, out=mascara)
+                    _, etiquetas, estadisticas, _ = cv2.connectedComponentsWithStats(
+                        mascara.astype(np.uint8, copy=False), connectivity=8, ltype=cv2.CV_32S)
+                    etiquetados.append((etiquetas, estadisticas))
+                yield k, inicio - solape, solape, etiquetados
+        
+        # 1. Etiquetado por franjas y unión en las costuras
+        acumulados = [_ClustersPorFranjas() for _ in patrones]
+        for k, fila_ventana, solape, etiquetados in etiquetar_franjas(range(len(franjas))):
+            inicio, fin = franjas[k]
+            valores = {'ndvi': ndvi[inicio:fin], 'ndmi': ndmi[inicio:fin], 'savi': savi[inicio:fin]}
+            for acumulado, (etiquetas, estadisticas) in zip(acumulados, etiquetados):
+                acumulado.agregar(etiquetas, estadisticas, fila_ventana, solape, valores)
+        
+        resueltos = [acumulado.resolver(min_area_pixeles) for acumulado in acumulados]
+        
+        # 2. Máscaras exactas de las zonas válidas, recortadas a su bbox
+        recortes = [{int(r): np.zeros((unidas['bbox'][r, 3] - unidas['bbox'][r, 1],
+                                       unidas['bbox'][r, 2] - unidas['bbox'][r, 0]), dtype=np.uint8)
+                     for r in validas}
+                    for _, unidas, validas in resueltos]
+        necesarias = [k for k, (inicio, fin) in enumerate(franjas)
+                      if any(((unidas['bbox'][validas, 1] < fin) & (unidas['bbox'][validas, 3] > inicio)).any()
+                             for _, unidas, validas in resueltos)]
+        for k, fila_ventana, solape, etiquetados in etiquetar_franjas(necesarias):
+            inicio, fin = franjas[k]
+            for acumulado, (raices, unidas, validas), recortes_patron, (etiquetas, estadisticas) in zip(
+                    acumulados, resueltos, recortes, etiquetados):
+                base = acumulado.bases[k]
+                locales_a_raiz = raices[np.arange(base, base + len(estadisticas))]
+                locales_a_raiz[0] = 0
+                for raiz in validas:
+                    x0, y0, x1, y1 = unidas['bbox'][raiz]
+                    desde, hasta = max(inicio, y0), min(fin, y1)
+                    if desde >= hasta:
+                        continue
+                    trozo = etiquetas[desde - fila_ventana:hasta - fila_ventana, x0:x1]
+                    recortes_patron[int(raiz)][desde - y0:hasta - y0] = locales_a_raiz[trozo] == raiz
+        
+        zonas = []
+        for patron, (_, unidas, validas), recortes_patron in zip(patrones, resueltos, recortes):
+            area = unidas['area']
+            for raiz in validas:
+                x0, y0, x1, y1 = (int(v) for v in unidas['bbox'][raiz])
+                medias = {nombre: unidas[f'suma_{nombre}'][raiz] / area[raiz] for nombre in ('ndvi', 'ndmi', 'savi')}
+                desviaciones = {
+                    nombre: float(np.sqrt(max(unidas[f'cuadrados_{nombre}'][raiz] / area[raiz] - medias[nombre] ** 2, 0.0)))
+                    for nombre in ('ndvi', 'ndmi')
+                }
                 zona = self._analizar_cluster(
-                    cluster_mask, bbox, ndvi, ndmi, savi,
-                    geo_transform, patron
+                    num_pixeles=int(area[raiz]),
+                    centroide=np.array([unidas['suma_x'][raiz], unidas['suma_y'][raiz]]) / area[raiz],
+                    bbox=(x0, y0, x1, y1),
+                    valores_indices={nombre: float(valor) for nombre, valor in medias.items()},
+                    desviaciones=desviaciones,
+                    imagen_etiquetas=recortes_patron[int(raiz)],
+                    etiqueta=1,
+                    geo_transform=geo_transform,
+                    patron=patron,
+                    origen_etiquetas=(x0, y0)
                 )
                 if zona:
                     zonas.append(zona)
         
+        logger.info(f"   🧩 Detección por franjas: {len(franjas)} franjas de {filas} filas, "
+                    f"{len(zonas)} zonas ({sum(len(v) for _, _, v in resueltos)} clusters unidos)")
         return sorted(zonas, key=lambda z: z.severidad * z.area_hectareas, reverse=True)
     
     def _construir_patrones_deteccion_dinamicos(self) -> List[Dict]:
@@ -532,110 +848,208 @@ class CerebroDiagnosticoUnificado:
         return mascara
 
     
+    # Píxeles evaluados por bloque en la detección fusionada (≈ 1 Mpx → pocos
+    # MB de temporales aunque el raster sea enorme); 0/None = todo de una vez
+    PIXELES_POR_BLOQUE_DETECCION = 1 << 20
+    
+    def _evaluar_patrones_bitmask(
+        self,
+        ndvi: np.ndarray,
+        ndmi: np.ndarray,
+        savi: np.ndarray,
+        patrones: List[Dict],
+        pixeles_por_bloque: Optional[int] = -1
+    ) -> np.ndarray:
+        """
+        Evalúa todos los patrones en una sola pasada y devuelve una máscara
+        de bits por píxel (bit i = cumple el patrón i)
+        
+        Equivale a OR de (_crear_mascara_condicion_dinamica(patrón i) << i),
+        pero procesando el raster por bloques de filas: las validaciones
+        (índice >= -1) se calculan una vez por índice y bloque, y los
+        temporales tienen el tamaño del bloque, no del raster.
+        """
+        if pixeles_por_bloque == -1:
+            pixeles_por_bloque = self.PIXELES_POR_BLOQUE_DETECCION
+        
+        dtype = np.uint8 if len(patrones) <= 8 else np.uint16 if len(patrones) <= 16 else np.uint32
+        bits = np.zeros(ndvi.shape, dtype=dtype)
+        
+        alto = ndvi.shape[0]
+        ancho = int(np.prod(ndvi.shape[1:])) or 1
+        filas = alto if not pixeles_por_bloque else max(1, pixeles_por_bloque // ancho)
+        arrays = {'ndvi': ndvi, 'ndmi': ndmi, 'savi': savi}
+        
+        for inicio in range(0, alto, filas):
+            bloque = slice(inicio, min(inicio + filas, alto))
+            valores = {nombre: array[bloque] for nombre, array in arrays.items()}
+            validos = {}  # índice >= -1, solo si algún patrón tiene un máximo sobre él
+            salida = bits[bloque]
+            
+            for i, patron in enumerate(patrones):
+                cumple = None
+                for nombre, valor in valores.items():
+                    condiciones = []
+                    if f'{nombre}_max' in patron:
+                        if nombre not in validos:
+                            validos[nombre] = valor >= -1.0
+                        condiciones += [valor <= patron[f'{nombre}_max'], validos[nombre]]
+                    if f'{nombre}_min' in patron:
+                        condiciones.append(valor >= patron[f'{nombre}_min'])
+                    for condicion in condiciones:
+                        cumple = condicion.copy() if cumple is None else np.logical_and(cumple, condicion, out=cumple)
+                
+                if cumple is None:  # Patrón sin condiciones: todo el raster
+                    salida |= dtype(1 << i)
+                else:
+                    salida |= cumple.view(np.uint8).astype(dtype, copy=False) << dtype(i)
+        
+        return bits
+    
+    def _area_minima_pixeles(self) -> int:
+        """Área mínima de cluster: max(0.05 ha, 0.5% del lote) según el cultivo"""
+        # Usa configuración del cultivo
+        area_absoluta = self.umbrales.area_minima_absoluta_ha
+        area_porcentual = self.area_parcela_ha * (self.umbrales.area_minima_porcentaje_lote / 100.0)
+        min_area_ha = max(area_absoluta, area_porcentual)
+        min_area_pixeles = int(min_area_ha / self.area_pixel_ha)
+        min_area_pixeles = max(5, min_area_pixeles)  # Mínimo absoluto: 5 píxeles
+        logger.debug(f"   📏 Área mínima de cluster: {min_area_ha:.3f} ha ({min_area_pixeles} píxeles)")
+        return min_area_pixeles
+    
     def _encontrar_clusters(
         self,
         mascara: np.ndarray,
         min_area_pixeles: Optional[int] = None
-    ) -> List[Tuple[np.ndarray, Tuple[int, int, int, int]]]:
+    ) -> ClustersEtiquetados:
         """
         Encuentra clusters (manchas) contiguos usando OpenCV
         
-        CORRECCIÓN CRÍTICA: Si existe máscara de cultivo, recorta ANTES de buscar contornos
+        CORRECCIÓN CRÍTICA: Si existe máscara de cultivo, recorta ANTES de etiquetar
         
         CORRECCIÓN DINAMISMO (Enero 23, 2026):
         - Área mínima ahora es PROPORCIONAL al tamaño del lote
         - No más 5 píxeles fijos (irrelevante para lotes grandes, excesivo para pequeños)
         - Fórmula: min_area = max(0.05 ha, 0.5% del lote)
         
+        Una sola pasada de connectedComponentsWithStats (8-conectividad) da
+        área, bbox y centroide de todos los clusters; no se crea una máscara
+        de tamaño completo por cluster.
+        
+        La máscara puede ser booleana o un bit de la máscara fusionada
+        (uint16/uint32 con más de 8 patrones): cuenta todo valor distinto de 0.
+        
         Returns:
-            Lista de (mascara_cluster, bbox) para cada cluster detectado
+            ClustersEtiquetados con la imagen de etiquetas y las etiquetas válidas
         """
         # ✅ CALCULAR ÁREA MÍNIMA DINÁMICAMENTE (desde DB, no hardcoded)
         if min_area_pixeles is None:
-            # Usa configuración del cultivo
-            area_absoluta = self.umbrales.area_minima_absoluta_ha
-            area_porcentual = self.area_parcela_ha * (self.umbrales.area_minima_porcentaje_lote / 100.0)
-            min_area_ha = max(area_absoluta, area_porcentual)
-            min_area_pixeles = int(min_area_ha / self.area_pixel_ha)
-            min_area_pixeles = max(5, min_area_pixeles)  # Mínimo absoluto: 5 píxeles
-            logger.debug(f"   📏 Área mínima de cluster: {min_area_ha:.3f} ha ({min_area_pixeles} píxeles)")
-        
-        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO ANTES DE BUSCAR CONTORNOS
+            min_area_pixeles = self._area_minima_pixeles()
+        
+        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO ANTES DE ETIQUETAR
         if self.mascara_cultivo is not None:
             mascara_recortada = np.logical_and(mascara, self.mascara_cultivo)
             logger.debug(f"   Máscara recortada por polígono: {np.sum(mascara)} → {np.sum(mascara_recortada)} píxeles")
         else:
             mascara_recortada = mascara
         
-        # Convertir a uint8 para OpenCV
-        mascara_uint8 = (mascara_recortada * 255).astype(np.uint8)
-        
-        # Encontrar contornos
-        contours, hierarchy = cv2.findContours(
-            mascara_uint8,
-            cv2.RETR_EXTERNAL,
-            cv2.CHAIN_APPROX_SIMPLE
+        num_etiquetas, etiquetas, estadisticas, centroides = cv2.connectedComponentsWithStats(
+            (mascara_recortada != 0).astype(np.uint8), connectivity=8, ltype=cv2.CV_32S
         )
         
-        clusters = []
-        for contour in contours:
-            # Filtrar clusters muy pequeños (ahora dinámico)
-            area = cv2.contourArea(contour)
-            if area < min_area_pixeles:
-                continue
-            
-            # Crear máscara individual para este cluster
-            cluster_mask = np.zeros(mascara.shape, dtype=np.uint8)
-            cv2.drawContours(cluster_mask, [contour], -1, 255, -1)
-            cluster_mask = cluster_mask > 0
-            
-            # Obtener bounding box
-            x, y, w, h = cv2.boundingRect(contour)
-            bbox = (x, y, x + w, y + h)
-            
-            clusters.append((cluster_mask, bbox))
+        # Filtrar clusters muy pequeños (ahora dinámico); la etiqueta 0 es el fondo
+        areas = estadisticas[1:, cv2.CC_STAT_AREA]
+        validas = np.flatnonzero(areas >= min_area_pixeles) + 1
         
-        return clusters
+        logger.debug(f"   🔎 {num_etiquetas - 1} clusters etiquetados, {len(validas)} sobre el área mínima")
+        return ClustersEtiquetados(etiquetas, estadisticas, centroides, validas)
     
-    def _analizar_cluster(
+    def _analizar_clusters(
         self,
-        cluster_mask: np.ndarray,
-        bbox: Tuple[int, int, int, int],
+        clusters: ClustersEtiquetados,
         ndvi: np.ndarray,
         ndmi: np.ndarray,
         savi: np.ndarray,
         geo_transform: Tuple,
-        patron: Dict  # ✅ CAMBIO: ahora recibe patron dinámico, no (tipo, config)
+        patron: Dict
+    ) -> List[ZonaCritica]:
+        """
+        Analiza todos los clusters de un patrón a la vez
+        
+        Promedios y desviaciones por etiqueta con np.bincount sobre los
+        píxeles etiquetados: O(píxeles) una vez, no O(clusters × píxeles).
+        """
+        if len(clusters.validas) == 0:
+            return []
+        
+        plano = clusters.etiquetas.ravel()
+        seleccion = np.flatnonzero(plano)
+        etiquetas_px = plano[seleccion]
+        n = clusters.num_etiquetas
+        conteos = np.maximum(np.bincount(etiquetas_px, minlength=n), 1)
+        
+        medias, desviaciones = {}, {}
+        for nombre, array in (('ndvi', ndvi), ('ndmi', ndmi), ('savi', savi)):
+            valores = array.ravel()[seleccion].astype(np.float64)
+            medias[nombre] = np.bincount(etiquetas_px, weights=valores, minlength=n) / conteos
+            if nombre != 'savi':
+                cuadrados = np.bincount(etiquetas_px, weights=valores * valores, minlength=n) / conteos
+                desviaciones[nombre] = np.sqrt(np.maximum(cuadrados - medias[nombre] ** 2, 0.0))
+        
+        zonas = []
+        for etiqueta in clusters.validas:
+            x_min, y_min, x_max, y_max = clusters.bbox(etiqueta)
+            zona = self._analizar_cluster(
+                num_pixeles=int(clusters.estadisticas[etiqueta, cv2.CC_STAT_AREA]),
+                centroide=clusters.centroides[etiqueta],
+                bbox=(x_min, y_min, x_max, y_max),
+                valores_indices={nombre: float(medias[nombre][etiqueta]) for nombre in medias},
+                desviaciones={nombre: float(desviaciones[nombre][etiqueta]) for nombre in desviaciones},
+                imagen_etiquetas=clusters.etiquetas,
+                etiqueta=int(etiqueta),
+                geo_transform=geo_transform,
+                patron=patron
+            )
+            if zona:
+                zonas.append(zona)
+        return zonas
+    
+    def _analizar_cluster(
+        self,
+        num_pixeles: int,
+        centroide: np.ndarray,
+        bbox: Tuple[int, int, int, int],
+        valores_indices: Dict[str, float],
+        desviaciones: Dict[str, float],
+        imagen_etiquetas: np.ndarray,
+        etiqueta: int,
+        geo_transform: Tuple,
+        patron: Dict,  # ✅ CAMBIO: ahora recibe patron dinámico, no (tipo, config)
+        origen_etiquetas: Tuple[int, int] = (0, 0)
     ) -> Optional[ZonaCritica]:
         """
-        Analiza un cluster individual y extrae información
+        Construye la ZonaCritica de un cluster a partir de sus estadísticas
         
         ACTUALIZADO ENERO 23, 2026: Recibe patrón dinámico
         """
+        if num_pixeles == 0:
+            return None
+        
         # Calcular área
-        num_pixeles = np.sum(cluster_mask)
         area_ha = num_pixeles * self.area_pixel_ha
         
-        # Calcular centroide en coordenadas de pixel
-        indices = np.where(cluster_mask)
-        if len(indices[0]) == 0:
-            return None
-        
-        centroide_y = int(np.mean(indices[0]))
-        centroide_x = int(np.mean(indices[1]))
+        # Centroide en coordenadas de pixel (x, y)
+        centroide_x = int(centroide[0])
+        centroide_y = int(centroide[1])
         
         # Convertir a coordenadas geográficas
         centroide_geo = self._pixel_a_geo(centroide_x, centroide_y, geo_transform)
         
-        # Extraer valores promedio de índices en la zona
-        valores_indices = {
-            'ndvi': float(np.mean(ndvi[cluster_mask])),
-            'ndmi': float(np.mean(ndmi[cluster_mask])),
-            'savi': float(np.mean(savi[cluster_mask]))
-        }
-        
         # Calcular confianza (basado en homogeneidad de la zona)
-        confianza = self._calcular_confianza(ndvi[cluster_mask], ndmi[cluster_mask])
+        confianza = self._confianza_desde_estadisticas(
+            valores_indices['ndvi'], desviaciones['ndvi'],
+            valores_indices['ndmi'], desviaciones['ndmi']
+        )
         
         # ✅ NUEVO: Calcular severidad DINÁMICAMENTE basada en distancia a valores óptimos
         severidad = self._calcular_severidad_dinamica(
@@ -657,7 +1071,10 @@ class CerebroDiagnosticoUnificado:
             bbox=bbox,
             valores_indices=valores_indices,
             confianza=confianza,
-            recomendaciones=patron['recomendaciones']
+            recomendaciones=patron['recomendaciones'],
+            imagen_etiquetas=imagen_etiquetas,
+            etiqueta=etiqueta,
+            origen_etiquetas=origen_etiquetas
         )
     
     def _calcular_severidad_dinamica(
@@ -735,9 +1152,21 @@ class CerebroDiagnosticoUnificado:
         
         Zonas más homogéneas = mayor confianza
         """
+        return self._confianza_desde_estadisticas(
+            np.mean(ndvi_zona), np.std(ndvi_zona), np.mean(ndmi_zona), np.std(ndmi_zona)
+        )
+    
+    def _confianza_desde_estadisticas(
+        self,
+        media_ndvi: float,
+        std_ndvi: float,
+        media_ndmi: float,
+        std_ndmi: float
+    ) -> float:
+        """Confianza a partir de media y desviación ya calculadas por zona"""
         # Coeficiente de variación (menor = más homogéneo)
-        cv_ndvi = np.std(ndvi_zona) / (np.abs(np.mean(ndvi_zona)) + 0.01)
-        cv_ndmi = np.std(ndmi_zona) / (np.abs(np.mean(ndmi_zona)) + 0.01)
+        cv_ndvi = std_ndvi / (abs(media_ndvi) + 0.01)
+        cv_ndmi = std_ndmi / (abs(media_ndmi) + 0.01)
         
         # Confianza inversa al CV (normalizado a 0-1)
         confianza = 1.0 - min(1.0, (cv_ndvi + cv_ndmi) / 2.0)
@@ -1470,19 +1899,62 @@ class CerebroDiagnosticoUnificado:
     # MÉTODOS DE CORRECCIÓN MATEMÁTICA - ENERO 2026
     # ========================================================================
     
+    # Códigos del raster de niveles: mayor valor = mayor prioridad
+    CODIGOS_SEVERIDAD = {'leve': 1, 'moderada': 2, 'critica': 3}
+    
+    def _raster_niveles_severidad(
+        self,
+        zonas_por_severidad: Dict[str, List[ZonaCritica]],
+        shape: Tuple[int, int]
+    ) -> np.ndarray:
+        """
+        Raster uint8 con el nivel de severidad más alto de cada píxel
+        
+        0 = sin zona, 1 = leve, 2 = moderada, 3 = crítica. Cada zona se pinta
+        con su máscara exacta (imagen de etiquetas) y solo dentro de su bbox;
+        los niveles se pintan de menor a mayor para que la prioridad quede
+        resuelta sin máscaras intermedias. Recortado a la máscara de cultivo.
+        
+        Se memoriza por conjunto de zonas: área afectada y desglose comparten
+        el mismo raster.
+        """
+        clave = (tuple(shape), tuple(
+            (nivel, id(zona)) for nivel in ('leve', 'moderada', 'critica')
+            for zona in zonas_por_severidad.get(nivel, [])
+        ))
+        memo = getattr(self, '_memo_niveles', None)
+        if memo is not None and memo[0] == clave:
+            return memo[1]
+        
+        niveles = np.zeros(shape, dtype=np.uint8)
+        for nivel in ('leve', 'moderada', 'critica'):
+            for zona in zonas_por_severidad.get(nivel, []):
+                zona.pintar(niveles, self.CODIGOS_SEVERIDAD[nivel])
+        
+        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO (si existe)
+        if self.mascara_cultivo is not None:
+            niveles[~self.mascara_cultivo] = 0
+        
+        # Las zonas quedan referenciadas para que sus id() no se reutilicen
+        self._memo_niveles = (clave, niveles, zonas_por_severidad)
+        return niveles
+    
     def _calcular_area_afectada_union(
         self,
         zonas: List[ZonaCritica],
         shape: Tuple[int, int]
     ) -> Tuple[float, np.ndarray]:
         """
-        Calcula área afectada total usando UNIÓN de máscaras (np.logical_or)
+        Calcula área afectada total usando UNIÓN de máscaras exactas
         
         CORRECCIÓN CRÍTICA: 
         1. Evita doble conteo de áreas solapadas
         2. Aplica máscara de cultivo para recortar al polígono real
         3. Garantiza que área afectada NUNCA supere área total
         
+        La unión sale del raster de niveles (máscaras exactas por etiqueta,
+        no bboxes), en una pasada sin importar el número de zonas.
+        
         Args:
             zonas: Lista de zonas críticas detectadas
             shape: Dimensiones del array (height, width)
@@ -1493,24 +1965,13 @@ class CerebroDiagnosticoUnificado:
         if not zonas:
             return 0.0, np.zeros(shape, dtype=bool)
         
-        # Crear máscara de unión vacía
-        mascara_union = np.zeros(shape, dtype=bool)
-        
-        # Aplicar OR lógico para cada zona
-        for zona in zonas:
-            mascara_zona = self._reconstruir_mascara_zona(zona, shape)
-            mascara_union = np.logical_or(mascara_union, mascara_zona)
-        
-        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO (si existe)
-        if self.mascara_cultivo is not None:
-            pixeles_antes = np.sum(mascara_union)
-            mascara_union = np.logical_and(mascara_union, self.mascara_cultivo)
-            pixeles_despues = np.sum(mascara_union)
-            logger.info(f"   Recorte por máscara de cultivo: {pixeles_antes} → {pixeles_despues} píxeles")
+        niveles = self._raster_niveles_severidad(self._clasificar_por_severidad(zonas), shape)
+        mascara_union = niveles > 0
         
         # Calcular área total de la unión
-        pixeles_afectados = np.sum(mascara_union)
+        pixeles_afectados = int(np.count_nonzero(mascara_union))
         area_hectareas = pixeles_afectados * self.area_pixel_ha
+        logger.info(f"   Unión exacta de {len(zonas)} zonas: {pixeles_afectados} píxeles")
         
         # ✅ VALIDACIÓN FINAL: Hard limit al área de la parcela
         area_hectareas = min(area_hectareas, self.area_parcela_ha)
@@ -1522,26 +1983,6 @@ class CerebroDiagnosticoUnificado:
         
         return area_hectareas, mascara_union
     
-    def _reconstruir_mascara_zona(
-        self,
-        zona: ZonaCritica,
-        shape: Tuple[int, int]
-    ) -> np.ndarray:
-        """Reconstruye máscara booleana aproximada de una zona desde su bbox"""
-        mascara = np.zeros(shape, dtype=bool)
-        
-        x_min, y_min, x_max, y_max = zona.bbox
-        
-        # Validar límites
-        x_min = max(0, x_min)
-        y_min = max(0, y_min)
-        x_max = min(shape[1], x_max)
-        y_max = min(shape[0], y_max)
-        
-        mascara[y_min:y_max, x_min:x_max] = True
-        
-        return mascara
-    
     def _calcular_desglose_severidad_union(
         self,
         zonas_por_severidad: Dict[str, List[ZonaCritica]],
@@ -1554,52 +1995,18 @@ class CerebroDiagnosticoUnificado:
         1. Evita solapamiento entre niveles de severidad
         2. Aplica máscara de cultivo para recortar al polígono real
         3. Normaliza si el total supera el área permitida
+        
+        Cada píxel cuenta una sola vez, en su nivel más alto: np.bincount
+        sobre el raster de niveles da los tres totales en una pasada.
         """
+        niveles = self._raster_niveles_severidad(zonas_por_severidad, shape)
+        conteos = np.bincount(niveles.ravel(), minlength=len(self.CODIGOS_SEVERIDAD) + 1)
+        
         desglose = {
-            'critica': 0.0,
-            'moderada': 0.0,
-            'leve': 0.0
+            nivel: round(int(conteos[codigo]) * self.area_pixel_ha, 2)  # MEJORA 3: 2 decimales
+            for nivel, codigo in (('critica', 3), ('moderada', 2), ('leve', 1))
         }
         
-        # Máscara de zonas críticas (prioridad 1)
-        mascara_critica = np.zeros(shape, dtype=bool)
-        for zona in zonas_por_severidad['critica']:
-            mascara_zona = self._reconstruir_mascara_zona(zona, shape)
-            mascara_critica = np.logical_or(mascara_critica, mascara_zona)
-        
-        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO
-        if self.mascara_cultivo is not None:
-            mascara_critica = np.logical_and(mascara_critica, self.mascara_cultivo)
-        
-        desglose['critica'] = round(np.sum(mascara_critica) * self.area_pixel_ha, 2)  # MEJORA 3: 2 decimales
-        
-        # Máscara de zonas moderadas EXCLUYENDO críticas
-        mascara_moderada = np.zeros(shape, dtype=bool)
-        for zona in zonas_por_severidad['moderada']:
-            mascara_zona = self._reconstruir_mascara_zona(zona, shape)
-            mascara_moderada = np.logical_or(mascara_moderada, mascara_zona)
-        
-        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO
-        if self.mascara_cultivo is not None:
-            mascara_moderada = np.logical_and(mascara_moderada, self.mascara_cultivo)
-        
-        mascara_moderada = np.logical_and(mascara_moderada, ~mascara_critica)
-        desglose['moderada'] = round(np.sum(mascara_moderada) * self.area_pixel_ha, 2)  # MEJORA 3: 2 decimales
-        
-        # Máscara de zonas leves EXCLUYENDO críticas y moderadas
-        mascara_leve = np.zeros(shape, dtype=bool)
-        for zona in zonas_por_severidad['leve']:
-            mascara_zona = self._reconstruir_mascara_zona(zona, shape)
-            mascara_leve = np.logical_or(mascara_leve, mascara_zona)
-        
-        # ✅ APLICAR RECORTE POR MÁSCARA DE CULTIVO
-        if self.mascara_cultivo is not None:
-            mascara_leve = np.logical_and(mascara_leve, self.mascara_cultivo)
-        
-        mascara_leve = np.logical_and(mascara_leve, ~mascara_critica)
-        mascara_leve = np.logical_and(mascara_leve, ~mascara_moderada)
-        desglose['leve'] = round(np.sum(mascara_leve) * self.area_pixel_ha, 2)  # MEJORA 3: 2 decimales
-        
         # ✅ NORMALIZACIÓN FINAL: Aplicar clips individuales
         for nivel in desglose:
             desglose[nivel] = min(desglose[nivel], self.area_parcela_ha)
@@ -1669,7 +2076,9 @@ def ejecutar_diagnostico_unificado(
     mascara_cultivo: Optional[np.ndarray] = None,
     geometria_parcela: Optional[any] = None,
     data_cubes_temporales: Optional[Dict] = None,
-    crisis_historicas: Optional[list] = None
+    crisis_historicas: Optional[list] = None,
+    filas_por_tile: Optional[int] = None,
+    medir_memoria: bool = False
 ) -> DiagnosticoUnificado:
     """
     Función de alto nivel para integrar con el generador de PDF
@@ -1691,6 +2100,9 @@ def ejecutar_diagnostico_unificado(
         geometria_parcela: Geometría del polígono de la parcela (NUEVO - para mapa georef)
         data_cubes_temporales: Data Cubes 3D para análisis temporal (NUEVO)
         crisis_historicas: Lista de crisis detectadas históricamente (NUEVO)
+        filas_por_tile: Detección por franjas de N filas (lotes muy grandes);
+                        None = raster completo. Ver metadata['memoria']
+        medir_memoria: Medir el pico de memoria de la detección (tracemalloc)
     
     Returns:
         DiagnosticoUnificado completo
@@ -1746,7 +2158,9 @@ def ejecutar_diagnostico_unificado(
         fase_fenologica=fase_fenologica,  # ✅ NUEVO ENERO 23, 2026
         resolucion_pixel_m=resolucion_m,
         mascara_cultivo=mascara_cultivo,  # ✅ NUEVO parámetro
-        geometria_parcela=geometria_parcela  # ✅ NUEVO ENERO 2026
+        geometria_parcela=geometria_parcela,  # ✅ NUEVO ENERO 2026
+        filas_por_tile=filas_por_tile,
+        medir_memoria=medir_memoria
     )
     
     # Ejecutar diagnóstico con crisis históricas Y data cubes temporales
@@ -10,7 +10,7 @@ Fecha: Enero 2026
 """
 
 import numpy as np
-from typing import Tuple, Optional
+from typing import List, Tuple, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,17 +20,24 @@ def generar_mascara_desde_geometria(
     geometria,  # django.contrib.gis.geos.Polygon
     geo_transform: Tuple[float, float, float, float, float, float],
     shape: Tuple[int, int],
-    buffer_pixels: int = 0
+    buffer_pixels: int = 0,
+    todos_tocados: bool = False
 ) -> np.ndarray:
     """
     Genera máscara booleana de cultivo desde geometría de parcela
     
+    La rasterización se hace por barrido de líneas (scanline) con operaciones
+    NumPy en bloque: no se crea un ``Point`` por píxel.
+    
     Args:
         geometria: Objeto GEOSGeometry (Polygon/MultiPolygon) de Django/PostGIS
         geo_transform: Transformación GDAL (origin_x, pixel_width, rotation_x,
                                             origin_y, rotation_y, pixel_height)
         shape: Dimensiones del raster (height, width)
         buffer_pixels: Número de píxeles de buffer interior (negativo = erosión)
+        todos_tocados: False = píxel dentro si su centro está dentro del polígono
+                       (comportamiento histórico). True = píxel dentro si el
+                       polígono toca cualquier parte del píxel (all-touched).
     
     Returns:
         Array booleano (True = dentro del cultivo, False = fuera)
@@ -66,50 +73,24 @@ def generar_mascara_desde_geometria(
     ```
     """
     try:
-        from shapely.geometry import shape as shapely_shape
-        from shapely.geometry.polygon import Polygon as ShapelyPolygon
-        from shapely.ops import transform
-        import shapely.affinity
-        
         logger.info(f"🗺️  Generando máscara de cultivo desde geometría...")
         logger.info(f"   Dimensiones: {shape[0]}x{shape[1]} píxeles")
         
-        # Convertir GEOSGeometry a Shapely
-        if hasattr(geometria, '__geo_interface__'):
-            geojson = geometria.__geo_interface__
-            shapely_geom = shapely_shape(geojson)
-        else:
+        anillos = _extraer_anillos(geometria)
+        if anillos is None:
             logger.error("❌ Geometría no tiene interfaz GeoJSON")
             return np.ones(shape, dtype=bool)  # Fallback: máscara completa
         
-        # Extraer parámetros de transformación
-        origin_x = geo_transform[0]
-        pixel_width = geo_transform[1]
-        origin_y = geo_transform[3]
-        pixel_height = geo_transform[5]  # Usualmente negativo
-        
-        # Crear máscara vacía
-        mascara = np.zeros(shape, dtype=bool)
-        
-        # Recorrer cada píxel y verificar si está dentro del polígono
         height, width = shape
         
-        logger.info(f"   Rasterizando polígono...")
+        logger.info(f"   Rasterizando polígono ({'all-touched' if todos_tocados else 'centro de píxel'})...")
         
-        for row in range(height):
-            for col in range(width):
-                # Convertir coordenadas de píxel a geográficas (centro del píxel)
-                geo_x = origin_x + (col + 0.5) * pixel_width
-                geo_y = origin_y + (row + 0.5) * pixel_height
-                
-                # Verificar si el punto está dentro del polígono
-                try:
-                    from shapely.geometry import Point
-                    punto = Point(geo_x, geo_y)
-                    mascara[row, col] = shapely_geom.contains(punto) or shapely_geom.touches(punto)
-                except Exception as e:
-                    # En caso de error, asumir que está fuera
-                    mascara[row, col] = False
+        mascara = rasterizar_anillos(
+            anillos=anillos,
+            geo_transform=geo_transform,
+            shape=shape,
+            todos_tocados=todos_tocados
+        )
         
         # Aplicar buffer si se requiere
         if buffer_pixels != 0:
@@ -126,11 +107,6 @@ def generar_mascara_desde_geometria(
         
         return mascara
         
-    except ImportError as e:
-        logger.error(f"❌ Shapely no instalado: {str(e)}")
-        logger.warning(f"   Retornando máscara completa (sin recorte)")
-        return np.ones(shape, dtype=bool)
-        
     except Exception as e:
         logger.error(f"❌ Error generando máscara: {str(e)}")
         import traceback
@@ -139,6 +115,266 @@ def generar_mascara_desde_geometria(
         return np.ones(shape, dtype=bool)
 
 
+def rasterizar_anillos(
+    anillos: List[np.ndarray],
+    geo_transform: Tuple[float, float, float, float, float, float],
+    shape: Tuple[int, int],
+    todos_tocados: bool = False
+) -> np.ndarray:
+    """
+    Rasteriza anillos de polígonos (exteriores y huecos) con regla par-impar
+    
+    Para cada fila se calculan los cruces de las aristas con la línea que pasa
+    por el centro de los píxeles; cada cruce invierte el estado "dentro/fuera"
+    de las columnas a su derecha. Los cruces se acumulan con ``np.bincount``
+    y un ``cumsum`` por fila, por lo que el costo es O(píxeles + cruces).
+    
+    Con la regla par-impar los huecos de cada polígono y las partes de un
+    MultiPolygon se resuelven sin tratamiento especial.
+    
+    Args:
+        anillos: Lista de arrays (N, 2) con coordenadas geográficas (x, y)
+        geo_transform: Transformación GDAL de 6 elementos
+        shape: Dimensiones del raster (height, width)
+        todos_tocados: Incluir además todo píxel atravesado por el borde
+    
+    Returns:
+        Array booleano (height, width)
+    """
+    height, width = shape
+    
+    aristas = _aristas_en_pixeles(anillos, geo_transform)
+    if aristas is None:
+        return np.zeros(shape, dtype=bool)
+    
+    c0, r0, c1, r1 = aristas
+    
+    # ------------------------------------------------------------------
+    # Relleno por centro de píxel (scanline par-impar)
+    # ------------------------------------------------------------------
+    # Aristas horizontales no generan cruces
+    no_horizontal = r0 != r1
+    c0h, r0h, c1h, r1h = c0[no_horizontal], r0[no_horizontal], c1[no_horizontal], r1[no_horizontal]
+    
+    r_min = np.minimum(r0h, r1h)
+    r_max = np.maximum(r0h, r1h)
+    
+    # Filas cuyo centro (fila + 0.5) cumple r_min <= centro < r_max
+    fila_inicio = np.clip(np.ceil(r_min - 0.5), 0, height).astype(np.int64)
+    fila_fin = np.clip(np.ceil(r_max - 0.5), 0, height).astype(np.int64)
+    
+    idx_arista, filas = _expandir_rangos(fila_inicio, fila_fin - fila_inicio)
+    
+    conteo = np.zeros(height * (width + 1), dtype=np.int64)
+    if filas.size:
+        y_centro = filas + 0.5
+        pendiente = (c1h - c0h) / (r1h - r0h)
+        x_cruce = c0h[idx_arista] + (y_centro - r0h[idx_arista]) * pendiente[idx_arista]
+        
+        # Primera columna cuyo centro queda a la derecha del cruce
+        col_cruce = np.clip(np.ceil(x_cruce - 0.5), 0, width).astype(np.int64)
+        conteo += np.bincount(filas * (width + 1) + col_cruce, minlength=conteo.size)
+    
+    paridad = np.cumsum(conteo.reshape(height, width + 1), axis=1)[:, :width]
+    mascara = (paridad & 1).astype(bool)
+    
+    if todos_tocados:
+        mascara |= _pixeles_borde(c0, r0, c1, r1, shape)
+    
+    return mascara
+
+
+def _extraer_anillos(geometria) -> Optional[List[np.ndarray]]:
+    """
+    Obtiene los anillos (exteriores y huecos) de un Polygon/MultiPolygon
+    
+    Acepta objetos con ``__geo_interface__`` (Shapely), GEOSGeometry de Django
+    (propiedad ``json``) o un dict GeoJSON.
+    
+    Returns:
+        Lista de arrays (N, 2) o None si la geometría no es interpretable
+    """
+    if isinstance(geometria, dict):
+        geojson = geometria
+    elif hasattr(geometria, '__geo_interface__'):
+        geojson = geometria.__geo_interface__
+    elif hasattr(geometria, 'json'):
+        import json
+        geojson = json.loads(geometria.json)
+    else:
+        return None
+    
+    tipo = geojson.get('type')
+    coordenadas = geojson.get('coordinates', [])
+    
+    if tipo == 'Polygon':
+        poligonos = [coordenadas]
+    elif tipo == 'MultiPolygon':
+        poligonos = coordenadas
+    elif tipo == 'GeometryCollection':
+        anillos = []
+        for sub in geojson.get('geometries', []):
+            anillos.extend(_extraer_anillos(sub) or [])
+        return anillos
+    else:
+        logger.warning(f"⚠️  Tipo de geometría no soportado para máscara: {tipo}")
+        return []
+    
+    anillos = []
+    for poligono in poligonos:
+        for anillo in poligono:
+            arr = np.asarray(anillo, dtype=np.float64)
+            if arr.ndim == 2 and arr.shape[0] >= 3:
+                anillos.append(arr[:, :2])
+    return anillos
+
+
+def _aristas_en_pixeles(
+    anillos: List[np.ndarray],
+    geo_transform: Tuple[float, float, float, float, float, float]
+) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Convierte anillos geográficos en aristas (c0, r0, c1, r1) en coordenadas
+    continuas de píxel aplicando la inversa de la transformación afín
+    """
+    if not anillos:
+        return None
+    
+    origin_x, a, b, origin_y, d, e = geo_transform
+    determinante = a * e - b * d
+    if determinante == 0:
+        raise ValueError("geo_transform no invertible (tamaño de píxel 0)")
+    
+    inicios = []
+    finales = []
+    for anillo in anillos:
+        # Cerrar el anillo si no viene cerrado
+        if not np.array_equal(anillo[0], anillo[-1]):
+            anillo = np.vstack([anillo, anillo[:1]])
+        inicios.append(anillo[:-1])
+        finales.append(anillo[1:])
+    
+    p0 = np.concatenate(inicios)
+    p1 = np.concatenate(finales)
+    
+    def a_pixel(puntos):
+        dx = puntos[:, 0] - origin_x
+        dy = puntos[:, 1] - origin_y
+        col = (e * dx - b * dy) / determinante
+        fila = (a * dy - d * dx) / determinante
+        return col, fila
+    
+    c0, r0 = a_pixel(p0)
+    c1, r1 = a_pixel(p1)
+    return c0, r0, c1, r1
+
+
+def _expandir_rangos(inicio: np.ndarray, cantidad: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Expande rangos [inicio, inicio + cantidad) sin bucles Python
+    
+    Returns:
+        (índice del rango de origen, valor) para cada elemento generado
+    """
+    cantidad = np.maximum(cantidad, 0)
+    total = int(cantidad.sum())
+    if total == 0:
+        vacio = np.zeros(0, dtype=np.int64)
+        return vacio, vacio
+    
+    origen = np.repeat(np.arange(cantidad.size), cantidad)
+    desplazamiento = np.arange(total) - np.repeat(np.cumsum(cantidad) - cantidad, cantidad)
+    return origen, inicio[origen] + desplazamiento
+
+
+def _pixeles_borde(
+    c0: np.ndarray,
+    r0: np.ndarray,
+    c1: np.ndarray,
+    r1: np.ndarray,
+    shape: Tuple[int, int]
+) -> np.ndarray:
+    """
+    Marca cada píxel atravesado por alguna arista (supercover)
+    
+    Un segmento entra a una celda nueva solo al cruzar una línea de la grilla,
+    así que basta marcar las celdas de sus extremos y las dos celdas vecinas
+    de cada cruce con líneas verticales y horizontales.
+    """
+    height, width = shape
+    borde = np.zeros(shape, dtype=bool)
+    
+    def marcar(filas, cols):
+        validos = (filas >= 0) & (filas < height) & (cols >= 0) & (cols < width)
+        borde[filas[validos], cols[validos]] = True
+    
+    # Extremos de cada arista
+    marcar(np.floor(r0).astype(np.int64), np.floor(c0).astype(np.int64))
+    marcar(np.floor(r1).astype(np.int64), np.floor(c1).astype(np.int64))
+    
+    # Cruces con líneas verticales de la grilla (x = entero)
+    no_vertical = c0 != c1
+    if np.any(no_vertical):
+        a0, b0, a1, b1 = c0[no_vertical], r0[no_vertical], c1[no_vertical], r1[no_vertical]
+        inicio = np.clip(np.ceil(np.minimum(a0, a1)), 0, width).astype(np.int64)
+        fin = np.clip(np.floor(np.maximum(a0, a1)), -1, width).astype(np.int64) + 1
+        origen, x_linea = _expandir_rangos(inicio, fin - inicio)
+        if x_linea.size:
+            t = (x_linea - a0[origen]) / (a1[origen] - a0[origen])
+            fila = np.floor(b0[origen] + t * (b1[origen] - b0[origen])).astype(np.int64)
+            marcar(fila, x_linea - 1)
+            marcar(fila, x_linea)
+    
+    # Cruces con líneas horizontales de la grilla (y = entero)
+    no_horizontal = r0 != r1
+    if np.any(no_horizontal):
+        a0, b0, a1, b1 = r0[no_horizontal], c0[no_horizontal], r1[no_horizontal], c1[no_horizontal]
+        inicio = np.clip(np.ceil(np.minimum(a0, a1)), 0, height).astype(np.int64)
+        fin = np.clip(np.floor(np.maximum(a0, a1)), -1, height).astype(np.int64) + 1
+        origen, y_linea = _expandir_rangos(inicio, fin - inicio)
+        if y_linea.size:
+            t = (y_linea - a0[origen]) / (a1[origen] - a0[origen])
+            col = np.floor(b0[origen] + t * (b1[origen] - b0[origen])).astype(np.int64)
+            marcar(y_linea - 1, col)
+            marcar(y_linea, col)
+    
+    return borde
+
+
+def _generar_mascara_por_puntos(
+    geometria,
+    geo_transform: Tuple[float, float, float, float, float, float],
+    shape: Tuple[int, int]
+) -> np.ndarray:
+    """
+    Implementación de referencia píxel a píxel con Shapely (contains/touches)
+    
+    Se conserva solo para validar y comparar tiempos contra el rasterizador
+    vectorizado (ver scripts/benchmarks/benchmark_mascara_cultivo.py).
+    """
+    from shapely.geometry import shape as shapely_shape, Point
+    
+    geojson = geometria if isinstance(geometria, dict) else geometria.__geo_interface__
+    shapely_geom = shapely_shape(geojson)
+    
+    origin_x = geo_transform[0]
+    pixel_width = geo_transform[1]
+    origin_y = geo_transform[3]
+    pixel_height = geo_transform[5]
+    
+    height, width = shape
+    mascara = np.zeros(shape, dtype=bool)
+    
+    for row in range(height):
+        for col in range(width):
+            geo_x = origin_x + (col + 0.5) * pixel_width
+            geo_y = origin_y + (row + 0.5) * pixel_height
+            punto = Point(geo_x, geo_y)
+            mascara[row, col] = shapely_geom.contains(punto) or shapely_geom.touches(punto)
+    
+    return mascara
+
+
 def generar_mascara_desde_bbox_simple(
     bbox: Tuple[float, float, float, float],
     geo_transform: Tuple[float, float, float, float, float, float],
@@ -12,6 +12,7 @@ import pandas as pd
 import numpy as np
 from ..models import Parcela, IndiceMensual, Informe
 from .eosda_api import eosda_service
+from .indices_mensuales import CAMPOS_CLIMA, agregar_clima_por_mes, upsert_indices_mensuales, valor_para_bd
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,14 @@ class AnalisisSatelitalService:
     Servicio para procesar y analizar datos satelitales obtenidos de EOSDA
     """
     
+    # Campos de IndiceMensual que escribe cada bloque de _procesar_por_meses
+    CAMPOS_POR_BLOQUE = {
+        'ndvi': ['ndvi_promedio', 'ndvi_maximo', 'ndvi_minimo', 'nubosidad_promedio'],
+        'ndmi': ['ndmi_promedio', 'ndmi_maximo', 'ndmi_minimo'],
+        'savi': ['savi_promedio', 'savi_maximo', 'savi_minimo'],
+        'clima': CAMPOS_CLIMA,
+    }
+    
     def __init__(self):
         pass
     
@@ -63,95 +72,84 @@ class AnalisisSatelitalService:
     def _procesar_por_meses(self, parcela: Parcela, datos_satelitales: Dict) -> Dict:
         """
         Procesa los datos satelitales agrupándolos por mes y guardándolos en BD
-        """
-        meses_procesados = []
         
+        Un groupby por índice y uno para el clima; la escritura es un bulk
+        upsert por combinación de bloques presentes (normalmente 1-2 queries
+        para todo el período, no un get_or_create + save por mes).
+        """
         try:
             # Convertir datos a DataFrames para facilitar el procesamiento
             df_ndvi = self._datos_a_dataframe(datos_satelitales.get('ndvi', []))
             df_ndmi = self._datos_a_dataframe(datos_satelitales.get('ndmi', []))
             df_savi = self._datos_a_dataframe(datos_satelitales.get('savi', []))
-            df_clima = self._datos_a_dataframe(datos_satelitales.get('datos_clima', []))
-            
-            # Obtener todos los meses únicos
-            fechas_unicas = set()
-            for df in [df_ndvi, df_ndmi, df_savi, df_clima]:
-                if not df.empty:
-                    fechas_unicas.update(df['fecha'].dt.to_period('M').unique())
-            
-            # Procesar cada mes
-            for periodo_mensual in sorted(fechas_unicas):
-                año = periodo_mensual.year
-                mes = periodo_mensual.month
-                
-                try:
-                    with transaction.atomic():
-                        # Obtener o crear registro mensual
-                        indice_mensual, created = IndiceMensual.objects.get_or_create(
-                            parcela=parcela,
-                            año=año,
-                            mes=mes,
-                            defaults={}
-                        )
-                        
-                        # Procesar NDVI para este mes
-                        ndvi_mes = self._calcular_estadisticas_mensuales(
-                            df_ndvi, año, mes
-                        )
-                        if ndvi_mes:
-                            indice_mensual.ndvi_promedio = ndvi_mes['promedio']
-                            indice_mensual.ndvi_maximo = ndvi_mes['maximo']
-                            indice_mensual.ndvi_minimo = ndvi_mes['minimo']
-                            indice_mensual.nubosidad_promedio = ndvi_mes.get('nubosidad_promedio')
-                        
-                        # Procesar NDMI para este mes
-                        ndmi_mes = self._calcular_estadisticas_mensuales(
-                            df_ndmi, año, mes
-                        )
-                        if ndmi_mes:
-                            indice_mensual.ndmi_promedio = ndmi_mes['promedio']
-                            indice_mensual.ndmi_maximo = ndmi_mes['maximo']
-                            indice_mensual.ndmi_minimo = ndmi_mes['minimo']
-                        
-                        # Procesar SAVI para este mes
-                        savi_mes = self._calcular_estadisticas_mensuales(
-                            df_savi, año, mes
-                        )
-                        if savi_mes:
-                            indice_mensual.savi_promedio = savi_mes['promedio']
-                            indice_mensual.savi_maximo = savi_mes['maximo']
-                            indice_mensual.savi_minimo = savi_mes['minimo']
-                        
-                        # Procesar datos climáticos para este mes
-                        clima_mes = self._calcular_climaticos_mensuales(
-                            df_clima, año, mes
-                        )
-                        if clima_mes:
-                            indice_mensual.temperatura_promedio = clima_mes.get('temperatura_promedio')
-                            indice_mensual.temperatura_maxima = clima_mes.get('temperatura_maxima')
-                            indice_mensual.temperatura_minima = clima_mes.get('temperatura_minima')
-                            indice_mensual.precipitacion_total = clima_mes.get('precipitacion_total')
-                        
-                        # Determinar calidad de datos
-                        indice_mensual.calidad_datos = self._evaluar_calidad_datos(
-                            indice_mensual
-                        )
-                        
-                        # Guardar
-                        indice_mensual.save()
-                        
-                        meses_procesados.append({
-                            'año': año,
-                            'mes': mes,
-                            'created': created,
-                            'ndvi': indice_mensual.ndvi_promedio,
-                            'ndmi': indice_mensual.ndmi_promedio,
-                            'savi': indice_mensual.savi_promedio
-                        })
-                
-                except Exception as e:
-                    logger.error(f"Error procesando mes {mes}/{año}: {str(e)}")
-                    continue
+            
+            # Estadísticas mensuales por bloque: {bloque: DataFrame indexado por (año, mes)}
+            bloques = {
+                'ndvi': self._calcular_estadisticas_mensuales(df_ndvi, 'ndvi', con_nubosidad=True),
+                'ndmi': self._calcular_estadisticas_mensuales(df_ndmi, 'ndmi'),
+                'savi': self._calcular_estadisticas_mensuales(df_savi, 'savi'),
+                'clima': agregar_clima_por_mes(datos_satelitales.get('datos_clima', [])),
+            }
+            bloques = {nombre: df for nombre, df in bloques.items() if not df.empty}
+            if not bloques:
+                return {
+                    'meses_procesados': [],
+                    'total_meses': 0,
+                    'simulado': datos_satelitales.get('simulado', False)
+                }
+            
+            mensual = pd.concat(bloques.values(), axis=1).sort_index()
+            presentes = pd.DataFrame(
+                {nombre: mensual.index.isin(df.index) for nombre, df in bloques.items()},
+                index=mensual.index
+            )
+            
+            # Un mes sin datos de un índice conserva el valor ya guardado
+            existentes = {
+                (fila['año'], fila['mes']): fila
+                for fila in IndiceMensual.objects.filter(
+                    parcela=parcela, año__in=mensual.index.get_level_values('año').unique().tolist()
+                ).values('año', 'mes', 'ndvi_promedio', 'ndmi_promedio', 'savi_promedio')
+            }
+            promedios = pd.DataFrame(index=mensual.index)
+            for indice in ('ndvi', 'ndmi', 'savi'):
+                campo = f'{indice}_promedio'
+                previos = pd.Series(
+                    [existentes.get(clave, {}).get(campo) for clave in mensual.index],
+                    index=mensual.index, dtype=float
+                )
+                if indice in bloques:
+                    promedios[campo] = mensual[campo].where(presentes[indice], previos)
+                else:
+                    promedios[campo] = previos
+            mensual['calidad_datos'] = self._evaluar_calidad_datos(promedios)
+            
+            # Upsert por grupo de meses con los mismos bloques presentes
+            firmas = presentes.apply(lambda fila: tuple(fila.index[fila.values]), axis=1)
+            meses_creados = set()
+            with transaction.atomic():
+                for firma, claves in mensual.groupby(firmas).groups.items():
+                    campos = [campo for bloque in firma for campo in self.CAMPOS_POR_BLOQUE[bloque]]
+                    campos.append('calidad_datos')
+                    grupo = mensual.loc[claves]
+                    filas = [
+                        {'año': año, 'mes': mes, **{campo: valores[campo] for campo in campos}}
+                        for (año, mes), valores in zip(grupo.index, grupo.to_dict('records'))
+                    ]
+                    resultado = upsert_indices_mensuales(parcela, filas, campos)
+                    meses_creados |= resultado['meses_creados']
+            
+            meses_procesados = [
+                {
+                    'año': int(año),
+                    'mes': int(mes),
+                    'created': (año, mes) in meses_creados,
+                    'ndvi': valor_para_bd(valores['ndvi_promedio']),
+                    'ndmi': valor_para_bd(valores['ndmi_promedio']),
+                    'savi': valor_para_bd(valores['savi_promedio'])
+                }
+                for (año, mes), valores in zip(promedios.index, promedios.to_dict('records'))
+            ]
             
             return {
                 'meses_procesados': meses_procesados,
@@ -179,92 +177,47 @@ class AnalisisSatelitalService:
             logger.error(f"Error convirtiendo datos a DataFrame: {str(e)}")
             return pd.DataFrame()
     
-    def _calcular_estadisticas_mensuales(self, df: pd.DataFrame, año: int, mes: int) -> Optional[Dict]:
+    def _calcular_estadisticas_mensuales(self, df: pd.DataFrame, prefijo: str,
+                                         con_nubosidad: bool = False) -> pd.DataFrame:
         """
-        Calcula estadísticas mensuales para un índice específico
+        Calcula estadísticas mensuales de un índice para todos los meses a la vez
+        
+        Returns:
+            DataFrame indexado por (año, mes) con {prefijo}_promedio, _maximo,
+            _minimo (y nubosidad_promedio si con_nubosidad)
         """
-        if df.empty:
-            return None
+        if df.empty or 'fecha' not in df.columns:
+            return pd.DataFrame()
         
         try:
-            # Filtrar por año y mes
-            filtro_mes = (df['fecha'].dt.year == año) & (df['fecha'].dt.month == mes)
-            df_mes = df[filtro_mes]
-            
-            if df_mes.empty:
-                return None
-            
-            estadisticas = {
-                'promedio': df_mes['promedio'].mean() if 'promedio' in df_mes.columns else None,
-                'maximo': df_mes['maximo'].max() if 'maximo' in df_mes.columns else None,
-                'minimo': df_mes['minimo'].min() if 'minimo' in df_mes.columns else None,
+            columnas = {
+                f'{prefijo}_promedio': ('promedio', 'mean'),
+                f'{prefijo}_maximo': ('maximo', 'max'),
+                f'{prefijo}_minimo': ('minimo', 'min'),
             }
+            if con_nubosidad:
+                columnas['nubosidad_promedio'] = ('nubosidad', 'mean')
             
-            # Nubosidad si está disponible
-            if 'nubosidad' in df_mes.columns:
-                estadisticas['nubosidad_promedio'] = df_mes['nubosidad'].mean()
+            # Columnas ausentes en los datos quedan en None, como antes
+            df = df.copy()
+            for origen, _ in columnas.values():
+                if origen not in df.columns:
+                    df[origen] = np.nan
             
-            return estadisticas
+            grupos = df.groupby([df['fecha'].dt.year.rename('año'), df['fecha'].dt.month.rename('mes')])
+            return grupos.agg(**columnas)
             
         except Exception as e:
             logger.error(f"Error calculando estadísticas mensuales: {str(e)}")
-            return None
-    
-    def _calcular_climaticos_mensuales(self, df: pd.DataFrame, año: int, mes: int) -> Optional[Dict]:
-        """
-        Calcula estadísticas climáticas mensuales
-        """
-        if df.empty:
-            return None
-        
-        try:
-            # Filtrar por año y mes
-            filtro_mes = (df['fecha'].dt.year == año) & (df['fecha'].dt.month == mes)
-            df_mes = df[filtro_mes]
-            
-            if df_mes.empty:
-                return None
-            
-            estadisticas = {}
-            
-            # Temperaturas
-            if 'temperatura_promedio' in df_mes.columns:
-                estadisticas['temperatura_promedio'] = df_mes['temperatura_promedio'].mean()
-            if 'temperatura_maxima' in df_mes.columns:
-                estadisticas['temperatura_maxima'] = df_mes['temperatura_maxima'].max()
-            if 'temperatura_minima' in df_mes.columns:
-                estadisticas['temperatura_minima'] = df_mes['temperatura_minima'].min()
-            
-            # Precipitación total
-            if 'precipitacion_total' in df_mes.columns:
-                estadisticas['precipitacion_total'] = df_mes['precipitacion_total'].sum()
-            
-            return estadisticas
-            
-        except Exception as e:
-            logger.error(f"Error calculando datos climáticos mensuales: {str(e)}")
-            return None
+            return pd.DataFrame()
     
-    def _evaluar_calidad_datos(self, indice_mensual) -> str:
+    def _evaluar_calidad_datos(self, promedios: pd.DataFrame) -> pd.Series:
         """
         Evalúa la calidad de los datos basándose en la completitud
+        (cuántos de NDVI, NDMI y SAVI tiene cada mes)
         """
-        campos_principales = [
-            indice_mensual.ndvi_promedio,
-            indice_mensual.ndmi_promedio,
-            indice_mensual.savi_promedio
-        ]
-        
-        campos_completos = sum(1 for campo in campos_principales if campo is not None)
-        
-        if campos_completos == 3:
-            return 'excelente'
-        elif campos_completos >= 2:
-            return 'buena'
-        elif campos_completos >= 1:
-            return 'regular'
-        else:
-            return 'pobre'
+        campos_completos = promedios[['ndvi_promedio', 'ndmi_promedio', 'savi_promedio']].notna().sum(axis=1)
+        return campos_completos.map({3: 'excelente', 2: 'buena', 1: 'regular', 0: 'pobre'})
     
     def calcular_tendencias_parcela(self, parcela: Parcela, 
                                    meses_analisis: int = 12) -> Dict:
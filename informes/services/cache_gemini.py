@@ -0,0 +1,402 @@
+"""
+Caché persistente y planificador de peticiones para Gemini
+Cada llamada a generate_content se identifica por el hash de lo que se
+envía: nombre del modelo, textos del prompt y bytes de las imágenes. Si
+la misma petición ya se respondió (otro informe de la misma parcela, un
+reintento), se devuelve el texto guardado sin gastar cuota.
+
+- Caché en disco (MEDIA_ROOT/cache_gemini/<hash[:2]>/<hash>.json) con
+  TTL y desalojo LRU por tamaño total; junto a cada respuesta, un
+  <hash>.lock vacío para el flock (no cuenta en el tamaño ni se borra)
+- Peticiones idénticas concurrentes se agrupan: la primera llama a la API
+  y las demás esperan su respuesta (hilos del proceso y, con flock, otros
+  procesos del host)
+- Cuota del free tier: token bucket de 15 peticiones/minuto compartido
+  entre procesos (el mismo LimitadorTokenBucket de EOSDA) y contador
+  diario; al tocar el límite por minuto se espera en lugar de fallar, y
+  un 429 pausa a todos los procesos antes de reintentar. Solo el límite
+  diario agotado (CuotaGeminiAgotada) termina en el análisis básico: el
+  propio contador o un 429 de Google por cuota diaria, que no se reintenta
+  y marca el día como agotado para todos los procesos.
+
+No importa Django ni google.generativeai al cargar el módulo.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from .eosda_poller import FCNTL_AVAILABLE, LimitadorTokenBucket
+
+if FCNTL_AVAILABLE:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+TTL_DIAS_POR_DEFECTO = 30
+MAX_MB_POR_DEFECTO = 64
+PETICIONES_MINUTO_POR_DEFECTO = 15
+PETICIONES_DIA_POR_DEFECTO = 1500
+REINTENTOS_429 = 4
+ESPERA_429_POR_DEFECTO = 60.0
+
+
+class CuotaGeminiAgotada(Exception):
+    """Se alcanzó el límite diario de peticiones a Gemini"""
+
+
+def _configuracion(nombre: str, por_defecto):
+    try:
+        from django.conf import settings
+        valor = getattr(settings, nombre, None)
+    except Exception:
+        valor = None
+    return por_defecto if valor is None else valor
+
+
+def _huella_parte(parte: Any) -> Dict:
+    """Forma estable de una parte del contenido enviado a generate_content"""
+    if isinstance(parte, str):
+        return {'texto': parte}
+    if isinstance(parte, (bytes, bytearray)):
+        return {'bytes': hashlib.sha256(bytes(parte)).hexdigest()}
+    if hasattr(parte, 'tobytes') and hasattr(parte, 'mode') and hasattr(parte, 'size'):  # Imagen PIL
+        return {'imagen': [parte.mode, list(parte.size), hashlib.sha256(parte.tobytes()).hexdigest()]}
+    if isinstance(parte, dict) and 'data' in parte:  # {'mime_type': ..., 'data': bytes}
+        return {'mime_type': parte.get('mime_type'), 'bytes': hashlib.sha256(bytes(parte['data'])).hexdigest()}
+    return {'repr': repr(parte)}
+
+
+def clave_peticion(modelo: str, contenido: Any) -> str:
+    """SHA-256 del modelo y el contenido (prompt + imágenes) de una petición"""
+    partes = contenido if isinstance(contenido, (list, tuple)) else [contenido]
+    texto = json.dumps([modelo, [_huella_parte(parte) for parte in partes]], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheGemini:
+    """
+    Respuestas de Gemini en disco por hash de la petición
+
+    Args:
+        directorio: Raíz del caché (default: MEDIA_ROOT/cache_gemini)
+        ttl_s: Vigencia de una respuesta (default: settings.GEMINI_CACHE_TTL_DIAS)
+        max_bytes: Tamaño máximo total (default: settings.GEMINI_CACHE_MAX_MB)
+    """
+
+    _lock_poda = threading.Lock()
+
+    def __init__(self, directorio: Optional[str] = None, ttl_s: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        self._directorio = directorio
+        self.ttl_s = ttl_s if ttl_s is not None else \
+            float(_configuracion('GEMINI_CACHE_TTL_DIAS', TTL_DIAS_POR_DEFECTO)) * 86400
+        self.max_bytes = max_bytes if max_bytes is not None else \
+            int(_configuracion('GEMINI_CACHE_MAX_MB', MAX_MB_POR_DEFECTO) * 1024 * 1024)
+        self._en_curso: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'agrupadas': 0, 'expiradas': 0, 'desalojos': 0}
+
+    @property
+    def directorio(self) -> str:
+        if self._directorio is None:
+            from django.conf import settings
+            self._directorio = os.path.join(str(settings.MEDIA_ROOT), 'cache_gemini')
+        return self._directorio
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave[:2], f'{clave}.json')
+
+    @staticmethod
+    def _escribir_atomico(ruta: str, contenido: bytes):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def obtener(self, clave: str) -> Optional[str]:
+        """Texto guardado para la petición, o None si no hay o ya venció"""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                entrada = json.load(archivo)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Entrada de caché Gemini corrupta ({ruta}): {e}")
+            return None
+        if time.time() - entrada.get('creado', 0) > self.ttl_s:
+            self.stats['expiradas'] += 1
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return entrada['texto']
+
+    def guardar(self, clave: str, texto: str, modelo: str = ''):
+        contenido = json.dumps({'texto': texto, 'modelo': modelo, 'creado': time.time()}, ensure_ascii=False)
+        self._escribir_atomico(self._ruta(clave), contenido.encode('utf-8'))
+        self.podar()
+
+    def _bloqueo_entre_procesos(self, clave: str):
+        """
+        Archivo de bloqueo por clave (None si no hay flock). Queda en disco
+        (vacío): borrarlo mientras otro proceso espera en él dejaría a ese
+        proceso bloqueando un inodo huérfano y a un tercero creando otro,
+        y ambos llamarían a la API.
+        """
+        if not FCNTL_AVAILABLE:
+            return None
+        ruta = self._ruta(clave)[:-len('.json')] + '.lock'
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        archivo = open(ruta, 'a+')
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+        return archivo
+
+    def obtener_o_generar(self, clave: str, generar: Callable[[], str], modelo: str = '') -> str:
+        """
+        Respuesta desde el caché o desde generar(); peticiones idénticas en
+        curso esperan a la primera en vez de repetir la llamada
+        """
+        texto = self.obtener(clave)
+        if texto is not None:
+            self.stats['hits'] += 1
+            return texto
+
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            propio = futuro is None
+            if propio:
+                futuro = self._en_curso[clave] = Future()
+        if not propio:
+            self.stats['agrupadas'] += 1
+            return futuro.result()
+
+        bloqueo = None
+        try:
+            bloqueo = self._bloqueo_entre_procesos(clave)
+            texto = self.obtener(clave)  # Otro proceso pudo responderla mientras esperábamos
+            if texto is not None:
+                self.stats['agrupadas'] += 1
+            else:
+                self.stats['misses'] += 1
+                texto = generar()
+                self.guardar(clave, texto, modelo)
+            futuro.set_result(texto)
+            return texto
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            if bloqueo is not None:
+                fcntl.flock(bloqueo, fcntl.LOCK_UN)
+                bloqueo.close()
+            with self._lock:
+                self._en_curso.pop(clave, None)
+
+    def _entradas(self):
+        """(mtime, tamaño, ruta) de todas las respuestas guardadas"""
+        entradas = []
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if not nombre.endswith('.json'):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                entradas.append((estado.st_mtime, estado.st_size, ruta))
+        return entradas
+
+    def tamano_total(self) -> int:
+        return sum(tamano for _, tamano, _ in self._entradas())
+
+    def podar(self) -> int:
+        """Borra las respuestas usadas hace más tiempo hasta quedar bajo max_bytes"""
+        with self._lock_poda:
+            entradas = self._entradas()
+            total = sum(tamano for _, tamano, _ in entradas)
+            desalojadas = 0
+            for _, tamano, ruta in sorted(entradas):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(ruta)
+                except OSError:
+                    continue
+                total -= tamano
+                desalojadas += 1
+            self.stats['desalojos'] += desalojadas
+            return desalojadas
+
+
+class CuotaDiaria:
+    """
+    Contador de peticiones del día compartido entre procesos (archivo + flock)
+
+    El día se cuenta en UTC-8 (Pacífico), como el reinicio de cuota de Google.
+    """
+
+    def __init__(self, limite: int, ruta_estado: Optional[str] = None):
+        self.limite = limite
+        self.ruta_estado = ruta_estado
+        self._lock = threading.Lock()
+        self._estado_local = {'dia': '', 'usadas': 0}
+
+    @staticmethod
+    def _dia() -> str:
+        return datetime.fromtimestamp(time.time() - 8 * 3600, tz=timezone.utc).strftime('%Y-%m-%d')
+
+    def _con_estado(self, operacion):
+        with self._lock:
+            if not (self.ruta_estado and FCNTL_AVAILABLE):
+                return operacion(self._estado_local)
+            with open(self.ruta_estado, 'a+') as archivo:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+                try:
+                    archivo.seek(0)
+                    try:
+                        estado = json.loads(archivo.read() or '{}')
+                    except ValueError:
+                        estado = {}
+                    resultado = operacion(estado)
+                    archivo.seek(0)
+                    archivo.truncate()
+                    archivo.write(json.dumps(estado))
+                    archivo.flush()
+                    return resultado
+                finally:
+                    fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def consumir(self) -> bool:
+        """Cuenta una petición; False si ya se alcanzó el límite del día"""
+        def operacion(estado):
+            dia = self._dia()
+            if estado.get('dia') != dia:
+                estado['dia'], estado['usadas'] = dia, 0
+            if estado['usadas'] >= self.limite:
+                return False
+            estado['usadas'] += 1
+            return True
+
+        return self._con_estado(operacion)
+
+    def agotar(self):
+        """Marca el día como agotado (Google rechazó por cuota diaria antes que el contador)"""
+        def operacion(estado):
+            estado['dia'], estado['usadas'] = self._dia(), max(self.limite, estado.get('usadas', 0))
+
+        self._con_estado(operacion)
+
+    def restantes(self) -> int:
+        def operacion(estado):
+            return self.limite if estado.get('dia') != self._dia() else max(0, self.limite - estado['usadas'])
+
+        return self._con_estado(operacion)
+
+
+def es_rate_limit(error: Exception) -> bool:
+    """429 / ResourceExhausted de la API de Gemini"""
+    texto = f"{type(error).__name__} {error}"
+    return 'ResourceExhausted' in texto or '429' in texto or 'quota' in texto.lower()
+
+
+def es_cuota_diaria(error: Exception) -> bool:
+    """429 por la cuota del día (quota_id ...PerDay...): reintentar hoy no sirve"""
+    return es_rate_limit(error) and re.search(r'per[ _-]?day|daily', str(error), re.IGNORECASE) is not None
+
+
+def _espera_sugerida(error: Exception, intento: int) -> float:
+    """retry_delay que sugiere el 429 o backoff exponencial con jitter"""
+    coincidencia = re.search(r'retry_delay\s*\{\s*seconds:\s*(\d+)', str(error)) or \
+        re.search(r'retry in ([\d.]+)\s*s', str(error), re.IGNORECASE)
+    if coincidencia:
+        return float(coincidencia.group(1)) + random.uniform(0, 1)
+    return min(ESPERA_429_POR_DEFECTO, 4 * 2 ** intento) + random.uniform(0, 1)
+
+
+class PlanificadorGemini:
+    """
+    Ejecuta llamadas a Gemini respetando la cuota del free tier
+
+    Args:
+        limitador: Token bucket por minuto (default: compartido, GEMINI_LIMITE_PETICIONES_MINUTO)
+        cuota: Contador diario (default: compartido, GEMINI_LIMITE_PETICIONES_DIA)
+    """
+
+    def __init__(self, limitador: Optional[LimitadorTokenBucket] = None, cuota: Optional[CuotaDiaria] = None,
+                 reintentos: int = REINTENTOS_429):
+        if limitador is None or cuota is None:
+            ruta = _configuracion('GEMINI_LIMITADOR_ESTADO', None) or \
+                os.path.join(tempfile.gettempdir(), 'agrotech_gemini_limitador.json')
+            if limitador is None:
+                por_minuto = float(_configuracion('GEMINI_LIMITE_PETICIONES_MINUTO', PETICIONES_MINUTO_POR_DEFECTO))
+                # Capacidad 1: las peticiones salen espaciadas, sin ráfagas que disparen el 429
+                limitador = LimitadorTokenBucket(por_minuto, capacidad=1, ruta_estado=ruta)
+            if cuota is None:
+                cuota = CuotaDiaria(int(_configuracion('GEMINI_LIMITE_PETICIONES_DIA', PETICIONES_DIA_POR_DEFECTO)),
+                                    ruta_estado=os.path.splitext(ruta)[0] + '_dia.json')
+        self.limitador = limitador
+        self.cuota = cuota
+        self.reintentos = reintentos
+        self.stats = {'peticiones': 0, 'rate_limits': 0, 'espera_s': 0.0}
+
+    def ejecutar(self, llamada: Callable[[], Any]) -> Any:
+        """
+        llamada() cuando haya cuota: espera el turno por minuto y, ante un
+        429 por minuto, pausa a todos y reintenta
+
+        Raises:
+            CuotaGeminiAgotada: si se alcanzó el límite diario (contador
+                propio o 429 de cuota diaria de Google, sin reintentos)
+        """
+        for intento in range(self.reintentos + 1):
+            if not self.cuota.consumir():
+                raise CuotaGeminiAgotada(f"Límite diario de {self.cuota.limite} peticiones a Gemini alcanzado")
+            inicio = time.perf_counter()
+            self.limitador.adquirir()
+            self.stats['espera_s'] += time.perf_counter() - inicio
+            self.stats['peticiones'] += 1
+            try:
+                return llamada()
+            except Exception as e:
+                if es_cuota_diaria(e):
+                    self.cuota.agotar()
+                    raise CuotaGeminiAgotada(f"Google rechazó la petición por cuota diaria agotada: {e}") from e
+                if not es_rate_limit(e) or intento == self.reintentos:
+                    raise
+                espera = _espera_sugerida(e, intento)
+                self.stats['rate_limits'] += 1
+                logger.warning(f"⏳ Gemini 429 (intento {intento + 1}/{self.reintentos}); "
+                               f"pausa global de {espera:.0f}s")
+                self.limitador.pausar(espera)
+
+
+_planificador_global: Optional[PlanificadorGemini] = None
+_planificador_lock = threading.Lock()
+
+
+def obtener_planificador_gemini() -> PlanificadorGemini:
+    """Planificador único por proceso, con estado de cuota compartido en disco"""
+    global _planificador_global
+    if _planificador_global is None:
+        with _planificador_lock:
+            if _planificador_global is None:
+                _planificador_global = PlanificadorGemini()
+    return _planificador_global
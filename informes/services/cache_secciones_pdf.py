@@ -0,0 +1,282 @@
+"""
+Caché de secciones del informe PDF direccionado por contenido
+Cada sección del informe (flowables de ReportLab, PNG de gráficos o el
+resultado del diagnóstico) se guarda bajo el hash de sus entradas: filas
+de IndiceMensual que usa, geometría y datos de la parcela, umbrales y
+VERSION_PLANTILLA_PDF. Si ninguna entrada cambió, la sección se carga de
+disco en lugar de volver a renderizarse; al llegar un mes nuevo solo se
+regeneran las secciones que dependen de él.
+
+Estructura (MEDIA_ROOT/cache_secciones_pdf/):
+- <seccion>/<hash[:2]>/<hash>.pkl: objeto serializado con pickle
+- Desalojo LRU por tamaño total: cada lectura actualiza el mtime del
+  archivo; las escrituras se suman a un total estimado (un solo recorrido
+  del árbol por instancia) y solo al superar el límite se borran los menos
+  usados, hasta bajar al 90 % del límite
+
+No importa Django al cargar el módulo: el directorio y el límite por
+defecto (settings.PDF_CACHE_SECCIONES_MAX_MB) se resuelven al usarlo.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Subir cuando cambie el contenido o el diseño de cualquier sección del informe
+VERSION_PLANTILLA_PDF = 1
+
+MAX_MB_POR_DEFECTO = 512
+# Al podar se baja hasta esta fracción del límite (no podar en cada escritura)
+FRACCION_TRAS_PODA = 0.9
+
+
+def _a_json(valor: Any) -> Any:
+    """Forma estable (sin direcciones de memoria) de los valores que entran al hash"""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(bytes(valor)).hexdigest()
+    if isinstance(valor, np.ndarray):
+        return {'shape': list(valor.shape), 'dtype': str(valor.dtype),
+                'sha256': hashlib.sha256(np.ascontiguousarray(valor).tobytes()).hexdigest()}
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (set, frozenset)):
+        return sorted(valor, key=str)
+    if hasattr(valor, 'wkb') and hasattr(valor, 'srid'):  # Geometría GEOS
+        return {'srid': valor.srid, 'wkb': hashlib.sha256(bytes(valor.wkb)).hexdigest()}
+    if hasattr(valor, '_meta') and hasattr(valor._meta, 'concrete_fields'):  # Instancia de modelo
+        return descriptor_modelo(valor)
+    if dataclasses.is_dataclass(valor) and not isinstance(valor, type):
+        return dataclasses.asdict(valor)
+    if isinstance(valor, SimpleNamespace) or hasattr(valor, '__dict__'):
+        return {k: v for k, v in vars(valor).items() if not k.startswith('_')}
+    return str(valor)
+
+
+def _descriptor_archivo(campo) -> Optional[Dict]:
+    """Nombre, tamaño y mtime de un FileField/ImageField (None si no hay archivo)"""
+    if not campo:
+        return None
+    descriptor = {'nombre': campo.name}
+    try:
+        estado = os.stat(campo.path)
+        descriptor.update(tamano=estado.st_size, mtime=estado.st_mtime)
+    except (OSError, ValueError, NotImplementedError):
+        pass
+    return descriptor
+
+
+def descriptor_modelo(instancia) -> Dict:
+    """
+    Valores de todos los campos concretos de una instancia de modelo
+
+    Los archivos (ImageField/FileField) entran con su tamaño y mtime, así
+    que reemplazar una imagen en disco también invalida la sección.
+    """
+    from django.db.models import FileField
+
+    descriptor = {'_modelo': instancia._meta.label}
+    for campo in instancia._meta.concrete_fields:
+        valor = getattr(instancia, campo.attname)
+        if isinstance(campo, FileField):
+            valor = _descriptor_archivo(getattr(instancia, campo.name))
+        descriptor[campo.attname] = valor
+    return descriptor
+
+
+def huella(seccion: str, *entradas: Any) -> str:
+    """Hash SHA-256 de la sección, sus entradas y VERSION_PLANTILLA_PDF"""
+    texto = json.dumps([VERSION_PLANTILLA_PDF, seccion, list(entradas)],
+                       default=_a_json, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+class CacheSeccionesPDF:
+    """
+    Caché en disco de secciones renderizadas con desalojo LRU
+
+    Args:
+        directorio: Raíz del caché (default: MEDIA_ROOT/cache_secciones_pdf)
+        max_bytes: Tamaño máximo total (default: settings.PDF_CACHE_SECCIONES_MAX_MB)
+    """
+
+    _lock_poda = threading.Lock()
+
+    def __init__(self, directorio: Optional[str] = None, max_bytes: Optional[int] = None):
+        self._directorio = directorio
+        self._max_bytes = max_bytes
+        self._bytes_estimados: Optional[int] = None  # Tamaño del caché visto por esta instancia
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'escrituras': 0, 'desalojos': 0, 'no_serializables': 0}
+
+    @property
+    def directorio(self) -> str:
+        if self._directorio is None:
+            from django.conf import settings
+            self._directorio = os.path.join(str(settings.MEDIA_ROOT), 'cache_secciones_pdf')
+        return self._directorio
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            from django.conf import settings
+            self._max_bytes = int(getattr(settings, 'PDF_CACHE_SECCIONES_MAX_MB', MAX_MB_POR_DEFECTO) * 1024 * 1024)
+        return self._max_bytes
+
+    def _ruta(self, seccion: str, clave: str) -> str:
+        return os.path.join(self.directorio, seccion, clave[:2], f'{clave}.pkl')
+
+    @staticmethod
+    def _escribir_atomico(ruta: str, contenido: bytes):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def obtener(self, seccion: str, clave: str) -> Tuple[bool, Any]:
+        """(encontrado, objeto); marca la entrada como recién usada"""
+        ruta = self._ruta(seccion, clave)
+        try:
+            with open(ruta, 'rb') as archivo:
+                objeto = pickle.load(archivo)
+        except FileNotFoundError:
+            self.stats['misses'] += 1
+            return False, None
+        except Exception as e:
+            logger.warning(f"⚠️ Entrada de caché de sección corrupta ({ruta}): {e}")
+            self.stats['misses'] += 1
+            return False, None
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        self.stats['hits'] += 1
+        return True, objeto
+
+    def guardar(self, seccion: str, clave: str, objeto: Any) -> bool:
+        """Serializa y guarda; False si el objeto no se puede serializar"""
+        try:
+            contenido = pickle.dumps(objeto, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            logger.debug(f"Sección {seccion} no serializable, no se guarda en caché: {e}")
+            self.stats['no_serializables'] += 1
+            return False
+        self._escribir_atomico(self._ruta(seccion, clave), contenido)
+        self.stats['escrituras'] += 1
+        self._registrar_escritura(len(contenido))
+        return True
+
+    def _registrar_escritura(self, tamano: int):
+        """Suma lo escrito al total estimado y poda solo si pasa del límite"""
+        with self._lock:
+            if self._bytes_estimados is None:
+                self._bytes_estimados = self.tamano_total()
+            else:
+                self._bytes_estimados += tamano
+            excedido = self._bytes_estimados > self.max_bytes
+        if excedido:
+            self.podar()
+
+    def contiene(self, seccion: str, entradas: Iterable[Any]) -> bool:
+        """True si la sección ya está en caché para estas entradas (sin leerla)"""
+        return os.path.exists(self._ruta(seccion, huella(seccion, *entradas)))
+
+    def obtener_o_generar(self, seccion: str, entradas: Iterable[Any], generar: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Objeto de la sección para estas entradas: de disco si ya se generó,
+        si no llama a generar() y lo guarda
+
+        Returns:
+            (objeto, True si vino del caché)
+        """
+        clave = huella(seccion, *entradas)
+        encontrado, objeto = self.obtener(seccion, clave)
+        if encontrado:
+            return objeto, True
+        objeto = generar()
+        self.guardar(seccion, clave, objeto)
+        return objeto, False
+
+    def _entradas(self):
+        """(mtime, tamaño, ruta) de todos los objetos del caché"""
+        entradas = []
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if not nombre.endswith('.pkl'):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                entradas.append((estado.st_mtime, estado.st_size, ruta))
+        return entradas
+
+    def tamano_total(self) -> int:
+        return sum(tamano for _, tamano, _ in self._entradas())
+
+    def podar(self) -> int:
+        """Si el caché pasa de max_bytes, borra las entradas usadas hace más tiempo (hasta el 90 %)"""
+        with self._lock_poda:
+            entradas = self._entradas()
+            total = sum(tamano for _, tamano, _ in entradas)
+            desalojadas = 0
+            if total > self.max_bytes:
+                objetivo = self.max_bytes * FRACCION_TRAS_PODA
+                for _, tamano, ruta in sorted(entradas):
+                    if total <= objetivo:
+                        break
+                    try:
+                        os.remove(ruta)
+                    except OSError:
+                        continue
+                    total -= tamano
+                    desalojadas += 1
+            with self._lock:
+                self._bytes_estimados = total
+            self.stats['desalojos'] += desalojadas
+            return desalojadas
+
+    def limpiar(self):
+        """Borra todo el caché"""
+        import shutil
+        shutil.rmtree(self.directorio, ignore_errors=True)
+
+
+class RegistroSecciones:
+    """Hit/miss y tiempo por sección de un informe (para logs y benchmarks)"""
+
+    def __init__(self):
+        self.secciones: Dict[str, Dict] = {}
+
+    def registrar(self, seccion: str, desde_cache: bool, segundos: float):
+        self.secciones[seccion] = {'cache': desde_cache, 'segundos': round(segundos, 4)}
+
+    def medir(self, seccion: str, funcion: Callable[[], Tuple[Any, bool]]) -> Any:
+        inicio = time.perf_counter()
+        resultado, desde_cache = funcion()
+        self.registrar(seccion, desde_cache, time.perf_counter() - inicio)
+        return resultado
+
+    def resumen(self) -> str:
+        regeneradas = [s for s, d in self.secciones.items() if not d['cache']]
+        total = sum(d['segundos'] for d in self.secciones.values())
+        return (f"{len(self.secciones) - len(regeneradas)}/{len(self.secciones)} secciones desde caché, "
+                f"{total:.2f}s; regeneradas: {', '.join(regeneradas) or 'ninguna'}")
@@ -0,0 +1,263 @@
+"""
+Almacén local de clima diario por celda de la rejilla de Open-Meteo
+Open-Meteo responde con el punto de rejilla más cercano (~9 km), así que
+las parcelas vecinas de Casanare reciben el mismo clima. El almacén ajusta
+las coordenadas a una celda fija y guarda los días ya descargados por
+celda: cada parcela solo pide los rangos de días que faltan en su celda y
+las parcelas de la misma celda no vuelven a llamar a la API.
+
+- MEDIA_ROOT/clima_celdas/<lat>_<lon>.json: {fecha: fila diaria} por celda
+- Los días faltantes se agrupan en rangos contiguos (una petición por rango;
+  huecos cortos se piden junto con los rangos vecinos)
+- Días sin datos de los últimos RETRASO_ARCHIVO_DIAS no se guardan: el
+  archivo de Open-Meteo los publica con unos días de retraso
+- Peticiones simultáneas a la misma celda se serializan (lock por celda y
+  flock entre procesos): la segunda lee lo que descargó la primera
+- clima_mensual() entrega el agregado mensual listo para IndiceMensual
+
+No importa Django al cargar el módulo: el directorio y el tamaño de celda
+(settings.CLIMA_CELDA_GRADOS) se resuelven al usarlo.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .eosda_poller import FCNTL_AVAILABLE
+
+if FCNTL_AVAILABLE:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+# 0.1° ≈ 11 km en el ecuador: del orden de la rejilla ERA5-Land que usa Open-Meteo
+PASO_GRADOS_POR_DEFECTO = 0.1
+RETRASO_ARCHIVO_DIAS = 7
+# Huecos de hasta estos días entre dos rangos faltantes se piden en la misma petición
+MAX_HUECO_FUSION_DIAS = 7
+
+CAMPOS_CLIMA = ['temperatura_promedio', 'temperatura_maxima', 'temperatura_minima', 'precipitacion_total']
+
+Celda = Tuple[float, float]
+
+
+def agregar_clima_por_mes(datos_diarios: List[Dict]) -> pd.DataFrame:
+    """
+    Agrega clima diario (fecha, temperatura_*, precipitacion_total) por mes
+
+    Promedio de temperatura media, máximo de máximas, mínimo de mínimas y
+    precipitación acumulada. Un mes sin ningún dato de lluvia queda en None
+    (no en 0).
+    """
+    if not datos_diarios:
+        return pd.DataFrame(columns=CAMPOS_CLIMA)
+
+    df = pd.DataFrame(datos_diarios)
+    df['fecha'] = pd.to_datetime(df.get('fecha'), errors='coerce')
+    df = df.dropna(subset=['fecha'])
+    for campo in CAMPOS_CLIMA:
+        df[campo] = pd.to_numeric(df[campo], errors='coerce') if campo in df.columns else np.nan
+    if df.empty:
+        return pd.DataFrame(columns=CAMPOS_CLIMA)
+
+    grupos = df.groupby([df['fecha'].dt.year.rename('año'), df['fecha'].dt.month.rename('mes')])
+    mensual = grupos.agg(
+        temperatura_promedio=('temperatura_promedio', 'mean'),
+        temperatura_maxima=('temperatura_maxima', 'max'),
+        temperatura_minima=('temperatura_minima', 'min'),
+    )
+    mensual['precipitacion_total'] = grupos['precipitacion_total'].sum(min_count=1)
+    return mensual[CAMPOS_CLIMA]
+
+
+def _a_fecha(valor) -> date:
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def _dias(inicio: date, fin: date) -> List[date]:
+    return [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+
+
+def celda_de(latitud: float, longitud: float, paso_grados: float = PASO_GRADOS_POR_DEFECTO) -> Celda:
+    """Centro de la celda de la rejilla que contiene el punto"""
+    return (round(round(latitud / paso_grados) * paso_grados, 4),
+            round(round(longitud / paso_grados) * paso_grados, 4))
+
+
+def rangos_faltantes(dias: List[date], max_hueco: int = MAX_HUECO_FUSION_DIAS) -> List[Tuple[date, date]]:
+    """Rangos (inicio, fin) que cubren los días dados, fusionando huecos cortos"""
+    rangos: List[List[date]] = []
+    for dia in sorted(dias):
+        if rangos and (dia - rangos[-1][1]).days <= max_hueco + 1:
+            rangos[-1][1] = dia
+        else:
+            rangos.append([dia, dia])
+    return [(inicio, fin) for inicio, fin in rangos]
+
+
+def _tiene_datos(fila: Dict) -> bool:
+    return any(fila.get(campo) is not None for campo in CAMPOS_CLIMA)
+
+
+def _descargar_open_meteo(latitud: float, longitud: float, inicio: date, fin: date) -> List[Dict]:
+    from .weather_service import OpenMeteoWeatherService
+    return OpenMeteoWeatherService.obtener_datos_historicos(latitud, longitud, inicio, fin)
+
+
+class AlmacenClima:
+    """
+    Clima diario de Open-Meteo por celda y día, descargado una sola vez
+
+    Args:
+        directorio: Raíz del almacén (default: MEDIA_ROOT/clima_celdas)
+        paso_grados: Tamaño de celda (default: settings.CLIMA_CELDA_GRADOS o 0.1°)
+        descargar: (lat, lon, inicio, fin) -> filas diarias (default: Open-Meteo)
+    """
+
+    def __init__(self, directorio: Optional[str] = None, paso_grados: Optional[float] = None,
+                 descargar: Optional[Callable[[float, float, date, date], List[Dict]]] = None):
+        self._directorio = directorio
+        self._paso_grados = paso_grados
+        self.descargar = descargar or _descargar_open_meteo
+        self._memoria: Dict[Celda, Tuple[float, Dict[str, Dict]]] = {}
+        self._locks: Dict[Celda, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.stats = {'peticiones': 0, 'dias_descargados': 0, 'dias_desde_almacen': 0}
+
+    @property
+    def directorio(self) -> str:
+        if self._directorio is None:
+            from django.conf import settings
+            self._directorio = os.path.join(str(settings.MEDIA_ROOT), 'clima_celdas')
+        return self._directorio
+
+    @property
+    def paso_grados(self) -> float:
+        if self._paso_grados is None:
+            try:
+                from django.conf import settings
+                self._paso_grados = float(getattr(settings, 'CLIMA_CELDA_GRADOS', PASO_GRADOS_POR_DEFECTO))
+            except Exception:
+                self._paso_grados = PASO_GRADOS_POR_DEFECTO
+        return self._paso_grados
+
+    def celda(self, latitud: float, longitud: float) -> Celda:
+        return celda_de(latitud, longitud, self.paso_grados)
+
+    def _ruta(self, celda: Celda) -> str:
+        return os.path.join(self.directorio, f'{celda[0]:+08.3f}_{celda[1]:+09.3f}.json')
+
+    @staticmethod
+    def _escribir_atomico(ruta: str, contenido: bytes):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _leer(self, celda: Celda) -> Dict[str, Dict]:
+        """Días guardados de la celda (en memoria mientras el archivo no cambie)"""
+        ruta = self._ruta(celda)
+        try:
+            mtime = os.stat(ruta).st_mtime
+        except OSError:
+            return {}
+        en_memoria = self._memoria.get(celda)
+        if en_memoria is not None and en_memoria[0] == mtime:
+            return en_memoria[1]
+        try:
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                dias = json.load(archivo)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Archivo de clima de la celda {celda} ilegible ({ruta}): {e}")
+            return {}
+        self._memoria[celda] = (mtime, dias)
+        return dias
+
+    def _guardar(self, celda: Celda, dias: Dict[str, Dict]):
+        ruta = self._ruta(celda)
+        self._escribir_atomico(ruta, json.dumps(dias, sort_keys=True).encode('utf-8'))
+        self._memoria[celda] = (os.stat(ruta).st_mtime, dias)
+
+    def _lock_celda(self, celda: Celda) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(celda, threading.Lock())
+
+    def _bloqueo_entre_procesos(self, celda: Celda):
+        """Archivo de bloqueo de la celda (None si no hay flock)"""
+        if not FCNTL_AVAILABLE:
+            return None
+        os.makedirs(self.directorio, exist_ok=True)
+        archivo = open(self._ruta(celda)[:-len('.json')] + '.lock', 'a+')
+        fcntl.flock(archivo, fcntl.LOCK_EX)
+        return archivo
+
+    def obtener_dias(self, latitud: float, longitud: float, fecha_inicio, fecha_fin) -> List[Dict]:
+        """
+        Clima diario del punto entre dos fechas (mismo formato que
+        OpenMeteoWeatherService.obtener_datos_historicos); solo descarga
+        los días que la celda todavía no tiene
+        """
+        inicio, fin = _a_fecha(fecha_inicio), _a_fecha(fecha_fin)
+        celda = self.celda(latitud, longitud)
+        rango = [dia.isoformat() for dia in _dias(inicio, fin)]
+
+        with self._lock_celda(celda):
+            bloqueo = self._bloqueo_entre_procesos(celda)
+            try:
+                dias = self._leer(celda)
+                faltantes = [dia for dia in _dias(inicio, fin) if dia.isoformat() not in dias]
+                if faltantes:
+                    dias = dict(dias)
+                    nuevos = self._descargar_faltantes(celda, faltantes, dias)
+                    if nuevos:
+                        self._guardar(celda, dias)
+            finally:
+                if bloqueo is not None:
+                    fcntl.flock(bloqueo, fcntl.LOCK_UN)
+                    bloqueo.close()
+
+        self.stats['dias_desde_almacen'] += len(rango) - len(faltantes)
+        return [dias[dia] for dia in rango if dia in dias]
+
+    def _descargar_faltantes(self, celda: Celda, faltantes: List[date], dias: Dict[str, Dict]) -> int:
+        """Pide los rangos faltantes a la API y los agrega a `dias`; devuelve los días nuevos"""
+        limite_publicado = date.today() - timedelta(days=RETRASO_ARCHIVO_DIAS)
+        nuevos = 0
+        for inicio, fin in rangos_faltantes(faltantes):
+            logger.info(f"🌦️ Clima celda {celda}: descargando {inicio} a {fin}")
+            self.stats['peticiones'] += 1
+            for fila in self.descargar(celda[0], celda[1], inicio, fin) or []:
+                fecha = str(fila.get('fecha', ''))[:10]
+                if not (inicio.isoformat() <= fecha <= fin.isoformat()) or fecha in dias:
+                    continue
+                if not _tiene_datos(fila) and fecha > limite_publicado.isoformat():
+                    continue  # Aún no publicado: se vuelve a pedir en la próxima consulta
+                dias[fecha] = dict(fila, fecha=fecha)
+                nuevos += 1
+        self.stats['dias_descargados'] += nuevos
+        return nuevos
+
+    def clima_mensual(self, latitud: float, longitud: float, fecha_inicio, fecha_fin) -> pd.DataFrame:
+        """Clima agregado por (año, mes) con las columnas de CAMPOS_CLIMA"""
+        return agregar_clima_por_mes(self.obtener_dias(latitud, longitud, fecha_inicio, fecha_fin))
+
+
+_almacen_global: Optional[AlmacenClima] = None
+_almacen_lock = threading.Lock()
+
+
+def obtener_almacen_clima() -> AlmacenClima:
+    """Almacén único por proceso (las celdas leídas quedan en memoria)"""
+    global _almacen_global
+    if _almacen_global is None:
+        with _almacen_lock:
+            if _almacen_global is None:
+                _almacen_global = AlmacenClima()
+    return _almacen_global
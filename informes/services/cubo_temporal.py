@@ -0,0 +1,434 @@
+"""
+Cubo temporal persistente por parcela
+Bandas NDVI/NDMI/SAVI [meses, alto, ancho] en disco, abiertas con memmap
+para que el cerebro de diagnóstico, el analizador de series temporales y
+el exportador de video lean el mismo cubo sin copiarlo a RAM.
+
+Estructura (MEDIA_ROOT/cubos_temporales/parcela_<id>/):
+- ndvi.f32, ndmi.f32, savi.f32: float32 crudo en orden C; el eje de meses
+  es el primero, así que agregar un mes es escribir al final del archivo
+- meta.json: shape (alto, ancho), geo_transform, fechas 'YYYY-MM' en
+  orden cronológico, view_id de la escena de cada mes y huella de la
+  geometría de la parcela. Se reescribe (atómico) después de los datos:
+  bytes de un append interrumpido quedan fuera del cubo y se truncan en
+  el siguiente
+
+Un mes cuyo view_id cambió (p. ej. EOSDA reprocesó la escena) se
+reescribe al sincronizar; si cambió la geometría de la parcela la rejilla
+ya no sirve y el cubo se descarta al abrirlo con para_parcela().
+
+Los meses se leen por rebanada (cubo[i]) sin cargar el cubo completo.
+Solo guarda píxeles reales; los cubos sintéticos no se persisten.
+
+No importa Django al cargar el módulo: el directorio por defecto se
+resuelve al usarlo.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .rasters_eosda import INDICES_RASTER, rasters_por_mes, remuestrear_a_rejilla
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo bloqueo entre hilos
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+VERSION_CUBO = 2
+
+
+def huella_geometria(geometria) -> Optional[str]:
+    """Hash corto de la geometría (GEOS/shapely por WKB, si no su texto)"""
+    if geometria is None:
+        return None
+    wkb = getattr(geometria, 'wkb', None)
+    datos = bytes(wkb) if wkb is not None else str(geometria).encode('utf-8')
+    return hashlib.sha256(datos).hexdigest()[:16]
+
+
+class CuboTemporalParcela:
+    """
+    Cubo [meses, alto, ancho] por índice de una parcela
+
+    Args:
+        directorio: Carpeta del cubo (ver para_parcela())
+        indices: Bandas del cubo
+        geometria: Huella de la geometría de la parcela (huella_geometria());
+                   un cubo guardado con otra huella no se reutiliza
+    """
+
+    _locks: Dict[str, threading.Lock] = {}
+    _locks_guard = threading.Lock()
+
+    def __init__(self, directorio: str, indices: Sequence[str] = INDICES_RASTER,
+                 geometria: Optional[str] = None):
+        self.directorio = directorio
+        self.indices = tuple(indices)
+        self.geometria = geometria
+        self._meta = None
+        self._memmaps: Dict[Tuple[str, int], np.memmap] = {}
+
+    @classmethod
+    def para_parcela(cls, parcela_id: int, directorio_base: Optional[str] = None,
+                     geometria=None) -> 'CuboTemporalParcela':
+        """
+        Cubo de la parcela
+
+        Args:
+            geometria: Geometría actual de la parcela; si no coincide con la
+                       del cubo guardado, el cubo se elimina
+        """
+        if directorio_base is None:
+            from django.conf import settings
+            directorio_base = os.path.join(str(settings.MEDIA_ROOT), 'cubos_temporales')
+        cubo = cls(os.path.join(directorio_base, f'parcela_{parcela_id}'),
+                   geometria=huella_geometria(geometria))
+        if cubo.meta is not None and not cubo._geometria_vigente(cubo.meta):
+            logger.info(f"🧊 Geometría de la parcela {parcela_id} cambió: se descarta su cubo temporal")
+            cubo.eliminar()
+        return cubo
+
+    def _geometria_vigente(self, meta: Dict) -> bool:
+        # Cubos sin huella (versión 1) no se pueden validar: se reconstruyen
+        return self.geometria is None or meta.get('geometria') == self.geometria
+
+    # ------------------------------------------------------------------
+    # Metadatos
+    # ------------------------------------------------------------------
+
+    @property
+    def _ruta_meta(self) -> str:
+        return os.path.join(self.directorio, 'meta.json')
+
+    def _ruta_banda(self, indice: str) -> str:
+        return os.path.join(self.directorio, f'{indice.lower()}.f32')
+
+    def recargar(self) -> Optional[Dict]:
+        """Relee meta.json (otro proceso pudo agregar meses)"""
+        try:
+            with open(self._ruta_meta, 'r', encoding='utf-8') as archivo:
+                self._meta = json.load(archivo)
+        except FileNotFoundError:
+            self._meta = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ meta.json del cubo corrupto ({self.directorio}): {e}")
+            self._meta = None
+        return self._meta
+
+    @property
+    def meta(self) -> Optional[Dict]:
+        if self._meta is None:
+            self.recargar()
+        return self._meta
+
+    @property
+    def existe(self) -> bool:
+        return bool(self.meta and self.meta.get('fechas'))
+
+    @property
+    def fechas(self) -> List[str]:
+        return list(self.meta['fechas']) if self.meta else []
+
+    @property
+    def num_meses(self) -> int:
+        return len(self.fechas)
+
+    @property
+    def view_ids(self) -> Dict[str, str]:
+        """view_id de la escena guardada en cada mes ('YYYY-MM' → view_id)"""
+        return dict(self.meta.get('view_ids') or {}) if self.meta else {}
+
+    @property
+    def shape(self) -> Optional[Tuple[int, int]]:
+        return tuple(self.meta['shape']) if self.meta else None
+
+    @property
+    def geo_transform(self) -> Optional[Tuple]:
+        geo_transform = self.meta.get('geo_transform') if self.meta else None
+        return tuple(geo_transform) if geo_transform else None
+
+    def _escribir_meta(self, meta: Dict):
+        meta = dict(meta, actualizado_en=datetime.now().isoformat())
+        temporal = f"{self._ruta_meta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(meta, archivo)
+        os.replace(temporal, self._ruta_meta)
+        self._meta = meta
+        self._memmaps.clear()
+
+    @contextmanager
+    def _bloqueo(self):
+        """Exclusión entre hilos (lock por directorio) y entre procesos (flock)"""
+        with self._locks_guard:
+            lock = self._locks.setdefault(os.path.abspath(self.directorio), threading.Lock())
+        with lock:
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(os.path.join(self.directorio, '.lock'), 'a') as archivo_lock:
+                if fcntl is not None:
+                    fcntl.flock(archivo_lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(archivo_lock, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # Lectura (sin copias)
+    # ------------------------------------------------------------------
+
+    def banda(self, indice: str) -> Optional[np.memmap]:
+        """Cubo completo del índice como memmap de solo lectura"""
+        if not self.existe:
+            return None
+        n = self.num_meses
+        clave = (indice.lower(), n)
+        if clave not in self._memmaps:
+            self._memmaps[clave] = np.memmap(self._ruta_banda(indice), dtype=np.float32, mode='r',
+                                             shape=(n,) + self.shape)
+        return self._memmaps[clave]
+
+    def posiciones(self, fechas: Optional[Iterable[str]] = None) -> List[int]:
+        """Posiciones en el eje temporal de las fechas pedidas que están en el cubo"""
+        if fechas is None:
+            return list(range(self.num_meses))
+        posicion_por_fecha = {fecha: i for i, fecha in enumerate(self.fechas)}
+        return sorted({posicion_por_fecha[f] for f in fechas if f in posicion_por_fecha})
+
+    def _seleccionar(self, cubo: np.ndarray, posiciones: List[int]) -> np.ndarray:
+        # Meses consecutivos → rebanada (vista sobre el memmap); si no, copia
+        if posiciones == list(range(posiciones[0], posiciones[-1] + 1)):
+            return cubo[posiciones[0]:posiciones[-1] + 1]
+        return cubo[posiciones]
+
+    def mes(self, indice: str, fecha: str) -> Optional[np.ndarray]:
+        """Capa [alto, ancho] de un mes ('YYYY-MM'), vista sobre el memmap"""
+        posiciones = self.posiciones([fecha])
+        if not posiciones:
+            return None
+        return self.banda(indice)[posiciones[0]]
+
+    def rebanada(self, fechas: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """
+        Cubos de las fechas pedidas presentes en el cubo
+
+        Returns:
+            {'cubos': {'ndvi': ..., 'ndmi': ..., 'savi': ...}, 'fechas': [...],
+             'geo_transform': ..., 'shape': (H, W)} o None si no hay ninguna
+        """
+        posiciones = self.posiciones(fechas)
+        if not posiciones:
+            return None
+        todas = self.fechas
+        return {
+            'cubos': {indice: self._seleccionar(self.banda(indice), posiciones) for indice in self.indices},
+            'fechas': [todas[i] for i in posiciones],
+            'geo_transform': self.geo_transform,
+            'shape': self.shape,
+        }
+
+    def como_data_cubes(self, fechas: Optional[Iterable[str]] = None) -> Optional[Dict]:
+        """Formato data_cubes_temporales de triangular_y_diagnosticar()"""
+        seleccion = self.rebanada(fechas)
+        if seleccion is None:
+            return None
+        datos = {f'{indice}_cube': cubo for indice, cubo in seleccion['cubos'].items()}
+        datos.update(fechas=seleccion['fechas'], num_meses=len(seleccion['fechas']))
+        return datos
+
+    def serie_promedio(self, indice: str, fechas: Optional[Iterable[str]] = None,
+                       mascara: Optional[np.ndarray] = None) -> Tuple[List[str], np.ndarray]:
+        """
+        Promedio espacial por mes, leyendo una capa a la vez
+
+        Args:
+            mascara: Píxeles a promediar (p. ej. máscara de cultivo)
+
+        Returns:
+            (fechas, valores) con NaN en meses sin píxeles válidos
+        """
+        posiciones = self.posiciones(fechas)
+        cubo = self.banda(indice)
+        valores = np.full(len(posiciones), np.nan)
+        for i, posicion in enumerate(posiciones):
+            capa = cubo[posicion] if mascara is None else cubo[posicion][mascara]
+            validos = capa[np.isfinite(capa)]
+            if validos.size:
+                valores[i] = float(validos.mean())
+        todas = self.fechas
+        return [todas[i] for i in posiciones], valores
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def agregar_meses(self, capas: Sequence[Tuple[str, Dict[str, np.ndarray]]],
+                      geo_transform: Optional[Tuple] = None,
+                      view_ids: Optional[Dict[str, str]] = None) -> List[str]:
+        """
+        Agrega (o reemplaza) meses
+
+        Meses posteriores al último se escriben al final de cada banda; un
+        mes anterior obliga a reescribir las bandas en orden.
+
+        Args:
+            capas: [('YYYY-MM', {'ndvi': [alto, ancho], ...}), ...] en la rejilla
+                   del cubo (la del primer mes si el cubo es nuevo)
+            geo_transform: Georreferencia de la rejilla (solo al crear el cubo)
+            view_ids: Escena de cada mes escrito ('YYYY-MM' → view_id)
+
+        Returns:
+            Fechas nuevas agregadas
+        """
+        if not capas:
+            return []
+
+        with self._bloqueo():
+            meta = self.recargar()
+            if meta is not None and not self._geometria_vigente(meta):
+                # Otro proceso guardó el cubo con la geometría anterior: se
+                # empieza de cero (el append trunca las bandas a 0 meses)
+                meta = None
+            if meta is None:
+                alto, ancho = np.shape(capas[0][1][self.indices[0]])
+                meta = {
+                    'version': VERSION_CUBO,
+                    'shape': [int(alto), int(ancho)],
+                    'geo_transform': list(geo_transform) if geo_transform else None,
+                    'indices': list(self.indices),
+                    'geometria': self.geometria,
+                    'fechas': [],
+                    'view_ids': {},
+                }
+            shape = tuple(meta['shape'])
+            for fecha, capa in capas:
+                for indice in self.indices:
+                    if np.shape(capa[indice]) != shape:
+                        raise ValueError(f"Capa {indice} {fecha} con shape {np.shape(capa[indice])}, "
+                                         f"el cubo es {shape}")
+
+            fechas = list(meta['fechas'])
+            existentes = {fecha: i for i, fecha in enumerate(fechas)}
+            nuevas = dict((fecha, capa) for fecha, capa in capas if fecha not in existentes)
+            reemplazos = [(existentes[fecha], capa) for fecha, capa in capas if fecha in existentes]
+
+            if reemplazos:
+                for indice in self.indices:
+                    cubo = np.memmap(self._ruta_banda(indice), dtype=np.float32, mode='r+',
+                                     shape=(len(fechas),) + shape)
+                    for posicion, capa in reemplazos:
+                        cubo[posicion] = capa[indice]
+                    cubo.flush()
+                    del cubo
+
+            orden_nuevas = sorted(nuevas)
+            if orden_nuevas and fechas and orden_nuevas[0] < fechas[-1]:
+                self._reescribir(fechas, nuevas, shape)
+                fechas = sorted(fechas + orden_nuevas)
+            elif orden_nuevas:
+                bytes_por_mes = shape[0] * shape[1] * 4
+                for indice in self.indices:
+                    ruta = self._ruta_banda(indice)
+                    with open(ruta, 'ab') as archivo:
+                        archivo.truncate(len(fechas) * bytes_por_mes)
+                        for fecha in orden_nuevas:
+                            archivo.write(np.ascontiguousarray(nuevas[fecha][indice], dtype=np.float32).tobytes())
+                        archivo.flush()
+                        os.fsync(archivo.fileno())
+                fechas = fechas + orden_nuevas
+
+            if orden_nuevas or reemplazos:
+                escenas = dict(meta.get('view_ids') or {})
+                escenas.update({fecha: view_id for fecha, view_id in (view_ids or {}).items() if view_id})
+                self._escribir_meta(dict(meta, fechas=fechas, view_ids=escenas))
+                logger.info(f"🧊 Cubo temporal {os.path.basename(self.directorio)}: "
+                            f"+{len(orden_nuevas)} meses, {len(reemplazos)} reemplazados "
+                            f"({len(fechas)} meses, {shape[0]}x{shape[1]})")
+            return orden_nuevas
+
+    def _reescribir(self, fechas: List[str], nuevas: Dict[str, Dict], shape: Tuple[int, int]):
+        """Intercala meses anteriores reescribiendo cada banda (reemplazo atómico)"""
+        orden = sorted(fechas + list(nuevas))
+        posicion_actual = {fecha: i for i, fecha in enumerate(fechas)}
+        for indice in self.indices:
+            ruta = self._ruta_banda(indice)
+            actual = (np.memmap(ruta, dtype=np.float32, mode='r', shape=(len(fechas),) + shape)
+                      if fechas else None)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, 'wb') as archivo:
+                for fecha in orden:
+                    capa = nuevas[fecha][indice] if fecha in nuevas else actual[posicion_actual[fecha]]
+                    archivo.write(np.ascontiguousarray(capa, dtype=np.float32).tobytes())
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            del actual
+            os.replace(temporal, ruta)
+
+    def sincronizar_desde_rasters(self, meses: Iterable, field_id: str, descargador) -> Dict:
+        """
+        Agrega los meses que faltan con los rasters de EOSDA (caché en disco)
+
+        Un cubo nuevo toma la rejilla del mes más reciente; los siguientes
+        meses se remuestrean a esa rejilla. Un mes guardado con otro view_id
+        (escena reprocesada) se vuelve a descargar y se reescribe.
+
+        Args:
+            meses: Objetos con año, mes y view_id_imagen (p. ej. IndiceMensual)
+            field_id: Campo EOSDA
+            descargador: DescargadorRastersEOSDA
+
+        Returns:
+            {'nuevos': [...], 'actualizados': [...], 'sin_raster': [...]}
+        """
+        presentes = set(self.fechas)
+        escenas = self.view_ids
+
+        def desactualizado(registro) -> bool:
+            fecha = f"{registro.año}-{registro.mes:02d}"
+            if fecha not in presentes:
+                return True
+            view_id = getattr(registro, 'view_id_imagen', None)
+            return bool(view_id) and escenas.get(fecha) != view_id
+
+        faltantes = [m for m in meses if desactualizado(m)]
+        if not faltantes:
+            return {'nuevos': [], 'actualizados': [], 'sin_raster': []}
+
+        capas, sin_raster = rasters_por_mes(faltantes, field_id, descargador)
+        if not capas:
+            return {'nuevos': [], 'actualizados': [], 'sin_raster': sin_raster}
+
+        if self.existe:
+            shape, geo_transform = self.shape, self.geo_transform
+        else:
+            referencia = capas[-1][1][self.indices[0]]
+            shape, geo_transform = tuple(referencia.shape), referencia.geo_transform
+
+        nuevas = [
+            (fecha, {indice: remuestrear_a_rejilla(rasters[indice], shape, geo_transform)
+                     for indice in self.indices})
+            for fecha, rasters in capas
+        ]
+        view_ids = {f"{m.año}-{m.mes:02d}": getattr(m, 'view_id_imagen', None) for m in faltantes}
+        return {
+            'nuevos': self.agregar_meses(nuevas, geo_transform, view_ids),
+            'actualizados': [fecha for fecha, _ in capas if fecha in presentes],
+            'sin_raster': sin_raster,
+        }
+
+    def eliminar(self):
+        """Borra el cubo (p. ej. si cambió la geometría de la parcela)"""
+        with self._bloqueo():
+            shutil.rmtree(self.directorio, ignore_errors=True)
+        self._meta = None
+        self._memmaps.clear()
@@ -13,6 +13,9 @@ from django.utils import timezone
 from typing import Dict, List, Optional, Tuple
 import time
 
+from .eosda_poller import obtener_limitador_eosda
+from .rasters_eosda import DescargadorRastersEOSDA
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,6 +82,9 @@ class EosdaAPIService:
         
         # Cache para la lista de tipos de cultivo válidos
         self._cultivos_validos_cache = None
+        
+        # Descargador de rasters (se crea al primer uso)
+        self._descargador_rasters = None
     
     def validar_configuracion(self) -> bool:
         """
@@ -541,6 +547,7 @@ class EosdaAPIService:
             logger.info(f"Solicitando datos {indice} para field_id {field_id} desde {start_date} hasta {end_date}")
             
             # Crear tarea
+            obtener_limitador_eosda().adquirir()  # Presupuesto global de peticiones
             response = self.session.post(url, json=payload, timeout=60)
             
             if response.status_code not in [200, 201, 202]:
@@ -565,94 +572,97 @@ class EosdaAPIService:
             logger.error(f"Error procesando {indice}: {str(e)}")
             return []
     
+    @property
+    def descargador_rasters(self) -> DescargadorRastersEOSDA:
+        """Descargador de rasters Field Imagery con caché en disco (uno por servicio)"""
+        if self._descargador_rasters is None:
+            self._descargador_rasters = DescargadorRastersEOSDA(self.session, self.base_url)
+        return self._descargador_rasters
+    
+    def _buscar_view_id(self, field_id: str, fecha: date, dias_atras: int = 30) -> Optional[Dict]:
+        """
+        Escena con menor nubosidad en [fecha - dias_atras, fecha] según lo ya
+        consultado (caché mensual de Statistics API o IndiceMensual); 0 requests
+        """
+        from informes.models import CacheMesEOSDA, IndiceMensual
+        
+        fecha_inicio = fecha - timedelta(days=dias_atras)
+        candidatas = []
+        meses = set(CacheMesEOSDA.meses_en_rango(fecha_inicio, fecha))
+        registros = CacheMesEOSDA.objects.filter(
+            field_id=field_id, año__in={año for año, _ in meses}
+        )
+        for registro in registros:
+            if (registro.año, registro.mes) not in meses:
+                continue
+            for escena in registro.escenas_json:
+                fecha_escena = CacheMesEOSDA.fecha_escena(escena)
+                if escena.get('view_id') and fecha_escena and fecha_inicio <= fecha_escena <= fecha:
+                    candidatas.append({
+                        'view_id': escena['view_id'],
+                        'fecha': fecha_escena,
+                        'nubosidad': escena.get('cloud') or 0
+                    })
+        if candidatas:
+            return min(candidatas, key=lambda c: (c['nubosidad'], -c['fecha'].toordinal()))
+        
+        registro = IndiceMensual.objects.filter(
+            parcela__eosda_field_id=field_id, año=fecha.year, mes=fecha.month,
+            view_id_imagen__isnull=False
+        ).first()
+        if registro:
+            return {
+                'view_id': registro.view_id_imagen,
+                'fecha': registro.fecha_imagen,
+                'nubosidad': registro.nubosidad_imagen
+            }
+        return None
+    
     def obtener_array_indice(self, field_id: str, indice: str, 
-                            fecha: date) -> Optional[Dict]:
+                            fecha: date, view_id: Optional[str] = None) -> Optional[Dict]:
         """
         Obtiene el array NumPy de un índice satelital para diagnóstico
         
-        NOTA: Implementación temporal con datos sintéticos.
-        TODO: Integrar con EOSDA Field Imagery API para obtener GeoTIFF real
+        Descarga el GeoTIFF de Field Imagery una sola vez por view_id/índice
+        y lo sirve desde el caché en disco (memmap) en llamadas siguientes.
         
         Args:
             field_id: ID del campo en EOSDA
             indice: 'ndvi', 'ndmi' o 'savi'
-            fecha: Fecha de la imagen
+            fecha: Fecha de la imagen (se usa la escena más limpia de los 30 días previos)
+            view_id: Escena exacta (opcional, evita la búsqueda)
             
         Returns:
-            Dict con 'array', 'bbox', 'metadata' o None si falla
+            Dict con 'array' (float32, NaN = sin dato), 'bbox', 'geo_transform',
+            'metadata' o None si falla
         """
         try:
-            import numpy as np
-            
             logger.info(f"📡 Obteniendo array {indice.upper()} para field {field_id}")
             
-            # TODO: Implementar descarga real de GeoTIFF desde EOSDA
-            # Por ahora, generar datos sintéticos realistas basados en histórico
-            
-            # Obtener datos históricos para usar como base
-            fecha_fin = fecha
-            fecha_inicio = fecha - timedelta(days=30)
-            
-            datos_historicos = self._obtener_indice_temporal_por_field_id(
-                field_id, indice.upper(), fecha_inicio, fecha_fin
-            )
-            
-            if not datos_historicos:
-                logger.warning(f"No hay datos históricos para {indice}")
-                return None
+            escena = {'view_id': view_id, 'fecha': fecha, 'nubosidad': None}
+            if not view_id:
+                escena = self._buscar_view_id(field_id, fecha)
+                if not escena:
+                    logger.warning(f"No hay escenas con view_id para {field_id} cerca de {fecha}")
+                    return None
             
-            # Usar el último valor como referencia para generar array sintético
-            ultimo = datos_historicos[-1] if datos_historicos else None
-            if not ultimo:
+            raster = self.descargador_rasters.obtener(field_id, escena['view_id'], indice)
+            if raster is None:
                 return None
             
-            valor_base = ultimo.get('mean', 0.5)
-            
-            # Generar array sintético realista (100x100 pixels)
-            # Con variación espacial basada en el valor promedio histórico
-            shape = (100, 100)
-            
-            # Crear base con variación gaussiana
-            array = np.random.normal(valor_base, 0.15, shape)
-            
-            # Clipear a rangos válidos según el índice
-            if indice.lower() in ['ndvi', 'ndmi', 'savi']:
-                array = np.clip(array, -1.0, 1.0)
-            
-            # Añadir algunas zonas con valores más bajos (simulando problemas)
-            # para que el diagnóstico tenga algo que detectar
-            num_zonas_criticas = np.random.randint(1, 4)
-            for _ in range(num_zonas_criticas):
-                y, x = np.random.randint(20, 80, size=2)
-                radio = np.random.randint(5, 15)
-                
-                # Crear máscara circular
-                yy, xx = np.ogrid[:shape[0], :shape[1]]
-                mascara = (yy - y)**2 + (xx - x)**2 <= radio**2
-                
-                # Aplicar valor bajo en la zona
-                if indice.lower() == 'ndvi':
-                    array[mascara] = np.random.uniform(0.2, 0.4)
-                elif indice.lower() == 'ndmi':
-                    array[mascara] = np.random.uniform(-0.1, 0.05)
-                elif indice.lower() == 'savi':
-                    array[mascara] = np.random.uniform(0.15, 0.35)
-            
-            # BBox aproximado (Colombia - ajustar según parcela real)
-            bbox = [-74.0, 4.4, -73.9, 4.5]
-            
-            logger.info(f"✅ Array generado: shape={shape}, rango=[{array.min():.3f}, {array.max():.3f}]")
-            
             return {
-                'array': array,
-                'bbox': bbox,
+                'array': raster.array,
+                'bbox': raster.bbox,
+                'geo_transform': raster.geo_transform,
                 'metadata': {
-                    'fecha': fecha.isoformat(),
+                    'fecha': escena['fecha'].isoformat() if escena.get('fecha') else fecha.isoformat(),
                     'indice': indice,
-                    'fuente': 'sintético_temporal',  # Cambiar a 'eosda' cuando esté implementado
+                    'fuente': 'eosda',
+                    'view_id': escena['view_id'],
+                    'nubosidad': escena.get('nubosidad'),
+                    'hash_contenido': raster.hash_contenido,
                     'resolucion_m': 10.0,
-                    'shape': shape,
-                    'valor_promedio_historico': valor_base
+                    'shape': raster.shape
                 }
             }
             
@@ -736,6 +746,7 @@ class EosdaAPIService:
             logger.info(f"Solicitando datos {indice} desde {start_date} hasta {end_date}")
             
             # Crear tarea
+            obtener_limitador_eosda().adquirir()  # Presupuesto global de peticiones
             response = self.session.post(url, json=payload, timeout=60)
             
             if response.status_code not in [200, 201, 202]:
@@ -763,52 +774,15 @@ class EosdaAPIService:
     def _obtener_resultados_tarea(self, task_id: str, indice: str, max_intentos: int = 20) -> List[Dict]:
         """
         Obtiene los resultados de una tarea asíncrona de EOSDA Statistics
-        Aumentado a 20 intentos (100 segundos) para batch requests
+        Usa el poller con backoff exponencial y el limitador global de peticiones
         """
-        try:
-            url = f"{self.base_url}/api/gdw/api/{task_id}"
-            
-            for intento in range(max_intentos):
-                response = self.session.get(url, timeout=30)
-                
-                if response.status_code != 200:
-                    logger.warning(f"❌ Error consultando tarea {task_id}: {response.status_code}")
-                    if response.status_code == 429:
-                        logger.warning(f"Rate limit alcanzado en intento {intento+1}/{max_intentos}")
-                        time.sleep(10)  # Esperar más en rate limit
-                        continue
-                    return []
-                
-                data = response.json()
-                
-                # Debug: Ver el estado completo de la respuesta
-                logger.debug(f"Intento {intento+1}/{max_intentos} - Estado tarea: {data.get('status', 'unknown')}")
-                
-                # Verificar si hay resultados
-                if 'result' in data and data['result']:
-                    logger.info(f"✅ Datos obtenidos para {indice}: {len(data['result'])} escenas")
-                    return self._procesar_datos_estadisticas(data['result'], indice)
-                
-                # Verificar si la tarea aún está procesando
-                status = data.get('status')
-                if status in ['pending', 'processing', 'running']:
-                    logger.info(f"⏳ Tarea {task_id} aún procesando... ({intento+1}/{max_intentos})")
-                
-                # Verificar si hay errores
-                if 'errors' in data and data['errors']:
-                    logger.error(f"❌ Errores en tarea {task_id}: {data['errors'][:200]}")
-                    return []
-                
-                # Esperar antes del siguiente intento
-                if intento < max_intentos - 1:
-                    time.sleep(5)  # 5 segundos entre intentos
-            
-            logger.warning(f"⏱️ Timeout esperando resultados para {indice}, tarea {task_id}")
-            return []
-            
-        except Exception as e:
-            logger.error(f"❌ Error obteniendo resultados de tarea {task_id}: {str(e)}")
+        resultado = self.esperar_resultados_tareas([task_id], max_consultas=max_intentos)[task_id]
+        if not resultado.exitosa or not resultado.resultados:
+            logger.warning(f"⏱️ Sin resultados para {indice}, tarea {task_id}: {resultado.mensaje or resultado.estado}")
             return []
+        
+        logger.info(f"✅ Datos obtenidos para {indice}: {len(resultado.resultados)} escenas")
+        return self._procesar_datos_estadisticas(resultado.resultados, indice)
 
     def _procesar_datos_estadisticas(self, resultados: List[Dict], indice: str) -> List[Dict]:
         """
@@ -863,62 +837,30 @@ class EosdaAPIService:
     
     def _obtener_resultados_tarea_lento(self, task_id: str, max_intentos: int = 15) -> List[Dict]:
         """
-        Obtiene resultados de tarea con delays más largos para evitar rate limits.
-        Usa 10 segundos entre intentos (6 requests/minuto vs 10/minuto del API)
+        Obtiene resultados crudos de una tarea (escenas de mt_stats)
+        
+        Antes hacía polling fijo cada 10s; ahora delega en el poller asíncrono,
+        que aplica backoff con jitter, respeta 429/Retry-After y comparte el
+        presupuesto de peticiones con el resto de workers.
         """
-        try:
-            url = f"{self.base_url}/api/gdw/api/{task_id}"
-            
-            for intento in range(max_intentos):
-                # Delay ANTES de cada petición (excepto la primera)
-                if intento > 0:
-                    logger.debug(f"⏳ Esperando 10s antes de intento {intento+1}...")
-                    time.sleep(10)  # 10 segundos entre peticiones
-                
-                response = self.session.get(url, timeout=30)
-                
-                if response.status_code != 200:
-                    if response.status_code == 429:
-                        logger.warning(f"⚠️ Rate limit en intento {intento+1}/{max_intentos}, esperando 15s...")
-                        time.sleep(15)
-                        continue
-                    logger.error(f"❌ Error {response.status_code} consultando tarea")
-                    return []
-                
-                data = response.json()
-                status = data.get('status', 'unknown')
-                
-                # Log de debug cada 3 intentos
-                if intento % 3 == 0:
-                    logger.debug(f"   Debug intento {intento+1}: status={status}, keys={list(data.keys())}")
-                
-                # Verificar si hay resultados
-                if 'result' in data and data['result']:
-                    logger.info(f"✅ Resultados obtenidos: {len(data['result'])} escenas")
-                    return data['result']
-                
-                # Verificar si está procesando
-                if status in ['pending', 'processing', 'running', 'unknown']:
-                    if status == 'unknown':
-                        logger.debug(f"   Status desconocido, continuando polling ({intento+1}/{max_intentos})")
-                    else:
-                        logger.info(f"   Procesando... ({intento+1}/{max_intentos}, status: {status})")
-                    continue
-                
-                # Verificar errores
-                if 'errors' in data and data['errors']:
-                    logger.error(f"❌ Errores en tarea: {data['errors'][:300]}")
-                    return []
-                
-                # Si no hay result ni está procesando, seguir intentando
-                logger.debug(f"   Status: {status}, sin resultados aún")
-            
-            logger.warning(f"⏱️ Timeout después de {max_intentos} intentos ({max_intentos * 10}s)")
-            return []
+        resultado = self.esperar_resultados_tareas([task_id], max_consultas=max_intentos)[task_id]
+        if not resultado.exitosa:
+            logger.warning(f"⏱️ Tarea {task_id}: {resultado.mensaje or resultado.estado}")
+        return resultado.resultados
+    
+    def esperar_resultados_tareas(self, task_ids: List[str], **opciones_poller) -> Dict:
+        """
+        Espera varias tareas de Statistics API a la vez (síncrono)
+        
+        Args:
+            task_ids: IDs de tareas ya creadas con POST /api/gdw/api
+            **opciones_poller: espera_inicial, espera_maxima, timeout_total, max_consultas...
             
-        except Exception as e:
-            logger.error(f"❌ Error obteniendo resultados: {str(e)}")
-            return []
+        Returns:
+            {task_id: ResultadoTarea}
+        """
+        from .eosda_poller import esperar_tareas_sync
+        return esperar_tareas_sync(self.session, self.base_url, task_ids, **opciones_poller)
     
     def _obtener_datos_climaticos(self, geojson: Dict, 
                                  fecha_inicio: date, fecha_fin: date) -> List[Dict]:
@@ -1281,11 +1223,15 @@ class EosdaAPIService:
                                 max_nubosidad: int = 50) -> Dict:
         """
         Método optimizado usando Statistics API de EOSDA con geometría:
-        1. Consulta caché primero (0 requests si existe)
-        2. Usa Statistics API con geometría (autenticación correcta)
-        3. Hace UNA petición con todos los índices
+        1. Consulta el caché mensual (CacheMesEOSDA) mes por mes
+        2. Agrupa los meses faltantes en huecos contiguos
+        3. Hace UNA petición Statistics API por hueco con todos los índices
         4. Polling con delays más largos para evitar rate limits
-        5. Guarda en caché para futuras consultas
+        5. Guarda las escenas nuevas por mes y arma la respuesta completa
+        
+        Un rango ya cubierto por consultas anteriores (aunque se hayan hecho
+        con otros rangos) consume 0 requests; uno parcialmente cubierto solo
+        consume las peticiones de los meses que faltan.
         
         Args:
             parcela: Parcela con geometría GeoJSON
@@ -1298,7 +1244,7 @@ class EosdaAPIService:
         Returns:
             Dict con los datos satelitales organizados por índice
         """
-        from informes.models import CacheDatosEOSDA, EstadisticaUsoEOSDA
+        from informes.models import CacheMesEOSDA, EstadisticaUsoEOSDA
         import json
         
         # Validar geometría y field_id
@@ -1314,147 +1260,65 @@ class EosdaAPIService:
             return {'error': f'Error geometría: {str(e)}', 'resultados': []}
         
         tiempo_inicio = time.time()
+        url = f"{self.base_url}/api/gdw/api"
         
-        # 1. CONSULTAR CACHÉ PRIMERO
-        datos_cache = CacheDatosEOSDA.obtener_o_none(
+        # 1. CONSULTAR CACHÉ MENSUAL
+        meses = CacheMesEOSDA.meses_en_rango(fecha_inicio, fecha_fin)
+        cubiertos = CacheMesEOSDA.obtener_cubiertos(
             field_id=field_id,
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin,
-            indices=indices
+            indices=indices,
+            max_nubosidad=max_nubosidad
         )
+        huecos = CacheMesEOSDA.calcular_huecos(fecha_inicio, fecha_fin, cubiertos)
         
-        if datos_cache:
-            tiempo_respuesta = time.time() - tiempo_inicio
-            
-            # Registrar uso desde caché (0 requests consumidos)
-            EstadisticaUsoEOSDA.registrar_uso(
-                usuario=usuario,
-                parcela=parcela,
-                tipo_operacion='statistics',
-                endpoint=f'/api/gdw/api (CACHE)',
-                exitoso=True,
-                tiempo_respuesta=tiempo_respuesta,
-                requests_consumidos=0,
-                desde_cache=True,
-                cache_key=CacheDatosEOSDA.generar_cache_key(
-                    field_id, fecha_inicio, fecha_fin, indices
-                )
-            )
-            
-            logger.info(f"✅ Datos obtenidos desde CACHÉ para field {field_id} - 0 requests consumidos")
-            return datos_cache
-        
-        # 2. NO HAY CACHÉ - USAR STATISTICS API CON GEOMETRÍA
-        logger.info(f"🔍 No hay caché, usando Statistics API - {len(indices)} índices en 1 petición")
+        logger.info(
+            f"🗓️ Caché mensual field {field_id}: {len(cubiertos)}/{len(meses)} meses en caché, "
+            f"{len(huecos)} hueco(s) por consultar"
+        )
         
+        # 2. CONSULTAR SOLO LOS HUECOS - UNA PETICIÓN POR HUECO
+        task_ids = []
+        codigo_respuesta = None
         try:
-            # UNA petición con TODOS los índices usando geometría
-            url = f"{self.base_url}/api/gdw/api"
-            
-            # Convertir índices a mayúsculas (requerido por EOSDA)
-            indices_mayusculas = [idx.upper() for idx in indices]
-            
-            payload = {
-                'type': 'mt_stats',
-                'params': {
-                    'bm_type': indices_mayusculas,  # NDVI, NDMI, SAVI en mayúsculas
-                    'date_start': fecha_inicio.isoformat(),
-                    'date_end': fecha_fin.isoformat(),
-                    'geometry': geometria,  # Usar geometría
-                    'sensors': ['S2L2A'],  # Sentinel-2 Level 2A
-                    'reference': f'stats_{field_id}_{datetime.now().strftime("%Y%m%d_%H%M")}',
-                    'limit': 50,
-                    'max_cloud_cover_in_aoi': max_nubosidad,
-                    'exclude_cover_pixels': True,
-                    'cloud_masking_level': 3
-                }
-            }
-            
-            logger.info(f"📡 Enviando petición Statistics API: {len(indices)} índices")
-            logger.info(f"   Índices: {', '.join(indices_mayusculas)}")
-            logger.info(f"   Geometría: {geometria['type']} con {len(geometria.get('coordinates', [[]])[0])} puntos")
-            
-            response = self.session.post(url, json=payload, timeout=60)
-            tiempo_respuesta = time.time() - tiempo_inicio
-            
-            if response.status_code not in [200, 201, 202]:
-                logger.error(f"❌ Error EOSDA: {response.status_code}")
-                logger.error(f"   Respuesta: {response.text[:500]}")
-                
-                # Registrar fallo
-                EstadisticaUsoEOSDA.registrar_uso(
-                    usuario=usuario,
-                    parcela=parcela,
-                    tipo_operacion='statistics',
-                    endpoint=url,
-                    exitoso=False,
-                    tiempo_respuesta=tiempo_respuesta,
-                    requests_consumidos=1,
-                    codigo_respuesta=response.status_code,
-                    mensaje_error=response.text[:500]
+            for desde, hasta in huecos:
+                logger.info(f"📡 Consultando hueco {desde} → {hasta}")
+                resultado = self._consultar_estadisticas_rango(
+                    geometria, field_id, desde, hasta, indices, max_nubosidad
                 )
+                codigo_respuesta = resultado.get('codigo_respuesta')
                 
-                return {'error': f'Error HTTP {response.status_code}', 'resultados': []}
-            
-            # Obtener task_id
-            task_data = response.json()
-            task_id = task_data.get('task_id')
-            
-            if not task_id:
-                logger.error("❌ No se obtuvo task_id de EOSDA")
-                return {'error': 'No task_id', 'resultados': []}
-            
-            logger.info(f"✅ Tarea creada: {task_id}")
-            
-            # 3. ESPERAR RESULTADOS CON DELAYS MÁS LARGOS
-            logger.info(f"⏳ Esperando resultados (delays de 10s para evitar rate limits)...")
-            resultados = self._obtener_resultados_tarea_lento(task_id)
-            
-            if not resultados:
-                logger.warning(f"⚠️ No se obtuvieron resultados para tarea {task_id}")
-                return {'error': 'Sin resultados', 'resultados': []}
-            
-            # 4. DATOS CLIMÁTICOS - DESHABILITADO
-            # ❌ EOSDA Weather API no tiene cobertura en Colombia
-            # Se usa Open-Meteo como alternativa (ver weather_service.py en views.py)
-            logger.info(f"ℹ️ Datos climáticos: usando Open-Meteo (EOSDA Weather deshabilitado)")
-            datos_clima = []
-            
-            # 5. GUARDAR EN CACHÉ
-            datos_formateados = {
-                'resultados': resultados,
-                'datos_clima': datos_clima,  # Siempre vacío - Open-Meteo se usa en views.py
-                'field_id': field_id,
-                'indices': indices,
-                'fecha_consulta': datetime.now().isoformat(),
-                'num_escenas': len(resultados),
-                'metodo': 'statistics_api'
-            }
-            
-            CacheDatosEOSDA.guardar_datos(
-                field_id=field_id,
-                fecha_inicio=fecha_inicio,
-                fecha_fin=fecha_fin,
-                indices=indices,
-                datos=datos_formateados,
-                task_id=task_id
-            )
-            
-            # 6. REGISTRAR ESTADÍSTICAS
-            tiempo_total = time.time() - tiempo_inicio
-            EstadisticaUsoEOSDA.registrar_uso(
-                usuario=usuario,
-                parcela=parcela,
-                tipo_operacion='statistics',
-                endpoint=url,
-                exitoso=True,
-                tiempo_respuesta=tiempo_total,
-                requests_consumidos=1,  # 1 request inicial + polling
-                codigo_respuesta=response.status_code
-            )
-            
-            logger.info(f"✅ Datos obtenidos - 1 petición, {len(resultados)} escenas, {len(datos_clima)} clima, {tiempo_total:.1f}s")
-            return datos_formateados
+                if 'error' in resultado:
+                    # Registrar fallo (los huecos ya guardados quedan en caché)
+                    EstadisticaUsoEOSDA.registrar_uso(
+                        usuario=usuario,
+                        parcela=parcela,
+                        tipo_operacion='statistics',
+                        endpoint=url,
+                        exitoso=False,
+                        tiempo_respuesta=time.time() - tiempo_inicio,
+                        requests_consumidos=len(task_ids) + 1,
+                        codigo_respuesta=codigo_respuesta,
+                        mensaje_error=resultado.get('mensaje_error', resultado['error'])[:500],
+                        meses_solicitados=len(meses),
+                        meses_desde_cache=len(cubiertos)
+                    )
+                    return {'error': resultado['error'], 'resultados': []}
+                
+                task_ids.append(resultado['task_id'])
+                if not resultado['resultados']:
+                    # Lista vacía puede ser timeout del polling: no cachear el hueco
+                    continue
+                CacheMesEOSDA.guardar_escenas(
+                    field_id=field_id,
+                    desde=desde,
+                    hasta=hasta,
+                    indices=indices,
+                    escenas=resultado['resultados'],
+                    max_nubosidad=max_nubosidad,
+                    task_id=resultado['task_id']
+                )
             
         except requests.exceptions.Timeout:
             tiempo_respuesta = time.time() - tiempo_inicio
@@ -1462,10 +1326,13 @@ class EosdaAPIService:
                 usuario=usuario,
                 parcela=parcela,
                 tipo_operacion='statistics',
-                endpoint=f'{self.base_url}/api/gdw/api',
+                endpoint=url,
                 exitoso=False,
                 tiempo_respuesta=tiempo_respuesta,
-                mensaje_error='Timeout'
+                requests_consumidos=len(task_ids) + 1,
+                mensaje_error='Timeout',
+                meses_solicitados=len(meses),
+                meses_desde_cache=len(cubiertos)
             )
             logger.error("❌ Timeout en petición Statistics API")
             return {'error': 'Timeout', 'resultados': []}
@@ -1476,13 +1343,198 @@ class EosdaAPIService:
                 usuario=usuario,
                 parcela=parcela,
                 tipo_operacion='statistics',
-                endpoint=f'{self.base_url}/api/gdw/api',
+                endpoint=url,
                 exitoso=False,
                 tiempo_respuesta=tiempo_respuesta,
-                mensaje_error=str(e)
+                requests_consumidos=len(task_ids) + 1,
+                mensaje_error=str(e),
+                meses_solicitados=len(meses),
+                meses_desde_cache=len(cubiertos)
             )
             logger.error(f"❌ Error obteniendo datos: {str(e)}", exc_info=True)
             return {'error': str(e), 'resultados': []}
+        
+        # 3. ARMAR RESPUESTA: meses del caché + meses recién guardados
+        registros = CacheMesEOSDA.obtener_cubiertos(
+            field_id=field_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            indices=indices,
+            max_nubosidad=max_nubosidad
+        )
+        resultados = self._ensamblar_escenas_cache(
+            registros.values(), fecha_inicio, fecha_fin, max_nubosidad
+        )
+        
+        if cubiertos:
+            from django.db.models import F
+            CacheMesEOSDA.objects.filter(
+                pk__in=[r.pk for r in cubiertos.values()]
+            ).update(veces_usado=F('veces_usado') + 1)
+        
+        if not resultados:
+            logger.warning(f"⚠️ No hay escenas para field {field_id} entre {fecha_inicio} y {fecha_fin}")
+            return {'error': 'Sin resultados', 'resultados': []}
+        
+        # 4. DATOS CLIMÁTICOS - DESHABILITADO
+        # ❌ EOSDA Weather API no tiene cobertura en Colombia
+        # Se usa Open-Meteo como alternativa (ver weather_service.py en views.py)
+        datos_clima = []
+        
+        datos_formateados = {
+            'resultados': resultados,
+            'datos_clima': datos_clima,  # Siempre vacío - Open-Meteo se usa en views.py
+            'field_id': field_id,
+            'indices': indices,
+            'fecha_consulta': datetime.now().isoformat(),
+            'num_escenas': len(resultados),
+            'metodo': 'statistics_api' if huecos else 'statistics_api_cache'
+        }
+        
+        # 5. REGISTRAR ESTADÍSTICAS (hit total, parcial o miss)
+        tiempo_total = time.time() - tiempo_inicio
+        EstadisticaUsoEOSDA.registrar_uso(
+            usuario=usuario,
+            parcela=parcela,
+            tipo_operacion='statistics',
+            endpoint=url if huecos else '/api/gdw/api (CACHE)',
+            exitoso=True,
+            tiempo_respuesta=tiempo_total,
+            requests_consumidos=len(huecos),  # 1 request por hueco + polling
+            desde_cache=not huecos,
+            cache_key=f"{field_id}:{CacheMesEOSDA.normalizar_indices(indices)}:{fecha_inicio}:{fecha_fin}",
+            codigo_respuesta=codigo_respuesta,
+            meses_solicitados=len(meses),
+            meses_desde_cache=len(cubiertos)
+        )
+        
+        if huecos:
+            logger.info(
+                f"✅ Datos obtenidos - {len(huecos)} petición(es), {len(cubiertos)} mes(es) desde caché, "
+                f"{len(resultados)} escenas, {tiempo_total:.1f}s"
+            )
+        else:
+            logger.info(f"✅ Datos obtenidos desde CACHÉ para field {field_id} - 0 requests consumidos")
+        return datos_formateados
+    
+    def _consultar_estadisticas_rango(self, geometria: Dict, field_id: str,
+                                      fecha_inicio: date, fecha_fin: date,
+                                      indices: List[str], max_nubosidad: int) -> Dict:
+        """
+        Crea UNA tarea Statistics API para el rango y espera sus resultados
+        
+        Returns:
+            Dict con 'task_id', 'resultados' y 'codigo_respuesta', o con
+            'error' (y 'mensaje_error') si la tarea no se pudo crear.
+            El polling no distingue "sin escenas" de "sin respuesta", así
+            que en ambos casos devuelve resultados vacíos.
+        """
+        tarea = self._crear_tarea_estadisticas(
+            geometria, field_id, fecha_inicio, fecha_fin, indices, max_nubosidad
+        )
+        if 'error' in tarea:
+            return tarea
+        
+        task_id = tarea['task_id']
+        
+        # Esperar resultados (poller con backoff y limitador global)
+        logger.info(f"⏳ Esperando resultados (backoff adaptativo + limitador global)...")
+        resultados = self._obtener_resultados_tarea_lento(task_id)
+        
+        if not resultados:
+            logger.warning(f"⚠️ No se obtuvieron resultados para tarea {task_id}")
+        
+        return {
+            'task_id': task_id,
+            'resultados': resultados,
+            'codigo_respuesta': tarea['codigo_respuesta']
+        }
+    
+    def _crear_tarea_estadisticas(self, geometria: Dict, field_id: str,
+                                  fecha_inicio: date, fecha_fin: date,
+                                  indices: List[str], max_nubosidad: int,
+                                  limitador=None) -> Dict:
+        """
+        Envía el POST mt_stats (1 request facturable) sin esperar resultados
+        
+        Args:
+            limitador: Presupuesto de peticiones a consumir (default: el global)
+        
+        Returns:
+            Dict con 'task_id' y 'codigo_respuesta', o con 'error'
+            (y 'mensaje_error') si la tarea no se pudo crear
+        """
+        url = f"{self.base_url}/api/gdw/api"
+        
+        # Convertir índices a mayúsculas (requerido por EOSDA)
+        indices_mayusculas = [idx.upper() for idx in indices]
+        
+        payload = {
+            'type': 'mt_stats',
+            'params': {
+                'bm_type': indices_mayusculas,  # NDVI, NDMI, SAVI en mayúsculas
+                'date_start': fecha_inicio.isoformat(),
+                'date_end': fecha_fin.isoformat(),
+                'geometry': geometria,  # Usar geometría
+                'sensors': ['S2L2A'],  # Sentinel-2 Level 2A
+                'reference': f'stats_{field_id}_{datetime.now().strftime("%Y%m%d_%H%M")}',
+                'limit': 50,
+                'max_cloud_cover_in_aoi': max_nubosidad,
+                'exclude_cover_pixels': True,
+                'cloud_masking_level': 3
+            }
+        }
+        
+        logger.info(f"📡 Enviando petición Statistics API: {len(indices)} índices")
+        logger.info(f"   Índices: {', '.join(indices_mayusculas)}")
+        logger.info(f"   Geometría: {geometria['type']} con {len(geometria.get('coordinates', [[]])[0])} puntos")
+        
+        (limitador or obtener_limitador_eosda()).adquirir()  # Presupuesto de peticiones
+        response = self.session.post(url, json=payload, timeout=60)
+        
+        if response.status_code not in [200, 201, 202]:
+            logger.error(f"❌ Error EOSDA: {response.status_code}")
+            logger.error(f"   Respuesta: {response.text[:500]}")
+            return {
+                'error': f'Error HTTP {response.status_code}',
+                'mensaje_error': response.text[:500],
+                'codigo_respuesta': response.status_code
+            }
+        
+        # Obtener task_id
+        task_id = response.json().get('task_id')
+        if not task_id:
+            logger.error("❌ No se obtuvo task_id de EOSDA")
+            return {'error': 'No task_id', 'codigo_respuesta': response.status_code}
+        
+        logger.info(f"✅ Tarea creada: {task_id}")
+        return {'task_id': task_id, 'codigo_respuesta': response.status_code}
+    
+    @staticmethod
+    def _ensamblar_escenas_cache(registros, fecha_inicio: date, fecha_fin: date,
+                                 max_nubosidad: int) -> List[Dict]:
+        """
+        Une las escenas de varios meses del caché en una lista ordenada por fecha
+        
+        Descarta escenas fuera del rango pedido y, si el mes se consultó con
+        una nubosidad máxima mayor, las que superan la nubosidad pedida.
+        """
+        from informes.models import CacheMesEOSDA
+        
+        escenas = []
+        for registro in registros:
+            for escena in registro.escenas_json:
+                fecha = CacheMesEOSDA.fecha_escena(escena)
+                if fecha is None or not (fecha_inicio <= fecha <= fecha_fin):
+                    continue
+                nubosidad = escena.get('cloud')
+                if (registro.max_nubosidad > max_nubosidad and nubosidad is not None
+                        and nubosidad > max_nubosidad):
+                    continue
+                escenas.append(escena)
+        
+        escenas.sort(key=lambda e: str(e.get('date', '')))
+        return escenas
     
     def descargar_imagen_satelital(self, field_id: str, indice: str, 
                                    view_id: str = None,
@@ -0,0 +1,333 @@
+"""
+Poller asíncrono de tareas de la Statistics API de EOSDA
+Sigue muchas tareas (task_id) a la vez sin bloquear un hilo por cada una
+
+- Backoff exponencial con jitter entre consultas de una misma tarea
+- Respeta 429 / Retry-After: la pausa se aplica a TODOS los workers
+- Token bucket global compartido entre procesos (archivo + flock) para
+  no superar el límite de peticiones/minuto de la cuenta EOSDA
+- esperar_tareas_sync() para los llamadores síncronos existentes
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:  # Windows: el limitador queda por proceso
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Estados que indican tarea terminada (aunque no haya escenas); cualquier
+# otro estado se trata como en cola/procesando
+ESTADOS_TERMINADOS = {'finished', 'completed', 'done', 'success'}
+
+
+# ========================================
+# 🪣 TOKEN BUCKET GLOBAL
+# ========================================
+
+class LimitadorTokenBucket:
+    """
+    Token bucket compartido entre procesos del mismo host
+
+    El estado (tokens, última recarga, pausa por 429) vive en un archivo
+    JSON protegido con flock, así gunicorn, los workers de la cola y los
+    comandos de sincronización consumen del mismo presupuesto.
+    """
+
+    def __init__(self, peticiones_por_minuto: float = 10, capacidad: Optional[float] = None,
+                 ruta_estado: Optional[str] = None):
+        self.tasa = peticiones_por_minuto / 60.0
+        self.capacidad = capacidad if capacidad is not None else max(1.0, peticiones_por_minuto / 6)
+        self.ruta_estado = ruta_estado
+        self._lock = threading.Lock()
+        self._estado_local = {'tokens': self.capacidad, 'actualizado': time.time(), 'pausa_hasta': 0.0}
+
+    def _leer(self, archivo) -> Dict:
+        archivo.seek(0)
+        contenido = archivo.read()
+        if not contenido:
+            return {'tokens': self.capacidad, 'actualizado': time.time(), 'pausa_hasta': 0.0}
+        try:
+            return json.loads(contenido)
+        except ValueError:
+            return {'tokens': self.capacidad, 'actualizado': time.time(), 'pausa_hasta': 0.0}
+
+    def _escribir(self, archivo, estado: Dict):
+        archivo.seek(0)
+        archivo.truncate()
+        archivo.write(json.dumps(estado))
+        archivo.flush()
+
+    def _con_estado(self, operacion):
+        """Ejecuta operacion(estado) -> resultado bajo el lock correspondiente"""
+        with self._lock:
+            if not (self.ruta_estado and FCNTL_AVAILABLE):
+                return operacion(self._estado_local)
+
+            with open(self.ruta_estado, 'a+') as archivo:
+                fcntl.flock(archivo, fcntl.LOCK_EX)
+                try:
+                    estado = self._leer(archivo)
+                    resultado = operacion(estado)
+                    self._escribir(archivo, estado)
+                    return resultado
+                finally:
+                    fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def intentar_adquirir(self) -> float:
+        """
+        Toma un token si hay disponible
+
+        Returns:
+            0 si se tomó el token; si no, segundos a esperar antes de reintentar
+        """
+        def operacion(estado):
+            ahora = time.time()
+            if estado['pausa_hasta'] > ahora:
+                return estado['pausa_hasta'] - ahora
+
+            transcurrido = max(0.0, ahora - estado['actualizado'])
+            estado['tokens'] = min(self.capacidad, estado['tokens'] + transcurrido * self.tasa)
+            estado['actualizado'] = ahora
+
+            if estado['tokens'] >= 1:
+                estado['tokens'] -= 1
+                return 0.0
+            return (1 - estado['tokens']) / self.tasa
+
+        return self._con_estado(operacion)
+
+    def adquirir(self):
+        """Versión bloqueante (hilos síncronos)"""
+        while True:
+            espera = self.intentar_adquirir()
+            if espera <= 0:
+                return
+            time.sleep(espera)
+
+    async def adquirir_async(self):
+        while True:
+            espera = self.intentar_adquirir()
+            if espera <= 0:
+                return
+            await asyncio.sleep(espera)
+
+    def pausar(self, segundos: float):
+        """Pausa global tras un 429: nadie consume tokens hasta que pase"""
+        def operacion(estado):
+            estado['pausa_hasta'] = max(estado['pausa_hasta'], time.time() + segundos)
+            estado['tokens'] = 0.0
+
+        self._con_estado(operacion)
+
+
+_limitador_global: Optional[LimitadorTokenBucket] = None
+_limitador_lock = threading.Lock()
+
+
+def obtener_limitador_eosda() -> LimitadorTokenBucket:
+    """Limitador único por proceso, con estado compartido en disco"""
+    global _limitador_global
+    if _limitador_global is None:
+        with _limitador_lock:
+            if _limitador_global is None:
+                try:
+                    from django.conf import settings
+                    por_minuto = getattr(settings, 'EOSDA_LIMITE_PETICIONES_MINUTO', 10)
+                    ruta = getattr(settings, 'EOSDA_LIMITADOR_ESTADO', None)
+                except Exception:
+                    por_minuto, ruta = 10, None
+                ruta = ruta or os.path.join(tempfile.gettempdir(), 'agrotech_eosda_limitador.json')
+                _limitador_global = LimitadorTokenBucket(por_minuto, ruta_estado=ruta)
+    return _limitador_global
+
+
+# ========================================
+# ⏳ POLLER
+# ========================================
+
+@dataclass
+class ResultadoTarea:
+    """Resultado de esperar una tarea de EOSDA"""
+    task_id: str
+    estado: str  # 'completada', 'error' o 'timeout'
+    resultados: List[Dict] = field(default_factory=list)
+    consultas: int = 0
+    rate_limits: int = 0
+    tiempo_s: float = 0.0
+    mensaje: str = ''
+
+    @property
+    def exitosa(self) -> bool:
+        return self.estado == 'completada'
+
+
+def calcular_retry_after(valor: Optional[str], por_defecto: float) -> float:
+    """Segundos indicados en Retry-After (número o fecha HTTP)"""
+    if not valor:
+        return por_defecto
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return por_defecto
+
+
+class PollerTareasEOSDA:
+    """
+    Espera resultados de varias tareas EOSDA en paralelo
+
+    Args:
+        session: Sesión HTTP con los headers de EOSDA (requests.Session)
+        base_url: URL base de la API
+        limitador: Token bucket compartido (por defecto el global)
+        espera_inicial: Primera espera antes de volver a consultar (s)
+        espera_maxima: Techo del backoff exponencial (s)
+        factor: Multiplicador del backoff
+        timeout_total: Tiempo máximo esperando cada tarea (s)
+        max_consultas: Máximo de GET por tarea
+        max_hilos: Peticiones HTTP simultáneas
+    """
+
+    def __init__(self, session, base_url: str, limitador: Optional[LimitadorTokenBucket] = None,
+                 espera_inicial: float = 3.0, espera_maxima: float = 30.0, factor: float = 1.6,
+                 timeout_total: float = 180.0, max_consultas: int = 30, max_hilos: int = 8):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.limitador = limitador or obtener_limitador_eosda()
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.factor = factor
+        self.timeout_total = timeout_total
+        self.max_consultas = max_consultas
+        self.max_hilos = max_hilos
+
+    def _espera_backoff(self, intento: int) -> float:
+        """Backoff exponencial con 'equal jitter' (entre 50% y 100% del tope)"""
+        tope = min(self.espera_maxima, self.espera_inicial * (self.factor ** intento))
+        return tope / 2 + random.uniform(0, tope / 2)
+
+    async def _esperar_tarea(self, task_id: str, ejecutor: ThreadPoolExecutor) -> ResultadoTarea:
+        loop = asyncio.get_running_loop()
+        url = f"{self.base_url}/api/gdw/api/{task_id}"
+        resultado = ResultadoTarea(task_id=task_id, estado='timeout')
+        inicio = time.monotonic()
+        intento = 0
+
+        while resultado.consultas < self.max_consultas:
+            if time.monotonic() - inicio > self.timeout_total:
+                break
+
+            await self.limitador.adquirir_async()
+            resultado.consultas += 1
+            try:
+                response = await loop.run_in_executor(
+                    ejecutor, lambda: self.session.get(url, timeout=30)
+                )
+            except Exception as e:
+                # Error de red: reintentar con backoff
+                logger.warning(f"⚠️ Error de red consultando tarea {task_id}: {e}")
+                await asyncio.sleep(self._espera_backoff(intento))
+                intento += 1
+                continue
+
+            if response.status_code == 429:
+                resultado.rate_limits += 1
+                espera = calcular_retry_after(
+                    response.headers.get('Retry-After'), self._espera_backoff(intento + 2)
+                )
+                logger.warning(f"⚠️ Rate limit (429) en tarea {task_id}, pausa global de {espera:.1f}s")
+                self.limitador.pausar(espera)
+                intento += 1
+                continue
+
+            if response.status_code >= 500:
+                logger.warning(f"⚠️ Error {response.status_code} de EOSDA en tarea {task_id}, reintentando")
+                await asyncio.sleep(self._espera_backoff(intento))
+                intento += 1
+                continue
+
+            if response.status_code != 200:
+                resultado.estado = 'error'
+                resultado.mensaje = f"HTTP {response.status_code}: {response.text[:200]}"
+                logger.error(f"❌ Error {response.status_code} consultando tarea {task_id}")
+                break
+
+            data = response.json()
+            status = data.get('status', 'unknown')
+
+            if data.get('result'):
+                resultado.estado = 'completada'
+                resultado.resultados = data['result']
+                logger.info(f"✅ Tarea {task_id}: {len(data['result'])} escenas "
+                            f"({resultado.consultas} consultas)")
+                break
+
+            if data.get('errors'):
+                resultado.estado = 'error'
+                resultado.mensaje = str(data['errors'])[:300]
+                logger.error(f"❌ Errores en tarea {task_id}: {resultado.mensaje}")
+                break
+
+            if status in ESTADOS_TERMINADOS:
+                resultado.estado = 'completada'
+                logger.info(f"ℹ️ Tarea {task_id} terminada sin escenas")
+                break
+
+            logger.debug(f"   Tarea {task_id}: status={status}, consulta {resultado.consultas}")
+            await asyncio.sleep(self._espera_backoff(intento))
+            intento += 1
+
+        resultado.tiempo_s = time.monotonic() - inicio
+        if resultado.estado == 'timeout':
+            resultado.mensaje = f"Sin resultados tras {resultado.consultas} consultas ({resultado.tiempo_s:.0f}s)"
+            logger.warning(f"⏱️ Timeout en tarea {task_id}: {resultado.mensaje}")
+        return resultado
+
+    async def esperar_tareas(self, task_ids: Iterable[str]) -> Dict[str, ResultadoTarea]:
+        """Espera todas las tareas a la vez; devuelve {task_id: ResultadoTarea}"""
+        task_ids = list(dict.fromkeys(task_ids))
+        with ThreadPoolExecutor(max_workers=max(1, min(self.max_hilos, len(task_ids)))) as ejecutor:
+            resultados = await asyncio.gather(
+                *(self._esperar_tarea(task_id, ejecutor) for task_id in task_ids)
+            )
+        return {r.task_id: r for r in resultados}
+
+
+def ejecutar_sync(corrutina):
+    """
+    Ejecuta una corrutina desde código síncrono
+
+    Si ya hay un event loop corriendo en este hilo (p. ej. vista async),
+    la corrutina se ejecuta en un hilo aparte con su propio loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(corrutina)
+
+    with ThreadPoolExecutor(max_workers=1) as ejecutor:
+        return ejecutor.submit(asyncio.run, corrutina).result()
+
+
+def esperar_tareas_sync(session, base_url: str, task_ids: Iterable[str], **kwargs) -> Dict[str, ResultadoTarea]:
+    """Wrapper síncrono de PollerTareasEOSDA.esperar_tareas"""
+    poller = PollerTareasEOSDA(session, base_url, **kwargs)
+    return ejecutar_sync(poller.esperar_tareas(task_ids))
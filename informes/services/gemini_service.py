@@ -13,6 +13,8 @@ from pathlib import Path
 import google.generativeai as genai
 from django.conf import settings
 
+from .cache_gemini import CacheGemini, clave_peticion, obtener_planificador_gemini
+
 logger = logging.getLogger(__name__)
 
 
@@ -20,6 +22,10 @@ class GeminiService:
     """
     Servicio para interactuar con Google Gemini AI
     Especializado en análisis agrícola y satelital
+    
+    Todas las llamadas pasan por _generar_texto(): caché persistente por
+    hash de la petición y planificador de cuota del free tier
+    (ver informes/services/cache_gemini.py).
     """
     
     def __init__(self):
@@ -38,7 +44,10 @@ class GeminiService:
         # Límites FREE: 1,500 solicitudes/día, 15 solicitudes/minuto
         # Input: 1M tokens, Output: 8K tokens
         # Nota: gemini-2.5-flash solo tiene 20 req/día en free tier
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
+        self.nombre_modelo = 'gemini-2.0-flash'
+        self.model = genai.GenerativeModel(self.nombre_modelo)
+        self.cache = CacheGemini()
+        self.planificador = obtener_planificador_gemini()
         
         logger.info("✅ GeminiService inicializado correctamente")
     
@@ -73,11 +82,8 @@ class GeminiService:
             if imagenes_paths:
                 contenido.extend(self._cargar_imagenes(imagenes_paths))
             
-            # Generar respuesta
-            response = self.model.generate_content(contenido)
-            
-            # Procesar respuesta
-            texto_completo = response.text
+            # Generar respuesta (desde caché si la misma petición ya se respondió)
+            texto_completo = self._generar_texto(contenido)
             
             # Parsear secciones
             resultado = self._parsear_respuesta(texto_completo, tipo_analisis)
@@ -96,6 +102,32 @@ class GeminiService:
                 'alertas': ''
             }
     
+    def _generar_texto(self, contenido) -> str:
+        """
+        Texto de generate_content(contenido): desde el caché si la petición
+        (modelo + prompt + imágenes) ya se respondió; si no, cuando la cuota
+        lo permita. Peticiones idénticas simultáneas se hacen una sola vez.
+        
+        Raises:
+            CuotaGeminiAgotada: límite diario alcanzado (los llamadores usan el fallback)
+        """
+        clave = clave_peticion(self.nombre_modelo, contenido)
+        return self.cache.obtener_o_generar(
+            clave,
+            lambda: self.planificador.ejecutar(lambda: self.model.generate_content(contenido).text),
+            modelo=self.nombre_modelo
+        )
+    
+    def _cargar_imagenes(self, imagenes_paths: List[str]) -> List:
+        """Carga las imágenes que se puedan leer (las demás se omiten)"""
+        imagenes = []
+        for imagen_path in imagenes_paths:
+            try:
+                imagenes.append(self._cargar_imagen_individual(imagen_path))
+            except Exception as e:
+                logger.warning(f"No se pudo cargar imagen {imagen_path}: {e}")
+        return imagenes
+    
     def _construir_prompt(
         self, 
         parcela_data: Dict[str, Any],
@@ -682,9 +714,7 @@ Valor de referencia del índice: {valor_promedio:.3f}
 """
             
             # Generar análisis
-            response = self.model.generate_content([prompt, imagen])
-            
-            analisis = response.text
+            analisis = self._generar_texto([prompt, imagen])
             
             # Limpiar y formatear
             analisis = self._limpiar_texto_para_pdf(analisis)
@@ -891,9 +921,7 @@ Máximo 400 palabras.
             contenido = [prompt] + imagenes
             
             # Generar análisis global
-            response = self.model.generate_content(contenido)
-            
-            analisis = response.text
+            analisis = self._generar_texto(contenido)
             
             # Limpiar y formatear
             analisis = self._limpiar_texto_para_pdf(analisis)
@@ -0,0 +1,282 @@
+"""
+Persistencia de datos satelitales y climáticos en IndiceMensual
+Compartido por la vista obtener_datos_historicos, el comando
+sincronizar_portafolio y AnalisisSatelitalService.
+
+- Agregación vectorizada: un solo groupby de pandas por (año, mes) para
+  todos los índices (promedio, máximo, mínimo, nubosidad y mejor escena)
+  y otro para el clima diario
+- Escritura con bulk_create(update_conflicts=True) sobre la clave única
+  (parcela, año, mes): un período de 24 meses cuesta un par de queries
+  en lugar de un get_or_create + save por mes
+- Clima desde el almacén por celda de Open-Meteo (clima_celdas): parcelas
+  vecinas comparten los días ya descargados
+"""
+
+import logging
+import math
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from informes.models import Parcela, IndiceMensual
+from informes.services.clima_celdas import CAMPOS_CLIMA, agregar_clima_por_mes, obtener_almacen_clima
+
+logger = logging.getLogger(__name__)
+
+INDICES_SATELITALES = ('NDVI', 'NDMI', 'SAVI')
+
+CAMPOS_INDICES = [
+    f'{indice.lower()}_{estadistico}'
+    for indice in INDICES_SATELITALES
+    for estadistico in ('promedio', 'maximo', 'minimo')
+]
+
+# Campos que escribe una sincronización satelital (se sobrescriben completos)
+CAMPOS_SATELITALES = CAMPOS_INDICES + [
+    'nubosidad_promedio', 'view_id_imagen', 'fecha_imagen', 'nubosidad_imagen',
+    'fuente_datos', 'calidad_datos',
+]
+
+
+# ========================================
+# 📊 AGREGACIÓN MENSUAL (pandas)
+# ========================================
+
+def _claves_mes(fechas: pd.Series) -> List[pd.Series]:
+    return [fechas.dt.year.rename('año'), fechas.dt.month.rename('mes')]
+
+
+def escenas_a_dataframe(escenas: List[Dict]) -> pd.DataFrame:
+    """
+    Aplana escenas de la Statistics API (date, indexes{NDVI,...}, cloud, view_id)
+    en un DataFrame con una fila por escena y una columna por estadístico
+    """
+    filas = []
+    for escena in escenas:
+        indexes = escena.get('indexes') or {}
+        fila = {
+            'fecha': escena.get('date'),
+            'view_id': escena.get('view_id'),  # ✅ view_id de la escena (campo correcto según API)
+            'nubosidad': escena.get('cloud', 0),
+        }
+        for indice in INDICES_SATELITALES:
+            if indice in indexes:
+                clave = indice.lower()
+                fila[f'{clave}_promedio'] = indexes[indice].get('average', 0)
+                fila[f'{clave}_maximo'] = indexes[indice].get('max', 0)
+                fila[f'{clave}_minimo'] = indexes[indice].get('min', 0)
+        filas.append(fila)
+
+    df = pd.DataFrame(filas, columns=['fecha', 'view_id', 'nubosidad'] + CAMPOS_INDICES)
+    df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce')
+    descartadas = int(df['fecha'].isna().sum())
+    if descartadas:
+        logger.warning(f"⚠️ {descartadas} escena(s) sin fecha válida descartadas")
+    df = df.dropna(subset=['fecha'])
+    df[CAMPOS_INDICES + ['nubosidad']] = df[CAMPOS_INDICES + ['nubosidad']].apply(pd.to_numeric, errors='coerce')
+    return df
+
+
+def clasificar_calidad_por_nubosidad(nubosidad: pd.Series) -> pd.Series:
+    """buena (<30%), regular (<50%) o pobre, igual que la vista original"""
+    return pd.Series(
+        np.select([nubosidad < 30, nubosidad < 50], ['buena', 'regular'], default='pobre'),
+        index=nubosidad.index
+    )
+
+
+def agregar_escenas_por_mes(escenas: List[Dict]) -> pd.DataFrame:
+    """
+    Un solo groupby por (año, mes) para todos los índices
+
+    Returns:
+        DataFrame indexado por (año, mes) con las columnas de CAMPOS_SATELITALES
+        (la mejor escena es la de menor nubosidad del mes)
+    """
+    df = escenas_a_dataframe(escenas)
+    if df.empty:
+        return pd.DataFrame(columns=CAMPOS_SATELITALES)
+
+    df['nubosidad'] = df['nubosidad'].fillna(0)
+    grupos = df.groupby(_claves_mes(df['fecha']))
+
+    agregaciones = {'nubosidad_promedio': ('nubosidad', 'mean')}
+    for campo in CAMPOS_INDICES:
+        funcion = 'max' if campo.endswith('_maximo') else ('min' if campo.endswith('_minimo') else 'mean')
+        agregaciones[campo] = (campo, funcion)
+    mensual = grupos.agg(**agregaciones)
+
+    # ✅ Escena con MENOR nubosidad de cada mes para descarga de imágenes
+    mejores = df.loc[grupos['nubosidad'].idxmin()]
+    mejores.index = mensual.index
+    mensual['view_id_imagen'] = mejores['view_id']
+    mensual['fecha_imagen'] = mejores['fecha'].dt.date
+    mensual['nubosidad_imagen'] = mejores['nubosidad']
+
+    mensual['fuente_datos'] = 'EOSDA'
+    mensual['calidad_datos'] = clasificar_calidad_por_nubosidad(mensual['nubosidad_promedio'])
+    return mensual[CAMPOS_SATELITALES]
+
+
+# ========================================
+# 💾 UPSERT MASIVO
+# ========================================
+
+def valor_para_bd(valor):
+    """Convierte tipos de numpy/pandas a tipos que acepta el driver de BD"""
+    if valor is None or valor is pd.NaT:
+        return None
+    if isinstance(valor, float) and math.isnan(valor):
+        return None
+    if isinstance(valor, pd.Timestamp):
+        return valor.date()
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, np.floating):
+        return None if np.isnan(valor) else float(valor)
+    return valor
+
+
+def upsert_indices_mensuales(parcela: Parcela, filas: Iterable[Dict], campos_actualizar: List[str],
+                             valores_nuevos: Optional[Dict] = None, batch_size: int = 500) -> Dict:
+    """
+    Crea o actualiza muchos meses de una parcela en un solo INSERT ... ON CONFLICT
+
+    Args:
+        parcela: Parcela dueña de los registros
+        filas: Dicts con 'año', 'mes' y los valores de campos_actualizar
+        campos_actualizar: Campos que se sobrescriben si el mes ya existe
+            (el resto del registro existente no se toca)
+        valores_nuevos: Valores extra solo para los meses que se crean
+
+    Returns:
+        {'creados': int, 'actualizados': int, 'meses_creados': set}
+    """
+    filas = [{clave: valor_para_bd(valor) for clave, valor in fila.items()} for fila in filas]
+    if not filas:
+        return {'creados': 0, 'actualizados': 0, 'meses_creados': set()}
+
+    años = {fila['año'] for fila in filas}
+    existentes = set(
+        IndiceMensual.objects.filter(parcela=parcela, año__in=años).values_list('año', 'mes')
+    )
+
+    objetos = []
+    meses_creados = set()
+    for fila in filas:
+        clave = (fila['año'], fila['mes'])
+        valores = {campo: fila.get(campo) for campo in campos_actualizar}
+        if clave not in existentes:
+            meses_creados.add(clave)
+            valores = {**(valores_nuevos or {}), **valores}
+        objetos.append(IndiceMensual(parcela=parcela, año=fila['año'], mes=fila['mes'], **valores))
+
+    IndiceMensual.objects.bulk_create(
+        objetos,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['parcela', 'año', 'mes'],
+        update_fields=campos_actualizar,
+    )
+    return {
+        'creados': len(meses_creados),
+        'actualizados': len(objetos) - len(meses_creados),
+        'meses_creados': meses_creados,
+    }
+
+
+def _filas_desde_dataframe(mensual: pd.DataFrame) -> List[Dict]:
+    return [
+        {'año': año, 'mes': mes, **valores}
+        for (año, mes), valores in zip(mensual.index, mensual.to_dict('records'))
+    ]
+
+
+# ========================================
+# 🛰️ ENTRADAS DE ALTO NIVEL
+# ========================================
+
+def guardar_escenas_en_indices(parcela: Parcela, escenas: List[Dict]) -> Dict:
+    """
+    Agrupa escenas de la Statistics API por año-mes y crea/actualiza IndiceMensual
+
+    Args:
+        parcela: Parcela dueña de los registros
+        escenas: Escenas crudas (date, indexes{NDVI,NDMI,SAVI}, cloud, view_id)
+
+    Returns:
+        {'creados': int, 'procesados': int}
+    """
+    try:
+        mensual = agregar_escenas_por_mes(escenas)
+    except Exception as e:
+        logger.error(f"Error agregando escenas por mes: {str(e)}")
+        return {'creados': 0, 'procesados': 0}
+
+    if mensual.empty:
+        return {'creados': 0, 'procesados': 0}
+
+    for (year, month), fila in mensual.iterrows():
+        ndvi = fila['ndvi_promedio']
+        ndvi_str = f"{ndvi:.3f}" if pd.notna(ndvi) else "N/A"
+        logger.debug(f"   {month:02d}/{year}: NDVI={ndvi_str}, Nubosidad={fila['nubosidad_promedio']:.1f}%, "
+                     f"mejor escena {fila['view_id_imagen']} ({fila['nubosidad_imagen']:.1f}%)")
+
+    resultado = upsert_indices_mensuales(parcela, _filas_desde_dataframe(mensual), CAMPOS_SATELITALES)
+    logger.info(f"✅ {len(mensual)} meses satelitales guardados para {parcela.nombre} "
+                f"({resultado['creados']} nuevos, {resultado['actualizados']} actualizados)")
+    return {'creados': resultado['creados'], 'procesados': len(mensual)}
+
+
+def guardar_clima_mensual(parcela: Parcela, clima_mensual: pd.DataFrame) -> int:
+    """
+    Escribe clima mensual ya agregado; solo toca los campos climáticos
+
+    Los meses sin registro satelital se crean con fuente 'Solo Clima'.
+    """
+    if clima_mensual.empty:
+        return 0
+    resultado = upsert_indices_mensuales(
+        parcela, _filas_desde_dataframe(clima_mensual), CAMPOS_CLIMA,
+        valores_nuevos={'fuente_datos': 'Solo Clima', 'calidad_datos': 'buena'}
+    )
+    logger.info(f"   🌡️ Clima: {resultado['actualizados']} meses actualizados, "
+                f"{resultado['creados']} creados solo con clima")
+    return len(clima_mensual)
+
+
+def guardar_clima_en_indices(parcela: Parcela, fecha_inicio: date, fecha_fin: date) -> int:
+    """
+    Obtiene clima mensual de Open-Meteo (vía el almacén por celda) y lo
+    guarda en IndiceMensual
+
+    Returns:
+        Número de meses con datos climáticos guardados
+    """
+    # EOSDA Weather API deshabilitado (sin cobertura en Colombia)
+    # Usamos Open-Meteo como alternativa gratuita con cobertura global
+    logger.info("🌦️ Obteniendo datos climáticos con Open-Meteo...")
+    try:
+        # Calcular centroide de la parcela para las coordenadas
+        centroide = parcela.geometria.centroid
+        clima_mensual = obtener_almacen_clima().clima_mensual(
+            latitud=centroide.y,
+            longitud=centroide.x,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        )
+
+        if clima_mensual.empty:
+            logger.warning("⚠️ Open-Meteo no retornó datos climáticos")
+            return 0
+
+        meses_clima_actualizados = guardar_clima_mensual(parcela, clima_mensual)
+        logger.info(f"✅ Open-Meteo: {meses_clima_actualizados} meses con datos climáticos")
+        return meses_clima_actualizados
+
+    except Exception as e:
+        logger.error(f"Error obteniendo datos climáticos de Open-Meteo: {str(e)}")
+        return 0
@@ -0,0 +1,259 @@
+"""
+Miniaturas de imágenes para el informe PDF
+Las imágenes NDVI/NDMI/SAVI de media/ se guardan a resolución completa,
+pero en la galería ocupan 5×5 cm. Antes de insertarlas en el story se
+reducen a los píxeles que necesita su tamaño impreso (DPI objetivo) y se
+recodifican; el PDF pesa menos y ReportLab comprime menos datos.
+
+- Caché en disco direccionado por contenido: el nombre del derivado es el
+  hash del archivo original + tamaño en píxeles + formato, así que una
+  imagen reemplazada genera un derivado nuevo y nunca uno desactualizado
+- Formatos: 'png' (sin pérdida, por defecto), y como opción con pérdida
+  'png_indexado' (paleta de 256 colores, conserva transparencia) o 'jpeg'
+  (fondo blanco, calidad configurable)
+- Nunca amplía: si el original ya es más pequeño que el objetivo o el
+  derivado pesa más que el original, se usa el original
+
+Estructura (MEDIA_ROOT/miniaturas_pdf/):
+- <hash[:2]>/<hash>.png|.jpg
+- Desalojo LRU por tamaño total: cada uso actualiza el mtime del derivado
+  y, cuando lo escrito supera el límite, se borran los menos usados
+
+No importa Django al cargar el módulo: directorio, DPI (PDF_MINIATURAS_DPI),
+formato (PDF_MINIATURAS_FORMATO), calidad JPEG (PDF_MINIATURAS_CALIDAD) y
+tamaño máximo (PDF_MINIATURAS_MAX_MB) se resuelven al usarlo.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+FORMATOS = ('png', 'png_indexado', 'jpeg')
+DPI_POR_DEFECTO = 200
+FORMATO_POR_DEFECTO = 'png'
+CALIDAD_POR_DEFECTO = 85
+MAX_MB_POR_DEFECTO = 256
+# Al podar se baja hasta esta fracción del límite (no podar en cada escritura)
+FRACCION_TRAS_PODA = 0.9
+PUNTOS_POR_PULGADA = 72.0  # Unidades de ReportLab (cm = 28.35 puntos)
+
+
+def pixeles_objetivo(tamano_origen: Tuple[int, int], ancho_pt: float, alto_pt: float,
+                     dpi: int) -> Tuple[int, int]:
+    """
+    Píxeles del derivado para una imagen que se dibuja proporcional dentro
+    de una caja de ancho_pt × alto_pt puntos (kind='proportional')
+    """
+    ancho, alto = tamano_origen
+    escala = min(ancho_pt / ancho, alto_pt / alto)  # Puntos por píxel al colocarla
+    factor = min(1.0, escala * dpi / PUNTOS_POR_PULGADA)
+    return max(1, round(ancho * factor)), max(1, round(alto * factor))
+
+
+class MiniaturasPDF:
+    """
+    Derivados a resolución de impresión de las imágenes del informe
+
+    Args:
+        directorio: Raíz del caché (default: MEDIA_ROOT/miniaturas_pdf)
+        dpi: Resolución objetivo para el tamaño impreso
+        formato: 'png' (sin pérdida), 'png_indexado' o 'jpeg' (con pérdida)
+        calidad: Calidad JPEG (1-95)
+        max_bytes: Tamaño máximo del caché (default: settings.PDF_MINIATURAS_MAX_MB)
+    """
+
+    _lock_poda = threading.Lock()
+
+    def __init__(self, directorio: Optional[str] = None, dpi: Optional[int] = None,
+                 formato: Optional[str] = None, calidad: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self._directorio = directorio
+        self._max_bytes = max_bytes
+        self._bytes_estimados: Optional[int] = None  # Tamaño del caché visto por esta instancia
+        if dpi is None or formato is None or calidad is None:
+            from django.conf import settings
+            dpi = dpi or getattr(settings, 'PDF_MINIATURAS_DPI', DPI_POR_DEFECTO)
+            formato = formato or getattr(settings, 'PDF_MINIATURAS_FORMATO', FORMATO_POR_DEFECTO)
+            calidad = calidad or getattr(settings, 'PDF_MINIATURAS_CALIDAD', CALIDAD_POR_DEFECTO)
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato de miniatura no soportado: {formato} (usar {', '.join(FORMATOS)})")
+        self.dpi = int(dpi)
+        self.formato = formato
+        self.calidad = int(calidad)
+        self._hashes: Dict[Tuple[str, int, float], str] = {}
+        self._lock = threading.Lock()
+        self.stats = {'generadas': 0, 'reutilizadas': 0, 'originales': 0, 'desalojos': 0,
+                      'bytes_origen': 0, 'bytes_insertados': 0}
+
+    @property
+    def directorio(self) -> str:
+        if self._directorio is None:
+            from django.conf import settings
+            self._directorio = os.path.join(str(settings.MEDIA_ROOT), 'miniaturas_pdf')
+        return self._directorio
+
+    @property
+    def max_bytes(self) -> int:
+        if self._max_bytes is None:
+            try:
+                from django.conf import settings
+                max_mb = getattr(settings, 'PDF_MINIATURAS_MAX_MB', MAX_MB_POR_DEFECTO)
+            except Exception:
+                max_mb = MAX_MB_POR_DEFECTO
+            self._max_bytes = int(max_mb * 1024 * 1024)
+        return self._max_bytes
+
+    @property
+    def perfil(self) -> Dict:
+        """Parámetros que determinan el derivado (entran en las claves de caché del informe)"""
+        return {'dpi': self.dpi, 'formato': self.formato, 'calidad': self.calidad}
+
+    def _hash_archivo(self, ruta: str) -> str:
+        """SHA-256 del archivo, memorizado por (ruta, tamaño, mtime)"""
+        estado = os.stat(ruta)
+        clave = (os.path.abspath(ruta), estado.st_size, estado.st_mtime)
+        with self._lock:
+            hash_archivo = self._hashes.get(clave)
+        if hash_archivo is None:
+            with open(ruta, 'rb') as archivo:
+                hash_archivo = hashlib.sha256(archivo.read()).hexdigest()
+            with self._lock:
+                self._hashes[clave] = hash_archivo
+        return hash_archivo
+
+    @staticmethod
+    def _escribir_atomico(ruta: str, contenido: bytes):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+
+    def _codificar(self, imagen, tamano: Tuple[int, int]) -> bytes:
+        from PIL import Image as PILImage
+
+        if imagen.size != tamano:
+            imagen = imagen.resize(tamano, PILImage.Resampling.LANCZOS)
+        salida = io.BytesIO()
+        if self.formato == 'jpeg':
+            if imagen.mode in ('RGBA', 'LA', 'P'):
+                imagen = imagen.convert('RGBA')
+                fondo = PILImage.new('RGB', imagen.size, (255, 255, 255))
+                fondo.paste(imagen, mask=imagen.getchannel('A'))
+                imagen = fondo
+            elif imagen.mode != 'RGB':
+                imagen = imagen.convert('RGB')
+            imagen.save(salida, format='JPEG', quality=self.calidad, optimize=True)
+        elif self.formato == 'png_indexado':
+            if imagen.mode == 'RGBA':
+                imagen = imagen.quantize(256, method=PILImage.Quantize.FASTOCTREE)
+            elif imagen.mode != 'P':
+                imagen = imagen.convert('RGB').quantize(256, method=PILImage.Quantize.MEDIANCUT)
+            imagen.save(salida, format='PNG', optimize=True)
+        else:
+            imagen.save(salida, format='PNG', optimize=True)
+        return salida.getvalue()
+
+    def miniatura(self, ruta: str, ancho_pt: float, alto_pt: float) -> bytes:
+        """
+        Bytes de la imagen a insertar en una caja de ancho_pt × alto_pt
+
+        Returns:
+            El derivado (desde caché si ya existía) o el archivo original si
+            no conviene reducirlo o no se puede leer como imagen
+        """
+        from PIL import Image as PILImage
+
+        with open(ruta, 'rb') as archivo:
+            original = archivo.read()
+        self.stats['bytes_origen'] += len(original)
+        try:
+            with PILImage.open(io.BytesIO(original)) as imagen:
+                tamano = pixeles_objetivo(imagen.size, ancho_pt, alto_pt, self.dpi)
+                extension = 'jpg' if self.formato == 'jpeg' else 'png'
+                clave = hashlib.sha256(
+                    f"{self._hash_archivo(ruta)}|{tamano[0]}x{tamano[1]}|{self.formato}|{self.calidad}".encode()
+                ).hexdigest()
+                destino = os.path.join(self.directorio, clave[:2], f'{clave}.{extension}')
+                try:
+                    with open(destino, 'rb') as archivo:
+                        datos = archivo.read()
+                    os.utime(destino)  # Recién usado (LRU)
+                    self.stats['reutilizadas'] += 1
+                except FileNotFoundError:
+                    imagen.load()
+                    datos = self._codificar(imagen, tamano)
+                    if len(datos) >= len(original):
+                        datos = original
+                    self._escribir_atomico(destino, datos)
+                    self.stats['generadas'] += 1
+                    self._registrar_escritura(len(datos))
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo generar miniatura de {ruta}: {e}. Se usa el original.")
+            self.stats['originales'] += 1
+            datos = original
+        self.stats['bytes_insertados'] += len(datos)
+        return datos
+
+    def _registrar_escritura(self, tamano: int):
+        """Suma lo escrito al total estimado y poda solo si pasa del límite"""
+        with self._lock:
+            if self._bytes_estimados is None:
+                self._bytes_estimados = self.tamano_total()  # Un solo recorrido por instancia
+            else:
+                self._bytes_estimados += tamano
+            excedido = self._bytes_estimados > self.max_bytes
+        if excedido:
+            self.podar()
+
+    def _entradas(self):
+        """(mtime, tamaño, ruta) de todos los derivados"""
+        entradas = []
+        for raiz, _, archivos in os.walk(self.directorio):
+            for nombre in archivos:
+                if not nombre.endswith(('.png', '.jpg')):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                entradas.append((estado.st_mtime, estado.st_size, ruta))
+        return entradas
+
+    def tamano_total(self) -> int:
+        return sum(tamano for _, tamano, _ in self._entradas())
+
+    def podar(self) -> int:
+        """Borra los derivados usados hace más tiempo hasta quedar bajo el límite (con margen)"""
+        with self._lock_poda:
+            entradas = self._entradas()
+            total = sum(tamano for _, tamano, _ in entradas)
+            desalojadas = 0
+            if total > self.max_bytes:
+                objetivo = self.max_bytes * FRACCION_TRAS_PODA
+                for _, tamano, ruta in sorted(entradas):
+                    if total <= objetivo:
+                        break
+                    try:
+                        os.remove(ruta)
+                    except OSError:
+                        continue
+                    total -= tamano
+                    desalojadas += 1
+            with self._lock:
+                self._bytes_estimados = total
+            self.stats['desalojos'] += desalojadas
+            return desalojadas
+
+    def resumen(self) -> str:
+        origen = self.stats['bytes_origen']
+        insertados = self.stats['bytes_insertados']
+        reduccion = (1 - insertados / origen) * 100 if origen else 0.0
+        return (f"{self.stats['generadas']} generadas, {self.stats['reutilizadas']} desde caché, "
+                f"{origen / 1e6:.1f} MB → {insertados / 1e6:.1f} MB ({reduccion:.0f}% menos)")
@@ -0,0 +1,254 @@
+"""
+Planificador de figuras de los informes PDF
+Los mapas y gráficos de un informe (matplotlib/PIL) son independientes
+entre sí y limitados por CPU. El planificador reúne las figuras que
+necesita el informe, las renderiza en un pool de procesos con backend Agg
+y el story se arma después con los buffers ya terminados.
+
+- Las tareas no se serializan: se registran en memoria antes de crear el
+  pool y los procesos hijos (fork) las heredan, así que pueden recibir la
+  parcela, el verificador con sus capas o métodos del generador. Solo
+  vuelve serializado el resultado (bytes / BytesIO).
+- Mientras el pool trabaja, el proceso principal sigue con su parte
+  (análisis, diagnóstico) y la mide con ejecutar_local()
+- Sin fork (Windows, macOS con spawn), con una sola figura o con
+  PDF_PROCESOS_FIGURAS=1 las figuras se renderizan en el proceso actual;
+  si el pool se rompe, las figuras pendientes también
+- Antes de bifurcar se cierran las conexiones de Django: cada proceso
+  abre la suya si la necesita
+- finalizar() cierra el pool y registra el tiempo de cada figura, el
+  proceso que la generó y el tiempo de pared total
+
+Uso:
+    figuras = PlanificadorFiguras()
+    figuras.agregar('mapa_municipal', generar_mapa_ubicacion_municipal_profesional, parcela, verificador)
+    figuras.iniciar()
+    try:
+        ...  # trabajo del proceso principal
+    finally:
+        figuras.finalizar()
+    buffer = figuras.obtener('mapa_municipal')  # relanza el error del render si falló
+"""
+
+import itertools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_PROCESOS_POR_DEFECTO = 4
+
+# Figuras de los planes en curso; los procesos hijos las leen de la memoria heredada
+_PLANES: Dict[int, List['Figura']] = {}
+_contador_planes = itertools.count(1)
+_lock_planes = threading.Lock()
+
+
+@dataclass
+class Figura:
+    """Figura del informe y su resultado"""
+    nombre: str
+    funcion: Callable
+    args: tuple = ()
+    kwargs: Dict = field(default_factory=dict)
+    valor: Any = None
+    error: Optional[BaseException] = None
+    segundos: Optional[float] = None
+    proceso: Optional[int] = None
+    terminada: bool = False
+
+
+def _inicializar_proceso():
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+
+
+def _renderizar_en_proceso(plan_id: int, posicion: int):
+    """Ejecuta una figura en el proceso hijo (devuelve solo datos serializables)"""
+    figura = _PLANES[plan_id][posicion]
+    inicio = time.perf_counter()
+    try:
+        valor, error = figura.funcion(*figura.args, **figura.kwargs), None
+    except Exception as e:
+        valor, error = None, f"{type(e).__name__}: {e}"
+    finally:
+        import matplotlib.pyplot as plt
+        plt.close('all')
+    return valor, error, time.perf_counter() - inicio, os.getpid()
+
+
+def _cerrar_conexiones_django():
+    try:
+        from django.db import connections
+        connections.close_all()
+    except Exception:
+        pass
+
+
+def _max_procesos_configurado() -> int:
+    try:
+        from django.conf import settings
+        configurado = getattr(settings, 'PDF_PROCESOS_FIGURAS', None)
+    except Exception:
+        configurado = None
+    if configurado is None:
+        configurado = min(MAX_PROCESOS_POR_DEFECTO, os.cpu_count() or 1)
+    return max(1, int(configurado))
+
+
+class PlanificadorFiguras:
+    """
+    Render concurrente de las figuras de un informe
+
+    Args:
+        max_procesos: Procesos del pool (default: settings.PDF_PROCESOS_FIGURAS
+            o min(4, núcleos)); 1 renderiza todo en el proceso actual
+    """
+
+    def __init__(self, max_procesos: Optional[int] = None):
+        self.max_procesos = max(1, int(max_procesos)) if max_procesos is not None else _max_procesos_configurado()
+        self.figuras: Dict[str, Figura] = {}
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._futuros: Dict[str, Any] = {}
+        self._plan_id: Optional[int] = None
+        self._inicio: Optional[float] = None
+        self.segundos_pared: Optional[float] = None
+
+    def __contains__(self, nombre: str) -> bool:
+        return nombre in self.figuras
+
+    def __len__(self) -> int:
+        return len(self.figuras)
+
+    def agregar(self, nombre: str, funcion: Callable, *args, **kwargs):
+        """Registra una figura (antes de iniciar); `funcion` debe devolver bytes o BytesIO"""
+        if self._inicio is not None:
+            raise RuntimeError("No se pueden agregar figuras después de iniciar el planificador")
+        if nombre in self.figuras:
+            raise ValueError(f"Figura duplicada en el plan: {nombre}")
+        self.figuras[nombre] = Figura(nombre, funcion, args, kwargs)
+
+    @property
+    def paralelo(self) -> bool:
+        pendientes = sum(1 for figura in self.figuras.values() if not figura.terminada)
+        return (self.max_procesos > 1 and pendientes > 1
+                and 'fork' in multiprocessing.get_all_start_methods())
+
+    def iniciar(self) -> 'PlanificadorFiguras':
+        """Lanza las figuras en el pool y vuelve de inmediato"""
+        if self._inicio is not None:
+            return self
+        self._inicio = time.perf_counter()
+        if not self.paralelo:
+            return self
+
+        pendientes = [figura for figura in self.figuras.values() if not figura.terminada]
+        with _lock_planes:
+            self._plan_id = next(_contador_planes)
+            _PLANES[self._plan_id] = pendientes
+        _cerrar_conexiones_django()
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=min(self.max_procesos, len(pendientes)),
+                mp_context=multiprocessing.get_context('fork'),
+                initializer=_inicializar_proceso
+            )
+            for posicion, figura in enumerate(pendientes):
+                self._futuros[figura.nombre] = self._pool.submit(_renderizar_en_proceso, self._plan_id, posicion)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudo crear el pool de figuras ({e}); se renderizan en este proceso")
+            self._cerrar_pool()
+        return self
+
+    def _renderizar_local(self, figura: Figura):
+        inicio = time.perf_counter()
+        try:
+            figura.valor = figura.funcion(*figura.args, **figura.kwargs)
+        except Exception as e:
+            figura.error = e
+        figura.segundos = time.perf_counter() - inicio
+        figura.proceso = os.getpid()
+        figura.terminada = True
+
+    def _completar(self, figura: Figura):
+        if figura.terminada:
+            return
+        futuro = self._futuros.pop(figura.nombre, None)
+        if futuro is not None:
+            try:
+                valor, error, segundos, proceso = futuro.result()
+                figura.valor, figura.segundos, figura.proceso = valor, segundos, proceso
+                figura.error = RuntimeError(error) if error else None
+                figura.terminada = True
+                return
+            except Exception as e:  # Pool roto o resultado no serializable
+                logger.warning(f"⚠️ Figura {figura.nombre} falló en el pool ({type(e).__name__}: {e}); "
+                               f"se genera en este proceso")
+        self._renderizar_local(figura)
+
+    def obtener(self, nombre: str, generar: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Resultado de una figura (espera a que termine). Si falló, relanza
+        el error; si no estaba en el plan y se da `generar`, la renderiza aquí
+        """
+        figura = self.figuras.get(nombre)
+        if figura is None:
+            if generar is None:
+                raise KeyError(nombre)
+            figura = self.figuras[nombre] = Figura(nombre, generar)
+        if self._inicio is None:
+            self.iniciar()
+        self._completar(figura)
+        if figura.error is not None:
+            raise figura.error
+        return figura.valor
+
+    def ejecutar_local(self, nombre: str, funcion: Callable, *args, **kwargs) -> Any:
+        """Ejecuta trabajo del proceso principal y lo incluye en el desglose de tiempos"""
+        figura = self.figuras[nombre] = Figura(nombre, funcion, args, kwargs)
+        self._renderizar_local(figura)
+        if figura.error is not None:
+            raise figura.error
+        return figura.valor
+
+    def _cerrar_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._plan_id is not None:
+            with _lock_planes:
+                _PLANES.pop(self._plan_id, None)
+            self._plan_id = None
+
+    def finalizar(self) -> str:
+        """Espera las figuras pendientes, cierra el pool y registra el desglose de tiempos"""
+        if self._inicio is None:
+            self.iniciar()
+        try:
+            for figura in self.figuras.values():
+                self._completar(figura)
+        finally:
+            self._cerrar_pool()
+        if self.segundos_pared is None:
+            self.segundos_pared = time.perf_counter() - self._inicio
+        resumen = self.resumen()
+        logger.info(resumen)
+        return resumen
+
+    def resumen(self) -> str:
+        terminadas = [figura for figura in self.figuras.values() if figura.terminada]
+        suma = sum(figura.segundos for figura in terminadas)
+        procesos = len({figura.proceso for figura in terminadas})
+        pared = self.segundos_pared if self.segundos_pared is not None else suma
+        lineas = [f"⏱️  Figuras: {len(terminadas)} en {procesos} proceso(s), "
+                  f"suma {suma:.2f}s, pared {pared:.2f}s ({suma / pared if pared else 1:.1f}x)"]
+        for figura in sorted(terminadas, key=lambda f: -f.segundos):
+            estado = '❌' if figura.error is not None else '✅'
+            lineas.append(f"   {estado} {figura.nombre:<32} {figura.segundos:7.2f}s  pid {figura.proceso}")
+        return "\n".join(lineas)
@@ -0,0 +1,509 @@
+"""
+Ingesta de rasters de índices EOSDA (Field Imagery API)
+Descarga cada raster una sola vez por view_id/índice, lo decodifica a
+float32 y lo guarda en un caché en disco direccionado por contenido.
+
+- GeoTIFF float32 (format='tiff'): valores reales del índice + geo_transform
+  leído de los tags GeoTIFF (ModelPixelScale / ModelTiepoint / GDAL_NODATA)
+- PNG (format='png'): compatibilidad con la decodificación anterior
+  (canal R en 0-255 → [-1, 1]); sin georreferencia
+- Caché: objetos/<hash>.npy (+ .json con geo_transform y metadatos) que se
+  abren con mmap_mode='r'; referencias/<clave>.json apunta del
+  (field_id, view_id, índice) al hash. Rasters idénticos se guardan una vez.
+- construir_cubos_desde_rasters(): cubos [meses, alto, ancho] para
+  CerebroDiagnosticoUnificado a partir de los view_id de IndiceMensual
+
+No importa Django al cargar el módulo: el directorio por defecto
+(MEDIA_ROOT/rasters_eosda) se resuelve al usarlo.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .eosda_poller import calcular_retry_after, obtener_limitador_eosda
+
+logger = logging.getLogger(__name__)
+
+FIRMAS_TIFF = (b'II*\x00', b'MM\x00*')
+FIRMA_PNG = b'\x89PNG'
+
+# Tags GeoTIFF
+TAG_PIXEL_SCALE = 33550
+TAG_TIEPOINT = 33922
+TAG_GDAL_NODATA = 42113
+
+INDICES_RASTER = ('ndvi', 'ndmi', 'savi')
+
+
+@dataclass
+class RasterIndice:
+    """Raster de un índice listo para el motor de análisis"""
+    array: np.ndarray  # float32 (H, W), NaN = sin dato; puede ser un memmap de solo lectura
+    geo_transform: Optional[Tuple[float, float, float, float, float, float]]
+    hash_contenido: str
+    metadata: Dict = field(default_factory=dict)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return tuple(self.array.shape)
+
+    @property
+    def bbox(self) -> Optional[List[float]]:
+        """[min_x, min_y, max_x, max_y] a partir del geo_transform"""
+        if not self.geo_transform:
+            return None
+        x0, dx, _, y0, _, dy = self.geo_transform
+        alto, ancho = self.array.shape
+        xs = (x0, x0 + dx * ancho)
+        ys = (y0, y0 + dy * alto)
+        return [min(xs), min(ys), max(xs), max(ys)]
+
+
+# ========================================
+# 🧩 DECODIFICACIÓN
+# ========================================
+
+def _geo_transform_desde_tags(tags) -> Optional[Tuple]:
+    escala = tags.get(TAG_PIXEL_SCALE)
+    tiepoint = tags.get(TAG_TIEPOINT)
+    if not escala or not tiepoint or len(tiepoint) < 6:
+        return None
+    sx, sy = float(escala[0]), float(escala[1])
+    i, j, _, x, y, _ = (float(v) for v in tiepoint[:6])
+    return (x - i * sx, sx, 0.0, y + j * sy, 0.0, -sy)
+
+
+def _nodata_desde_tags(tags) -> Optional[float]:
+    valor = tags.get(TAG_GDAL_NODATA)
+    if valor is None:
+        return None
+    try:
+        return float(str(valor).strip().strip('\x00'))
+    except ValueError:
+        return None
+
+
+def _decodificar_tiff(contenido: bytes) -> Tuple[np.ndarray, Optional[Tuple], Optional[float]]:
+    """GeoTIFF de una banda con Pillow; si no puede (p. ej. multibanda float), GDAL"""
+    from PIL import Image
+
+    try:
+        with Image.open(io.BytesIO(contenido)) as imagen:
+            array = np.asarray(imagen, dtype=np.float32)
+            tags = dict(imagen.tag_v2)
+        if array.ndim == 3:
+            array = array[:, :, 0]
+        return array, _geo_transform_desde_tags(tags), _nodata_desde_tags(tags)
+    except Exception as e:
+        logger.debug(f"Pillow no pudo leer el TIFF ({e}), usando GDAL")
+
+    from django.contrib.gis.gdal import GDALRaster
+
+    raster = GDALRaster(bytes(contenido))
+    banda = raster.bands[0]
+    return banda.data().astype(np.float32), tuple(raster.geotransform), banda.nodata_value
+
+
+def _decodificar_png(contenido: bytes) -> np.ndarray:
+    """Misma convención que descargar_array_desde_url: canal R 0-255 → [-1, 1]"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(contenido)) as imagen:
+        rgba = np.asarray(imagen.convert('RGBA'))
+    array = rgba[:, :, 0].astype(np.float32) / 127.5 - 1.0
+    array[rgba[:, :, 3] == 0] = np.nan  # Transparente = fuera del lote / nube
+    return array
+
+
+def decodificar_raster(contenido: bytes) -> Tuple[np.ndarray, Optional[Tuple]]:
+    """
+    Decodifica la respuesta de Field Imagery a float32
+
+    Returns:
+        (array float32 con NaN como sin-dato, geo_transform o None)
+    """
+    if contenido[:4] in FIRMAS_TIFF:
+        array, geo_transform, nodata = _decodificar_tiff(contenido)
+        array = np.array(array, dtype=np.float32)
+        if nodata is not None:
+            array[array == np.float32(nodata)] = np.nan
+        array[~np.isfinite(array)] = np.nan
+        return array, geo_transform
+    if contenido[:4] == FIRMA_PNG:
+        return _decodificar_png(contenido), None
+    raise ValueError(f"Formato de raster no reconocido (firma {contenido[:4]!r})")
+
+
+# ========================================
+# 💾 CACHÉ EN DISCO DIRECCIONADO POR CONTENIDO
+# ========================================
+
+class CacheRastersEOSDA:
+    """
+    Caché de rasters decodificados
+
+    Args:
+        directorio: Raíz del caché (default: MEDIA_ROOT/rasters_eosda)
+        comprimir: True guarda .npz comprimido (menos disco, sin memmap);
+                   False guarda .npy que se abre con mmap_mode='r'
+    """
+
+    def __init__(self, directorio: Optional[str] = None, comprimir: bool = False):
+        self._directorio = directorio
+        self.comprimir = comprimir
+
+    @property
+    def directorio(self) -> str:
+        if self._directorio is None:
+            from django.conf import settings
+            self._directorio = os.path.join(str(settings.MEDIA_ROOT), 'rasters_eosda')
+        return self._directorio
+
+    @staticmethod
+    def clave_escena(field_id: str, view_id: str, indice: str) -> str:
+        texto = f"{field_id}|{view_id}|{indice.upper()}"
+        return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def hash_array(array: np.ndarray, geo_transform: Optional[Tuple]) -> str:
+        h = hashlib.sha256()
+        h.update(str(array.shape).encode())
+        h.update(json.dumps(geo_transform).encode())
+        h.update(np.ascontiguousarray(array, dtype=np.float32).tobytes())
+        return h.hexdigest()
+
+    def _ruta_referencia(self, clave: str) -> str:
+        return os.path.join(self.directorio, 'referencias', f'{clave}.json')
+
+    def _ruta_objeto(self, hash_contenido: str, extension: str) -> str:
+        return os.path.join(self.directorio, 'objetos', hash_contenido[:2], f'{hash_contenido}{extension}')
+
+    @staticmethod
+    def _escribir_atomico(ruta: str, escribir):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as archivo:
+            escribir(archivo)
+        os.replace(temporal, ruta)
+
+    def cargar_objeto(self, hash_contenido: str) -> Optional[RasterIndice]:
+        ruta_meta = self._ruta_objeto(hash_contenido, '.json')
+        if not os.path.exists(ruta_meta):
+            return None
+        with open(ruta_meta, 'r', encoding='utf-8') as archivo:
+            meta = json.load(archivo)
+
+        ruta_npy = self._ruta_objeto(hash_contenido, '.npy')
+        ruta_npz = self._ruta_objeto(hash_contenido, '.npz')
+        if os.path.exists(ruta_npy):
+            array = np.load(ruta_npy, mmap_mode='r')
+        elif os.path.exists(ruta_npz):
+            with np.load(ruta_npz) as datos:
+                array = datos['array']
+        else:
+            return None
+
+        geo_transform = tuple(meta['geo_transform']) if meta.get('geo_transform') else None
+        return RasterIndice(array=array, geo_transform=geo_transform,
+                            hash_contenido=hash_contenido, metadata=meta.get('metadata', {}))
+
+    def obtener(self, field_id: str, view_id: str, indice: str) -> Optional[RasterIndice]:
+        ruta = self._ruta_referencia(self.clave_escena(field_id, view_id, indice))
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'r', encoding='utf-8') as archivo:
+                referencia = json.load(archivo)
+            return self.cargar_objeto(referencia['hash'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"⚠️ Entrada de caché de raster corrupta ({ruta}): {e}")
+            return None
+
+    def guardar(self, field_id: str, view_id: str, indice: str, array: np.ndarray,
+                geo_transform: Optional[Tuple], metadata: Optional[Dict] = None) -> RasterIndice:
+        array = np.ascontiguousarray(array, dtype=np.float32)
+        hash_contenido = self.hash_array(array, geo_transform)
+        metadata = dict(metadata or {})
+
+        if self.cargar_objeto(hash_contenido) is None:
+            if self.comprimir:
+                self._escribir_atomico(self._ruta_objeto(hash_contenido, '.npz'),
+                                       lambda f: np.savez_compressed(f, array=array))
+            else:
+                self._escribir_atomico(self._ruta_objeto(hash_contenido, '.npy'),
+                                       lambda f: np.save(f, array))
+            meta = {
+                'shape': list(array.shape),
+                'dtype': 'float32',
+                'geo_transform': list(geo_transform) if geo_transform else None,
+                'metadata': metadata,
+            }
+            # El .json se escribe al final: su existencia marca el objeto como completo
+            self._escribir_atomico(self._ruta_objeto(hash_contenido, '.json'),
+                                   lambda f: f.write(json.dumps(meta).encode('utf-8')))
+
+        referencia = {
+            'hash': hash_contenido,
+            'field_id': field_id,
+            'view_id': view_id,
+            'indice': indice.upper(),
+            'guardado_en': datetime.now().isoformat(),
+        }
+        self._escribir_atomico(self._ruta_referencia(self.clave_escena(field_id, view_id, indice)),
+                               lambda f: f.write(json.dumps(referencia).encode('utf-8')))
+        return self.cargar_objeto(hash_contenido)
+
+
+# ========================================
+# 📡 DESCARGA
+# ========================================
+
+class DescargadorRastersEOSDA:
+    """
+    Descarga rasters de Field Imagery pasando por el caché
+
+    Args:
+        session: Sesión HTTP con los headers de EOSDA
+        base_url: URL base de la API
+        cache: CacheRastersEOSDA (default: MEDIA_ROOT/rasters_eosda)
+        limitador: Presupuesto de peticiones (default: el global)
+        formato: 'tiff' (valores reales) o 'png'
+        espera_inicial, espera_maxima: Backoff del polling (s)
+        max_consultas: Máximo de GET por raster
+    """
+
+    def __init__(self, session, base_url: str, cache: Optional[CacheRastersEOSDA] = None,
+                 limitador=None, formato: str = 'tiff', espera_inicial: float = 2.0,
+                 espera_maxima: float = 10.0, max_consultas: int = 20):
+        self.session = session
+        self.base_url = base_url.rstrip('/')
+        self.cache = cache or CacheRastersEOSDA()
+        self.limitador = limitador or obtener_limitador_eosda()
+        self.formato = formato
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.max_consultas = max_consultas
+        self.descargas = 0  # Rasters bajados de la API (para métricas/tests)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_para(self, clave: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(clave, threading.Lock())
+
+    def obtener(self, field_id: str, view_id: str, indice: str) -> Optional[RasterIndice]:
+        """Raster del caché o, si no está, descargado una vez y guardado"""
+        raster = self.cache.obtener(field_id, view_id, indice)
+        if raster is not None:
+            return raster
+
+        # Un solo hilo descarga cada escena; los demás esperan y leen el caché
+        with self._lock_para(CacheRastersEOSDA.clave_escena(field_id, view_id, indice)):
+            raster = self.cache.obtener(field_id, view_id, indice)
+            if raster is not None:
+                return raster
+
+            inicio = time.time()
+            contenido = self._descargar(field_id, view_id, indice)
+            if contenido is None:
+                return None
+            try:
+                array, geo_transform = decodificar_raster(contenido)
+            except Exception as e:
+                logger.error(f"❌ No se pudo decodificar raster {indice} ({view_id}): {e}")
+                return None
+
+            self.descargas += 1
+            raster = self.cache.guardar(field_id, view_id, indice, array, geo_transform, metadata={
+                'field_id': field_id,
+                'view_id': view_id,
+                'indice': indice.upper(),
+                'formato': self.formato,
+                'bytes_descargados': len(contenido),
+            })
+            logger.info(f"✅ Raster {indice.upper()} {view_id}: {array.shape}, "
+                        f"{len(contenido) / 1024:.0f} KB en {time.time() - inicio:.1f}s")
+            return raster
+
+    def obtener_indices(self, field_id: str, view_id: str,
+                        indices: Iterable[str] = INDICES_RASTER) -> Dict[str, Optional[RasterIndice]]:
+        """Los índices de una misma escena en paralelo"""
+        indices = list(indices)
+        with ThreadPoolExecutor(max_workers=len(indices) or 1) as ejecutor:
+            rasters = ejecutor.map(lambda indice: self.obtener(field_id, view_id, indice), indices)
+            return dict(zip(indices, rasters))
+
+    def _espera(self, intento: int) -> float:
+        return min(self.espera_maxima, self.espera_inicial * (1.5 ** intento))
+
+    def _descargar(self, field_id: str, view_id: str, indice: str) -> Optional[bytes]:
+        url_imagery = f"{self.base_url}/field-imagery/indicies/{field_id}"
+        payload = {'params': {'view_id': view_id, 'index': indice.upper(), 'format': self.formato}}
+
+        self.limitador.adquirir()
+        try:
+            response = self.session.post(url_imagery, json=payload, timeout=60)
+        except Exception as e:
+            logger.error(f"❌ Error de red creando raster {indice} ({view_id}): {e}")
+            return None
+        if response.status_code == 403:
+            logger.error("❌ Error 403: API Key sin permisos para Field Imagery API")
+            return None
+        if response.status_code not in (200, 201, 202):
+            logger.error(f"❌ Error {response.status_code} creando raster {indice}: {response.text[:200]}")
+            return None
+        request_id = response.json().get('request_id')
+        if not request_id:
+            logger.error(f"❌ Field Imagery no devolvió request_id para {indice} ({view_id})")
+            return None
+
+        url_descarga = f"{self.base_url}/field-imagery/{field_id}/{request_id}"
+        for intento in range(self.max_consultas):
+            time.sleep(self._espera(intento))
+            self.limitador.adquirir()
+            try:
+                response = self.session.get(url_descarga, timeout=60)
+            except Exception as e:
+                logger.warning(f"⚠️ Error de red descargando raster {request_id}: {e}")
+                continue
+
+            if response.status_code == 429:
+                espera = calcular_retry_after(response.headers.get('Retry-After'), self._espera(intento + 2))
+                self.limitador.pausar(espera)
+                continue
+            if response.status_code == 404:
+                continue  # Aún no está listo
+            if response.status_code != 200:
+                logger.error(f"❌ Error {response.status_code} descargando raster {request_id}")
+                return None
+
+            contenido = response.content
+            if contenido[:4] in FIRMAS_TIFF or contenido[:4] == FIRMA_PNG:
+                return contenido
+            try:
+                estado = response.json().get('status', 'unknown')
+            except ValueError:
+                estado = 'unknown'
+            if estado in ('failed', 'error'):
+                logger.error(f"❌ EOSDA no pudo generar el raster {indice} ({view_id})")
+                return None
+
+        logger.warning(f"⏱️ Timeout esperando raster {indice} ({view_id})")
+        return None
+
+
+# ========================================
+# 🧊 CUBOS PARA EL CEREBRO
+# ========================================
+
+def remuestrear_a_rejilla(raster: RasterIndice, shape: Tuple[int, int],
+                          geo_transform: Optional[Tuple]) -> np.ndarray:
+    """
+    Vecino más cercano sobre la rejilla de referencia
+
+    Con geo_transform en ambos lados se alinea por coordenadas; si falta,
+    se escala por proporción de filas/columnas.
+    """
+    alto, ancho = shape
+    if tuple(raster.shape) == tuple(shape) and raster.geo_transform == geo_transform:
+        return np.asarray(raster.array, dtype=np.float32)
+
+    filas_src, cols_src = raster.shape
+    if raster.geo_transform and geo_transform:
+        x0, dx, _, y0, _, dy = geo_transform
+        sx0, sdx, _, sy0, _, sdy = raster.geo_transform
+        xs = x0 + (np.arange(ancho) + 0.5) * dx
+        ys = y0 + (np.arange(alto) + 0.5) * dy
+        cols = np.floor((xs - sx0) / sdx).astype(np.int64)
+        filas = np.floor((ys - sy0) / sdy).astype(np.int64)
+    else:
+        cols = (np.arange(ancho) * cols_src // ancho).astype(np.int64)
+        filas = (np.arange(alto) * filas_src // alto).astype(np.int64)
+
+    validas_c = (cols >= 0) & (cols < cols_src)
+    validas_f = (filas >= 0) & (filas < filas_src)
+    resultado = np.full(shape, np.nan, dtype=np.float32)
+    origen = np.asarray(raster.array, dtype=np.float32)
+    resultado[np.ix_(validas_f, validas_c)] = origen[np.ix_(filas[validas_f], cols[validas_c])]
+    return resultado
+
+
+def rasters_por_mes(meses: Iterable, field_id: str,
+                    descargador: DescargadorRastersEOSDA) -> Tuple[List[Tuple[str, Dict]], List[str]]:
+    """
+    Rasters NDVI/NDMI/SAVI de la escena de cada mes
+
+    Args:
+        meses: Objetos con año, mes y view_id_imagen (p. ej. IndiceMensual)
+        field_id: Campo EOSDA
+        descargador: DescargadorRastersEOSDA
+
+    Returns:
+        ([('YYYY-MM', {'ndvi': RasterIndice, ...}), ...], ['YYYY-MM' sin raster, ...])
+    """
+    capas = []
+    meses_sin_raster = []
+    for registro in meses:
+        fecha = f"{registro.año}-{registro.mes:02d}"
+        view_id = getattr(registro, 'view_id_imagen', None)
+        if not view_id:
+            meses_sin_raster.append(fecha)
+            continue
+        rasters = descargador.obtener_indices(field_id, view_id)
+        if any(raster is None for raster in rasters.values()):
+            meses_sin_raster.append(fecha)
+            continue
+        capas.append((fecha, rasters))
+    return capas, meses_sin_raster
+
+
+def construir_cubos_desde_rasters(meses: Iterable, field_id: str,
+                                  descargador: DescargadorRastersEOSDA) -> Optional[Dict]:
+    """
+    Arma los cubos [meses, alto, ancho] de NDVI/NDMI/SAVI con píxeles reales
+
+    Args:
+        meses: Objetos con año, mes y view_id_imagen (p. ej. IndiceMensual),
+               en orden cronológico
+        field_id: Campo EOSDA
+        descargador: DescargadorRastersEOSDA
+
+    Returns:
+        {'cubos': {'ndvi': ..., 'ndmi': ..., 'savi': ...}, 'fechas': [...],
+         'geo_transform': ..., 'shape': (H, W), 'meses_sin_raster': [...]}
+        o None si ningún mes tiene los tres rasters
+    """
+    capas, meses_sin_raster = rasters_por_mes(meses, field_id, descargador)
+    if not capas:
+        return None
+
+    # Rejilla de referencia: el mes más reciente (el que analiza el cerebro)
+    referencia = capas[-1][1]['ndvi']
+    shape, geo_transform = referencia.shape, referencia.geo_transform
+
+    cubos = {indice: np.empty((len(capas),) + tuple(shape), dtype=np.float32) for indice in INDICES_RASTER}
+    for posicion, (_, rasters) in enumerate(capas):
+        for indice in INDICES_RASTER:
+            cubos[indice][posicion] = remuestrear_a_rejilla(rasters[indice], shape, geo_transform)
+
+    if meses_sin_raster:
+        logger.warning(f"⚠️ Meses sin raster real (omitidos del cubo): {', '.join(meses_sin_raster)}")
+
+    return {
+        'cubos': cubos,
+        'fechas': [fecha for fecha, _ in capas],
+        'geo_transform': geo_transform,
+        'shape': tuple(shape),
+        'meses_sin_raster': meses_sin_raster,
+    }
@@ -0,0 +1,389 @@
+"""
+Sincronización masiva del portafolio con la Statistics API de EOSDA
+Envía las tareas de todas las parcelas activas de forma concurrente,
+respetando un presupuesto de peticiones/minuto, y guarda cada parcela en
+IndiceMensual en cuanto terminan sus tareas.
+
+- Reutiliza el caché mensual (CacheMesEOSDA): solo se piden los huecos
+- Checkpoint JSON en disco: tras una interrupción no se repiten parcelas
+  terminadas y las tareas ya creadas se vuelven a consultar (no a crear)
+- Métricas de throughput y consumo de peticiones al final
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+
+from informes.models import CacheMesEOSDA, EstadisticaUsoEOSDA
+from informes.services.eosda_api import EosdaAPIService, eosda_service
+from informes.services.eosda_poller import (
+    LimitadorTokenBucket, PollerTareasEOSDA, obtener_limitador_eosda, ejecutar_sync
+)
+from informes.services.indices_mensuales import guardar_escenas_en_indices, guardar_clima_en_indices
+
+logger = logging.getLogger(__name__)
+
+INDICES_POR_DEFECTO = ['NDVI', 'NDMI', 'SAVI']
+
+
+@dataclass
+class MetricasSincronizacion:
+    """Contadores de una corrida de sincronización"""
+    parcelas_total: int = 0
+    parcelas_completadas: int = 0
+    parcelas_omitidas: int = 0  # Ya completadas en una corrida anterior (checkpoint)
+    parcelas_fallidas: int = 0
+    tareas_creadas: int = 0  # POST mt_stats = requests facturables
+    tareas_reanudadas: int = 0  # task_id recuperados del checkpoint
+    consultas_estado: int = 0  # GET de polling
+    rate_limits: int = 0
+    meses_solicitados: int = 0
+    meses_desde_cache: int = 0
+    escenas: int = 0
+    registros_guardados: int = 0
+    duracion_s: float = 0.0
+
+    @property
+    def requests_totales(self) -> int:
+        return self.tareas_creadas + self.consultas_estado
+
+    @property
+    def parcelas_por_minuto(self) -> float:
+        if self.duracion_s <= 0:
+            return 0.0
+        return self.parcelas_completadas * 60.0 / self.duracion_s
+
+    @property
+    def requests_por_parcela(self) -> float:
+        if not self.parcelas_completadas:
+            return 0.0
+        return self.requests_totales / self.parcelas_completadas
+
+
+class PresupuestoSincronizacion:
+    """
+    Presupuesto de peticiones/minuto de la corrida, encadenado al global
+
+    Cada petición consume un token del presupuesto propio y otro del
+    limitador global, así la sincronización nunca deja sin cuota a las
+    vistas ni a los workers que comparten la cuenta EOSDA.
+    """
+
+    def __init__(self, propio: Optional[LimitadorTokenBucket], global_: LimitadorTokenBucket):
+        self.propio = propio
+        self.global_ = global_
+
+    def adquirir(self):
+        if self.propio is not None:
+            self.propio.adquirir()
+        self.global_.adquirir()
+
+    async def adquirir_async(self):
+        if self.propio is not None:
+            await self.propio.adquirir_async()
+        await self.global_.adquirir_async()
+
+    def pausar(self, segundos: float):
+        if self.propio is not None:
+            self.propio.pausar(segundos)
+        self.global_.pausar(segundos)
+
+
+class CheckpointSincronizacion:
+    """
+    Estado reanudable de una corrida, en un archivo JSON por firma
+
+    La firma depende del rango de meses, los índices, la nubosidad y las
+    parcelas, así dos corridas distintas no se pisan el checkpoint. Firma y
+    claves de tarea van por mes (no por día): el fin del rango se recorta a
+    hoy y reanudar otro día del mismo mes debe encontrar las tareas ya
+    pagadas.
+    """
+
+    def __init__(self, ruta: str, firma: str):
+        self.ruta = ruta
+        self.firma = firma
+        self.parcelas_completadas = set()
+        # "parcela:AAAA-MM:AAAA-MM" -> {'task_id', 'desde', 'hasta'} (rango exacto de la tarea)
+        self.tareas: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def calcular_firma(parcela_ids: Iterable[int], fecha_inicio: date, fecha_fin: date,
+                       indices: List[str], max_nubosidad: int) -> str:
+        contenido = json.dumps({
+            'parcelas': sorted(parcela_ids),
+            'desde': fecha_inicio.strftime('%Y-%m'),
+            'hasta': fecha_fin.strftime('%Y-%m'),
+            'indices': CacheMesEOSDA.normalizar_indices(indices),
+            'max_nubosidad': max_nubosidad,
+        }, sort_keys=True)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:16]
+
+    @classmethod
+    def para_corrida(cls, firma: str, directorio: Optional[str] = None) -> 'CheckpointSincronizacion':
+        directorio = directorio or os.path.join(settings.MEDIA_ROOT, 'sincronizacion')
+        os.makedirs(directorio, exist_ok=True)
+        checkpoint = cls(os.path.join(directorio, f'portafolio_{firma}.json'), firma)
+        checkpoint.cargar()
+        return checkpoint
+
+    @staticmethod
+    def clave_tarea(parcela_id: int, desde: date, hasta: date) -> str:
+        return f"{parcela_id}:{desde:%Y-%m}:{hasta:%Y-%m}"
+
+    def cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as archivo:
+                datos = json.load(archivo)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Checkpoint ilegible ({self.ruta}), se empieza de cero: {e}")
+            return
+        if datos.get('firma') != self.firma:
+            return
+        self.parcelas_completadas = set(datos.get('parcelas_completadas', []))
+        self.tareas = dict(datos.get('tareas', {}))
+
+    def guardar(self):
+        """Escritura atómica: un corte a mitad no deja el JSON corrupto"""
+        temporal = f"{self.ruta}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump({
+                'firma': self.firma,
+                'parcelas_completadas': sorted(self.parcelas_completadas),
+                'tareas': self.tareas,
+            }, archivo)
+        os.replace(temporal, self.ruta)
+
+    def eliminar(self):
+        if os.path.exists(self.ruta):
+            os.remove(self.ruta)
+        self.parcelas_completadas = set()
+        self.tareas = {}
+
+
+class SincronizadorPortafolio:
+    """
+    Orquesta la sincronización de muchas parcelas en un event loop
+
+    Args:
+        parcelas: Parcelas a sincronizar
+        fecha_inicio, fecha_fin: Rango a cubrir
+        checkpoint: Estado reanudable (ver CheckpointSincronizacion)
+        indices: Índices a pedir en cada tarea
+        max_nubosidad: Nubosidad máxima de las escenas
+        max_concurrentes: Tareas EOSDA en vuelo a la vez
+        limitador: Presupuesto de peticiones (default: el global)
+        incluir_clima: Agregar clima de Open-Meteo a IndiceMensual
+        usuario: Usuario al que se imputa el consumo (EstadisticaUsoEOSDA)
+        servicio: Servicio EOSDA (inyectable en tests)
+        opciones_poller: kwargs extra para PollerTareasEOSDA
+    """
+
+    def __init__(self, parcelas, fecha_inicio: date, fecha_fin: date,
+                 checkpoint: CheckpointSincronizacion,
+                 indices: Optional[List[str]] = None, max_nubosidad: int = 50,
+                 max_concurrentes: int = 4, limitador=None, incluir_clima: bool = True,
+                 usuario=None, servicio: Optional[EosdaAPIService] = None,
+                 opciones_poller: Optional[Dict] = None):
+        self.parcelas = list(parcelas)
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.checkpoint = checkpoint
+        self.indices = indices or INDICES_POR_DEFECTO
+        self.max_nubosidad = max_nubosidad
+        self.max_concurrentes = max(1, max_concurrentes)
+        self.limitador = limitador or obtener_limitador_eosda()
+        self.incluir_clima = incluir_clima
+        self.usuario = usuario
+        self.servicio = servicio or eosda_service
+        self.opciones_poller = opciones_poller or {}
+        self.metricas = MetricasSincronizacion(parcelas_total=len(self.parcelas))
+
+    def ejecutar(self) -> MetricasSincronizacion:
+        """Wrapper síncrono (management command)"""
+        return ejecutar_sync(self.ejecutar_async())
+
+    async def ejecutar_async(self) -> MetricasSincronizacion:
+        inicio = time.monotonic()
+        self._semaforo = asyncio.Semaphore(self.max_concurrentes)
+        self._poller = PollerTareasEOSDA(
+            self.servicio.session, self.servicio.base_url,
+            limitador=self.limitador, **self.opciones_poller
+        )
+
+        pendientes = []
+        for parcela in self.parcelas:
+            if parcela.id in self.checkpoint.parcelas_completadas:
+                self.metricas.parcelas_omitidas += 1
+                continue
+            pendientes.append(self._sincronizar_parcela(parcela))
+
+        if self.metricas.parcelas_omitidas:
+            logger.info(f"♻️ Reanudando: {self.metricas.parcelas_omitidas} parcela(s) ya sincronizadas")
+
+        try:
+            await asyncio.gather(*pendientes)
+        finally:
+            self.metricas.duracion_s = time.monotonic() - inicio
+        return self.metricas
+
+    async def _sincronizar_parcela(self, parcela) -> bool:
+        tiempo_inicio = time.monotonic()
+        field_id = parcela.eosda_field_id or f"parcela_{parcela.id}"
+        try:
+            geometria = json.loads(parcela.poligono_geojson) if parcela.poligono_geojson else None
+        except ValueError:
+            geometria = None
+        if not geometria:
+            logger.error(f"❌ Parcela {parcela.nombre} no tiene geometría GeoJSON")
+            self.metricas.parcelas_fallidas += 1
+            return False
+
+        meses = CacheMesEOSDA.meses_en_rango(self.fecha_inicio, self.fecha_fin)
+        cubiertos = await asyncio.to_thread(
+            CacheMesEOSDA.obtener_cubiertos, field_id, self.fecha_inicio, self.fecha_fin,
+            self.indices, self.max_nubosidad
+        )
+        huecos = CacheMesEOSDA.calcular_huecos(self.fecha_inicio, self.fecha_fin, cubiertos)
+        self.metricas.meses_solicitados += len(meses)
+        self.metricas.meses_desde_cache += len(cubiertos)
+
+        # Todos los huecos de la parcela a la vez; el semáforo limita el total en vuelo
+        resultados = await asyncio.gather(*(
+            self._sincronizar_hueco(parcela, field_id, geometria, desde, hasta)
+            for desde, hasta in huecos
+        ))
+        tareas_creadas = sum(creada for _, creada in resultados)
+
+        if not all(ok for ok, _ in resultados):
+            self.metricas.parcelas_fallidas += 1
+            await asyncio.to_thread(
+                self._registrar_uso, parcela, False, time.monotonic() - tiempo_inicio,
+                tareas_creadas, len(meses), len(cubiertos), 'Huecos sin completar'
+            )
+            logger.warning(f"⚠️ Parcela {parcela.nombre}: huecos pendientes, se reintentará al reanudar")
+            return False
+
+        # Guardar en IndiceMensual en cuanto la parcela está completa (streaming)
+        resumen = await asyncio.to_thread(self._guardar_parcela, parcela, field_id)
+        self.metricas.escenas += resumen['escenas']
+        self.metricas.registros_guardados += resumen['procesados']
+        self.metricas.parcelas_completadas += 1
+
+        for desde, hasta in huecos:
+            self.checkpoint.tareas.pop(CheckpointSincronizacion.clave_tarea(parcela.id, desde, hasta), None)
+        self.checkpoint.parcelas_completadas.add(parcela.id)
+        self.checkpoint.guardar()
+
+        await asyncio.to_thread(
+            self._registrar_uso, parcela, True, time.monotonic() - tiempo_inicio,
+            tareas_creadas, len(meses), len(cubiertos), None
+        )
+        logger.info(
+            f"✅ {parcela.nombre}: {resumen['escenas']} escenas, {resumen['procesados']} meses guardados, "
+            f"{len(huecos)} hueco(s), {len(cubiertos)}/{len(meses)} meses desde caché"
+        )
+        return True
+
+    async def _sincronizar_hueco(self, parcela, field_id: str, geometria: Dict,
+                                 desde: date, hasta: date):
+        """
+        Crea (o recupera del checkpoint) la tarea de un hueco y espera su resultado
+
+        Returns:
+            (exitoso, tarea_creada)
+        """
+        clave = CheckpointSincronizacion.clave_tarea(parcela.id, desde, hasta)
+        tarea_creada = False
+
+        async with self._semaforo:
+            registro = self.checkpoint.tareas.get(clave)
+            if registro:
+                # La tarea cubre el rango con que se creó (puede terminar días antes de hoy)
+                task_id = registro['task_id']
+                desde, hasta = date.fromisoformat(registro['desde']), date.fromisoformat(registro['hasta'])
+                self.metricas.tareas_reanudadas += 1
+                logger.info(f"♻️ {parcela.nombre} {desde} → {hasta}: retomando tarea {task_id}")
+            else:
+                try:
+                    tarea = await asyncio.to_thread(
+                        self.servicio._crear_tarea_estadisticas, geometria, field_id, desde, hasta,
+                        self.indices, self.max_nubosidad, self.limitador
+                    )
+                except Exception as e:
+                    logger.error(f"❌ {parcela.nombre} {desde} → {hasta}: error creando tarea: {e}")
+                    return False, False
+                if 'error' in tarea:
+                    logger.error(f"❌ {parcela.nombre} {desde} → {hasta}: {tarea['error']}")
+                    self.metricas.tareas_creadas += 1  # El POST rechazado también cuenta
+                    return False, True
+                task_id = tarea['task_id']
+                tarea_creada = True
+                self.metricas.tareas_creadas += 1
+                # Persistir antes de esperar: si se interrumpe, no se paga otra tarea
+                self.checkpoint.tareas[clave] = {
+                    'task_id': task_id, 'desde': desde.isoformat(), 'hasta': hasta.isoformat()
+                }
+                self.checkpoint.guardar()
+
+            resultado = (await self._poller.esperar_tareas([task_id]))[task_id]
+
+        self.metricas.consultas_estado += resultado.consultas
+        self.metricas.rate_limits += resultado.rate_limits
+
+        if resultado.estado == 'error':
+            # La tarea no sirve: la próxima corrida crea una nueva
+            self.checkpoint.tareas.pop(clave, None)
+            self.checkpoint.guardar()
+            return False, tarea_creada
+        if resultado.estado == 'timeout':
+            # Se conserva el task_id para volver a consultarla al reanudar
+            return False, tarea_creada
+
+        if resultado.resultados:
+            await asyncio.to_thread(
+                CacheMesEOSDA.guardar_escenas, field_id, desde, hasta, self.indices,
+                resultado.resultados, self.max_nubosidad, task_id
+            )
+        return True, tarea_creada
+
+    def _guardar_parcela(self, parcela, field_id: str) -> Dict:
+        registros = CacheMesEOSDA.obtener_cubiertos(
+            field_id, self.fecha_inicio, self.fecha_fin, self.indices, self.max_nubosidad
+        )
+        escenas = EosdaAPIService._ensamblar_escenas_cache(
+            registros.values(), self.fecha_inicio, self.fecha_fin, self.max_nubosidad
+        )
+        resumen = guardar_escenas_en_indices(parcela, escenas)
+        if self.incluir_clima:
+            guardar_clima_en_indices(parcela, self.fecha_inicio, self.fecha_fin)
+        resumen['escenas'] = len(escenas)
+        return resumen
+
+    def _registrar_uso(self, parcela, exitoso: bool, tiempo_respuesta: float, tareas_creadas: int,
+                       meses_solicitados: int, meses_desde_cache: int, mensaje_error: Optional[str]):
+        if self.usuario is None:
+            return
+        EstadisticaUsoEOSDA.registrar_uso(
+            usuario=self.usuario,
+            parcela=parcela,
+            tipo_operacion='statistics',
+            endpoint='/api/gdw/api (sincronizar_portafolio)',
+            exitoso=exitoso,
+            tiempo_respuesta=tiempo_respuesta,
+            requests_consumidos=tareas_creadas,
+            desde_cache=tareas_creadas == 0,
+            mensaje_error=mensaje_error,
+            meses_solicitados=meses_solicitados,
+            meses_desde_cache=meses_desde_cache
+        )
@@ -0,0 +1,436 @@
+"""
+Ejecutores de la cola de trabajos de generación
+Contiene el trabajo pesado que antes corría dentro de las vistas
+(generar_informe_pdf, generar_informe_legal_pdf, exportar_video_timeline)
+y el bucle que usan los workers de `manage.py procesar_trabajos`
+"""
+
+import os
+import sys
+import time
+import socket
+import logging
+import threading
+import traceback
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from informes.models import Parcela, IndiceMensual, Informe
+from informes.models_trabajos import TrabajoGeneracion, TipoTrabajo, EstadoTrabajo
+
+logger = logging.getLogger(__name__)
+
+
+def _nombre_limpio(texto: str) -> str:
+    return (texto or '').replace(" ", "_").replace("/", "-")
+
+
+# ========================================
+# 📄 INFORME PDF
+# ========================================
+
+def _calcular_precio_base(parcela: Parcela, meses_atras: int) -> Tuple[Decimal, Optional[object]]:
+    """
+    Precio del informe: invitación > configuración > tarifa según período
+
+    Returns:
+        (precio_base, cliente_invitacion)
+    """
+    if hasattr(parcela, 'invitacion_cliente'):
+        invitacion = parcela.invitacion_cliente
+        precio_base = invitacion.costo_servicio if invitacion.costo_servicio else Decimal('0.00')
+        logger.info(f"Precio asignado desde invitación: ${precio_base} COP")
+        return precio_base, invitacion
+
+    from informes.models_configuracion import ConfiguracionReporte
+    config = ConfiguracionReporte.objects.filter(
+        parcela=parcela
+    ).order_by('-creado_en').first()
+
+    if config and config.costo_estimado:
+        precio_base = config.costo_estimado
+        logger.info(f"Precio asignado desde configuración: ${precio_base} COP")
+    elif meses_atras <= 6:
+        precio_base = Decimal('200000.00')  # Plan básico
+    elif meses_atras <= 12:
+        precio_base = Decimal('320000.00')  # Plan estándar
+    else:
+        precio_base = Decimal('560000.00')  # Plan avanzado
+
+    # GARANTIZAR que precio_base NUNCA sea None
+    return precio_base if precio_base is not None else Decimal('0.00'), None
+
+
+def ejecutar_informe_pdf(trabajo: TrabajoGeneracion) -> Dict:
+    """Genera el informe PDF profesional y registra el Informe con sus datos de pago"""
+    from informes.generador_pdf import GeneradorPDFProfesional
+
+    parcela = trabajo.parcela
+    meses_atras = int(trabajo.parametros.get('meses', 12))
+
+    indices_count = IndiceMensual.objects.filter(parcela=parcela).count()
+    if indices_count == 0:
+        raise ValueError('No hay datos satelitales disponibles para esta parcela')
+
+    generador = GeneradorPDFProfesional()
+    ruta_pdf = generador.generar_informe_completo(
+        parcela_id=parcela.id,
+        meses_atras=meses_atras
+    )
+    if not ruta_pdf or not os.path.exists(ruta_pdf):
+        raise FileNotFoundError(f"El PDF no se generó correctamente en {ruta_pdf}")
+
+    precio_base, cliente_invitacion = _calcular_precio_base(parcela, meses_atras)
+
+    # Calcular fecha de vencimiento (30 días desde hoy)
+    fecha_vencimiento = (datetime.now() + timedelta(days=30)).date() if precio_base > 0 else None
+
+    informe = Informe.objects.create(
+        parcela=parcela,
+        periodo_analisis_meses=meses_atras,
+        fecha_inicio_analisis=(datetime.now() - timedelta(days=meses_atras * 30)).date(),
+        fecha_fin_analisis=datetime.now().date(),
+        titulo=f"Informe - {parcela.nombre}"[:290],
+        resumen_ejecutivo=f"Informe generado con {indices_count} meses de datos satelitales.",
+        archivo_pdf=ruta_pdf,
+        # Campos de pago
+        precio_base=precio_base,
+        cliente=cliente_invitacion,
+        fecha_vencimiento=fecha_vencimiento
+    )
+    logger.info(f"Informe creado con precio_base=${precio_base}, estado={informe.estado_pago}")
+
+    fecha_str = datetime.now().strftime("%Y%m%d")
+    return {
+        'archivo': ruta_pdf,
+        'nombre_descarga': (
+            f"informe_{_nombre_limpio(parcela.propietario)}_{_nombre_limpio(parcela.nombre)}_{fecha_str}.pdf"
+        ),
+        'resultado': {
+            'informe_id': informe.id,
+            'registros_mensuales': indices_count,
+            'precio_base': str(precio_base),
+            'estado_pago': informe.get_estado_pago_display(),
+        },
+    }
+
+
+# ========================================
+# ⚖️ INFORME LEGAL PDF
+# ========================================
+
+def ejecutar_informe_legal_pdf(trabajo: TrabajoGeneracion) -> Dict:
+    """Verifica restricciones ambientales y genera el PDF legal"""
+    import json
+    from shapely.geometry import shape, mapping
+
+    # Los módulos legales viven en la raíz del proyecto
+    base_dir = Path(__file__).resolve().parent.parent.parent
+    if str(base_dir) not in sys.path:
+        sys.path.insert(0, str(base_dir))
+
+    from generador_pdf_legal import GeneradorPDFLegal
+    from verificador_legal import VerificadorRestriccionesLegales
+
+    parcela = trabajo.parcela
+    if not parcela.geometria or parcela.geometria.empty:
+        raise ValueError('La parcela no tiene geometría definida')
+
+    # Parcela no guarda el departamento: se detecta por la geometría
+    from detector_geografico import obtener_detector_geografico
+    try:
+        departamento = obtener_detector_geografico().detectar_ubicacion(parcela.geometria)['departamento']
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo detectar el departamento de la parcela {parcela.id}: {e}")
+        departamento = None
+
+    verificador = VerificadorRestriccionesLegales()
+    # Paquete departamental si está construido y cubre la parcela; si no, capas nacionales
+    verificador.cargar_capas(departamento, limites_parcela=parcela.geometria.extent)
+
+    resultado = verificador.verificar_parcela(
+        parcela_id=parcela.id,
+        geometria_parcela=mapping(shape(json.loads(parcela.geometria.geojson))),
+        nombre_parcela=parcela.nombre
+    )
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_path = os.path.join(
+        settings.MEDIA_ROOT, 'verificacion_legal',
+        f"verificacion_legal_parcela_{parcela.id}_{timestamp}.pdf"
+    )
+    ruta_pdf = GeneradorPDFLegal().generar_pdf(
+        parcela=parcela,
+        resultado=resultado,
+        verificador=verificador,
+        output_path=output_path,
+        departamento=departamento or 'Casanare'
+    )
+    if not ruta_pdf or not os.path.exists(ruta_pdf):
+        raise FileNotFoundError(f"El PDF legal no se generó correctamente en {ruta_pdf}")
+
+    fecha_str = datetime.now().strftime("%Y%m%d")
+    return {
+        'archivo': ruta_pdf,
+        'nombre_descarga': (
+            f"informe_legal_{_nombre_limpio(parcela.propietario)}_{_nombre_limpio(parcela.nombre)}_{fecha_str}.pdf"
+        ),
+        'resultado': {
+            'cumple_normativa': bool(resultado.cumple_normativa),
+            'restricciones': len(resultado.restricciones_encontradas),
+            'area_restringida_ha': round(float(resultado.area_restringida_ha), 4),
+        },
+    }
+
+
+# ========================================
+# 🎬 VIDEO TIMELINE
+# ========================================
+
+def _obtener_textos_ultimo_informe(parcela: Parcela) -> Tuple[Optional[str], Optional[str]]:
+    """Análisis y recomendaciones del último informe generado (si existe)"""
+    try:
+        from informes.models_gemini import InformeGenerado
+        ultimo_informe = InformeGenerado.objects.filter(
+            parcela=parcela
+        ).order_by('-fecha_generacion').first()
+
+        if not ultimo_informe or not ultimo_informe.contenido_json:
+            return None, None
+
+        analisis_ia = ultimo_informe.contenido_json.get('analisis_ia', {})
+        analisis_texto = analisis_ia.get('analisis_textual', '') or analisis_ia.get('resumen_ejecutivo', '')
+
+        recomendaciones = analisis_ia.get('recomendaciones_priorizadas', [])
+        if recomendaciones:
+            recomendaciones_texto = '\n'.join([f"- {r.get('accion', '')}" for r in recomendaciones[:4]])
+        else:
+            recomendaciones_texto = analisis_ia.get('recomendaciones_texto', '')
+
+        logger.info(f"✅ Análisis obtenido del informe #{ultimo_informe.id}")
+        return analisis_texto, recomendaciones_texto
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo obtener análisis del informe: {e}")
+        return None, None
+
+
+def ejecutar_video_timeline(trabajo: TrabajoGeneracion) -> Dict:
+    """Exporta el timeline como video MP4 multi-escena"""
+    from informes.processors.timeline_processor import TimelineProcessor
+    from informes.exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
+    from informes.services.cubo_temporal import CuboTemporalParcela
+
+    parcela = trabajo.parcela
+    parametros = trabajo.parametros
+    indice = parametros.get('indice', 'ndvi')
+
+    # Sin request las URLs quedan relativas (/media/...) y el exportador
+    # lee las imágenes directamente del disco
+    timeline_data = TimelineProcessor.generar_timeline_completo(
+        parcela=parcela,
+        fecha_inicio=None,
+        fecha_fin=None
+    )
+    frames = timeline_data.get('frames', [])
+    if not frames:
+        raise ValueError('No hay datos disponibles para generar el video')
+
+    logger.info(f"📊 Procesando {len(frames)} frames para el video")
+
+    parcela_info = {
+        'nombre': parcela.nombre,
+        'area_hectareas': float(parcela.area_hectareas) if parcela.area_hectareas else 0,
+        'tipo_cultivo': parcela.tipo_cultivo or 'Sin especificar',
+        'centro_lat': parcela.geometria.centroid.y if parcela.geometria else 0,
+        'centro_lon': parcela.geometria.centroid.x if parcela.geometria else 0
+    }
+    analisis_texto, recomendaciones_texto = _obtener_textos_ultimo_informe(parcela)
+    cubo_temporal = CuboTemporalParcela.para_parcela(parcela.id, geometria=parcela.geometria)
+
+    exporter = TimelineVideoExporterMultiScene(
+        width=parametros.get('width', 1920),
+        height=parametros.get('height', 1080),
+        fps=parametros.get('fps', 2),
+        bitrate=parametros.get('bitrate'),  # None = tope del perfil
+        procesos=parametros.get('procesos', 1),
+        perfil=parametros.get('perfil', 'archive')
+    )
+    video_path = exporter.export_timeline(
+        frames_data=frames,
+        indice=indice,
+        parcela_info=parcela_info,
+        analisis_texto=analisis_texto,
+        recomendaciones_texto=recomendaciones_texto,
+        cubo_temporal=cubo_temporal if cubo_temporal.existe else None
+    )
+    if not os.path.exists(video_path):
+        raise RuntimeError("El video fue generado pero no se encuentra")
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return {
+        'archivo': video_path,
+        'nombre_descarga': f"timeline_{parcela.nombre}_{indice.upper()}_{timestamp}.mp4",
+        'resultado': {'frames': len(frames), 'indice': indice},
+    }
+
+
+EJECUTORES = {
+    TipoTrabajo.INFORME_PDF: ejecutar_informe_pdf,
+    TipoTrabajo.INFORME_LEGAL_PDF: ejecutar_informe_legal_pdf,
+    TipoTrabajo.VIDEO_TIMELINE: ejecutar_video_timeline,
+}
+
+# Errores de datos: reintentar no cambia el resultado
+ERRORES_NO_REINTENTABLES = (ValueError, Parcela.DoesNotExist)
+
+
+# ========================================
+# ⚙️ WORKER
+# ========================================
+
+# Segundos entre latidos del worker (liberar_huerfanos usa minutos sin latido)
+INTERVALO_LATIDO = 30
+# Minutos sin latido para dar un trabajo por abandonado
+MINUTOS_SIN_LATIDO = 5
+# Segundos entre revisiones de trabajos huérfanos dentro del bucle
+INTERVALO_REVISION_HUERFANOS = 60
+
+
+def nombre_worker(indice: int = 0) -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{indice}"
+
+
+class LatidoTrabajo:
+    """Hilo que registra el latido del trabajo mientras el ejecutor corre"""
+
+    def __init__(self, trabajo: TrabajoGeneracion, intervalo: float = INTERVALO_LATIDO):
+        self.trabajo = trabajo
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._bucle, name=f'latido-{trabajo.pk}', daemon=True)
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+
+    def _bucle(self):
+        try:
+            while not self._detener.wait(self.intervalo):
+                try:
+                    if not self.trabajo.registrar_latido():
+                        logger.warning(f"⚠️ Trabajo #{self.trabajo.pk} ya no está asignado a este worker")
+                except Exception as e:
+                    logger.warning(f"⚠️ No se pudo registrar el latido del trabajo #{self.trabajo.pk}: {e}")
+        finally:
+            connection.close()  # Conexión propia de este hilo
+
+
+def liberar_huerfanos(minutos: int = MINUTOS_SIN_LATIDO) -> Dict:
+    """Libera los trabajos de workers muertos y lo deja en el log"""
+    resumen = TrabajoGeneracion.liberar_huerfanos(minutos=minutos)
+    if resumen['devueltos']:
+        logger.warning(f"♻️ {resumen['devueltos']} trabajo(s) huérfano(s) devueltos a la cola")
+    if resumen['fallidos']:
+        logger.error(f"❌ {resumen['fallidos']} trabajo(s) huérfano(s) sin intentos restantes marcados como fallidos")
+    return resumen
+
+
+def ejecutar_trabajo(trabajo: TrabajoGeneracion) -> bool:
+    """
+    Ejecuta un trabajo ya reclamado y registra su resultado
+
+    Returns:
+        True si terminó bien
+    """
+    ejecutor = EJECUTORES.get(trabajo.tipo)
+    inicio = time.time()
+    logger.info(
+        f"▶️ Trabajo #{trabajo.pk} ({trabajo.tipo}) parcela {trabajo.parcela_id} "
+        f"- intento {trabajo.intentos}/{trabajo.max_intentos}"
+    )
+
+    try:
+        if ejecutor is None:
+            raise ValueError(f"Tipo de trabajo desconocido: {trabajo.tipo}")
+
+        with LatidoTrabajo(trabajo):
+            salida = ejecutor(trabajo)
+        if not trabajo.marcar_completado(
+            archivo=salida['archivo'],
+            nombre_descarga=salida.get('nombre_descarga', ''),
+            resultado=salida.get('resultado')
+        ):
+            logger.warning(f"⚠️ Trabajo #{trabajo.pk} terminó pero ya no era de este worker; resultado descartado")
+            return False
+        logger.info(f"✅ Trabajo #{trabajo.pk} completado en {time.time() - inicio:.1f}s "
+                    f"(espera en cola {trabajo.tiempo_cola or 0:.1f}s)")
+        return True
+
+    except ERRORES_NO_REINTENTABLES as e:
+        trabajo.intentos = trabajo.max_intentos
+        if trabajo.marcar_fallido(str(e)):
+            logger.error(f"❌ Trabajo #{trabajo.pk} fallido sin reintento: {e}")
+        else:
+            logger.warning(f"⚠️ Trabajo #{trabajo.pk} falló pero ya no era de este worker: {e}")
+        return False
+
+    except Exception as e:
+        if not trabajo.marcar_fallido(f"{e}\n\n{traceback.format_exc()}"):
+            logger.warning(f"⚠️ Trabajo #{trabajo.pk} falló pero ya no era de este worker: {e}")
+        elif trabajo.estado == EstadoTrabajo.PENDIENTE:
+            logger.warning(f"⚠️ Trabajo #{trabajo.pk} falló ({e}), reintento desde {trabajo.disponible_desde}")
+        else:
+            logger.error(f"❌ Trabajo #{trabajo.pk} fallido tras {trabajo.intentos} intentos: {e}")
+        return False
+
+
+def procesar_cola(worker: str, tipos: list = None, intervalo: float = 2.0,
+                  hasta_vaciar: bool = False, max_trabajos: int = None,
+                  minutos_huerfanos: int = MINUTOS_SIN_LATIDO) -> Dict:
+    """
+    Bucle de un worker: reclama y ejecuta trabajos hasta que lo detengan
+
+    Args:
+        worker: Identificador del worker (queda guardado en el trabajo)
+        tipos: Limitar a ciertos tipos de trabajo (None = todos)
+        intervalo: Segundos de espera cuando la cola está vacía
+        hasta_vaciar: Terminar en cuanto no queden trabajos disponibles
+        max_trabajos: Terminar después de N trabajos (reciclado del proceso)
+        minutos_huerfanos: Cada INTERVALO_REVISION_HUERFANOS s se liberan los
+            trabajos sin latido hace más de estos minutos (p. ej. de un
+            worker del pool que murió y fue reemplazado)
+
+    Returns:
+        Contadores del worker
+    """
+    contadores = {'completados': 0, 'fallidos': 0}
+    ultima_revision = None
+
+    while max_trabajos is None or sum(contadores.values()) < max_trabajos:
+        close_old_connections()
+        if ultima_revision is None or time.monotonic() - ultima_revision >= INTERVALO_REVISION_HUERFANOS:
+            liberar_huerfanos(minutos_huerfanos)
+            ultima_revision = time.monotonic()
+        trabajo = TrabajoGeneracion.reclamar_siguiente(worker, tipos=tipos)
+
+        if trabajo is None:
+            if hasta_vaciar:
+                break
+            time.sleep(intervalo)
+            continue
+
+        if ejecutar_trabajo(trabajo):
+            contadores['completados'] += 1
+        else:
+            contadores['fallidos'] += 1
+
+    return contadores
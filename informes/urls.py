@@ -70,6 +70,10 @@ urlpatterns = [
     path('parcelas/<int:parcela_id>/generar-informe/', views.generar_informe_pdf, name='generar_informe_pdf'),
     path('parcelas/<int:parcela_id>/generar-informe-legal/', views.generar_informe_legal_pdf, name='generar_informe_legal_pdf'),
     
+    # Cola de trabajos de generación (PDF, PDF legal, video)
+    path('trabajos/<int:trabajo_id>/', views.estado_trabajo, name='estado_trabajo'),
+    path('trabajos/<int:trabajo_id>/descargar/', views.descargar_trabajo, name='descargar_trabajo'),
+    
     # Timeline Visual
     path('parcelas/<int:parcela_id>/timeline/', views.timeline_parcela, name='timeline_parcela'),
     path('parcelas/<int:parcela_id>/timeline/api/', views.timeline_api, name='timeline_api'),
@@ -26,11 +26,14 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 
 from .models import Parcela, IndiceMensual, Informe, ConfiguracionAPI
+from .models_trabajos import TrabajoGeneracion, TipoTrabajo, EstadoTrabajo
 from .models_clientes import ClienteInvitacion, RegistroEconomico
 # Importaciones de servicios
 from .services.eosda_api import eosda_service
 from .services.weather_service import OpenMeteoWeatherService
 from .services.analisis_datos import analisis_service
+from .services.indices_mensuales import guardar_escenas_en_indices, guardar_clima_en_indices
+from .exporters.perfiles_video import PERFILES_CODIFICACION
 # Importar generador de PDF
 from .generador_pdf import GeneradorPDFProfesional
 
@@ -1435,211 +1438,12 @@ def obtener_datos_historicos(request, parcela_id):
                     logger.info(f"    Ejemplo: {valor[0]}")
         
         # Procesar y guardar los datos en la base de datos
-        indices_creados = 0
-        datos_procesados = 0
-        
-        # Agrupar datos por año-mes desde la estructura real de EOSDA
-        from collections import defaultdict
-        datos_por_mes = defaultdict(lambda: {
-            'ndvi_valores': [], 'ndvi_max': [], 'ndvi_min': [],
-            'ndmi_valores': [], 'ndmi_max': [], 'ndmi_min': [],
-            'savi_valores': [], 'savi_max': [], 'savi_min': [],
-            'nubosidad': [],
-            'escenas': []  # Guardar todas las escenas para encontrar la mejor
-        })
-        
-        # Procesar cada escena satelital
-        for escena in datos_satelitales.get('resultados', []):
-            try:
-                fecha_str = escena.get('date')
-                if not fecha_str:
-                    continue
-                
-                fecha = datetime.fromisoformat(fecha_str).date()
-                clave_mes = (fecha.year, fecha.month)
-                
-                # Extraer índices de cada escena
-                indexes = escena.get('indexes', {})
-                nubosidad = escena.get('cloud', 0)
-                view_id = escena.get('view_id')  # ✅ view_id de la escena (campo correcto según API)
-                
-                # NDVI
-                if 'NDVI' in indexes:
-                    datos_por_mes[clave_mes]['ndvi_valores'].append(indexes['NDVI'].get('average', 0))
-                    datos_por_mes[clave_mes]['ndvi_max'].append(indexes['NDVI'].get('max', 0))
-                    datos_por_mes[clave_mes]['ndvi_min'].append(indexes['NDVI'].get('min', 0))
-                
-                # NDMI
-                if 'NDMI' in indexes:
-                    datos_por_mes[clave_mes]['ndmi_valores'].append(indexes['NDMI'].get('average', 0))
-                    datos_por_mes[clave_mes]['ndmi_max'].append(indexes['NDMI'].get('max', 0))
-                    datos_por_mes[clave_mes]['ndmi_min'].append(indexes['NDMI'].get('min', 0))
-                
-                # SAVI
-                if 'SAVI' in indexes:
-                    datos_por_mes[clave_mes]['savi_valores'].append(indexes['SAVI'].get('average', 0))
-                    datos_por_mes[clave_mes]['savi_max'].append(indexes['SAVI'].get('max', 0))
-                    datos_por_mes[clave_mes]['savi_min'].append(indexes['SAVI'].get('min', 0))
-                
-                datos_por_mes[clave_mes]['nubosidad'].append(nubosidad)
-                
-                # ✅ Guardar info completa de la escena para encontrar la mejor
-                datos_por_mes[clave_mes]['escenas'].append({
-                    'view_id': view_id,
-                    'fecha': fecha,
-                    'nubosidad': nubosidad
-                })
-                
-            except Exception as e:
-                logger.error(f"Error procesando escena: {str(e)}")
-                continue
-        
-        # Guardar datos agrupados por mes
-        for (year, month), datos in datos_por_mes.items():
-            try:
-                # Calcular promedios
-                ndvi_prom = sum(datos['ndvi_valores']) / len(datos['ndvi_valores']) if datos['ndvi_valores'] else None
-                ndvi_max = max(datos['ndvi_max']) if datos['ndvi_max'] else None
-                ndvi_min = min(datos['ndvi_min']) if datos['ndvi_min'] else None
-                
-                ndmi_prom = sum(datos['ndmi_valores']) / len(datos['ndmi_valores']) if datos['ndmi_valores'] else None
-                ndmi_max = max(datos['ndmi_max']) if datos['ndmi_max'] else None
-                ndmi_min = min(datos['ndmi_min']) if datos['ndmi_min'] else None
-                
-                savi_prom = sum(datos['savi_valores']) / len(datos['savi_valores']) if datos['savi_valores'] else None
-                savi_max = max(datos['savi_max']) if datos['savi_max'] else None
-                savi_min = min(datos['savi_min']) if datos['savi_min'] else None
-                
-                nub_prom = sum(datos['nubosidad']) / len(datos['nubosidad']) if datos['nubosidad'] else 0
-                
-                # ✅ Encontrar la escena con MENOR nubosidad del mes para imágenes
-                mejor_escena = None
-                if datos['escenas']:
-                    mejor_escena = min(datos['escenas'], key=lambda x: x['nubosidad'])
-                    logger.info(f"   🎯 Mejor escena para {month:02d}/{year}: "
-                               f"view_id={mejor_escena['view_id']}, "
-                               f"fecha={mejor_escena['fecha']}, "
-                               f"nubosidad={mejor_escena['nubosidad']:.1f}%")
-                
-                # Crear o actualizar registro mensual
-                defaults = {
-                    'ndvi_promedio': ndvi_prom,
-                    'ndvi_maximo': ndvi_max,
-                    'ndvi_minimo': ndvi_min,
-                    'ndmi_promedio': ndmi_prom,
-                    'ndmi_maximo': ndmi_max,
-                    'ndmi_minimo': ndmi_min,
-                    'savi_promedio': savi_prom,
-                    'savi_maximo': savi_max,
-                    'savi_minimo': savi_min,
-                    'nubosidad_promedio': nub_prom,
-                    'fuente_datos': 'EOSDA',
-                    'calidad_datos': 'buena' if nub_prom < 30 else ('regular' if nub_prom < 50 else 'pobre')
-                }
-                
-                # ✅ Agregar metadatos de la mejor escena para descarga de imágenes
-                if mejor_escena:
-                    defaults['view_id_imagen'] = mejor_escena['view_id']
-                    defaults['fecha_imagen'] = mejor_escena['fecha']
-                    defaults['nubosidad_imagen'] = mejor_escena['nubosidad']
-                
-                indice, created = IndiceMensual.objects.update_or_create(
-                    parcela=parcela,
-                    año=year,
-                    mes=month,
-                    defaults=defaults
-                )
-                
-                if created:
-                    indices_creados += 1
-                datos_procesados += 1
-                
-                # Log con formato correcto
-                ndvi_str = f"{ndvi_prom:.3f}" if ndvi_prom else "N/A"
-                ndmi_str = f"{ndmi_prom:.3f}" if ndmi_prom else "N/A"
-                savi_str = f"{savi_prom:.3f}" if savi_prom else "N/A"
-                logger.info(f"✅ Guardado {month:02d}/{year}: NDVI={ndvi_str}, "
-                           f"NDMI={ndmi_str}, SAVI={savi_str}, "
-                           f"Nubosidad={nub_prom:.1f}%")
-                
-            except Exception as e:
-                logger.error(f"Error guardando datos de {month}/{year}: {str(e)}")
+        resumen_satelital = guardar_escenas_en_indices(parcela, datos_satelitales.get('resultados', []))
+        indices_creados = resumen_satelital['creados']
+        datos_procesados = resumen_satelital['procesados']
         
         # 🌦️ OBTENER DATOS CLIMÁTICOS CON OPEN-METEO
-        # EOSDA Weather API deshabilitado (sin cobertura en Colombia)
-        # Usamos Open-Meteo como alternativa gratuita con cobertura global
-        logger.info("🌦️ Obteniendo datos climáticos con Open-Meteo...")
-        meses_clima_actualizados = 0
-        try:
-            # Calcular centroide de la parcela para las coordenadas
-            centroide = parcela.geometria.centroid
-            latitud = centroide.y
-            longitud = centroide.x
-            
-            # Obtener datos diarios de Open-Meteo
-            datos_diarios = OpenMeteoWeatherService.obtener_datos_historicos(
-                latitud=latitud,
-                longitud=longitud,
-                fecha_inicio=fecha_inicio,
-                fecha_fin=fecha_fin
-            )
-            
-            if datos_diarios:
-                # Agrupar por mes
-                datos_clima_por_mes = OpenMeteoWeatherService.agrupar_por_mes(datos_diarios)
-                
-                # Actualizar O CREAR registros mensuales con datos climáticos
-                for (year, month), datos in datos_clima_por_mes.items():
-                    try:
-                        # Verificar si ya existe el registro (creado por datos satelitales)
-                        registro_existente = IndiceMensual.objects.filter(
-                            parcela=parcela,
-                            año=year,
-                            mes=month
-                        ).first()
-                        
-                        if registro_existente:
-                            # ACTUALIZAR solo datos climáticos, mantener fuente_datos = 'EOSDA'
-                            registro_existente.temperatura_promedio = datos.get('temperatura_promedio')
-                            registro_existente.temperatura_maxima = datos.get('temperatura_maxima')
-                            registro_existente.temperatura_minima = datos.get('temperatura_minima')
-                            registro_existente.precipitacion_total = datos.get('precipitacion_total')
-                            registro_existente.save(update_fields=[
-                                'temperatura_promedio', 'temperatura_maxima', 
-                                'temperatura_minima', 'precipitacion_total'
-                            ])
-                            accion = "actualizado"
-                        else:
-                            # CREAR nuevo registro solo con datos climáticos (sin índices satelitales)
-                            IndiceMensual.objects.create(
-                                parcela=parcela,
-                                año=year,
-                                mes=month,
-                                temperatura_promedio=datos.get('temperatura_promedio'),
-                                temperatura_maxima=datos.get('temperatura_maxima'),
-                                temperatura_minima=datos.get('temperatura_minima'),
-                                precipitacion_total=datos.get('precipitacion_total'),
-                                fuente_datos='Solo Clima',  # Datos climáticos reales sin imágenes satelitales
-                                calidad_datos='buena'
-                            )
-                            accion = "creado"
-                        
-                        meses_clima_actualizados += 1
-                        temp = datos.get('temperatura_promedio')
-                        precip = datos.get('precipitacion_total')
-                        temp_str = f"{temp:.1f}" if temp else "N/A"
-                        precip_str = f"{precip:.1f}" if precip else "N/A"
-                        logger.info(f"   🌡️ Clima {accion} {month:02d}/{year}: "
-                                   f"Temp={temp_str}°C, Precip={precip_str}mm")
-                    except Exception as e:
-                        logger.error(f"Error actualizando datos climáticos de {month}/{year}: {str(e)}")
-                
-                logger.info(f"✅ Open-Meteo: {meses_clima_actualizados} meses con datos climáticos")
-            else:
-                logger.warning("⚠️ Open-Meteo no retornó datos climáticos")
-                
-        except Exception as e:
-            logger.error(f"Error obteniendo datos climáticos de Open-Meteo: {str(e)}")
+        meses_clima_actualizados = guardar_clima_en_indices(parcela, fecha_inicio, fecha_fin)
         
         logger.info(f"Datos históricos procesados para {parcela.nombre}: {indices_creados} nuevos índices, {datos_procesados} meses satelitales, {meses_clima_actualizados} meses climáticos")
         
@@ -2028,6 +1832,9 @@ def generar_informe_pdf(request, parcela_id):
     """
     Vista para generar informe PDF profesional de una parcela
     Accesible desde el botón "Generar Informe" en detalle de parcela
+    
+    La generación corre en la cola de trabajos (manage.py procesar_trabajos):
+    esta vista solo valida, encola y devuelve el id del trabajo.
     """
     try:
         # Verificar que la parcela existe
@@ -2035,133 +1842,127 @@ def generar_informe_pdf(request, parcela_id):
         
         # Verificar permisos (propietario o superusuario)
         if not request.user.is_superuser and parcela.propietario != request.user.username:
-            messages.error(request, 'No tiene permisos para generar informes de esta parcela.')
-            return redirect('informes:detalle_parcela', parcela_id=parcela_id)
+            return _error_trabajo(request, 'No tiene permisos para generar informes de esta parcela.',
+                                  parcela_id, status=403)
         
         # Obtener parámetros opcionales
         meses_atras = int(request.GET.get('meses', 12))
         
         # Validar que hay datos disponibles
-        indices_count = IndiceMensual.objects.filter(parcela=parcela).count()
-        if indices_count == 0:
-            messages.warning(request, 
-                           'No hay datos satelitales disponibles para esta parcela. '
-                           'Por favor sincronice datos primero.')
-            return redirect('informes:detalle_parcela', parcela_id=parcela_id)
-        
-        # Generar PDF
-        try:
-            generador = GeneradorPDFProfesional()
-            ruta_pdf = generador.generar_informe_completo(
-                parcela_id=parcela_id,
-                meses_atras=meses_atras
-            )
-            
-            # Verificar que el archivo se generó
-            if not os.path.exists(ruta_pdf):
-                raise FileNotFoundError(f"El PDF no se generó correctamente en {ruta_pdf}")
-            
-            # Determinar precio base del informe - SIEMPRE inicializar con Decimal
-            cliente_invitacion = None
-            fecha_vencimiento_calculada = None
-            
-            # Verificar si la parcela tiene invitación asociada
-            if hasattr(parcela, 'invitacion_cliente'):
-                invitacion = parcela.invitacion_cliente
-                cliente_invitacion = invitacion
-                precio_base = invitacion.costo_servicio if invitacion.costo_servicio else Decimal('0.00')
-                logger.info(f"Precio asignado desde invitación: ${precio_base} COP")
-            else:
-                # Calcular precio según configuración
-                from .models_configuracion import ConfiguracionReporte
-                config = ConfiguracionReporte.objects.filter(
-                    parcela=parcela
-                ).order_by('-creado_en').first()
-                
-                if config and config.costo_estimado:
-                    precio_base = config.costo_estimado
-                    logger.info(f"Precio asignado desde configuración: ${precio_base} COP")
-                else:
-                    # Precio por defecto según tipo de análisis
-                    if meses_atras <= 6:
-                        precio_base = Decimal('200000.00')  # Plan básico
-                    elif meses_atras <= 12:
-                        precio_base = Decimal('320000.00')  # Plan estándar
-                    else:
-                        precio_base = Decimal('560000.00')  # Plan avanzado
-                    logger.info(f"Precio por defecto según período: ${precio_base} COP")
-            
-            # GARANTIZAR que precio_base NUNCA sea None
-            if precio_base is None:
-                precio_base = Decimal('0.00')
-                logger.warning(f"⚠️ precio_base era None, asignado 0.00 por defecto")
-            
-            # Calcular fecha de vencimiento (30 días desde hoy)
-            if precio_base > 0:
-                fecha_vencimiento_calculada = (datetime.now() + timedelta(days=30)).date()
-            
-            # Crear registro de informe en BD con datos de pago
-            titulo_informe = f"Informe - {parcela.nombre}"[:290]
-            informe = Informe.objects.create(
-                parcela=parcela,
-                periodo_analisis_meses=meses_atras,
-                fecha_inicio_analisis=(datetime.now() - timedelta(days=meses_atras*30)).date(),
-                fecha_fin_analisis=datetime.now().date(),
-                titulo=titulo_informe,
-                resumen_ejecutivo=f"Informe generado con {indices_count} meses de datos satelitales.",
-                archivo_pdf=ruta_pdf,
-                # Campos de pago
-                precio_base=precio_base,
-                cliente=cliente_invitacion,
-                fecha_vencimiento=fecha_vencimiento_calculada
-            )
-            
-            logger.info(f"Informe creado con precio_base=${precio_base}, estado={informe.estado_pago}")
-            
-            # Enviar archivo para descarga con nombre descriptivo
-            from django.http import FileResponse
-            from datetime import datetime
-            
-            # Crear nombre de archivo descriptivo: Propietario_Parcela_Fecha.pdf
-            propietario_limpio = parcela.propietario.replace(" ", "_").replace("/", "-")
-            parcela_limpia = parcela.nombre.replace(" ", "_").replace("/", "-")
-            fecha_str = datetime.now().strftime("%Y%m%d")
-            nombre_archivo = f"informe_{propietario_limpio}_{parcela_limpia}_{fecha_str}.pdf"
-            
-            response = FileResponse(
-                open(ruta_pdf, 'rb'),
-                content_type='application/pdf'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
-            
-            # Log de éxito
-            logger.info(f"Informe PDF generado exitosamente para parcela {parcela.nombre} (ID: {parcela_id})")
-            
-            if precio_base > 0:
-                messages.success(request, 
-                               f'¡Informe generado exitosamente! '
-                               f'Analizados {indices_count} registros mensuales. '
-                               f'Precio: ${precio_base:,.0f} COP - Estado: {informe.get_estado_pago_display()}')
-            else:
-                messages.success(request, 
-                               f'¡Informe generado exitosamente! '
-                               f'Analizados {indices_count} registros mensuales.')
-            
-            return response
-            
-        except Exception as e_generacion:
-            logger.error(f"Error generando PDF para parcela {parcela_id}: {str(e_generacion)}")
-            logger.exception(e_generacion)
-            messages.error(request, 
-                          f'Error generando el informe PDF: {str(e_generacion)}. '
-                          'Por favor contacte al administrador.')
-            return redirect('informes:detalle_parcela', parcela_id=parcela_id)
+        if not IndiceMensual.objects.filter(parcela=parcela).exists():
+            return _error_trabajo(request,
+                                  'No hay datos satelitales disponibles para esta parcela. '
+                                  'Por favor sincronice datos primero.',
+                                  parcela_id, status=400)
+        
+        trabajo, creado = TrabajoGeneracion.encolar(
+            tipo=TipoTrabajo.INFORME_PDF,
+            parcela=parcela,
+            usuario=request.user,
+            parametros={'meses': meses_atras}
+        )
+        logger.info(f"📥 Informe PDF {'encolado' if creado else 'ya en curso'}: trabajo #{trabajo.pk} "
+                    f"parcela {parcela.nombre} (ID: {parcela_id})")
+        return _respuesta_trabajo(request, trabajo, creado)
         
     except Exception as e:
         logger.error(f"Error en generar_informe_pdf para parcela {parcela_id}: {str(e)}")
         logger.exception(e)
-        messages.error(request, f'Error: {str(e)}')
-        return redirect('informes:lista_parcelas')
+        return _error_trabajo(request, f'Error: {str(e)}', None, status=500)
+
+
+# ========================================
+# 📥 COLA DE TRABAJOS - ESTADO Y DESCARGA
+# ========================================
+
+def _espera_json(request) -> bool:
+    """True si la petición viene de fetch/AJAX y espera JSON"""
+    return (
+        request.headers.get('x-requested-with') == 'XMLHttpRequest'
+        or 'application/json' in request.headers.get('accept', '')
+    )
+
+
+def _info_trabajo(trabajo) -> Dict:
+    datos = trabajo.a_dict()
+    datos['url_estado'] = reverse('informes:estado_trabajo', args=[trabajo.pk])
+    datos['url_descarga'] = (
+        reverse('informes:descargar_trabajo', args=[trabajo.pk])
+        if trabajo.estado == EstadoTrabajo.COMPLETADO else None
+    )
+    return datos
+
+
+def _respuesta_trabajo(request, trabajo, creado: bool):
+    """202 + id del trabajo (fetch) o página de seguimiento (navegación normal)"""
+    if _espera_json(request):
+        datos = _info_trabajo(trabajo)
+        datos['creado'] = creado
+        return JsonResponse(datos, status=202)
+    return redirect('informes:estado_trabajo', trabajo_id=trabajo.pk)
+
+
+def _error_trabajo(request, mensaje: str, parcela_id: Optional[int], status: int = 400):
+    if _espera_json(request):
+        return JsonResponse({'error': True, 'mensaje': mensaje}, status=status)
+    messages.error(request, mensaje)
+    if parcela_id:
+        return redirect('informes:detalle_parcela', parcela_id=parcela_id)
+    return redirect('informes:lista_parcelas')
+
+
+def _obtener_trabajo_autorizado(request, trabajo_id):
+    trabajo = get_object_or_404(TrabajoGeneracion.objects.select_related('parcela'), pk=trabajo_id)
+    if not (request.user.is_superuser
+            or trabajo.usuario_id == request.user.id
+            or trabajo.parcela.propietario == request.user.username):
+        return None
+    return trabajo
+
+
+@login_required
+def estado_trabajo(request, trabajo_id):
+    """
+    Estado de un trabajo de generación
+    JSON para el polling del frontend; página de seguimiento en navegación normal
+    """
+    trabajo = _obtener_trabajo_autorizado(request, trabajo_id)
+    if trabajo is None:
+        return _error_trabajo(request, 'No tiene permisos para ver este trabajo.', None, status=403)
+    
+    if _espera_json(request):
+        return JsonResponse(_info_trabajo(trabajo))
+    
+    return render(request, 'informes/trabajos/estado.html', {
+        'trabajo': trabajo,
+        'parcela': trabajo.parcela,
+    })
+
+
+@login_required
+def descargar_trabajo(request, trabajo_id):
+    """Descarga el archivo (PDF/MP4) de un trabajo completado"""
+    trabajo = _obtener_trabajo_autorizado(request, trabajo_id)
+    if trabajo is None:
+        return _error_trabajo(request, 'No tiene permisos para descargar este archivo.', None, status=403)
+    
+    if trabajo.estado != EstadoTrabajo.COMPLETADO:
+        return JsonResponse({
+            'error': True,
+            'mensaje': f'El trabajo está {trabajo.get_estado_display().lower()}',
+            'estado': trabajo.estado
+        }, status=409)
+    
+    if not trabajo.archivo_resultado or not os.path.exists(trabajo.archivo_resultado):
+        return JsonResponse({'error': True, 'mensaje': 'El archivo generado ya no existe'}, status=410)
+    
+    content_type = 'video/mp4' if trabajo.archivo_resultado.endswith('.mp4') else 'application/pdf'
+    return FileResponse(
+        open(trabajo.archivo_resultado, 'rb'),
+        content_type=content_type,
+        as_attachment=True,
+        filename=trabajo.nombre_descarga or os.path.basename(trabajo.archivo_resultado)
+    )
 
 
 # ========================================
@@ -2275,29 +2076,35 @@ def timeline_api(request, parcela_id):
 def exportar_video_timeline(request, parcela_id):
     """
     Exporta el timeline como video MP4 de alta calidad con múltiples escenas
-    Genera el video en backend usando FFmpeg y el nuevo TimelineVideoExporterMultiScene
-    
-    ACTUALIZADO: Ahora usa TimelineVideoExporterMultiScene con columna dinámica de información
+    El video se genera en la cola de trabajos con TimelineVideoExporterMultiScene;
+    la vista responde 202 con el id del trabajo para hacer polling
     
     Parámetros GET:
         - indice: 'ndvi', 'ndmi' o 'savi' (default: 'ndvi')
         - fps: Frames por segundo (default: 2)
-        - width: Ancho del video (default: 1920)
-        - height: Alto del video (default: 1080)
-        - bitrate: Bitrate del video (default: '8000k')
+        - width: Ancho del lienzo (default: 1920; el perfil solo reduce)
+        - height: Alto del lienzo (default: 1080)
+        - perfil: 'draft', 'web' o 'archive' (default: 'web'); fija preset,
+          CRF, resolución máxima y tope de bitrate
+        - bitrate: Tope de bitrate explícito, p. ej. '6000k' (default: el del perfil)
+        - procesos: Procesos para dibujar escenas en paralelo (default: 1,
+          máximo: CPUs del servidor)
     """
     try:
-        from .processors.timeline_processor import TimelineProcessor
-        from .exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
-        
         parcela = get_object_or_404(Parcela, id=parcela_id)
         
         # Parámetros de exportación
         indice = request.GET.get('indice', 'ndvi')
-        fps = int(request.GET.get('fps', 2))
-        width = int(request.GET.get('width', 1920))
-        height = int(request.GET.get('height', 1080))
-        bitrate = request.GET.get('bitrate', '8000k')
+        perfil = request.GET.get('perfil', 'web').lower()
+        parametros = {
+            'indice': indice,
+            'fps': int(request.GET.get('fps', 2)),
+            'width': int(request.GET.get('width', 1920)),
+            'height': int(request.GET.get('height', 1080)),
+            'perfil': perfil,
+            'bitrate': request.GET.get('bitrate') or None,  # None = tope del perfil
+            'procesos': min(max(int(request.GET.get('procesos', 1)), 1), os.cpu_count() or 1),
+        }
         
         # Validar índice
         if indice not in ['ndvi', 'ndmi', 'savi']:
@@ -2306,99 +2113,28 @@ def exportar_video_timeline(request, parcela_id):
                 'mensaje': f'Índice inválido: {indice}. Debe ser ndvi, ndmi o savi.'
             }, status=400)
         
-        logger.info(f"🎬 Iniciando exportación de video multi-escena para parcela {parcela_id}, índice={indice}")
-        
-        # Obtener datos del timeline
-        timeline_data = TimelineProcessor.generar_timeline_completo(
-            parcela=parcela,
-            fecha_inicio=None,
-            fecha_fin=None,
-            request=request
-        )
-        
-        frames = timeline_data.get('frames', [])
+        # Validar perfil de codificación
+        if perfil not in PERFILES_CODIFICACION:
+            return JsonResponse({
+                'error': True,
+                'mensaje': f'Perfil inválido: {perfil}. Debe ser {", ".join(PERFILES_CODIFICACION)}.'
+            }, status=400)
         
-        if not frames:
+        if not IndiceMensual.objects.filter(parcela=parcela).exists():
             return JsonResponse({
                 'error': True,
                 'mensaje': 'No hay datos disponibles para generar el video'
             }, status=404)
         
-        logger.info(f"📊 Procesando {len(frames)} frames para el video")
-        
-        # Preparar información completa de la parcela
-        parcela_info = {
-            'nombre': parcela.nombre,
-            'area_hectareas': float(parcela.area_hectareas) if parcela.area_hectareas else 0,
-            'tipo_cultivo': parcela.tipo_cultivo or 'Sin especificar',
-            'centro_lat': parcela.geometria.centroid.y if parcela.geometria else 0,
-            'centro_lon': parcela.geometria.centroid.x if parcela.geometria else 0
-        }
-        
-        # Obtener análisis y recomendaciones del último informe (si existe)
-        analisis_texto = None
-        recomendaciones_texto = None
-        
-        try:
-            from .models import InformeGenerado
-            ultimo_informe = InformeGenerado.objects.filter(
-                parcela=parcela
-            ).order_by('-fecha_generacion').first()
-            
-            if ultimo_informe and ultimo_informe.contenido_json:
-                analisis_ia = ultimo_informe.contenido_json.get('analisis_ia', {})
-                
-                # Extraer análisis textual
-                analisis_texto = analisis_ia.get('analisis_textual', '')
-                if not analisis_texto:
-                    analisis_texto = analisis_ia.get('resumen_ejecutivo', '')
-                
-                # Extraer recomendaciones
-                recomendaciones = analisis_ia.get('recomendaciones_priorizadas', [])
-                if recomendaciones:
-                    recomendaciones_texto = '\n'.join([f"- {r.get('accion', '')}" for r in recomendaciones[:4]])
-                else:
-                    recomendaciones_texto = analisis_ia.get('recomendaciones_texto', '')
-                
-                logger.info(f"✅ Análisis obtenido del informe #{ultimo_informe.id}")
-        except Exception as e:
-            logger.warning(f"⚠️ No se pudo obtener análisis del informe: {e}")
-        
-        # Crear exportador multi-escena
-        exporter = TimelineVideoExporterMultiScene(
-            width=width,
-            height=height,
-            fps=fps,
-            bitrate=bitrate
-        )
-        
-        # Generar video con el nuevo sistema multi-escena
-        video_path = exporter.export_timeline(
-            frames_data=frames,
-            indice=indice,
-            parcela_info=parcela_info,
-            analisis_texto=analisis_texto,
-            recomendaciones_texto=recomendaciones_texto
-        )
-        
-        # Verificar que el archivo existe
-        if not os.path.exists(video_path):
-            raise RuntimeError("El video fue generado pero no se encuentra")
-        
-        logger.info(f"✅ Video generado exitosamente: {video_path}")
-        
-        # Retornar archivo como descarga
-        response = FileResponse(
-            open(video_path, 'rb'),
-            content_type='video/mp4'
+        trabajo, creado = TrabajoGeneracion.encolar(
+            tipo=TipoTrabajo.VIDEO_TIMELINE,
+            parcela=parcela,
+            usuario=request.user,
+            parametros=parametros
         )
-        
-        # Nombre del archivo con formato mejorado
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"timeline_{parcela.nombre}_{indice.upper()}_{timestamp}.mp4"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        
-        return response
+        logger.info(f"🎬 Video timeline {'encolado' if creado else 'ya en curso'}: trabajo #{trabajo.pk} "
+                    f"parcela {parcela_id}, índice={indice}, perfil={perfil}")
+        return _respuesta_trabajo(request, trabajo, creado)
         
     except ValueError as e:
         logger.error(f"Error de validación en exportación de video: {e}")
@@ -2407,13 +2143,6 @@ def exportar_video_timeline(request, parcela_id):
             'mensaje': str(e)
         }, status=400)
         
-    except RuntimeError as e:
-        logger.error(f"Error de runtime en exportación de video: {e}")
-        return JsonResponse({
-            'error': True,
-            'mensaje': f'Error generando video: {str(e)}'
-        }, status=500)
-        
     except Exception as e:
         logger.error(f"Error inesperado en exportación de video: {e}")
         logger.exception(e)
@@ -2501,7 +2230,7 @@ def arqueo_caja(request):
 def generar_informe_legal_pdf(request, parcela_id):
     """
     Vista para generar informe PDF de verificación legal (restricciones ambientales)
-    Similar a generar_informe_pdf pero usando generador_pdf_legal.py
+    Similar a generar_informe_pdf pero usando generador_pdf_legal.py (en la cola de trabajos)
     """
     try:
         # Verificar que la parcela existe
@@ -2509,89 +2238,27 @@ def generar_informe_legal_pdf(request, parcela_id):
         
         # Verificar permisos (propietario o superusuario)
         if not request.user.is_superuser and parcela.propietario != request.user.username:
-            messages.error(request, 'No tiene permisos para generar informes legales de esta parcela.')
-            return redirect('informes:detalle_parcela', parcela_id=parcela_id)
+            return _error_trabajo(request, 'No tiene permisos para generar informes legales de esta parcela.',
+                                  parcela_id, status=403)
         
         # Verificar que la parcela tiene geometría
         if not parcela.geometria or parcela.geometria.empty:
-            messages.warning(request, 
-                           'La parcela no tiene geometría definida. '
-                           'Por favor defina la ubicación en el mapa primero.')
-            return redirect('informes:detalle_parcela', parcela_id=parcela_id)
+            return _error_trabajo(request,
+                                  'La parcela no tiene geometría definida. '
+                                  'Por favor defina la ubicación en el mapa primero.',
+                                  parcela_id, status=400)
         
-        # Generar PDF legal
-        try:
-            # Importar el generador legal y verificador
-            import sys
-            import os
-            from pathlib import Path
-            
-            # Agregar directorio raíz al path para importar módulos
-            base_dir = Path(__file__).resolve().parent.parent
-            if str(base_dir) not in sys.path:
-                sys.path.insert(0, str(base_dir))
-            
-            from generador_pdf_legal import GeneradorPDFLegal
-            from verificador_legal import VerificadorRestriccionesLegales
-            
-            # Obtener departamento de la parcela (si existe, sino usar Casanare por defecto)
-            departamento = getattr(parcela, 'departamento', 'Casanare')
-            
-            # Instanciar verificador (sin argumento departamento)
-            verificador = VerificadorRestriccionesLegales()
-            
-            # Instanciar generador
-            generador = GeneradorPDFLegal()
-            
-            # Generar PDF
-            logger.info(f"🗺️ Iniciando generación de informe legal para parcela {parcela.nombre} (ID: {parcela_id})")
-            
-            ruta_pdf = generador.generar_pdf(
-                parcela=parcela,
-                verificador=verificador,
-                departamento=departamento
-            )
-            
-            # Verificar que el archivo se generó
-            if not os.path.exists(ruta_pdf):
-                raise FileNotFoundError(f"El PDF legal no se generó correctamente en {ruta_pdf}")
-            
-            # Enviar archivo para descarga con nombre descriptivo
-            from django.http import FileResponse
-            from datetime import datetime
-            
-            # Crear nombre de archivo: Propietario_Parcela_Legal_Fecha.pdf
-            propietario_limpio = parcela.propietario.replace(" ", "_").replace("/", "-")
-            parcela_limpia = parcela.nombre.replace(" ", "_").replace("/", "-")
-            fecha_str = datetime.now().strftime("%Y%m%d")
-            nombre_archivo = f"informe_legal_{propietario_limpio}_{parcela_limpia}_{fecha_str}.pdf"
-            
-            response = FileResponse(
-                open(ruta_pdf, 'rb'),
-                content_type='application/pdf'
-            )
-            response['Content-Disposition'] = f'attachment; filename="{nombre_archivo}"'
-            
-            # Log de éxito
-            logger.info(f"✅ Informe legal PDF generado exitosamente para parcela {parcela.nombre} (ID: {parcela_id})")
-            
-            messages.success(request, 
-                           f'¡Informe legal generado exitosamente! '
-                           f'Verificación de restricciones ambientales completada.')
-            
-            return response
-            
-        except Exception as e_generacion:
-            logger.error(f"❌ Error generando PDF legal para parcela {parcela_id}: {str(e_generacion)}")
-            logger.exception(e_generacion)
-            messages.error(request, 
-                          f'Error generando el informe legal PDF: {str(e_generacion)}. '
-                          'Por favor contacte al administrador.')
-            return redirect('informes:detalle_parcela', parcela_id=parcela_id)
+        trabajo, creado = TrabajoGeneracion.encolar(
+            tipo=TipoTrabajo.INFORME_LEGAL_PDF,
+            parcela=parcela,
+            usuario=request.user
+        )
+        logger.info(f"🗺️ Informe legal {'encolado' if creado else 'ya en curso'}: trabajo #{trabajo.pk} "
+                    f"parcela {parcela.nombre} (ID: {parcela_id})")
+        return _respuesta_trabajo(request, trabajo, creado)
         
     except Exception as e:
         logger.error(f"❌ Error en generar_informe_legal_pdf para parcela {parcela_id}: {str(e)}")
         logger.exception(e)
-        messages.error(request, f'Error: {str(e)}')
-        return redirect('informes:lista_parcelas')
+        return _error_trabajo(request, f'Error: {str(e)}', None, status=500)
 
@@ -8,6 +8,10 @@ python manage.py migrate --noinput
 echo "==> Recolectando archivos estáticos..."
 python manage.py collectstatic --noinput --clear
 
+# Worker de la cola de trabajos (PDF, PDF legal, video) en segundo plano
+echo "==> Iniciando worker de trabajos de generación..."
+python manage.py procesar_trabajos --workers "${TRABAJOS_WORKERS:-1}" --max-trabajos 20 &
+
 # Iniciar el servidor con Gunicorn
 echo "==> Iniciando servidor Gunicorn..."
 PORT="${PORT:-8000}"
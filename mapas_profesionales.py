@@ -22,6 +22,9 @@ from matplotlib.patches import Patch
 from matplotlib.lines import Line2D
 import numpy as np
 
+from registro_capas import obtener_registro_capas
+from paquetes_departamentales import ruta_capa_paquete
+
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 # 🎨 CONFIGURACIÓN VISUAL PROFESIONAL (PLANTILLA BASE)
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -486,7 +489,7 @@ def generar_mapa_ubicacion_municipal_profesional(parcela, verificador=None, save
     from io import BytesIO
     from datetime import datetime
     import os
-    from detector_geografico import DetectorGeografico
+    from detector_geografico import obtener_detector_geografico
     from shapely.geometry import shape
     from shapely import wkt
     
@@ -509,7 +512,7 @@ def generar_mapa_ubicacion_municipal_profesional(parcela, verificador=None, save
     centroide = gpd.GeoSeries([centroide_utm], crs=UTM_COLOMBIA).to_crs('EPSG:4326').iloc[0]
     
     # Detectar ubicación automáticamente usando DetectorGeografico
-    detector = DetectorGeografico()
+    detector = obtener_detector_geografico()
     resultado = detector.proceso_completo(parcela.geometria)
     
     if not resultado['municipio']:
@@ -546,11 +549,11 @@ def generar_mapa_ubicacion_municipal_profesional(parcela, verificador=None, save
     else:
         # Intentar cargar directamente
         try:
-            resguardos_path = 'datos_geograficos/resguardos_indigenas/Resguardo_Indígena_Formalizado.shp'
-            if os.path.exists(resguardos_path):
-                resguardos_gdf = gpd.read_file(resguardos_path)
-                if resguardos_gdf.crs != 'EPSG:4326':
-                    resguardos_gdf = resguardos_gdf.to_crs('EPSG:4326')
+            resguardos_path = (ruta_capa_paquete(departamento_nombre, 'resguardos_indigenas')
+                               or 'datos_geograficos/resguardos_indigenas/Resguardo_Indígena_Formalizado.shp')
+            capa_resguardos = obtener_registro_capas().obtener(resguardos_path)
+            if capa_resguardos is not None:
+                resguardos_gdf = capa_resguardos.gdf
                 print(f"\n🟡 Procesando resguardos indígenas para contexto municipal...")
         except Exception as e:
             print(f"   ⚠️  No se pudieron cargar resguardos: {str(e)}")
@@ -849,7 +852,7 @@ def generar_mapa_departamental_profesional(parcela, verificador=None, save_to_fi
     from io import BytesIO
     from datetime import datetime
     import os
-    from detector_geografico import DetectorGeografico
+    from detector_geografico import obtener_detector_geografico
     from shapely.geometry import shape
     from shapely import wkt
     
@@ -877,7 +880,7 @@ def generar_mapa_departamental_profesional(parcela, verificador=None, save_to_fi
     
     # Detectar ubicación automáticamente
     print("\n🌍 Detectando ubicación departamental...")
-    detector = DetectorGeografico()
+    detector = obtener_detector_geografico()
     resultado = detector.proceso_completo(parcela.geometria)
     
     if not resultado['departamento']:
@@ -903,11 +906,11 @@ def generar_mapa_departamental_profesional(parcela, verificador=None, save_to_fi
     else:
         # Intentar cargar directamente
         try:
-            resguardos_path = 'datos_geograficos/resguardos_indigenas/Resguardo_Indígena_Formalizado.shp'
-            if os.path.exists(resguardos_path):
-                resguardos_gdf = gpd.read_file(resguardos_path)
-                if resguardos_gdf.crs != 'EPSG:4326':
-                    resguardos_gdf = resguardos_gdf.to_crs('EPSG:4326')
+            resguardos_path = (ruta_capa_paquete(departamento_nombre, 'resguardos_indigenas')
+                               or 'datos_geograficos/resguardos_indigenas/Resguardo_Indígena_Formalizado.shp')
+            capa_resguardos = obtener_registro_capas().obtener(resguardos_path)
+            if capa_resguardos is not None:
+                resguardos_gdf = capa_resguardos.gdf
                 print(f"✅ Resguardos indígenas cargados: {len(resguardos_gdf)} elementos")
         except Exception as e:
             print(f"⚠️  No se pudieron cargar resguardos: {str(e)}")
@@ -920,11 +923,10 @@ def generar_mapa_departamental_profesional(parcela, verificador=None, save_to_fi
     else:
         # Intentar cargar directamente
         try:
-            runap_path = 'datos_geograficos/runap/runap.shp'
-            if os.path.exists(runap_path):
-                areas_protegidas_gdf = gpd.read_file(runap_path)
-                if areas_protegidas_gdf.crs != 'EPSG:4326':
-                    areas_protegidas_gdf = areas_protegidas_gdf.to_crs('EPSG:4326')
+            runap_path = ruta_capa_paquete(departamento_nombre, 'areas_protegidas') or 'datos_geograficos/runap/runap.shp'
+            capa_runap = obtener_registro_capas().obtener(runap_path)
+            if capa_runap is not None:
+                areas_protegidas_gdf = capa_runap.gdf
                 print(f"✅ Áreas protegidas cargadas: {len(areas_protegidas_gdf)} elementos")
         except Exception as e:
             print(f"⚠️  No se pudieron cargar áreas protegidas: {str(e)}")
@@ -0,0 +1,268 @@
+"""
+Paquetes Departamentales de Capas Legales (GeoParquet)
+======================================================
+
+Las capas legales (red hídrica IGAC, RUNAP, resguardos ANT, páramos) son
+shapefiles nacionales o regionales: cada worker lee el país entero,
+reproyecta a EPSG:3116 y luego filtra con `.cx[...]`. Este módulo las
+convierte, una vez, en un paquete por departamento:
+
+    datos_geograficos/paquetes/<departamento>/manifest.json
+    datos_geograficos/paquetes/<departamento>/<capa>.parquet
+
+Cada capa del paquete:
+- Solo los elementos que tocan el bbox del departamento + margen (geometrías
+  completas, sin cortar: distancias, retiros e intersecciones dan lo mismo
+  que con la capa nacional para parcelas del departamento)
+- Columna `geometry` en EPSG:4326 y `geometry_3116` ya proyectada
+- Columnas normalizadas `nombre_norm` y `categoria_norm` (y `tipo_fuente` /
+  `justificacion_retiro` en la red hídrica), con las mismas reglas del
+  verificador
+- Filas en orden de curva de Hilbert y columna bbox de cobertura
+  (GeoParquet 1.1) para lecturas filtradas por bbox
+
+El manifiesto guarda el mtime de cada capa fuente: si la capa nacional se
+actualiza después, esa capa del paquete deja de usarse (el verificador
+vuelve a la nacional con un aviso) hasta reconstruir el paquete.
+
+El registro de capas lee los .parquet sin reproyectar. Construir con:
+    python manage.py construir_paquetes_legales --departamentos Casanare Meta
+
+Autor: AgroTech Histórico
+Fecha: Febrero 2026
+"""
+
+import json
+import os
+import re
+import time
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+try:
+    import pyarrow  # noqa: F401  (motor de GeoParquet)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+from registro_capas import (
+    COLUMNA_GEOMETRIA_METRICA, CRS_GEOGRAFICO, CRS_METRICO, mtime_fuente, obtener_registro_capas
+)
+
+VERSION_PAQUETE = 1
+NOMBRE_MANIFIESTO = 'manifest.json'
+
+# Margen alrededor del bbox departamental: cubre el buffer de búsqueda de
+# _verificar_capa (0.1°) y el radio de retiros hídricos (5 km)
+MARGEN_PAQUETE_GRADOS = 0.25
+
+# Capa del paquete → (método de carga del verificador, tipo para nombres/categorías)
+CAPAS_PAQUETE = {
+    'red_hidrica': ('cargar_red_hidrica', 'fuente_hidrica'),
+    'areas_protegidas': ('cargar_areas_protegidas', 'area_protegida'),
+    'resguardos_indigenas': ('cargar_resguardos_indigenas', 'resguardo_indigena'),
+    'paramos': ('cargar_paramos', 'paramo'),
+}
+
+
+def slug_departamento(nombre: str) -> str:
+    """'Norte de Santander' → 'norte_de_santander' (sin tildes)"""
+    sin_tildes = unicodedata.normalize('NFKD', str(nombre)).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '_', sin_tildes.lower()).strip('_')
+
+
+def directorio_paquetes(directorio_datos: Optional[Union[str, Path]] = None) -> Path:
+    if directorio_datos is None:
+        directorio_datos = os.path.join(os.path.dirname(__file__), 'datos_geograficos')
+    return Path(directorio_datos) / 'paquetes'
+
+
+_manifiestos: Dict[str, tuple] = {}  # ruta → (mtime, manifiesto)
+
+
+def _leer_json_cacheado(ruta: Path) -> Optional[Dict]:
+    try:
+        mtime = ruta.stat().st_mtime
+    except OSError:
+        return None
+    cacheado = _manifiestos.get(str(ruta))
+    if cacheado is None or cacheado[0] != mtime:
+        with open(ruta, encoding='utf-8') as f:
+            cacheado = (mtime, json.load(f))
+        _manifiestos[str(ruta)] = cacheado
+    return cacheado[1]
+
+
+def leer_manifiesto(departamento: str, directorio_datos: Optional[Union[str, Path]] = None) -> Optional[Dict]:
+    """Manifiesto del paquete del departamento, o None si no se ha construido"""
+    if not departamento:
+        return None
+    return _leer_json_cacheado(directorio_paquetes(directorio_datos) / slug_departamento(departamento) / NOMBRE_MANIFIESTO)
+
+
+def fuente_vigente(info: Dict) -> bool:
+    """True si la capa fuente no cambió (ni desapareció) desde que se construyó el paquete"""
+    return mtime_fuente(info.get('fuente') or '') == info.get('fuente_mtime')
+
+
+def capas_desactualizadas(departamento: str, directorio_datos: Optional[Union[str, Path]] = None) -> List[str]:
+    """Capas del paquete cuya fuente nacional se modificó después de construirlo"""
+    manifiesto = leer_manifiesto(departamento, directorio_datos)
+    if manifiesto is None:
+        return []
+    return [nombre for nombre, info in manifiesto.get('capas', {}).items() if not fuente_vigente(info)]
+
+
+def ruta_capa_paquete(
+    departamento: str,
+    capa: str,
+    directorio_datos: Optional[Union[str, Path]] = None
+) -> Optional[Path]:
+    """
+    Ruta al .parquet de una capa del paquete (None si no hay paquete, falta
+    pyarrow o la capa fuente cambió desde que se construyó el paquete)
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    manifiesto = leer_manifiesto(departamento, directorio_datos)
+    if manifiesto is None or capa not in manifiesto.get('capas', {}):
+        return None
+    if not fuente_vigente(manifiesto['capas'][capa]):
+        return None
+    ruta = directorio_paquetes(directorio_datos) / slug_departamento(departamento) / manifiesto['capas'][capa]['archivo']
+    return ruta if ruta.exists() else None
+
+
+def info_capa_paquete(ruta: Union[str, Path]) -> Optional[Dict]:
+    """Entrada del manifiesto para un .parquet de paquete (fuente, nota, ...) o None"""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() != '.parquet':
+        return None
+    manifiesto = _leer_json_cacheado(ruta.parent / NOMBRE_MANIFIESTO)
+    if manifiesto is None:
+        return None
+    for info in manifiesto.get('capas', {}).values():
+        if info.get('archivo') == ruta.name:
+            return info
+    return None
+
+
+def _nota_fuente(ruta: str) -> Optional[str]:
+    """metadata.note de un GeoJSON (p. ej. 'región sin páramos')"""
+    try:
+        with open(ruta, 'r') as f:
+            data = json.load(f)
+        return data.get('metadata', {}).get('note') or None
+    except Exception:
+        return None
+
+
+def _preparar_capa(verificador, nombre: str, capa):
+    """Capa nacional con columnas normalizadas y geometría métrica"""
+    _, tipo = CAPAS_PAQUETE[nombre]
+    gdf = capa.gdf.copy()
+    gdf.insert(0, 'id_fuente', gdf.index.astype(str))
+    filas = [fila for _, fila in capa.gdf.iterrows()]
+    gdf['nombre_norm'] = [verificador._extraer_nombre_elemento(fila, tipo) for fila in filas]
+    gdf['categoria_norm'] = [verificador._extraer_categoria_elemento(fila, tipo) for fila in filas]
+    if nombre == 'red_hidrica':
+        gdf['tipo_fuente'], gdf['justificacion_retiro'] = verificador._clasificar_fuentes_hidricas(capa.gdf)
+    gdf[COLUMNA_GEOMETRIA_METRICA] = capa.gdf_metrico.geometry.values
+    return gdf.reset_index(drop=True)
+
+
+def construir_paquetes(
+    directorio_datos: Optional[Union[str, Path]] = None,
+    departamentos: Optional[List[str]] = None,
+    margen_grados: float = MARGEN_PAQUETE_GRADOS
+) -> Dict[str, Dict]:
+    """
+    Construye (o reconstruye) los paquetes departamentales
+
+    Args:
+        directorio_datos: Directorio con las capas fuente (default: ./datos_geograficos)
+        departamentos: Nombres GADM (NAME_1); None = todos
+        margen_grados: Margen alrededor del bbox de cada departamento
+
+    Returns:
+        Manifiesto de cada paquete escrito, por slug
+    """
+    if not PYARROW_AVAILABLE:
+        raise ImportError("pyarrow es requerido para GeoParquet. Instalar con: pip install pyarrow")
+
+    import numpy as np
+    from shapely.geometry import box
+    from verificador_legal import VerificadorRestriccionesLegales
+
+    verificador = VerificadorRestriccionesLegales(str(directorio_datos) if directorio_datos else None)
+    ruta_gadm = verificador.directorio_datos / 'limites_departamentales' / 'gadm_extract' / 'gadm41_COL_1.shp'
+    capa_departamentos = obtener_registro_capas().obtener(ruta_gadm)
+    if capa_departamentos is None:
+        raise FileNotFoundError(f"No se encontraron los límites departamentales: {ruta_gadm}")
+
+    # Capas fuente: misma selección de archivos que usa el verificador
+    fuentes = {}
+    for nombre, (metodo, _) in CAPAS_PAQUETE.items():
+        getattr(verificador, metodo)()
+        capa = verificador.capas_registro.get(nombre)
+        if capa is not None:
+            fuentes[nombre] = (capa, _preparar_capa(verificador, nombre, capa))
+    print(f"📚 Capas fuente: {', '.join(f'{n} ({len(c.gdf)})' for n, (c, _) in fuentes.items()) or 'ninguna'}")
+
+    gdf_departamentos = capa_departamentos.gdf
+    if departamentos:
+        buscados = {slug_departamento(d) for d in departamentos}
+        gdf_departamentos = gdf_departamentos[gdf_departamentos['NAME_1'].map(slug_departamento).isin(buscados)]
+        faltantes = buscados - set(gdf_departamentos['NAME_1'].map(slug_departamento))
+        if faltantes:
+            print(f"⚠️  Departamentos no encontrados en GADM: {', '.join(sorted(faltantes))}")
+
+    salida = directorio_paquetes(verificador.directorio_datos)
+    manifiestos = {}
+    for _, departamento in gdf_departamentos.iterrows():
+        inicio = time.perf_counter()
+        slug = slug_departamento(departamento['NAME_1'])
+        destino = salida / slug
+        destino.mkdir(parents=True, exist_ok=True)
+        x0, y0, x1, y1 = departamento.geometry.bounds
+        region = (x0 - margen_grados, y0 - margen_grados, x1 + margen_grados, y1 + margen_grados)
+
+        capas = {}
+        for nombre, (capa, preparada) in fuentes.items():
+            indices = np.sort(capa.arbol.query(box(*region), predicate='intersects'))
+            subconjunto = preparada.iloc[indices]
+            if len(subconjunto) > 1:
+                subconjunto = subconjunto.iloc[np.argsort(subconjunto.geometry.hilbert_distance(), kind='stable')]
+            archivo = f'{nombre}.parquet'
+            subconjunto.reset_index(drop=True).to_parquet(destino / archivo, index=False, write_covering_bbox=True)
+            capas[nombre] = {
+                'archivo': archivo,
+                'elementos': int(len(subconjunto)),
+                'fuente': capa.ruta,
+                'fuente_mtime': capa.mtime,
+                'crs': CRS_GEOGRAFICO,
+                'crs_metrico': CRS_METRICO,
+                'columna_metrica': COLUMNA_GEOMETRIA_METRICA,
+                'bbox': [float(v) for v in subconjunto.total_bounds] if len(subconjunto) else None,
+                'orden': 'hilbert',
+                'nota': _nota_fuente(capa.ruta),
+            }
+
+        manifiesto = {
+            'version': VERSION_PAQUETE,
+            'departamento': departamento['NAME_1'],
+            'slug': slug,
+            'creado': datetime.now().isoformat(timespec='seconds'),
+            'margen_grados': margen_grados,
+            'bbox': [float(v) for v in region],
+            'capas': capas,
+        }
+        with open(destino / NOMBRE_MANIFIESTO, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, indent=2, ensure_ascii=False)
+        manifiestos[slug] = manifiesto
+        resumen = ', '.join(f"{n}={c['elementos']}" for n, c in capas.items())
+        print(f"📦 {departamento['NAME_1']}: {resumen} ({time.perf_counter() - inicio:.2f}s)")
+
+    return manifiestos
@@ -0,0 +1,255 @@
+"""
+Registro de Capas Espaciales Compartido (por proceso)
+======================================================
+
+Mantiene en memoria, una sola vez por worker, las capas geográficas que usan
+el verificador legal, los mapas profesionales y el detector geográfico
+(red hídrica IGAC, RUNAP, resguardos ANT, páramos, límites GADM).
+
+Cada capa se carga de forma perezosa la primera vez que se pide y queda:
+- Reproyectada a EPSG:4326 (geográfica) y EPSG:3116 (MAGNA-SIRGAS, metros)
+- Con un STRtree de Shapely 2 ya construido para cada CRS
+- Asociada al mtime del archivo fuente: si el archivo cambia en disco,
+  la siguiente consulta la recarga automáticamente
+
+Los GeoParquet de los paquetes departamentales (paquetes_departamentales.py)
+traen la geometría EPSG:3116 ya calculada en `geometry_3116`: se usa tal
+cual, sin reproyectar.
+
+Uso:
+    from registro_capas import obtener_registro_capas
+
+    capa = obtener_registro_capas().obtener('datos_geograficos/runap/runap.shp')
+    capa.gdf          # GeoDataFrame EPSG:4326 (NO modificar in-place)
+    capa.gdf_metrico  # GeoDataFrame EPSG:3116
+    capa.arbol        # shapely.STRtree sobre capa.gdf.geometry
+    obtener_registro_capas().estadisticas()
+
+Autor: AgroTech Histórico
+Fecha: Febrero 2026
+"""
+
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+try:
+    import geopandas as gpd
+    from shapely import STRtree
+    GEOPANDAS_AVAILABLE = True
+except ImportError:
+    GEOPANDAS_AVAILABLE = False
+
+
+CRS_GEOGRAFICO = 'EPSG:4326'
+CRS_METRICO = 'EPSG:3116'
+
+# Columna con la geometría ya proyectada a CRS_METRICO (GeoParquet de paquetes)
+COLUMNA_GEOMETRIA_METRICA = 'geometry_3116'
+
+# Archivos auxiliares que, si cambian, también invalidan un shapefile
+EXTENSIONES_SHAPEFILE = ('.shp', '.dbf', '.shx', '.prj')
+
+
+@dataclass
+class CapaEspacial:
+    """Capa geográfica cargada en memoria con sus índices espaciales"""
+    ruta: str
+    mtime: float
+    gdf: 'gpd.GeoDataFrame'
+    gdf_metrico: 'gpd.GeoDataFrame'
+    arbol: 'STRtree'
+    arbol_metrico: 'STRtree'
+    crs_original: str
+    tiempo_carga_s: float
+    cargada_en: float = field(default_factory=time.time)
+
+    @property
+    def num_elementos(self) -> int:
+        return len(self.gdf)
+
+
+def mtime_fuente(ruta: str) -> Optional[float]:
+    """mtime del archivo; para shapefiles, el más reciente de sus componentes (None si no existe)"""
+    if not os.path.exists(ruta):
+        return None
+
+    base, extension = os.path.splitext(ruta)
+    if extension.lower() != '.shp':
+        return os.path.getmtime(ruta)
+
+    mtimes = []
+    for ext in EXTENSIONES_SHAPEFILE:
+        for candidato in (base + ext, base + ext.upper()):
+            if os.path.exists(candidato):
+                mtimes.append(os.path.getmtime(candidato))
+                break
+    return max(mtimes)
+
+
+class RegistroCapasEspaciales:
+    """
+    Caché de capas espaciales por proceso con invalidación por mtime
+
+    No instanciar directamente en código de aplicación: usar
+    ``obtener_registro_capas()`` para compartir la misma instancia.
+    """
+
+    def __init__(self):
+        self._capas: Dict[str, CapaEspacial] = {}
+        self._lock = threading.RLock()
+        self._locks_por_ruta: Dict[str, threading.Lock] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'recargas_por_mtime': 0,
+            'errores': 0,
+            'tiempo_carga_total_s': 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # API pública
+    # ------------------------------------------------------------------
+
+    def obtener(self, ruta: Union[str, Path]) -> Optional[CapaEspacial]:
+        """
+        Devuelve la capa del archivo indicado, cargándola si hace falta
+
+        Args:
+            ruta: Ruta al shapefile/GeoJSON/GeoPackage
+
+        Returns:
+            CapaEspacial o None si el archivo no existe o no se pudo leer
+        """
+        if not GEOPANDAS_AVAILABLE:
+            raise ImportError("GeoPandas es requerido. Instalar con: pip install geopandas")
+
+        clave = str(Path(ruta).resolve())
+        mtime = self._mtime_fuente(clave)
+        if mtime is None:
+            return None
+
+        capa = self._capas.get(clave)
+        if capa is not None and capa.mtime == mtime:
+            with self._lock:
+                self.stats['hits'] += 1
+            return capa
+
+        # Un lock por ruta: dos hilos pidiendo la misma capa la cargan una vez,
+        # capas distintas se cargan en paralelo
+        with self._lock:
+            lock_ruta = self._locks_por_ruta.setdefault(clave, threading.Lock())
+
+        with lock_ruta:
+            capa = self._capas.get(clave)
+            if capa is not None and capa.mtime == mtime:
+                with self._lock:
+                    self.stats['hits'] += 1
+                return capa
+
+            es_recarga = capa is not None
+            nueva = self._cargar(clave, mtime)
+
+            with self._lock:
+                self.stats['misses'] += 1
+                if es_recarga:
+                    self.stats['recargas_por_mtime'] += 1
+                if nueva is None:
+                    self.stats['errores'] += 1
+                    return None
+                self.stats['tiempo_carga_total_s'] += nueva.tiempo_carga_s
+                self._capas[clave] = nueva
+
+            return nueva
+
+    def invalidar(self, ruta: Optional[Union[str, Path]] = None):
+        """Descarta una capa (o todas si ruta es None) para forzar recarga"""
+        with self._lock:
+            if ruta is None:
+                self._capas.clear()
+            else:
+                self._capas.pop(str(Path(ruta).resolve()), None)
+
+    def estadisticas(self) -> Dict:
+        """Contadores de hit/miss y tiempos de carga por capa"""
+        with self._lock:
+            total = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'tiempo_carga_total_s': round(self.stats['tiempo_carga_total_s'], 3),
+                'tasa_hit': round(self.stats['hits'] / total, 3) if total else 0.0,
+                'capas': {
+                    ruta: {
+                        'elementos': capa.num_elementos,
+                        'crs_original': capa.crs_original,
+                        'tiempo_carga_s': round(capa.tiempo_carga_s, 3),
+                        'mtime': capa.mtime,
+                    }
+                    for ruta, capa in self._capas.items()
+                },
+            }
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    _mtime_fuente = staticmethod(mtime_fuente)
+
+    @staticmethod
+    def _cargar(ruta: str, mtime: float) -> Optional[CapaEspacial]:
+        inicio = time.perf_counter()
+        try:
+            metrica = None
+            if ruta.lower().endswith('.parquet'):
+                gdf = gpd.read_parquet(ruta)
+                if COLUMNA_GEOMETRIA_METRICA in gdf.columns:
+                    metrica = gdf.pop(COLUMNA_GEOMETRIA_METRICA)
+            else:
+                gdf = gpd.read_file(ruta)
+            crs_original = str(gdf.crs)
+
+            if gdf.crs is None:
+                gdf = gdf.set_crs(CRS_GEOGRAFICO)
+            elif gdf.crs != CRS_GEOGRAFICO:
+                gdf = gdf.to_crs(CRS_GEOGRAFICO)
+                metrica = None  # Solo es válida junto a la geometría con la que se escribió
+
+            if metrica is not None:
+                gdf_metrico = gdf.set_geometry(gpd.GeoSeries(metrica.values, index=gdf.index).set_crs(CRS_METRICO, allow_override=True))
+            else:
+                gdf_metrico = gdf.to_crs(CRS_METRICO)
+
+            capa = CapaEspacial(
+                ruta=ruta,
+                mtime=mtime,
+                gdf=gdf,
+                gdf_metrico=gdf_metrico,
+                arbol=STRtree(gdf.geometry.values),
+                arbol_metrico=STRtree(gdf_metrico.geometry.values),
+                crs_original=crs_original,
+                tiempo_carga_s=time.perf_counter() - inicio,
+            )
+            print(f"📦 Capa cargada en registro: {Path(ruta).name} "
+                  f"({capa.num_elementos} elementos, {capa.tiempo_carga_s:.2f}s)")
+            return capa
+
+        except Exception as e:
+            print(f"❌ Error cargando capa {ruta} en registro: {e}")
+            return None
+
+
+_registro_global: Optional[RegistroCapasEspaciales] = None
+_registro_lock = threading.Lock()
+
+
+def obtener_registro_capas() -> RegistroCapasEspaciales:
+    """Instancia única del registro para este proceso/worker"""
+    global _registro_global
+    if _registro_global is None:
+        with _registro_lock:
+            if _registro_global is None:
+                _registro_global = RegistroCapasEspaciales()
+    return _registro_global
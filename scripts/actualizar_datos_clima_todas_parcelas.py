@@ -71,82 +71,58 @@ for cache in CacheDatosEOSDA.objects.all():
 print(f"\n📊 Total de cachés actualizados: {caches_actualizados}")
 
 # Opción 2: Actualizar IndiceMensual de todas las parcelas
+# Clima de Open-Meteo desde el almacén por celda: las parcelas de una misma
+# celda (~9 km) comparten una sola descarga y solo se piden los días faltantes
 print("\n" + "=" * 80)
-print("OPCIÓN 2: Actualizar registros mensuales con datos climáticos")
+print("OPCIÓN 2: Actualizar registros mensuales con datos climáticos (Open-Meteo por celda)")
 print("=" * 80)
 
+import calendar
 from collections import defaultdict
+from informes.services.clima_celdas import obtener_almacen_clima
+from informes.services.indices_mensuales import guardar_clima_mensual
 
-parcelas_actualizadas = 0
+almacen = obtener_almacen_clima()
+hoy = date.today()
+
+# Rango de meses de cada parcela, agrupado por celda
+parcelas_por_celda = defaultdict(list)
 for parcela in parcelas:
-    print(f"\n🌱 Procesando {parcela.nombre} (field {parcela.eosda_field_id})...")
-    
-    # Obtener caché actualizado
-    # Buscar cualquier caché que tenga datos climáticos
-    cache = CacheDatosEOSDA.objects.filter(
-        field_id=parcela.eosda_field_id
-    ).order_by('-creado_en').first()
-    
-    if not cache:
-        print(f"   ⚠️ Sin caché - necesita actualizar datos EOSDA primero")
+    if not parcela.geometria:
+        print(f"\n⚠️ {parcela.nombre}: sin geometría")
         continue
-    
-    datos_clima = cache.datos_json.get('datos_clima', [])
-    if not datos_clima:
-        print(f"   ⚠️ Caché sin datos climáticos")
+    meses = IndiceMensual.objects.filter(parcela=parcela).order_by('año', 'mes').values_list('año', 'mes')
+    if not meses.exists():
+        print(f"\n⚠️ {parcela.nombre}: no hay registros mensuales para actualizar")
         continue
-    
-    # Agrupar datos climáticos por mes
-    datos_clima_por_mes = defaultdict(lambda: {
-        'temp_promedio': [], 'temp_max': [], 'temp_min': [], 'precipitacion': []
-    })
-    
-    for dato in datos_clima:
-        fecha_dato = dato.get('fecha')
-        if isinstance(fecha_dato, str):
-            fecha_dato = datetime.fromisoformat(fecha_dato).date()
-        
-        clave_mes = (fecha_dato.year, fecha_dato.month)
-        
-        if dato.get('temperatura_promedio') is not None:
-            datos_clima_por_mes[clave_mes]['temp_promedio'].append(dato['temperatura_promedio'])
-        if dato.get('temperatura_maxima') is not None:
-            datos_clima_por_mes[clave_mes]['temp_max'].append(dato['temperatura_maxima'])
-        if dato.get('temperatura_minima') is not None:
-            datos_clima_por_mes[clave_mes]['temp_min'].append(dato['temperatura_minima'])
-        if dato.get('precipitacion_total') is not None:
-            datos_clima_por_mes[clave_mes]['precipitacion'].append(dato['precipitacion_total'])
-    
-    # Actualizar registros mensuales
-    registros_actualizados = 0
-    for (year, month), datos in datos_clima_por_mes.items():
-        temp_prom = sum(datos['temp_promedio']) / len(datos['temp_promedio']) if datos['temp_promedio'] else None
-        temp_max = max(datos['temp_max']) if datos['temp_max'] else None
-        temp_min = min(datos['temp_min']) if datos['temp_min'] else None
-        precip_total = sum(datos['precipitacion']) if datos['precipitacion'] else None
-        
-        count = IndiceMensual.objects.filter(
-            parcela=parcela,
-            año=year,
-            mes=month
-        ).update(
-            temperatura_promedio=temp_prom,
-            temperatura_maxima=temp_max,
-            temperatura_minima=temp_min,
-            precipitacion_total=precip_total
-        )
-        
-        if count > 0:
-            registros_actualizados += count
-            temp_str = f"{temp_prom:.1f}" if temp_prom else "N/A"
-            precip_str = f"{precip_total:.1f}" if precip_total else "0"
-            print(f"   ✅ {month:02d}/{year}: Temp={temp_str}°C, Precip={precip_str}mm")
-    
-    if registros_actualizados > 0:
+    (año_desde, mes_desde), (año_hasta, mes_hasta) = meses.first(), meses.last()
+    desde = date(año_desde, mes_desde, 1)
+    hasta = min(hoy, date(año_hasta, mes_hasta, calendar.monthrange(año_hasta, mes_hasta)[1]))
+    centroide = parcela.geometria.centroid
+    parcelas_por_celda[almacen.celda(centroide.y, centroide.x)].append((parcela, centroide, desde, hasta))
+
+print(f"\n📍 {sum(len(p) for p in parcelas_por_celda.values())} parcelas en {len(parcelas_por_celda)} celdas")
+
+parcelas_actualizadas = 0
+for celda, miembros in parcelas_por_celda.items():
+    # Una descarga por celda con el rango que cubre a todas sus parcelas
+    _, centroide, _, _ = miembros[0]
+    almacen.obtener_dias(centroide.y, centroide.x,
+                         min(m[2] for m in miembros), max(m[3] for m in miembros))
+    print(f"\n🌦️ Celda {celda}: {len(miembros)} parcela(s)")
+
+    for parcela, centroide, desde, hasta in miembros:
+        clima_mensual = almacen.clima_mensual(centroide.y, centroide.x, desde, hasta)
+        if clima_mensual.empty:
+            print(f"   ⚠️ {parcela.nombre}: Open-Meteo sin datos climáticos")
+            continue
+        meses_guardados = guardar_clima_mensual(parcela, clima_mensual)
         parcelas_actualizadas += 1
-        print(f"   📊 {registros_actualizados} registros actualizados")
-    else:
-        print(f"   ⚠️ No hay registros mensuales para actualizar")
+        print(f"   ✅ {parcela.nombre}: {meses_guardados} meses ({desde:%m/%Y} a {hasta:%m/%Y})")
+
+print(f"\n📡 Open-Meteo: {almacen.stats['peticiones']} peticiones, "
+      f"{almacen.stats['dias_descargados']} días descargados, "
+      f"{almacen.stats['dias_desde_almacen']} días desde el almacén")
 
 print("\n" + "=" * 80)
 print("RESUMEN")
@@ -0,0 +1,3 @@
+"""
+Scripts de benchmark de rendimiento del sistema
+"""
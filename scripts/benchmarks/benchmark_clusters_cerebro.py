@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+"""
+Benchmark: clusters por contornos vs etiquetado en una pasada
+==============================================================
+
+Compara, para un patrón de detección del Cerebro de Diagnóstico sobre un
+raster con cientos de manchas:
+
+- Antes: findContours + una máscara de tamaño completo por contorno
+  (drawContours) + np.where y medias enmascaradas por cluster →
+  O(clusters × píxeles).
+- Ahora: connectedComponentsWithStats + np.bincount por etiqueta → O(píxeles).
+
+Segunda tabla: evaluación de los patrones de detección, una máscara por
+patrón (_crear_mascara_condicion_dinamica) contra la máscara de bits
+fusionada por bloques; tiempo y pico de memoria temporal (tracemalloc).
+
+Tercera tabla: _detectar_zonas_criticas completo contra el modo por franjas
+(filas_por_tile) para lotes grandes: tiempo, pico de memoria y zonas.
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_clusters_cerebro.py
+    python scripts/benchmarks/benchmark_clusters_cerebro.py --lado 4000 --manchas 800
+    python scripts/benchmarks/benchmark_clusters_cerebro.py --filas-por-tile 256 1024
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'tests'))
+
+from test_cerebro_clusters import CerebroSinBD
+
+
+def construir_escena(lado: int, manchas: int):
+    rng = np.random.default_rng(11)
+    ndvi = rng.uniform(0.6, 0.8, (lado, lado)).astype(np.float32)
+    ndmi = rng.uniform(0.2, 0.4, (lado, lado)).astype(np.float32)
+    savi = rng.uniform(0.5, 0.7, (lado, lado)).astype(np.float32)
+    mascara = np.zeros((lado, lado), dtype=np.uint8)
+    for _ in range(manchas):
+        centro = (int(rng.integers(0, lado)), int(rng.integers(0, lado)))
+        ejes = (int(rng.integers(4, 14)), int(rng.integers(4, 14)))
+        cv2.ellipse(mascara, centro, ejes, float(rng.uniform(0, 180)), 0, 360, 1, -1)
+    mancha = mascara.astype(bool)
+    ndvi[mancha] = rng.uniform(0.1, 0.25, mancha.sum())
+    ndmi[mancha] = rng.uniform(-0.3, -0.1, mancha.sum())
+    return ndvi, ndmi, savi
+
+
+def clusters_legado(cerebro, mascara, ndvi, ndmi, savi, min_area):
+    """Implementación anterior: máscara completa por contorno"""
+    contornos, _ = cv2.findContours((mascara * 255).astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    resultados = []
+    for contorno in contornos:
+        if cv2.contourArea(contorno) < min_area:
+            continue
+        cluster = np.zeros(mascara.shape, dtype=np.uint8)
+        cv2.drawContours(cluster, [contorno], -1, 255, -1)
+        cluster = cluster > 0
+        filas, columnas = np.where(cluster)
+        resultados.append((
+            int(np.mean(filas)), int(np.mean(columnas)),
+            float(np.mean(ndvi[cluster])), float(np.mean(ndmi[cluster])), float(np.mean(savi[cluster])),
+            cerebro._calcular_confianza(ndvi[cluster], ndmi[cluster])
+        ))
+    return resultados
+
+
+def medir_memoria(funcion):
+    """(segundos, pico MB de asignaciones NumPy/Python durante la llamada)"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return segundos, pico / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lado', type=int, default=2000, help='Lado del raster en píxeles')
+    parser.add_argument('--manchas', type=int, default=400)
+    parser.add_argument('--area-minima', type=int, default=20, help='Área mínima de cluster en píxeles')
+    parser.add_argument('--filas-por-tile', type=int, nargs='+', default=[128, 512],
+                        help='Alturas de franja a comparar con el modo completo')
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    ndvi, ndmi, savi = construir_escena(args.lado, args.manchas)
+    cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01)
+    patron = cerebro._construir_patrones_deteccion_dinamicos()[0]
+    mascara = cerebro._crear_mascara_condicion_dinamica(ndvi, ndmi, savi, patron)
+
+    inicio = time.perf_counter()
+    legado = clusters_legado(cerebro, mascara, ndvi, ndmi, savi, args.area_minima)
+    t_legado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    clusters = cerebro._encontrar_clusters(mascara, min_area_pixeles=args.area_minima)
+    zonas = cerebro._analizar_clusters(clusters, ndvi, ndmi, savi, None, patron)
+    t_nuevo = time.perf_counter() - inicio
+
+    print("=" * 72)
+    print(f"⏱️  BENCHMARK CLUSTERS: raster {args.lado}x{args.lado}, {args.manchas} manchas, "
+          f"área mínima {args.area_minima} px")
+    print("=" * 72)
+    print(f"{'Variante':<36} | {'Clusters':>8} | {'Tiempo (s)':>10}")
+    print("-" * 72)
+    print(f"{'Contornos + máscara por cluster':<36} | {len(legado):8d} | {t_legado:10.3f}")
+    print(f"{'connectedComponents + bincount':<36} | {len(zonas):8d} | {t_nuevo:10.3f}")
+    print("-" * 72)
+    print(f"Speedup: {t_legado / t_nuevo:.1f}x  ·  los conteos pueden diferir: contourArea rellena "
+          f"huecos y mide el polígono, el etiquetado cuenta píxeles reales")
+
+    patrones = cerebro._construir_patrones_deteccion_dinamicos()
+    print("\n" + "=" * 72)
+    print(f"🧮 EVALUACIÓN DE {len(patrones)} PATRONES ({ndvi.size / 1e6:.1f} Mpx)")
+    print("=" * 72)
+    print(f"{'Variante':<36} | {'Tiempo (s)':>10} | {'Pico (MB)':>10}")
+    print("-" * 72)
+    t, pico = medir_memoria(lambda: [cerebro._crear_mascara_condicion_dinamica(ndvi, ndmi, savi, p)
+                                     for p in patrones])
+    print(f"{'Una máscara bool por patrón':<36} | {t:10.3f} | {pico:10.1f}")
+    for bloque, nombre in ((None, 'Bits fusionados, sin bloques'),
+                           (cerebro.PIXELES_POR_BLOQUE_DETECCION, 'Bits fusionados, bloques 1 Mpx')):
+        t, pico = medir_memoria(lambda: cerebro._evaluar_patrones_bitmask(
+            ndvi, ndmi, savi, patrones, pixeles_por_bloque=bloque))
+        print(f"{nombre:<36} | {t:10.3f} | {pico:10.1f}")
+
+    print("\n" + "=" * 72)
+    print(f"🧩 DETECCIÓN COMPLETA VS POR FRANJAS ({ndvi.size / 1e6:.1f} Mpx)")
+    print("=" * 72)
+    print(f"{'Variante':<36} | {'Tiempo (s)':>10} | {'Pico (MB)':>10} | {'Zonas':>5}")
+    print("-" * 72)
+    # Lote cuyo 0.5% equivale al área mínima pedida (las manchas cuentan como zonas)
+    cerebro = CerebroSinBD(area_parcela_ha=args.area_minima * cerebro.area_pixel_ha / 0.005)
+    resultado = {}
+    t, pico = medir_memoria(lambda: resultado.update(
+        zonas=cerebro._detectar_zonas_criticas(ndvi, ndmi, savi, None)))
+    print(f"{'Raster completo':<36} | {t:10.3f} | {pico:10.1f} | {len(resultado['zonas']):5d}")
+    for filas in args.filas_por_tile:
+        t, pico = medir_memoria(lambda: resultado.update(
+            zonas=cerebro._detectar_zonas_criticas_por_tiles(ndvi, ndmi, savi, None, filas)))
+        print(f"{f'Franjas de {filas} filas':<36} | {t:10.3f} | {pico:10.1f} | {len(resultado['zonas']):5d}")
+    print("-" * 72)
+    print(f"Entradas NDVI/NDMI/SAVI (no incluidas en el pico): {3 * ndvi.nbytes / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
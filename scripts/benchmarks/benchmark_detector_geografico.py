@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Benchmark: detector geográfico indexado
+=======================================
+
+Capas sintéticas del tamaño de Colombia (≈33 departamentos, ≈1.100
+municipios, decenas de miles de drenajes) en un directorio temporal. Para
+N parcelas (cada una consultada dos veces, como mapa municipal + mapa
+departamental) compara:
+
+- Antes: `contains` sobre todos los polígonos GADM y `.cx` sobre la red
+  hídrica completa en cada llamada (capas ya en el registro)
+- Ahora: detector compartido con STRtree, memo por geometría y red hídrica
+  por municipio (en frío y tras precalentar())
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_detector_geografico.py
+    python scripts/benchmarks/benchmark_detector_geografico.py --parcelas 200 --rios 60000
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import LineString, box
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from detector_geografico import DetectorGeografico
+
+
+def construir_capas(directorio, lado_dept, lado_mun, rios):
+    """Rejilla de lado_dept² departamentos, cada uno con lado_mun² municipios"""
+    gadm = os.path.join(directorio, 'limites_departamentales', 'gadm_extract')
+    red = os.path.join(directorio, 'red_hidrica')
+    os.makedirs(gadm)
+    os.makedirs(red)
+    paso_dept = 12.0 / lado_dept
+    paso_mun = paso_dept / lado_mun
+    departamentos, municipios = [], []
+    for di in range(lado_dept):
+        for dj in range(lado_dept):
+            x0, y0 = -79.0 + di * paso_dept, -4.0 + dj * paso_dept
+            nombre = f'Dept {di}-{dj}'
+            departamentos.append({'NAME_1': nombre, 'geometry': box(x0, y0, x0 + paso_dept, y0 + paso_dept)})
+            for mi in range(lado_mun):
+                for mj in range(lado_mun):
+                    mx, my = x0 + mi * paso_mun, y0 + mj * paso_mun
+                    municipios.append({'NAME_1': nombre, 'NAME_2': f'{nombre}/{mi}-{mj}',
+                                       'geometry': box(mx, my, mx + paso_mun, my + paso_mun).buffer(
+                                           paso_mun * 0.02, quad_segs=8).intersection(
+                                           box(mx, my, mx + paso_mun, my + paso_mun))})
+    gpd.GeoDataFrame(departamentos, crs='EPSG:4326').to_file(os.path.join(gadm, 'gadm41_COL_1.shp'))
+    gpd.GeoDataFrame(municipios, crs='EPSG:4326').to_file(os.path.join(gadm, 'gadm41_COL_2.shp'))
+
+    rng = np.random.default_rng(5)
+    inicio = rng.uniform((-79.0, -4.0), (-67.0, 8.0), (rios, 2))
+    fin = inicio + rng.normal(0, 0.05, (rios, 2))
+    gpd.GeoDataFrame({'NOMBRE': [f'Caño {k}' if k % 7 == 0 else None for k in range(rios)],
+                      'geometry': [LineString([tuple(a), tuple(b)]) for a, b in zip(inicio, fin)]},
+                     crs='EPSG:4326').to_file(os.path.join(red, 'red_hidrica_casanare_meta_igac_2024.shp'))
+
+
+def consulta_legada(detector, parcela):
+    """Implementación anterior: contains sobre toda la capa + .cx sobre toda la red"""
+    centroide = parcela.centroid
+    departamentos, municipios = detector.departamentos_gdf, detector.municipios_gdf
+    dept = departamentos[departamentos.contains(centroide)].copy()
+    mun = municipios[municipios.contains(centroide)].copy()
+    red = detector._capa_red_hidrica().gdf
+    b = mun.total_bounds
+    return dept, mun, red.cx[b[0]:b[2], b[1]:b[3]]
+
+
+def medir(funcion, parcelas):
+    """Milisegundos por llamada, recorriendo las parcelas dos veces"""
+    inicio = time.perf_counter()
+    for _ in range(2):
+        for parcela in parcelas:
+            funcion(parcela)
+    return (time.perf_counter() - inicio) * 1000 / (2 * len(parcelas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--parcelas', type=int, default=100)
+    parser.add_argument('--rios', type=int, default=30000)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='bench_detector_')
+    try:
+        construir_capas(directorio, lado_dept=6, lado_mun=6, rios=args.rios)
+        rng = np.random.default_rng(9)
+        parcelas = [box(x, y, x + 0.01, y + 0.01) for x, y in rng.uniform((-78.9, -3.9), (-67.1, 7.9), (args.parcelas, 2))]
+
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            inicio = time.perf_counter()
+            detector = DetectorGeografico(directorio)
+            detector._capa_red_hidrica()
+            t_carga = time.perf_counter() - inicio
+
+            t_legado = medir(lambda p: consulta_legada(detector, p), parcelas)
+            t_frio = medir(detector.proceso_completo, parcelas)
+
+            caliente = DetectorGeografico(directorio)
+            inicio = time.perf_counter()
+            caliente.precalentar()
+            t_precalentar = time.perf_counter() - inicio
+            t_caliente = medir(caliente.proceso_completo, parcelas)
+
+        print("=" * 72)
+        print(f"⏱️  BENCHMARK DETECTOR GEOGRÁFICO: {len(detector.municipios_gdf)} municipios, "
+              f"{args.rios} drenajes, {args.parcelas} parcelas x2")
+        print("=" * 72)
+        print(f"Carga de capas en el registro (una vez por worker): {t_carga:.2f} s")
+        print(f"precalentar() de todos los municipios: {t_precalentar:.2f} s")
+        print("-" * 72)
+        print(f"{'Variante':<40} | {'ms / parcela':>12}")
+        print("-" * 72)
+        print(f"{'contains + .cx sobre capas completas':<40} | {t_legado:12.2f}")
+        print(f"{'STRtree + memo (en frío)':<40} | {t_frio:12.2f}")
+        print(f"{'STRtree + memo (precalentado)':<40} | {t_caliente:12.2f}")
+        print("-" * 72)
+        print(f"Speedup precalentado: {t_legado / t_caliente:.1f}x  ·  {caliente.estadisticas()}")
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
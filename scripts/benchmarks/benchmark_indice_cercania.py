@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+"""
+Benchmark: distancias mínimas del informe legal
+===============================================
+
+Para una capa sintética del tamaño de la red hídrica IGAC y N parcelas
+compara, por parcela:
+
+- Antes: `.cx` por bbox departamental + `to_crs(EPSG:32618)` de todo el
+  subconjunto + `distance()` a cada elemento + `idxmin`
+- Ahora: IndiceCercania sobre las geometrías EPSG:3116 del registro
+  (k=1 y k=3, con y sin distancia máxima)
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_indice_cercania.py
+    python scripts/benchmarks/benchmark_indice_cercania.py --elementos 60000 --parcelas 50
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import LineString, Point
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from indice_cercania import IndiceCercania
+from registro_capas import CRS_METRICO, obtener_registro_capas
+
+BBOX_CASANARE = [-73.0, 5.0, -69.0, 6.5]
+
+
+def legado(gdf, centroide_geo):
+    """Implementación anterior de _calcular_distancias_minimas (una capa)"""
+    candidatos = gdf.cx[BBOX_CASANARE[0]:BBOX_CASANARE[2], BBOX_CASANARE[1]:BBOX_CASANARE[3]]
+    centroide_utm = gpd.GeoSeries([centroide_geo], crs='EPSG:4326').to_crs('EPSG:32618').iloc[0]
+    distancias = candidatos.to_crs('EPSG:32618').distance(centroide_utm)
+    return distancias.idxmin(), distancias.min()
+
+
+def medir(funcion, puntos):
+    inicio = time.perf_counter()
+    for punto in puntos:
+        funcion(punto)
+    return (time.perf_counter() - inicio) * 1000 / len(puntos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--elementos', type=int, default=30000)
+    parser.add_argument('--parcelas', type=int, default=30)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='bench_cercania_')
+    try:
+        rng = np.random.default_rng(7)
+        inicio = rng.uniform((-74.5, 2.0), (-69.0, 7.0), (args.elementos, 2))
+        fin = inicio + rng.normal(0, 0.03, (args.elementos, 2))
+        ruta = os.path.join(directorio, 'red_hidrica.shp')
+        gpd.GeoDataFrame(geometry=[LineString([tuple(a), tuple(b)]) for a, b in zip(inicio, fin)],
+                         crs='EPSG:4326').to_file(ruta)
+
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            capa = obtener_registro_capas().obtener(ruta)
+        puntos_geo = [Point(x, y) for x, y in rng.uniform((-72.8, 5.1), (-69.2, 6.4), (args.parcelas, 2))]
+        puntos = list(gpd.GeoSeries(puntos_geo, crs='EPSG:4326').to_crs(CRS_METRICO))
+
+        t_legado = medir(lambda p: legado(capa.gdf, p), puntos_geo)
+        indice = IndiceCercania.desde_capa(capa)
+        variantes = [
+            ('STRtree k=1', lambda p: indice.mas_cercanos(p, k=1, bbox=BBOX_CASANARE)),
+            ('STRtree k=3', lambda p: indice.mas_cercanos(p, k=3, bbox=BBOX_CASANARE)),
+            ('STRtree k=3, máx. 50 km', lambda p: indice.mas_cercanos(p, k=3, bbox=BBOX_CASANARE,
+                                                                       distancia_max_m=50000)),
+        ]
+
+        print("=" * 72)
+        print(f"⏱️  BENCHMARK DISTANCIAS MÍNIMAS: {args.elementos} elementos, {args.parcelas} parcelas")
+        print("=" * 72)
+        print(f"{'Variante':<40} | {'ms / parcela':>12} | {'Speedup':>8}")
+        print("-" * 72)
+        print(f"{'.cx + to_crs + distance a todos':<40} | {t_legado:12.2f} | {'1.0x':>8}")
+        for nombre, funcion in variantes:
+            t = medir(funcion, puntos)
+            print(f"{nombre:<40} | {t:12.3f} | {t_legado / t:7.0f}x")
+        print("-" * 72)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""
+Benchmark: rasterizador vectorizado vs bucle píxel a píxel (Shapely)
+=====================================================================
+
+Compara ``generar_mascara_desde_geometria`` (scanline NumPy) contra la
+implementación de referencia ``_generar_mascara_por_puntos`` en rasters de
+256², 1024² y 4096² píxeles con un MultiPolygon con hueco.
+
+Para tamaños grandes el bucle de referencia se mide sobre una franja de filas
+y se extrapola (medirlo completo a 4096² toma decenas de minutos). Usar
+``--completo`` para medirlo entero.
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_mascara_cultivo.py
+    python scripts/benchmarks/benchmark_mascara_cultivo.py --completo
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from informes.motor_analisis.mascara_cultivo import (
+    generar_mascara_desde_geometria,
+    _generar_mascara_por_puntos,
+)
+
+TAMANOS = (256, 1024, 4096)
+FILAS_MUESTRA = 64
+
+
+def construir_geometria():
+    """MultiPolygon irregular de ~40 vértices con un hueco + un lote satélite"""
+    from shapely.geometry import Polygon, MultiPolygon
+    
+    rng = np.random.default_rng(42)
+    angulos = np.sort(rng.uniform(0, 2 * np.pi, 40))
+    radios = rng.uniform(0.6, 1.0, 40)
+    exterior = np.c_[np.cos(angulos) * radios, np.sin(angulos) * radios]
+    hueco = np.c_[np.cos(angulos[::-1]) * 0.2, np.sin(angulos[::-1]) * 0.15]
+    
+    lote_principal = Polygon(exterior, [hueco])
+    lote_satelite = Polygon([(1.1, 1.1), (1.5, 1.1), (1.5, 1.6), (1.1, 1.5)])
+    return MultiPolygon([lote_principal, lote_satelite])
+
+
+def geo_transform_para(geometria, n):
+    min_x, min_y, max_x, max_y = geometria.bounds
+    return (min_x, (max_x - min_x) / n, 0, max_y, 0, -(max_y - min_y) / n)
+
+
+def medir(funcion, *args, repeticiones=1, **kwargs):
+    mejor = float('inf')
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--completo', action='store_true', help='Medir el bucle de referencia sin extrapolar')
+    args = parser.parse_args()
+    
+    import logging
+    logging.disable(logging.INFO)
+    
+    geometria = construir_geometria()
+    
+    print("=" * 80)
+    print("⏱️  BENCHMARK MÁSCARA DE CULTIVO")
+    print("=" * 80)
+    print(f"{'Tamaño':>10} | {'Bucle (s)':>12} | {'Scanline (s)':>12} | {'All-touched (s)':>15} | {'Speedup':>8} | Difer.")
+    print("-" * 80)
+    
+    for n in TAMANOS:
+        geo_transform = geo_transform_para(geometria, n)
+        
+        t_vector, mascara = medir(
+            generar_mascara_desde_geometria, geometria, geo_transform, (n, n), repeticiones=3
+        )
+        t_tocados, _ = medir(
+            generar_mascara_desde_geometria, geometria, geo_transform, (n, n),
+            repeticiones=3, todos_tocados=True
+        )
+        
+        if args.completo or n <= FILAS_MUESTRA * 4:
+            t_bucle, referencia = medir(_generar_mascara_por_puntos, geometria, geo_transform, (n, n))
+            diferencias = int(np.sum(referencia != mascara))
+            etiqueta = f"{t_bucle:12.3f}"
+        else:
+            # Franja central de filas, desplazando el origen del geo_transform
+            fila_inicio = (n - FILAS_MUESTRA) // 2
+            gt_franja = list(geo_transform)
+            gt_franja[3] = geo_transform[3] + fila_inicio * geo_transform[5]
+            t_franja, referencia = medir(
+                _generar_mascara_por_puntos, geometria, tuple(gt_franja), (FILAS_MUESTRA, n)
+            )
+            t_bucle = t_franja * n / FILAS_MUESTRA
+            diferencias = int(np.sum(referencia != mascara[fila_inicio:fila_inicio + FILAS_MUESTRA]))
+            etiqueta = f"~{t_bucle:11.1f}"
+        
+        print(f"{n:>5}x{n:<4} | {etiqueta} | {t_vector:12.4f} | {t_tocados:15.4f} | "
+              f"{t_bucle / t_vector:7.0f}x | {diferencias}")
+    
+    print("-" * 80)
+    print("'~' = tiempo extrapolado desde una franja de filas; Difer. = píxeles distintos")
+
+
+if __name__ == '__main__':
+    main()
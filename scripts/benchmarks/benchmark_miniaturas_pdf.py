@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Benchmark: galería satelital del informe con y sin miniaturas
+=============================================================
+
+Construye con ReportLab una galería de N meses (3 imágenes NDVI/NDMI/SAVI
+de 5×5 cm por mes, como _crear_bloque_galeria_mes) a partir de PNG
+sintéticos a resolución completa y compara:
+
+- Original: los PNG de media/ insertados tal cual
+- MiniaturasPDF en 'png', 'png_indexado' y 'jpeg' al DPI objetivo, con el
+  caché vacío (generando derivados) y con el caché ya poblado
+
+Reporta tamaño del PDF y tiempo de construcción (derivados + build).
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_miniaturas_pdf.py
+    python scripts/benchmarks/benchmark_miniaturas_pdf.py --meses 24 --lado 1400 --dpi 150
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from io import BytesIO
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import cm as mpl_cm
+from PIL import Image as PILImage
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from informes.services.miniaturas_pdf import MiniaturasPDF
+
+
+def crear_imagenes(directorio, meses, lado, semilla=11):
+    """PNG RGBA con campo suave + ruido y fondo transparente fuera del lote"""
+    rng = np.random.default_rng(semilla)
+    yy, xx = np.mgrid[0:lado, 0:lado] / lado
+    lote = (xx - 0.5) ** 2 + (yy - 0.5) ** 2 < 0.2
+    rutas = []
+    for mes in range(meses):
+        fila = []
+        for indice, mapa in (('ndvi', 'RdYlGn'), ('ndmi', 'BrBG'), ('savi', 'YlGn')):
+            campo = 0.5 + 0.25 * np.sin(6 * xx + mes) * np.cos(5 * yy) + rng.normal(0, 0.05, (lado, lado))
+            rgba = (getattr(mpl_cm, mapa)(np.clip(campo, 0, 1)) * 255).astype(np.uint8)
+            rgba[~lote, 3] = 0
+            ruta = os.path.join(directorio, f'{indice}_{mes:02d}.png')
+            PILImage.fromarray(rgba, 'RGBA').save(ruta)
+            fila.append(ruta)
+        rutas.append(fila)
+    return rutas
+
+
+def construir_galeria(rutas, miniaturas=None):
+    estilos = getSampleStyleSheet()
+    story = []
+    for mes, fila in enumerate(rutas):
+        story.append(Paragraph(f'<strong>Mes {mes + 1}</strong>', estilos['Heading3']))
+        imagenes = []
+        for ruta in fila:
+            fuente = BytesIO(miniaturas.miniatura(ruta, 5*cm, 5*cm)) if miniaturas else ruta
+            imagenes.append(Image(fuente, width=5*cm, height=5*cm, kind='proportional'))
+        story.append(Table([imagenes], colWidths=[5.2*cm] * 3))
+        story.append(Spacer(1, 0.5*cm))
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4).build(story)
+    return len(buffer.getvalue())
+
+
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    return resultado, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meses', type=int, default=24)
+    parser.add_argument('--lado', type=int, default=1024, help='Píxeles por lado de cada PNG original')
+    parser.add_argument('--dpi', type=int, default=200)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='bench_miniaturas_')
+    try:
+        os.makedirs(os.path.join(directorio, 'media'))
+        rutas = crear_imagenes(os.path.join(directorio, 'media'), args.meses, args.lado)
+        origen_mb = sum(os.path.getsize(r) for fila in rutas for r in fila) / 1e6
+
+        print("=" * 78)
+        print(f"⏱️  BENCHMARK MINIATURAS PDF: {args.meses} meses × 3 imágenes de "
+              f"{args.lado}px ({origen_mb:.1f} MB), {args.dpi} DPI")
+        print("=" * 78)
+        print(f"{'Variante':<28} | {'PDF (MB)':>9} | {'Frío (s)':>9} | {'Caché (s)':>9} | {'Reducción':>9}")
+        print("-" * 78)
+        tamano_base, t_base = medir(lambda: construir_galeria(rutas))
+        print(f"{'Original (PNG de media/)':<28} | {tamano_base / 1e6:9.2f} | {t_base:9.2f} | {'-':>9} | {'-':>9}")
+        for formato in ('png', 'png_indexado', 'jpeg'):
+            miniaturas = MiniaturasPDF(os.path.join(directorio, f'miniaturas_{formato}'),
+                                       dpi=args.dpi, formato=formato, calidad=85)
+            tamano, t_frio = medir(lambda: construir_galeria(rutas, miniaturas))
+            _, t_cache = medir(lambda: construir_galeria(rutas, miniaturas))
+            print(f"{'Miniaturas ' + formato:<28} | {tamano / 1e6:9.2f} | {t_frio:9.2f} | {t_cache:9.2f} | "
+                  f"{(1 - tamano / tamano_base) * 100:8.0f}%")
+        print("-" * 78)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+"""
+Benchmark: perfiles de codificación de video y exportación multi-índice
+========================================================================
+
+Sobre el timeline sintético de benchmark_video_multiscene.py:
+
+1. Por perfil (draft, web, archive): tiempo de codificación FFmpeg, tamaño
+   del MP4 y duración de un video NDVI. Las escenas se dibujan una vez
+   antes de medir, así la tabla compara solo el encoder.
+2. NDVI + NDMI + SAVI con el perfil elegido: un FFmpeg por índice contra
+   una sola invocación (escenas apiladas + split/crop).
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_perfiles_video.py
+    python scripts/benchmarks/benchmark_perfiles_video.py --meses 36 --perfiles draft web
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmark_video_multiscene import DIRECTORIO_MEDIA, construir_timeline, duracion_video
+
+from informes.exporters.perfiles_video import PERFILES_CODIFICACION
+from informes.exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
+
+INDICES = ('ndvi', 'ndmi', 'savi')
+ANALISIS = "La parcela muestra un desarrollo vegetativo estable durante el período analizado."
+
+
+def medir_perfil(frames, perfil, args, salida):
+    exporter = TimelineVideoExporterMultiScene(width=args.ancho, height=args.alto, fps=args.fps, perfil=perfil)
+    escenas = exporter._generate_all_scenes(frames, 'ndvi', {'nombre': 'Lote Benchmark'}, ANALISIS)
+    ruta = os.path.join(salida, f'{perfil}.mp4')
+    inicio = time.perf_counter()
+    exporter._create_video_ffmpeg(escenas, ruta)
+    return time.perf_counter() - inicio, os.path.getsize(ruta) / 1e6, duracion_video(ruta)
+
+
+def medir_multi_indice(frames, perfil, args, salida):
+    exporter = TimelineVideoExporterMultiScene(width=args.ancho, height=args.alto, fps=args.fps, perfil=perfil)
+    argumentos = dict(frames_data=frames, parcela_info={'nombre': 'Lote Benchmark'}, analisis_texto=ANALISIS)
+
+    inicio = time.perf_counter()
+    for indice in INDICES:
+        exporter.export_timeline(indice=indice, output_path=os.path.join(salida, f'sep_{indice}.mp4'), **argumentos)
+    t_separado = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    rutas = exporter.export_timeline_multi(
+        indices=INDICES, output_paths={i: os.path.join(salida, f'uno_{i}.mp4') for i in INDICES}, **argumentos)
+    t_una = time.perf_counter() - inicio
+    return t_separado, t_una, [duracion_video(ruta) for ruta in rutas.values()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--fps', type=int, default=24)
+    parser.add_argument('--ancho', type=int, default=1920)
+    parser.add_argument('--alto', type=int, default=1080)
+    parser.add_argument('--perfiles', nargs='+', choices=list(PERFILES_CODIFICACION),
+                        default=list(PERFILES_CODIFICACION))
+    parser.add_argument('--perfil-multi', choices=list(PERFILES_CODIFICACION), default='draft',
+                        help='Perfil para la comparación de 3 índices')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    frames = construir_timeline(args.meses)
+    salida = tempfile.mkdtemp(prefix='bench_perfiles_out_')
+    try:
+        print("=" * 78)
+        print(f"⏱️  BENCHMARK PERFILES DE VIDEO: {args.meses} meses, lienzo {args.ancho}x{args.alto} @ {args.fps}fps")
+        print("=" * 78)
+        print(f"{'Perfil':<9} | {'Preset':<10} | {'CRF':>3} | {'GOP (s)':>7} | {'Salida':>9} | "
+              f"{'Encode (s)':>10} | {'MB':>6} | {'Video (s)':>9}")
+        print("-" * 78)
+        for nombre in args.perfiles:
+            perfil = PERFILES_CODIFICACION[nombre]
+            ancho, alto = perfil.dimensiones_salida(args.ancho, args.alto)
+            segundos, megas, duracion = medir_perfil(frames, nombre, args, salida)
+            print(f"{nombre:<9} | {perfil.preset:<10} | {perfil.crf:>3} | {perfil.gop_segundos:>7g} | "
+                  f"{f'{ancho}x{alto}':>9} | {segundos:10.2f} | {megas:6.2f} | {duracion:9.2f}")
+
+        print("\n" + "=" * 78)
+        print(f"🎞️  3 ÍNDICES ({', '.join(i.upper() for i in INDICES)}), perfil {args.perfil_multi} "
+              f"(incluye dibujo de escenas)")
+        print("=" * 78)
+        t_separado, t_una, duraciones = medir_multi_indice(frames, args.perfil_multi, args, salida)
+        print(f"{'Un FFmpeg por índice':<24} | {t_separado:8.2f} s")
+        print(f"{'Una sola invocación':<24} | {t_una:8.2f} s  (duraciones: "
+              f"{', '.join(f'{d:.2f}' for d in duraciones)})")
+        print("-" * 78)
+        print(f"Speedup: {t_separado / t_una:.2f}x")
+    finally:
+        shutil.rmtree(salida, ignore_errors=True)
+        shutil.rmtree(DIRECTORIO_MEDIA, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
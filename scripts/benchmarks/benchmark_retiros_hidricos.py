@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Benchmark: motor de retiros hídricos por lotes vs iterrows
+==========================================================
+
+Compara ``verificar_retiros_hidricos`` (STRtree + Shapely 2 vectorizado)
+contra ``_verificar_retiros_hidricos_por_elemento`` (iterrows + to_crs por
+cauce) sobre parcelas sintéticas centradas en cauces de la capa IGAC.
+
+Por defecto usa la capa completa Casanare/Meta (10.586 cauces); si no está
+en disco, cae a la capa disponible que elija ``cargar_red_hidrica()``.
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_retiros_hidricos.py
+    python scripts/benchmarks/benchmark_retiros_hidricos.py --parcelas 20 --lado-km 3
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from shapely.geometry import box
+
+from verificador_legal import VerificadorRestriccionesLegales
+
+CAPA_IGAC = os.path.join('datos_geograficos', 'red_hidrica', 'red_hidrica_casanare_meta_igac_2024.shp')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--capa', default=CAPA_IGAC, help='Shapefile de red hídrica')
+    parser.add_argument('--parcelas', type=int, default=10, help='Número de parcelas sintéticas')
+    parser.add_argument('--lado-km', type=float, default=2.0, help='Lado de cada parcela (km)')
+    args = parser.parse_args()
+    
+    verificador = VerificadorRestriccionesLegales()
+    archivo = args.capa if os.path.exists(args.capa) else None
+    if archivo is None:
+        print(f"⚠️  {args.capa} no encontrado, usando capa por defecto del verificador")
+    
+    inicio = time.perf_counter()
+    if not verificador.cargar_red_hidrica(archivo):
+        print("❌ No hay red hídrica disponible")
+        return
+    t_carga = time.perf_counter() - inicio
+    red = verificador.red_hidrica
+    
+    # Parcelas centradas en cauces repartidos por toda la capa
+    paso = max(1, len(red) // args.parcelas)
+    medio_lado = args.lado_km / 111.32 / 2
+    parcelas = []
+    for i in range(0, len(red), paso)[:args.parcelas]:
+        c = red.geometry.iloc[i].centroid
+        parcelas.append(box(c.x - medio_lado, c.y - medio_lado, c.x + medio_lado, c.y + medio_lado).__geo_interface__)
+    
+    print("=" * 80)
+    print("⏱️  BENCHMARK RETIROS HÍDRICOS")
+    print("=" * 80)
+    print(f"Capa: {len(red)} cauces (carga {t_carga:.2f}s) | {len(parcelas)} parcelas de {args.lado_km} km")
+    print("-" * 80)
+    print(f"{'#':>3} | {'Cercanos':>8} | {'Restric.':>8} | {'iterrows (s)':>12} | {'Lotes (s)':>10} | {'Speedup':>7} | Igual")
+    
+    total_iter = total_lote = 0.0
+    for n, parcela in enumerate(parcelas, 1):
+        inicio = time.perf_counter()
+        ref_rest, ref_area = verificador._verificar_retiros_hidricos_por_elemento(parcela)
+        t_iter = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        rest, area = verificador.verificar_retiros_hidricos(parcela)
+        t_lote = time.perf_counter() - inicio
+        
+        igual = (
+            len(rest) == len(ref_rest)
+            and abs(area - ref_area) < 1e-6
+            and all(a['area_afectada_ha'] == b['area_afectada_ha'] for a, b in zip(rest, ref_rest))
+        )
+        total_iter += t_iter
+        total_lote += t_lote
+        print(f"{n:>3} | {len(verificador.red_hidrica_cercana):>8} | {len(rest):>8} | {t_iter:12.3f} | "
+              f"{t_lote:10.4f} | {t_iter / t_lote:6.0f}x | {'✅' if igual else '❌'}")
+    
+    print("-" * 80)
+    print(f"Total: iterrows {total_iter:.2f}s | lotes {total_lote:.3f}s | speedup {total_iter / total_lote:.0f}x")
+
+
+if __name__ == '__main__':
+    main()
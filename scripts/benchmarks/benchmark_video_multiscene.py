@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+Benchmark: video multi-escena con PNGs por frame vs escenas únicas por pipe
+============================================================================
+
+Compara, sobre un timeline sintético de N meses con imágenes satelitales
+locales, la exportación anterior contra la actual de
+``TimelineVideoExporterMultiScene``:
+
+- Antes: cada escena se redibuja ``duración × fps`` veces (recargando
+  fuentes e imagen satelital), cada frame se guarda como PNG en un
+  directorio temporal y FFmpeg los relee con el demuxer concat.
+- Ahora: cada escena se dibuja una vez y se envía como RGB crudo por stdin;
+  la duración va en los timestamps.
+
+Con ``--procesos N`` agrega una tercera variante: escenas repartidas en un
+pool de N procesos (render paralelo opcional del exportador).
+
+Reporta tiempo total, frames dibujados y E/S de disco (bytes escritos por
+el proceso Python según /proc/self/io + bytes de PNG temporales que FFmpeg
+vuelve a leer).
+
+Ejecutar:
+    python scripts/benchmarks/benchmark_video_multiscene.py
+    python scripts/benchmarks/benchmark_video_multiscene.py --meses 36 --fps 24
+    python scripts/benchmarks/benchmark_video_multiscene.py --meses 36 --procesos 4
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from django.conf import settings
+
+DIRECTORIO_MEDIA = tempfile.mkdtemp(prefix='bench_video_media_')
+if not settings.configured:
+    settings.configure(MEDIA_ROOT=DIRECTORIO_MEDIA)
+
+from informes.exporters import video_exporter_multiscene as modulo
+from informes.exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
+
+MESES_TEXTO = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio', 'Julio',
+               'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
+
+
+def bytes_escritos() -> int:
+    """wchar del proceso (Linux); 0 si /proc no está disponible"""
+    try:
+        with open('/proc/self/io') as archivo:
+            for linea in archivo:
+                if linea.startswith('wchar:'):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def construir_timeline(meses: int):
+    """Frames del TimelineProcessor con PNGs satelitales en MEDIA_ROOT"""
+    rng = np.random.default_rng(7)
+    os.makedirs(os.path.join(DIRECTORIO_MEDIA, 'imagenes'), exist_ok=True)
+    frames = []
+    for i in range(meses):
+        año, mes = 2023 + i // 12, i % 12 + 1
+        nombre = f'imagenes/ndvi_{año}_{mes:02d}.png'
+        pixeles = (rng.random((512, 640, 3)) * 80 + [40, 120, 40]).astype(np.uint8)
+        Image.fromarray(pixeles).save(os.path.join(DIRECTORIO_MEDIA, nombre))
+        promedio = 0.55 + 0.15 * np.sin(i / 2)
+        frames.append({
+            'año': año, 'mes': mes, 'periodo_texto': f'{MESES_TEXTO[mes - 1]} {año}',
+            'ndvi': {'promedio': promedio, 'maximo': promedio + 0.2, 'minimo': promedio - 0.2},
+            'temperatura': 26.0, 'precipitacion': 120.0,
+            'imagenes': {'ndvi': f'/media/{nombre}'},
+            # Cada 6 meses uno nublado → escena "imagen no disponible"
+            'imagen_metadata': {'nubosidad': 0.85 if i % 6 == 5 else 0.1},
+            'clasificaciones': {'ndvi': {'etiqueta': 'Bueno'}},
+            'comparacion': None,
+        })
+    return frames
+
+
+def exportar_legado(exporter, plan, salida):
+    """Reproduce la exportación anterior: PNG por frame + concat"""
+    directorio = tempfile.mkdtemp(prefix='agrotech_video_')
+    rutas = []
+    try:
+        for metodo, argumentos in plan:
+            escena = None
+            repeticiones = max(int(getattr(exporter, metodo)(*argumentos).duracion * exporter.fps), 1)
+            for _ in range(repeticiones):
+                modulo._fuente.cache_clear()  # Antes las fuentes se cargaban en cada frame
+                escena = getattr(exporter, metodo)(*argumentos)
+                ruta = os.path.join(directorio, f'frame_{len(rutas):05d}.png')
+                escena.imagen.save(ruta, 'PNG')
+                rutas.append(ruta)
+        bytes_png = sum(os.path.getsize(ruta) for ruta in rutas)
+
+        lista = os.path.join(directorio, 'frames.txt')
+        with open(lista, 'w') as archivo:
+            for i, ruta in enumerate(rutas):
+                archivo.write(f"file '{ruta}'\n")
+                if i < len(rutas) - 1:
+                    archivo.write(f"duration {1.0 / exporter.fps}\n")
+        subprocess.run([
+            'ffmpeg', '-y', '-f', 'concat', '-safe', '0', '-i', lista,
+            '-c:v', 'libx264', '-preset', exporter.preset_benchmark, '-crf', str(exporter.crf),
+            '-pix_fmt', 'yuv420p', '-vf', f'fps={exporter.fps}', salida
+        ], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return len(rutas), bytes_png
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def duracion_video(ruta: str) -> float:
+    resultado = subprocess.run(['ffmpeg', '-i', ruta], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    for linea in resultado.stderr.decode(errors='replace').splitlines():
+        if 'Duration:' in linea:
+            h, m, s = linea.split('Duration:')[1].split(',')[0].strip().split(':')
+            return int(h) * 3600 + int(m) * 60 + float(s)
+    return 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--meses', type=int, default=12)
+    parser.add_argument('--fps', type=int, default=24)
+    parser.add_argument('--ancho', type=int, default=1920)
+    parser.add_argument('--alto', type=int, default=1080)
+    parser.add_argument('--preset', default='ultrafast',
+                        help='Preset x264 para ambas variantes (igual en las dos; veryslow tarda minutos)')
+    parser.add_argument('--procesos', type=int, default=0,
+                        help='Si > 1, agrega la variante de render paralelo con N procesos')
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    frames = construir_timeline(args.meses)
+    exporter = TimelineVideoExporterMultiScene(width=args.ancho, height=args.alto, fps=args.fps)
+    exporter.preset_benchmark = args.preset
+    comando_original = exporter._comando_ffmpeg
+
+    def comando_con_preset(escenas, salida):
+        comando = comando_original(escenas, salida)
+        comando[comando.index('-preset') + 1] = args.preset
+        return comando
+    exporter._comando_ffmpeg = comando_con_preset
+
+    analisis = "La parcela muestra un desarrollo vegetativo estable durante el período analizado."
+    plan = exporter._planificar_escenas(frames, 'ndvi', {'nombre': 'Lote Benchmark'}, analisis, None)
+    salida = tempfile.mkdtemp(prefix='bench_video_out_')
+
+    print("=" * 86)
+    print(f"⏱️  BENCHMARK VIDEO MULTI-ESCENA: {args.meses} meses, {len(plan)} escenas, "
+          f"{args.ancho}x{args.alto} @ {args.fps}fps, preset {args.preset}")
+    print("=" * 86)
+    print(f"{'Variante':<22} | {'Tiempo (s)':>10} | {'Frames dibujados':>16} | {'Escrito (MB)':>12} | "
+          f"{'PNG temp (MB)':>13} | {'Video (s)':>9}")
+    print("-" * 86)
+
+    try:
+        ruta_legado = os.path.join(salida, 'legado.mp4')
+        escritos = bytes_escritos()
+        inicio = time.perf_counter()
+        dibujados, bytes_png = exportar_legado(exporter, plan, ruta_legado)
+        t_legado = time.perf_counter() - inicio
+        mb_legado = (bytes_escritos() - escritos) / 1e6
+        print(f"{'PNG por frame + concat':<22} | {t_legado:10.2f} | {dibujados:16d} | {mb_legado:12.1f} | "
+              f"{bytes_png / 1e6:13.1f} | {duracion_video(ruta_legado):9.2f}")
+
+        ruta_nuevo = os.path.join(salida, 'pipe.mp4')
+        modulo._fuente.cache_clear()
+        escritos = bytes_escritos()
+        inicio = time.perf_counter()
+        exporter.export_timeline(frames, 'ndvi', output_path=ruta_nuevo,
+                                 parcela_info={'nombre': 'Lote Benchmark'}, analisis_texto=analisis)
+        t_nuevo = time.perf_counter() - inicio
+        mb_nuevo = (bytes_escritos() - escritos) / 1e6
+        print(f"{'Escenas únicas + pipe':<22} | {t_nuevo:10.2f} | {len(plan):16d} | {mb_nuevo:12.1f} | "
+              f"{0.0:13.1f} | {duracion_video(ruta_nuevo):9.2f}")
+
+        if args.procesos > 1:
+            ruta_paralelo = os.path.join(salida, 'paralelo.mp4')
+            exporter.procesos = args.procesos
+            escritos = bytes_escritos()
+            inicio = time.perf_counter()
+            exporter.export_timeline(frames, 'ndvi', output_path=ruta_paralelo,
+                                     parcela_info={'nombre': 'Lote Benchmark'}, analisis_texto=analisis)
+            t_paralelo = time.perf_counter() - inicio
+            mb_paralelo = (bytes_escritos() - escritos) / 1e6
+            variante = f"Pipe + {args.procesos} procesos"
+            print(f"{variante:<22} | {t_paralelo:10.2f} | {len(plan):16d} | {mb_paralelo:12.1f} | "
+                  f"{0.0:13.1f} | {duracion_video(ruta_paralelo):9.2f}")
+        print("-" * 86)
+        print(f"Speedup: {t_legado / t_nuevo:.1f}x  ·  'Escrito' incluye el RGB crudo enviado por el pipe "
+              f"(memoria, no disco)")
+    finally:
+        shutil.rmtree(salida, ignore_errors=True)
+        shutil.rmtree(DIRECTORIO_MEDIA, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
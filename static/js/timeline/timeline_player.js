@@ -1121,18 +1121,40 @@ class TimelinePlayer {
             // Construir URL de exportación
             const exportUrl = `/informes/parcelas/${parcelaId}/timeline/exportar-video/?indice=${indice}`;
             
+            // Encolar la exportación (el backend responde 202 con el id del trabajo)
+            const encolado = await fetch(exportUrl, {headers: {'Accept': 'application/json'}});
+            let trabajo = await encolado.json();
+            
+            if (!encolado.ok || trabajo.error) {
+                throw new Error(trabajo.mensaje || `HTTP ${encolado.status}`);
+            }
+            
             this.updateLoadingProgress(2, 5, 'Procesando frames...');
             
+            // Consultar el estado hasta que el worker termine el video
+            while (trabajo.estado === 'pendiente' || trabajo.estado === 'en_proceso') {
+                await new Promise(resolve => setTimeout(resolve, 3000));
+                const estado = await fetch(trabajo.url_estado, {headers: {'Accept': 'application/json'}});
+                trabajo = await estado.json();
+                if (trabajo.estado === 'en_proceso') {
+                    this.updateLoadingProgress(3, 5, 'Codificando video...');
+                }
+            }
+            
+            if (trabajo.estado !== 'completado') {
+                throw new Error((trabajo.mensaje_error || 'La generación falló').split('\n')[0]);
+            }
+            
+            this.updateLoadingProgress(4, 5, 'Descargando video...');
+            
             // Realizar petición de descarga
-            const response = await fetch(exportUrl);
+            const response = await fetch(trabajo.url_descarga);
             
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
                 throw new Error(errorData.mensaje || `HTTP ${response.status}`);
             }
             
-            this.updateLoadingProgress(4, 5, 'Descargando video...');
-            
             // Obtener blob del video
             const blob = await response.blob();
             
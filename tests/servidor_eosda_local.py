@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Servidor local que imita la Field Imagery API de EOSDA
+=======================================================
+
+Para tests sin red ni API key. Sirve GeoTIFF float32 deterministas por
+(view_id, índice) con el mismo flujo que la API real:
+
+    POST /field-imagery/indicies/<field_id>   {'params': {view_id, index, format}}
+         → {'request_id': ...}
+    GET  /field-imagery/<field_id>/<request_id>
+         → 404 mientras "procesa", luego el raster
+
+Uso:
+    with ServidorEOSDALocal(consultas_hasta_listo=2) as servidor:
+        session = requests.Session()
+        DescargadorRastersEOSDA(session, servidor.url, ...)
+
+    python tests/servidor_eosda_local.py   # levanta el servidor en :8765
+"""
+
+import io
+import json
+import threading
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+from PIL import Image, TiffImagePlugin, TiffTags
+
+NODATA = -9999.0
+GEO_TRANSFORM_BASE = (-72.5, 0.0001, 0.0, 5.3, 0.0, -0.0001)
+VALORES_BASE = {'NDVI': 0.65, 'NDMI': 0.15, 'SAVI': 0.45}
+
+
+def generar_geotiff(array: np.ndarray, geo_transform, nodata: float = NODATA) -> bytes:
+    """GeoTIFF de una banda float32 con ModelPixelScale/ModelTiepoint/GDAL_NODATA"""
+    x0, dx, _, y0, _, dy = geo_transform
+    tags = TiffImagePlugin.ImageFileDirectory_v2()
+    tags[33550] = (float(dx), float(-dy), 0.0)
+    tags.tagtype[33550] = TiffTags.DOUBLE
+    tags[33922] = (0.0, 0.0, 0.0, float(x0), float(y0), 0.0)
+    tags.tagtype[33922] = TiffTags.DOUBLE
+    tags[42113] = str(nodata)
+    tags.tagtype[42113] = TiffTags.ASCII
+
+    buffer = io.BytesIO()
+    Image.fromarray(np.asarray(array, dtype=np.float32), mode='F').save(
+        buffer, format='TIFF', tiffinfo=tags
+    )
+    return buffer.getvalue()
+
+
+def array_escena(view_id: str, indice: str, shape=(64, 80)) -> np.ndarray:
+    """Raster determinista: valor base del índice + gradiente + zona baja + nodata en una esquina"""
+    semilla = zlib.crc32(f"{view_id}|{indice}".encode())
+    rng = np.random.default_rng(semilla)
+    alto, ancho = shape
+    array = VALORES_BASE.get(indice.upper(), 0.5) + rng.normal(0, 0.03, shape)
+    array[alto // 3: alto // 2, ancho // 3: ancho // 2] -= 0.3  # Zona con problema
+    array[:4, :4] = NODATA
+    return array.astype(np.float32)
+
+
+class ServidorEOSDALocal:
+    """
+    Args:
+        consultas_hasta_listo: GET que responden 404 antes de entregar el raster
+        shapes: {view_id: (alto, ancho)} para escenas con otra resolución
+        contenido_fijo: bytes a servir para todas las escenas (p. ej. un PNG)
+    """
+
+    def __init__(self, consultas_hasta_listo: int = 1, shapes=None, contenido_fijo: bytes = None,
+                 puerto: int = 0):
+        self.consultas_hasta_listo = consultas_hasta_listo
+        self.shapes = shapes or {}
+        self.contenido_fijo = contenido_fijo
+        self.puerto = puerto
+        self.posts = 0
+        self.gets = 0
+        self.solicitudes = {}  # request_id -> dict
+        self._lock = threading.Lock()
+        self._servidor = None
+        self._hilo = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}"
+
+    def _manejador(self):
+        estado = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _json(self, codigo, datos):
+                cuerpo = json.dumps(datos).encode()
+                self.send_response(codigo)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def do_POST(self):
+                partes = self.path.strip('/').split('/')
+                longitud = int(self.headers.get('Content-Length', 0))
+                cuerpo = json.loads(self.rfile.read(longitud) or b'{}')
+                if partes[:2] != ['field-imagery', 'indicies'] or len(partes) != 3:
+                    return self._json(404, {'error': 'ruta desconocida'})
+                params = cuerpo.get('params', {})
+                request_id = uuid.uuid4().hex
+                with estado._lock:
+                    estado.posts += 1
+                    estado.solicitudes[request_id] = {
+                        'field_id': partes[2], 'view_id': params.get('view_id'),
+                        'indice': params.get('index'), 'consultas': 0
+                    }
+                self._json(202, {'request_id': request_id, 'status': 'created'})
+
+            def do_GET(self):
+                partes = self.path.strip('/').split('/')
+                if len(partes) != 3 or partes[0] != 'field-imagery':
+                    return self._json(404, {'error': 'ruta desconocida'})
+                with estado._lock:
+                    estado.gets += 1
+                    solicitud = estado.solicitudes.get(partes[2])
+                    if solicitud is not None:
+                        solicitud['consultas'] += 1
+                if solicitud is None:
+                    return self._json(404, {'error': 'request_id desconocido'})
+                if solicitud['consultas'] < estado.consultas_hasta_listo:
+                    return self._json(404, {'status': 'processing'})
+
+                contenido = estado.contenido_fijo or generar_geotiff(
+                    array_escena(solicitud['view_id'], solicitud['indice'],
+                                 estado.shapes.get(solicitud['view_id'], (64, 80))),
+                    GEO_TRANSFORM_BASE
+                )
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/tiff')
+                self.send_header('Content-Length', str(len(contenido)))
+                self.end_headers()
+                self.wfile.write(contenido)
+
+        return Manejador
+
+    def __enter__(self):
+        self._servidor = ThreadingHTTPServer(('127.0.0.1', self.puerto), self._manejador())
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+
+if __name__ == '__main__':
+    with ServidorEOSDALocal(puerto=8765) as servidor:
+        print(f"🛰️  Field Imagery local en {servidor.url} (Ctrl+C para salir)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
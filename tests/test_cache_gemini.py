@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""
+Test del caché persistente y el planificador de peticiones a Gemini
+===================================================================
+
+Sobre informes/services/cache_gemini.py (sin BD ni API de Gemini):
+
+- Clave estable por modelo + prompt + bytes de las imágenes
+- Hit/miss, vencimiento por TTL y desalojo LRU por tamaño
+- Peticiones idénticas concurrentes → una sola llamada a la API, también
+  entre instancias (flock); el archivo de bloqueo no se borra
+- Planificador: espacia las peticiones según el límite por minuto,
+  reintenta tras un 429 con pausa global y corta al agotar el límite diario
+
+Ejecutar:
+    python tests/test_cache_gemini.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image as PILImage
+
+from informes.services.cache_gemini import (
+    CacheGemini, CuotaDiaria, CuotaGeminiAgotada, PlanificadorGemini, clave_peticion
+)
+from informes.services.eosda_poller import FCNTL_AVAILABLE, LimitadorTokenBucket
+
+
+def test_clave_peticion():
+    imagen = PILImage.new('RGB', (64, 64), (30, 140, 60))
+    base = clave_peticion('gemini-2.0-flash', ['Analiza NDVI', imagen])
+    assert base == clave_peticion('gemini-2.0-flash', ['Analiza NDVI', imagen.copy()])
+    otra_imagen = imagen.copy()
+    otra_imagen.putpixel((0, 0), (0, 0, 0))
+    distintas = {
+        base,
+        clave_peticion('gemini-2.0-flash', ['Analiza NDMI', imagen]),
+        clave_peticion('gemini-2.5-flash', ['Analiza NDVI', imagen]),
+        clave_peticion('gemini-2.0-flash', ['Analiza NDVI', otra_imagen]),
+        clave_peticion('gemini-2.0-flash', ['Analiza NDVI', {'mime_type': 'image/png', 'data': b'png'}]),
+    }
+    assert len(distintas) == 5
+    assert clave_peticion('m', 'hola') == clave_peticion('m', ['hola'])
+    print("✅ Clave estable; cambia con el prompt, el modelo o un píxel de la imagen")
+
+
+def test_hit_miss_ttl_y_lru():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheGemini(tmp, ttl_s=3600, max_bytes=10 ** 6)
+        llamadas = []
+
+        def generar():
+            llamadas.append(1)
+            return 'Vigor alto en la zona norte'
+
+        assert cache.obtener_o_generar('ab' * 32, generar, 'gemini-2.0-flash') == 'Vigor alto en la zona norte'
+        # Otra instancia (otro proceso / otro informe) lee la misma respuesta del disco
+        otro = CacheGemini(tmp, ttl_s=3600, max_bytes=10 ** 6)
+        assert otro.obtener_o_generar('ab' * 32, generar) == 'Vigor alto en la zona norte'
+        assert len(llamadas) == 1 and otro.stats['hits'] == 1 and cache.stats['misses'] == 1
+
+        # Vencida: se borra y se vuelve a pedir
+        vencido = CacheGemini(tmp, ttl_s=0.05, max_bytes=10 ** 6)
+        time.sleep(0.1)
+        assert vencido.obtener('ab' * 32) is None and vencido.stats['expiradas'] == 1
+        vencido.obtener_o_generar('ab' * 32, generar)
+        assert len(llamadas) == 2
+
+        # LRU: con espacio para ~3 respuestas, se desaloja la usada hace más tiempo
+        lru = CacheGemini(os.path.join(tmp, 'lru'), ttl_s=3600, max_bytes=3 * 1200)
+        claves = [f'{i:02d}' * 32 for i in range(4)]
+        for i, clave in enumerate(claves[:3]):
+            lru.guardar(clave, 'x' * 1000)
+            os.utime(lru._ruta(clave), (time.time() - 100 + i, time.time() - 100 + i))
+        assert lru.obtener(claves[0]) is not None  # La más vieja pasa a ser la más reciente
+        lru.guardar(claves[3], 'x' * 1000)
+        assert lru.obtener(claves[1]) is None and lru.obtener(claves[0]) is not None
+        assert lru.stats['desalojos'] == 1 and lru.tamano_total() <= 3 * 1200
+    print("✅ Hit/miss entre instancias, vencimiento por TTL y desalojo LRU")
+
+
+def test_agrupa_peticiones_concurrentes():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheGemini(tmp, ttl_s=3600, max_bytes=10 ** 6)
+        llamadas = []
+        barrera = threading.Barrier(8)
+
+        def generar():
+            llamadas.append(1)
+            time.sleep(0.3)
+            return 'Análisis global'
+
+        def pedir(_):
+            barrera.wait()
+            return cache.obtener_o_generar('cd' * 32, generar)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            respuestas = list(pool.map(pedir, range(8)))
+        assert respuestas == ['Análisis global'] * 8
+        assert len(llamadas) == 1, len(llamadas)
+        assert cache.stats['misses'] == 1 and cache.stats['hits'] + cache.stats['agrupadas'] == 7
+
+        # Instancias distintas (como procesos distintos) solo comparten el flock por clave;
+        # tandas sucesivas reutilizan el mismo archivo de bloqueo
+        instancias = [CacheGemini(tmp, ttl_s=3600, max_bytes=10 ** 6) for _ in range(3)]
+        for tanda, clave in enumerate(('12' * 32, '34' * 32)):
+            del llamadas[:]
+            barrera = threading.Barrier(6)
+
+            def pedir_en(i):
+                barrera.wait()
+                return instancias[i % 3].obtener_o_generar(clave, generar)
+
+            with ThreadPoolExecutor(max_workers=6) as pool:
+                assert list(pool.map(pedir_en, range(6))) == ['Análisis global'] * 6
+            assert len(llamadas) == 1, (tanda, len(llamadas))
+            if FCNTL_AVAILABLE:
+                assert os.path.exists(instancias[0]._ruta(clave)[:-len('.json')] + '.lock')
+
+        # Un error se propaga a todas las que esperaban y no queda en caché
+        def falla():
+            time.sleep(0.2)
+            raise RuntimeError("API caída")
+
+        def pedir_falla(_):
+            try:
+                cache.obtener_o_generar('ef' * 32, falla)
+            except RuntimeError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            assert list(pool.map(pedir_falla, range(3))) == ['API caída'] * 3
+        assert cache.obtener('ef' * 32) is None
+    print("✅ 8 peticiones idénticas simultáneas → 1 llamada (también entre instancias); los errores no se guardan")
+
+
+class _Error429(Exception):
+    pass
+
+
+def test_planificador():
+    with tempfile.TemporaryDirectory() as tmp:
+        # 120 req/min = una cada 0.5 s
+        limitador = LimitadorTokenBucket(120, capacidad=1, ruta_estado=os.path.join(tmp, 'limitador.json'))
+        planificador = PlanificadorGemini(limitador, CuotaDiaria(100, os.path.join(tmp, 'dia.json')))
+        momentos = []
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda _: planificador.ejecutar(lambda: momentos.append(time.perf_counter())), range(4)))
+        momentos.sort()
+        separaciones = [b - a for a, b in zip(momentos, momentos[1:])]
+        assert min(separaciones) > 0.4, separaciones
+        assert planificador.cuota.restantes() == 96
+
+        # 429: pausa global y reintento en lugar del fallback
+        intentos = []
+
+        def llamada():
+            intentos.append(time.perf_counter())
+            if len(intentos) == 1:
+                raise _Error429("429 Resource has been exhausted, retry in 0.2s")
+            return 'ok'
+
+        assert planificador.ejecutar(llamada) == 'ok'
+        assert planificador.stats['rate_limits'] == 1 and intentos[1] - intentos[0] >= 0.2
+
+        # Otro error no se reintenta
+        try:
+            planificador.ejecutar(lambda: 1 / 0)
+            assert False, "Debió propagar el error"
+        except ZeroDivisionError:
+            pass
+
+        # Límite diario compartido: la tercera petición del día se rechaza
+        cuota = CuotaDiaria(2, os.path.join(tmp, 'dia_corto.json'))
+        rapido = PlanificadorGemini(LimitadorTokenBucket(6000, capacidad=10), cuota)
+        assert [rapido.ejecutar(lambda: 'ok') for _ in range(2)] == ['ok', 'ok']
+        try:
+            PlanificadorGemini(LimitadorTokenBucket(6000, capacidad=10),
+                               CuotaDiaria(2, os.path.join(tmp, 'dia_corto.json'))).ejecutar(lambda: 'ok')
+            assert False, "Debió agotar la cuota diaria"
+        except CuotaGeminiAgotada:
+            pass
+    print(f"✅ Peticiones espaciadas ({min(separaciones):.2f}s), reintento tras 429 y cuota diaria compartida")
+
+
+def test_429_cuota_diaria_sin_reintentos():
+    with tempfile.TemporaryDirectory() as tmp:
+        cuota = CuotaDiaria(1500, os.path.join(tmp, 'dia.json'))
+        planificador = PlanificadorGemini(LimitadorTokenBucket(6000, capacidad=10), cuota)
+        intentos = []
+
+        def llamada():
+            intentos.append(1)
+            raise _Error429("429 Quota exceeded for metric generate_content_free_tier_requests, "
+                            "quota_id: GenerateRequestsPerDayPerProjectPerModel-FreeTier, retry in 30s")
+
+        inicio = time.perf_counter()
+        try:
+            planificador.ejecutar(llamada)
+            assert False, "Debió terminar en CuotaGeminiAgotada"
+        except CuotaGeminiAgotada:
+            pass
+        assert len(intentos) == 1 and time.perf_counter() - inicio < 1
+        assert planificador.stats['rate_limits'] == 0
+
+        # El día queda agotado para los demás procesos, sin volver a llamar a Google
+        try:
+            PlanificadorGemini(LimitadorTokenBucket(6000, capacidad=10),
+                               CuotaDiaria(1500, os.path.join(tmp, 'dia.json'))).ejecutar(llamada)
+            assert False, "Debió rechazar por cuota diaria"
+        except CuotaGeminiAgotada:
+            pass
+        assert len(intentos) == 1 and cuota.restantes() == 0
+    print("✅ 429 por cuota diaria → CuotaGeminiAgotada al primer intento, sin pausas, día marcado como agotado")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST CACHÉ Y PLANIFICADOR GEMINI")
+    print("=" * 70)
+    test_clave_peticion()
+    test_hit_miss_ttl_y_lru()
+    test_agrupa_peticiones_concurrentes()
+    test_planificador()
+    test_429_cuota_diaria_sin_reintentos()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+"""
+Test del caché mensual de la Statistics API de EOSDA
+=====================================================
+
+Verifica que CacheMesEOSDA reparte escenas por mes, reconoce los meses ya
+cubiertos por consultas anteriores y agrupa los meses faltantes en huecos
+contiguos (una petición a EOSDA por hueco).
+
+No consume requests de EOSDA: usa escenas sintéticas con un field_id de prueba.
+
+Ejecutar:
+    python tests/test_cache_mensual_eosda.py
+"""
+
+import os
+import sys
+import django
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrotech_historico.settings')
+django.setup()
+
+from informes.models import CacheMesEOSDA
+from informes.services.eosda_api import EosdaAPIService
+
+FIELD_ID = 'test_cache_mensual'
+INDICES = ['NDVI', 'NDMI', 'SAVI']
+
+
+def _escena(fecha, nubes=10.0, view_id=None):
+    return {
+        'date': fecha,
+        'view_id': view_id or f'S2/{fecha}',
+        'cloud': nubes,
+        'indexes': {'NDVI': {'average': 0.6, 'max': 0.8, 'min': 0.3}},
+    }
+
+
+def test_meses_en_rango():
+    meses = CacheMesEOSDA.meses_en_rango(date(2024, 11, 15), date(2025, 2, 3))
+    assert meses == [(2024, 11), (2024, 12), (2025, 1), (2025, 2)], meses
+    print("✅ meses_en_rango cruza el cambio de año")
+
+
+def test_huecos_contiguos():
+    cubiertos = {(2024, 3): None, (2024, 4): None, (2024, 8): None}
+    huecos = CacheMesEOSDA.calcular_huecos(date(2024, 1, 10), date(2024, 10, 20), cubiertos)
+    assert huecos == [
+        (date(2024, 1, 10), date(2024, 2, 29)),
+        (date(2024, 5, 1), date(2024, 7, 31)),
+        (date(2024, 9, 1), date(2024, 10, 20)),
+    ], huecos
+    print(f"✅ {len(huecos)} huecos contiguos en vez de 7 meses sueltos")
+
+
+def test_reutiliza_subrango():
+    CacheMesEOSDA.objects.filter(field_id=FIELD_ID).delete()
+    escenas = [_escena('2024-01-05'), _escena('2024-02-14'), _escena('2024-04-20')]
+
+    CacheMesEOSDA.guardar_escenas(
+        FIELD_ID, date(2024, 1, 1), date(2024, 6, 30), INDICES, escenas, max_nubosidad=50
+    )
+    # Marzo, mayo y junio no tienen escenas pero también quedan cacheados
+    assert CacheMesEOSDA.objects.filter(field_id=FIELD_ID).count() == 6
+
+    cubiertos = CacheMesEOSDA.obtener_cubiertos(
+        FIELD_ID, date(2024, 2, 1), date(2024, 4, 30), ['ndvi'], max_nubosidad=30
+    )
+    assert sorted(cubiertos) == [(2024, 2), (2024, 3), (2024, 4)], sorted(cubiertos)
+    assert CacheMesEOSDA.calcular_huecos(date(2024, 2, 1), date(2024, 4, 30), cubiertos) == []
+
+    resultado = EosdaAPIService._ensamblar_escenas_cache(
+        cubiertos.values(), date(2024, 2, 1), date(2024, 4, 30), 30
+    )
+    assert [e['date'] for e in resultado] == ['2024-02-14', '2024-04-20']
+    print("✅ Subrango servido 100% desde caché mensual (0 requests)")
+
+
+def test_hit_parcial_y_filtros():
+    # Rango que se sale del caché: solo julio-agosto son hueco
+    cubiertos = CacheMesEOSDA.obtener_cubiertos(
+        FIELD_ID, date(2024, 5, 1), date(2024, 8, 31), INDICES, max_nubosidad=50
+    )
+    huecos = CacheMesEOSDA.calcular_huecos(date(2024, 5, 1), date(2024, 8, 31), cubiertos)
+    assert huecos == [(date(2024, 7, 1), date(2024, 8, 31))], huecos
+
+    # Nubosidad más permisiva o índices extra no se pueden servir desde caché
+    assert not CacheMesEOSDA.obtener_cubiertos(
+        FIELD_ID, date(2024, 1, 1), date(2024, 1, 31), INDICES, max_nubosidad=70
+    )
+    assert not CacheMesEOSDA.obtener_cubiertos(
+        FIELD_ID, date(2024, 1, 1), date(2024, 1, 31), INDICES + ['EVI'], max_nubosidad=50
+    )
+    print("✅ Hit parcial: solo se consulta el hueco julio-agosto")
+
+
+def test_fusion_cobertura_parcial():
+    CacheMesEOSDA.objects.filter(field_id=FIELD_ID).delete()
+    CacheMesEOSDA.guardar_escenas(
+        FIELD_ID, date(2024, 9, 16), date(2024, 9, 30), INDICES, [_escena('2024-09-20')]
+    )
+    # La primera quincena no está cubierta todavía
+    assert not CacheMesEOSDA.obtener_cubiertos(
+        FIELD_ID, date(2024, 9, 1), date(2024, 9, 30), INDICES
+    )
+
+    CacheMesEOSDA.guardar_escenas(
+        FIELD_ID, date(2024, 9, 1), date(2024, 9, 15), INDICES, [_escena('2024-09-03')]
+    )
+    registro = CacheMesEOSDA.objects.get(field_id=FIELD_ID, año=2024, mes=9)
+    assert (registro.cubre_desde, registro.cubre_hasta) == (date(2024, 9, 1), date(2024, 9, 30))
+    assert [e['date'] for e in registro.escenas_json] == ['2024-09-03', '2024-09-20']
+    print("✅ Coberturas parciales del mismo mes se fusionan")
+
+    CacheMesEOSDA.objects.filter(field_id=FIELD_ID).delete()
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST CACHÉ MENSUAL EOSDA")
+    print("=" * 70)
+    test_meses_en_rango()
+    test_huecos_contiguos()
+    test_reutiliza_subrango()
+    test_hit_parcial_y_filtros()
+    test_fusion_cobertura_parcial()
+    print("\n🎉 Todos los tests pasaron")
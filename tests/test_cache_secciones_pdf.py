@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+Test del caché de secciones del informe PDF
+===========================================
+
+Sobre el módulo informes/services/cache_secciones_pdf.py (sin BD):
+
+- huella() estable entre llamadas y distinta si cambia cualquier entrada
+  (fila, geometría, umbrales, arreglos numpy, versión de plantilla)
+- Flowables de ReportLab guardados y recuperados construyen el mismo PDF
+- obtener_o_generar() solo llama al constructor en el primer informe
+- Desalojo LRU: se borran las entradas usadas hace más tiempo, y solo
+  cuando el total escrito supera el límite (no en cada escritura)
+- Objetos no serializables no se guardan (y no rompen el informe)
+
+Ejecutar:
+    python tests/test_cache_secciones_pdf.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+from io import BytesIO
+from datetime import date
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from informes.services import cache_secciones_pdf
+from informes.services.cache_secciones_pdf import CacheSeccionesPDF, RegistroSecciones, huella
+
+
+def _png():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(3, 2))
+    ax.plot([1, 2, 3], [0.5, 0.62, 0.58])
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _seccion_ndvi(png):
+    """Flowables equivalentes a los de una sección del informe"""
+    estilos = getSampleStyleSheet()
+    tabla = Table([['Mes', 'NDVI'], ['2025-01', '0.612'], ['2025-02', '0.587']], colWidths=[4*cm, 4*cm])
+    tabla.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2E8B57')),
+                               ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)]))
+    return [Paragraph('<strong>Análisis NDVI</strong>', estilos['Heading2']), Spacer(1, 0.3*cm),
+            tabla, Image(BytesIO(png), width=8*cm, height=5*cm)]
+
+
+def _construir_pdf(flowables):
+    buffer = BytesIO()
+    SimpleDocTemplate(buffer, pagesize=A4, invariant=1).build(list(flowables))
+    return buffer.getvalue()
+
+
+def test_huella():
+    fila = {'año': 2025, 'mes': 3, 'ndvi_promedio': 0.61, 'fecha_imagen': date(2025, 3, 14)}
+    umbrales = SimpleNamespace(tipo_cultivo='cacao', ndvi_critico_max=0.30)
+    cubo = np.linspace(0, 1, 64, dtype=np.float32).reshape(4, 4, 4)
+    base = huella('ndvi', [fila], umbrales, cubo)
+    assert base == huella('ndvi', [dict(fila)], SimpleNamespace(**vars(umbrales)), cubo.copy())
+    assert len(base) == 64
+
+    cambios = [
+        huella('ndmi', [fila], umbrales, cubo),
+        huella('ndvi', [dict(fila, ndvi_promedio=0.62)], umbrales, cubo),
+        huella('ndvi', [fila, dict(fila, mes=4)], umbrales, cubo),
+        huella('ndvi', [fila], SimpleNamespace(tipo_cultivo='cacao', ndvi_critico_max=0.35), cubo),
+        huella('ndvi', [fila], umbrales, cubo * 2),
+    ]
+    assert len({base, *cambios}) == len(cambios) + 1
+
+    version = cache_secciones_pdf.VERSION_PLANTILLA_PDF
+    try:
+        cache_secciones_pdf.VERSION_PLANTILLA_PDF = version + 1
+        assert huella('ndvi', [fila], umbrales, cubo) != base
+    finally:
+        cache_secciones_pdf.VERSION_PLANTILLA_PDF = version
+    print("✅ Huella estable y sensible a filas, umbrales, arreglos y versión de plantilla")
+
+
+def test_flowables_desde_cache():
+    png = _png()
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheSeccionesPDF(tmp, max_bytes=50 * 1024 * 1024)
+        llamadas = []
+
+        def generar():
+            llamadas.append(1)
+            return _seccion_ndvi(png)
+
+        entradas = ([{'mes': 1, 'ndvi': 0.612}], png)
+        primera, desde_cache = cache.obtener_o_generar('ndvi', entradas, generar)
+        assert desde_cache is False
+        segunda, desde_cache = cache.obtener_o_generar('ndvi', entradas, generar)
+        assert desde_cache is True and len(llamadas) == 1
+        assert _construir_pdf(segunda) == _construir_pdf(_seccion_ndvi(png))
+
+        _, desde_cache = cache.obtener_o_generar('ndvi', ([{'mes': 1, 'ndvi': 0.613}], png), generar)
+        assert desde_cache is False and len(llamadas) == 2
+        assert cache.stats['hits'] == 1 and cache.stats['escrituras'] == 2
+    print("✅ Flowables desde caché construyen el mismo PDF; solo se regenera lo que cambió")
+
+
+def test_desalojo_lru():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheSeccionesPDF(tmp, max_bytes=10**9)
+        claves = [huella('galeria_mes', mes) for mes in range(6)]
+        for clave in claves:
+            cache.guardar('galeria_mes', clave, os.urandom(20000))
+        # Entradas viejas con mtime explícito; la más vieja se vuelve a leer
+        for i, clave in enumerate(claves):
+            ruta = cache._ruta('galeria_mes', clave)
+            os.utime(ruta, (time.time() - 1000 + i, time.time() - 1000 + i))
+        assert cache.obtener('galeria_mes', claves[0])[0] is True
+
+        cache._max_bytes = int(cache.tamano_total() * 0.6)
+        desalojadas = cache.podar()
+        assert desalojadas >= 2 and cache.tamano_total() <= cache.max_bytes
+        presentes = [cache.obtener('galeria_mes', clave)[0] for clave in claves]
+        assert presentes[0] and presentes[-1] and not presentes[1] and not presentes[2]
+    print(f"✅ Desalojo LRU: {desalojadas} entradas menos usadas borradas, la recién leída se conserva")
+
+
+def test_poda_solo_al_superar_limite():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheSeccionesPDF(tmp, max_bytes=10 * 20100)
+        recorridos = []
+        entradas_originales = cache._entradas
+        cache._entradas = lambda: recorridos.append(1) or entradas_originales()
+
+        # Un informe con 8 secciones bajo el límite: un solo recorrido del árbol
+        for mes in range(8):
+            cache.guardar('galeria_mes', huella('galeria_mes', mes), os.urandom(20000))
+        assert len(recorridos) == 1 and cache.stats['desalojos'] == 0
+
+        # Al pasar del límite se poda una vez y queda margen para las siguientes
+        for mes in range(8, 12):
+            cache.guardar('galeria_mes', huella('galeria_mes', mes), os.urandom(20000))
+        assert len(recorridos) == 2 and cache.stats['desalojos'] >= 2
+        assert sum(tamano for _, tamano, _ in entradas_originales()) <= cache.max_bytes
+    print("✅ Poda solo al superar el límite: 2 recorridos del árbol para 12 escrituras")
+
+
+def test_no_serializable_y_registro():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CacheSeccionesPDF(tmp, max_bytes=10**9)
+        objeto, desde_cache = cache.obtener_o_generar('grafico', (1,), lambda: (lambda x: x))
+        assert callable(objeto) and desde_cache is False
+        assert cache.stats['no_serializables'] == 1 and cache.tamano_total() == 0
+        assert cache.obtener_o_generar('grafico', (1,), lambda: 'otra')[1] is False
+
+        registro = RegistroSecciones()
+        assert registro.medir('portada', lambda: ('ok', True)) == 'ok'
+        registro.medir('ndvi', lambda: (None, False))
+        resumen = registro.resumen()
+        assert resumen.startswith('1/2 secciones desde caché') and resumen.endswith('regeneradas: ndvi')
+    print("✅ Objetos no serializables no se guardan; registro de secciones resume hits y regeneradas")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST CACHÉ DE SECCIONES PDF")
+    print("=" * 70)
+    test_huella()
+    test_flowables_desde_cache()
+    test_desalojo_lru()
+    test_poda_solo_al_superar_limite()
+    test_no_serializable_y_registro()
+    print("\n🎉 Todos los tests pasaron")
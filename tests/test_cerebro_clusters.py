@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+"""
+Test del etiquetado de clusters del Cerebro de Diagnóstico
+===========================================================
+
+- connectedComponentsWithStats: área, bbox y centroide exactos por cluster
+- Promedios NDVI/NDMI/SAVI por etiqueta (bincount) iguales a la media directa
+- ZonaCritica conserva su máscara exacta (un anillo no incluye su hueco)
+- Recorte por máscara de cultivo antes de etiquetar y filtro de área mínima
+- Área afectada y desglose por severidad desde un solo raster de niveles:
+  unión exacta (no bboxes) y cada píxel en su nivel más alto
+- Detección fusionada: máscara de bits por píxel igual a las máscaras por
+  patrón, con cualquier tamaño de bloque; con más de 8 patrones (uint16)
+  los bits altos también forman clusters
+- Modo por franjas: clusters unidos en las costuras, mismas zonas, bboxes,
+  centroides, máscaras y área afectada que el modo completo
+- Pico de memoria de la detección medido solo durante la llamada
+  (tracemalloc), no el pico del proceso, y solo si se pide
+- triangular_y_diagnosticar de punta a punta (modo completo y por franjas)
+
+Sin base de datos: los umbrales se fijan en memoria.
+
+Ejecutar:
+    python tests/test_cerebro_clusters.py
+"""
+
+import os
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from informes.motor_analisis.cerebro_diagnostico import CerebroDiagnosticoUnificado, ZonaCritica, _medir_pico_mb
+
+UMBRALES = SimpleNamespace(
+    ndvi_critico_max=0.30, ndvi_moderado_max=0.45, ndvi_optimo_min=0.70,
+    ndmi_estres_severo_max=-0.08, ndmi_estres_moderado_max=0.05, ndmi_optimo_min=0.20,
+    savi_exposicion_severa_max=0.25, savi_exposicion_moderada_max=0.35, savi_optimo_min=0.50,
+    factor_penalizacion_crisis=80.0, penalizacion_maxima=50.0,
+    area_minima_absoluta_ha=0.05, area_minima_porcentaje_lote=0.5
+)
+
+
+class CerebroSinBD(CerebroDiagnosticoUnificado):
+    def _cargar_umbrales_dinamicos(self):
+        self.umbrales = UMBRALES
+
+
+def _escena(shape=(120, 160), semilla=0):
+    """Índices sanos con manchas de déficit hídrico (bajo NDVI y NDMI)"""
+    rng = np.random.default_rng(semilla)
+    ndvi = rng.uniform(0.6, 0.8, shape).astype(np.float32)
+    ndmi = rng.uniform(0.2, 0.4, shape).astype(np.float32)
+    savi = rng.uniform(0.5, 0.7, shape).astype(np.float32)
+    mancha = np.zeros(shape, dtype=bool)
+    mancha[10:30, 10:40] = True                      # Rectángulo
+    yy, xx = np.ogrid[:shape[0], :shape[1]]
+    radio = np.hypot(yy - 70, xx - 100)
+    mancha |= (radio >= 8) & (radio <= 18)           # Anillo con hueco sano
+    mancha[100:102, 5:7] = True                      # Mancha bajo el área mínima
+    ndvi[mancha] = rng.uniform(0.1, 0.25, mancha.sum())
+    ndmi[mancha] = rng.uniform(-0.3, -0.1, mancha.sum())
+    return ndvi, ndmi, savi, mancha
+
+
+def test_clusters_exactos():
+    ndvi, ndmi, savi, mancha = _escena()
+    cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01)
+    patron = cerebro._construir_patrones_deteccion_dinamicos()[0]
+    mascara = cerebro._crear_mascara_condicion_dinamica(ndvi, ndmi, savi, patron)
+
+    clusters = cerebro._encontrar_clusters(mascara, min_area_pixeles=20)
+    assert len(clusters.validas) == 2  # La mancha de 4 píxeles se descarta
+    zonas = cerebro._analizar_clusters(clusters, ndvi, ndmi, savi, None, patron)
+
+    for zona in zonas:
+        completa = zona.mascara_completa(ndvi.shape)
+        assert completa.sum() == zona.area_pixeles
+        filas, columnas = np.nonzero(completa)
+        assert zona.bbox == (columnas.min(), filas.min(), columnas.max() + 1, filas.max() + 1)
+        assert zona.centroide_pixel == (int(columnas.mean()), int(filas.mean()))
+        for nombre, array in (('ndvi', ndvi), ('ndmi', ndmi), ('savi', savi)):
+            assert np.isclose(zona.valores_indices[nombre], array[completa].mean(), atol=1e-6)
+        assert np.isclose(zona.confianza, cerebro._calcular_confianza(ndvi[completa], ndmi[completa]))
+
+    anillo = max(zonas, key=lambda z: z.bbox[0])
+    assert not anillo.mascara_completa(ndvi.shape)[70, 100]  # El hueco no es parte de la zona
+    assert anillo.area_pixeles == int(((mancha & mascara)[50:90, 80:120]).sum())
+    print(f"✅ {len(zonas)} clusters con área, bbox, centroide, promedios y máscara exactos")
+
+
+def test_recorte_por_cultivo():
+    ndvi, ndmi, savi, _ = _escena()
+    cultivo = np.ones(ndvi.shape, dtype=bool)
+    cultivo[:, :25] = False  # Corta el rectángulo por la mitad
+    cerebro = CerebroSinBD(area_parcela_ha=cultivo.sum() * 0.01, mascara_cultivo=cultivo)
+    patron = cerebro._construir_patrones_deteccion_dinamicos()[0]
+    mascara = cerebro._crear_mascara_condicion_dinamica(ndvi, ndmi, savi, patron)
+    zonas = cerebro._analizar_clusters(
+        cerebro._encontrar_clusters(mascara, min_area_pixeles=20), ndvi, ndmi, savi, None, patron)
+    rectangulo = min(zonas, key=lambda z: z.bbox[0])
+    assert rectangulo.bbox[0] == 25 and rectangulo.area_pixeles == 20 * 15
+    print("✅ Clusters recortados por la máscara de cultivo antes de etiquetar")
+
+
+def test_detectar_zonas_criticas():
+    ndvi, ndmi, savi, _ = _escena(shape=(300, 400), semilla=1)
+    cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01)
+    zonas = cerebro._detectar_zonas_criticas(ndvi, ndmi, savi, (-72.5, 0.0001, 0, 5.3, 0, -0.0001))
+    assert zonas and all(z.mascara is not None for z in zonas)
+    assert all(z.centroide_geo[1] > -72.5 for z in zonas)
+    puntajes = [z.severidad * z.area_hectareas for z in zonas]
+    assert puntajes == sorted(puntajes, reverse=True)
+    print(f"✅ _detectar_zonas_criticas: {len(zonas)} zonas ordenadas por impacto")
+
+
+def test_union_y_desglose_exactos():
+    ndvi, ndmi, savi, _ = _escena(shape=(300, 400), semilla=2)
+    cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01)
+    zonas = cerebro._detectar_zonas_criticas(ndvi, ndmi, savi, None)
+    por_severidad = cerebro._clasificar_por_severidad(zonas)
+
+    # Referencia por fuerza bruta con las máscaras exactas
+    union = np.zeros(ndvi.shape, dtype=bool)
+    for zona in zonas:
+        union |= zona.mascara_completa(ndvi.shape)
+    area, mascara_union = cerebro._calcular_area_afectada_union(zonas, ndvi.shape)
+    assert np.array_equal(mascara_union, union)
+    assert np.isclose(area, union.sum() * 0.01)
+    # El anillo tiene un hueco sano: con bboxes el área quedaría inflada
+    area_bboxes = np.zeros(ndvi.shape, dtype=bool)
+    for zona in zonas:
+        x0, y0, x1, y1 = zona.bbox
+        area_bboxes[y0:y1, x0:x1] = True
+    assert area < area_bboxes.sum() * 0.01
+
+    desglose = cerebro._calcular_desglose_severidad_union(por_severidad, ndvi.shape)
+    assert np.isclose(sum(desglose.values()), area, atol=0.02)
+    print(f"✅ Unión exacta {area:.2f} ha (bboxes: {area_bboxes.sum() * 0.01:.2f} ha), desglose {desglose}")
+
+
+def test_desglose_prioriza_nivel_mas_alto():
+    cerebro = CerebroSinBD(area_parcela_ha=100.0)
+    etiquetas = np.zeros((50, 50), dtype=np.int32)
+    etiquetas[10:30, 10:30] = 1
+
+    def zona(severidad, bbox, imagen=None):
+        return ZonaCritica('x', 'x', severidad, 0.0, 0, (0, 0), (0.0, 0.0), bbox, {}, 0.9, [],
+                           imagen_etiquetas=imagen, etiqueta=1 if imagen is not None else 0)
+
+    critica = zona(0.9, (10, 10, 30, 30), etiquetas)   # 400 px exactos
+    leve = zona(0.2, (20, 20, 40, 40))                  # Sin etiquetas → bbox (400 px, 100 solapados)
+    desglose = cerebro._calcular_desglose_severidad_union(
+        {'critica': [critica], 'moderada': [], 'leve': [leve]}, (50, 50))
+    assert desglose == {'critica': 4.0, 'moderada': 0.0, 'leve': 3.0}
+    print("✅ Solapes cuentan una vez, en el nivel más alto; zonas sin etiquetas usan su bbox")
+
+
+def test_bitmask_fusionado():
+    ndvi, ndmi, savi, _ = _escena(shape=(97, 131), semilla=3)
+    rng = np.random.default_rng(4)
+    for array in (ndvi, ndmi, savi):
+        array[rng.random(array.shape) < 0.05] = np.nan          # Nubes / sin dato
+        array[rng.random(array.shape) < 0.02] = -2.0            # Fuera de rango
+    savi[40:60, 10:50] = rng.uniform(0.0, 0.3, (20, 40))        # Activa los otros patrones
+    ndvi[40:60, 10:50] = rng.uniform(0.1, 0.45, (20, 40))
+    ndmi[40:60, 30:50] = rng.uniform(0.1, 0.3, (20, 20))
+
+    cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01)
+    patrones = cerebro._construir_patrones_deteccion_dinamicos()
+    esperado = np.zeros(ndvi.shape, dtype=np.uint8)
+    for i, patron in enumerate(patrones):
+        esperado |= cerebro._crear_mascara_condicion_dinamica(ndvi, ndmi, savi, patron).astype(np.uint8) << i
+    assert all((esperado & (1 << i)).any() for i in range(len(patrones)))
+
+    for bloque in (None, 131, 131 * 7, 50, 10 ** 9):
+        bits = cerebro._evaluar_patrones_bitmask(ndvi, ndmi, savi, patrones, pixeles_por_bloque=bloque)
+        assert bits.dtype == np.uint8 and np.array_equal(bits, esperado), bloque
+    print(f"✅ Máscara de bits fusionada = {len(patrones)} máscaras por patrón (con NaN, bloques de 1..N filas)")
+
+
+def test_bits_altos_mas_de_8_patrones():
+    ndvi, ndmi, savi, _ = _escena(shape=(120, 160), semilla=6)
+    cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01)
+    patrones = cerebro._construir_patrones_deteccion_dinamicos()
+    referencia = cerebro._detectar_zonas_criticas(ndvi, ndmi, savi, None)
+
+    # 9 patrones imposibles delante: el déficit hídrico queda en el bit 9 (máscara uint16)
+    imposible = dict(patrones[0], tipo='imposible', ndvi_max=-5.0)
+    cerebro._construir_patrones_deteccion_dinamicos = lambda: [imposible] * 9 + patrones
+    bits = cerebro._evaluar_patrones_bitmask(ndvi, ndmi, savi, cerebro._construir_patrones_deteccion_dinamicos())
+    assert bits.dtype == np.uint16 and (bits & (1 << 9)).any()
+
+    mascara = np.bitwise_and(bits, bits.dtype.type(1 << 9))
+    assert len(cerebro._encontrar_clusters(mascara, min_area_pixeles=20).validas) == 2
+
+    for zonas in (cerebro._detectar_zonas_criticas(ndvi, ndmi, savi, None),
+                  cerebro._detectar_zonas_criticas_por_tiles(ndvi, ndmi, savi, None, 16)):
+        assert [(z.tipo_diagnostico, z.bbox, z.area_pixeles) for z in zonas] == \
+            [(z.tipo_diagnostico, z.bbox, z.area_pixeles) for z in referencia]
+    print(f"✅ Bits ≥ 8 de la máscara uint16: mismas {len(referencia)} zonas (completo y por franjas)")
+
+
+def test_modo_por_franjas():
+    ndvi, ndmi, savi, _ = _escena(shape=(301, 397), semilla=5)
+    # Una "U" que solo se une en su base: dos franjas la ven como dos clusters
+    ndvi[150:230, 300:306] = 0.1
+    ndvi[150:230, 340:346] = 0.1
+    ndvi[226:230, 300:346] = 0.1
+    ndmi[150:230, 300:346] = -0.2
+    cultivo = np.ones(ndvi.shape, dtype=bool)
+    cultivo[:, :20] = False
+    cultivo[60:62, :] = False  # Corta el anillo en dos a la altura de una costura
+
+    for mascara_cultivo in (None, cultivo):
+        cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01, mascara_cultivo=mascara_cultivo)
+        completo = cerebro._detectar_zonas_criticas(ndvi, ndmi, savi, None)
+        for filas in (1, 2, 7, 64, 10 ** 6):
+            franjas = cerebro._detectar_zonas_criticas_por_tiles(ndvi, ndmi, savi, None, filas)
+            assert len(franjas) == len(completo), filas
+            for a, b in zip(completo, franjas):
+                assert (a.tipo_diagnostico, a.area_pixeles, a.bbox, a.centroide_pixel) == \
+                    (b.tipo_diagnostico, b.area_pixeles, b.bbox, b.centroide_pixel), filas
+                assert np.array_equal(a.mascara, b.mascara)
+                for nombre in a.valores_indices:
+                    assert np.isclose(a.valores_indices[nombre], b.valores_indices[nombre])
+                assert np.isclose(a.severidad, b.severidad) and np.isclose(a.confianza, b.confianza)
+            area, _ = cerebro._calcular_area_afectada_union(franjas, ndvi.shape)
+            assert np.isclose(area, cerebro._calcular_area_afectada_union(completo, ndvi.shape)[0])
+    assert any(z.bbox == (300, 150, 346, 230) for z in franjas)
+    print(f"✅ Modo por franjas = modo completo ({len(completo)} zonas, costuras cada 1..N filas)")
+
+
+def test_pico_memoria_deteccion():
+    grande = np.ones(40 * 2 ** 20, dtype=np.uint8)  # 40 MB vivos antes de medir
+    resultado, pico = _medir_pico_mb(lambda: int(np.zeros(8 * 2 ** 20, dtype=np.uint8).sum()))
+    assert resultado == 0 and 7.5 <= pico < 20, pico
+    assert not tracemalloc.is_tracing()
+    del grande
+
+    # Si alguien ya traza (benchmark), no se interfiere con su medición
+    tracemalloc.start()
+    try:
+        assert _medir_pico_mb(lambda: 1) == (1, None) and tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    print(f"✅ Pico de la detección = solo sus asignaciones ({pico} MB de 8 MB pedidos)")
+
+
+def test_diagnostico_completo():
+    ndvi, ndmi, savi, _ = _escena(shape=(120, 160), semilla=7)
+    geo = (-72.5, 0.0001, 0, 5.3, 0, -0.0001)
+    with tempfile.TemporaryDirectory() as tmp:
+        for filas, medir in ((None, False), (16, True)):
+            cerebro = CerebroSinBD(area_parcela_ha=ndvi.size * 0.01, filas_por_tile=filas, medir_memoria=medir)
+            diagnostico = cerebro.triangular_y_diagnosticar(ndvi, ndmi, savi, geo, output_dir=Path(tmp))
+            assert diagnostico.zonas_criticas and diagnostico.zona_prioritaria is not None
+            assert 0 <= diagnostico.eficiencia_lote <= 100 and diagnostico.area_afectada_total > 0
+            memoria = diagnostico.metadata['memoria']
+            assert memoria['modo'] == ('tiles' if filas else 'completo')
+            assert (memoria['pico_deteccion_mb'] is not None) == medir
+            assert not tracemalloc.is_tracing()
+    print(f"✅ triangular_y_diagnosticar completo: {len(diagnostico.zonas_criticas)} zonas, "
+          f"eficiencia {diagnostico.eficiencia_lote:.1f}% (memoria medida solo si se pide)")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST CLUSTERS DEL CEREBRO DE DIAGNÓSTICO")
+    print("=" * 70)
+    test_clusters_exactos()
+    test_recorte_por_cultivo()
+    test_detectar_zonas_criticas()
+    test_union_y_desglose_exactos()
+    test_desglose_prioriza_nivel_mas_alto()
+    test_bitmask_fusionado()
+    test_bits_altos_mas_de_8_patrones()
+    test_modo_por_franjas()
+    test_pico_memoria_deteccion()
+    test_diagnostico_completo()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+"""
+Test del almacén de clima por celda de Open-Meteo
+=================================================
+
+Sobre informes/services/clima_celdas.py (sin BD ni red; la API se
+reemplaza por una función que registra las peticiones):
+
+- Parcelas vecinas caen en la misma celda; parcelas lejanas, no
+- La segunda parcela de una celda no llama a la API
+- Ampliar el rango solo pide los días faltantes (huecos cortos fusionados)
+- Días recientes sin datos se vuelven a pedir; los antiguos no
+- Persistencia en disco entre instancias y una sola descarga con
+  peticiones simultáneas a la misma celda
+- Agregado mensual = agregar_clima_por_mes sobre los días
+
+Ejecutar:
+    python tests/test_clima_celdas.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from informes.services.clima_celdas import AlmacenClima, celda_de, rangos_faltantes, RETRASO_ARCHIVO_DIAS
+
+# Dos parcelas vecinas en Casanare (~1.5 km) y una a ~40 km
+PARCELA_A = (5.3362, -72.3951)
+PARCELA_B = (5.3471, -72.4040)
+PARCELA_LEJANA = (5.7369, -71.5200)
+
+
+class _OpenMeteoFalso:
+    """Devuelve un día por fecha pedida; registra cada petición"""
+
+    def __init__(self, demora=0.0, sin_datos_desde=None):
+        self.peticiones = []
+        self.demora = demora
+        self.sin_datos_desde = sin_datos_desde
+        self._lock = threading.Lock()
+
+    def __call__(self, latitud, longitud, inicio, fin):
+        with self._lock:
+            self.peticiones.append((latitud, longitud, inicio, fin))
+        time.sleep(self.demora)
+        filas = []
+        dia = inicio
+        while dia <= fin:
+            publicado = self.sin_datos_desde is None or dia < self.sin_datos_desde
+            filas.append({
+                'fecha': dia.isoformat(),
+                'temperatura_promedio': 26.0 + dia.day / 10 if publicado else None,
+                'temperatura_maxima': 31.0 + dia.day / 10 if publicado else None,
+                'temperatura_minima': 21.0 if publicado else None,
+                'precipitacion_total': float(dia.day % 3) if publicado else None,
+            })
+            dia += timedelta(days=1)
+        return filas
+
+
+def test_celdas_y_rangos():
+    assert celda_de(*PARCELA_A) == celda_de(*PARCELA_B) == (5.3, -72.4)
+    assert celda_de(*PARCELA_LEJANA) != celda_de(*PARCELA_A)
+    assert celda_de(5.3362, -72.3951, paso_grados=0.25) == (5.25, -72.5)
+    dias = [date(2025, 1, d) for d in (1, 2, 3, 8, 30, 31)]
+    assert rangos_faltantes(dias) == [(date(2025, 1, 1), date(2025, 1, 8)), (date(2025, 1, 30), date(2025, 1, 31))]
+    assert rangos_faltantes(dias, max_hueco=0) == [
+        (date(2025, 1, 1), date(2025, 1, 3)), (date(2025, 1, 8), date(2025, 1, 8)),
+        (date(2025, 1, 30), date(2025, 1, 31))
+    ]
+    print("✅ Parcelas vecinas comparten celda; rangos faltantes con huecos cortos fusionados")
+
+
+def test_comparte_celda_y_pide_solo_faltantes():
+    with tempfile.TemporaryDirectory() as tmp:
+        api = _OpenMeteoFalso()
+        almacen = AlmacenClima(tmp, paso_grados=0.1, descargar=api)
+
+        dias_a = almacen.obtener_dias(*PARCELA_A, date(2024, 1, 1), date(2024, 6, 30))
+        assert len(dias_a) == 182 and api.peticiones == [(5.3, -72.4, date(2024, 1, 1), date(2024, 6, 30))]
+
+        # Parcela vecina, mismo período: sin peticiones y los mismos datos
+        assert almacen.obtener_dias(*PARCELA_B, date(2024, 1, 1), date(2024, 6, 30)) == dias_a
+        assert len(api.peticiones) == 1 and almacen.stats['dias_desde_almacen'] == 182
+
+        # Rango ampliado: solo diciembre 2023 y julio 2024
+        almacen.obtener_dias(*PARCELA_B, date(2023, 12, 1), date(2024, 7, 31))
+        assert api.peticiones[1:] == [(5.3, -72.4, date(2023, 12, 1), date(2023, 12, 31)),
+                                      (5.3, -72.4, date(2024, 7, 1), date(2024, 7, 31))]
+
+        # Parcela lejana: su propia celda
+        almacen.obtener_dias(*PARCELA_LEJANA, date(2024, 1, 1), date(2024, 1, 31))
+        assert api.peticiones[-1][:2] == celda_de(*PARCELA_LEJANA)
+
+        # Otra instancia (otro proceso) lee la celda del disco
+        api_nueva = _OpenMeteoFalso()
+        otro = AlmacenClima(tmp, paso_grados=0.1, descargar=api_nueva)
+        assert len(otro.obtener_dias(*PARCELA_A, date(2023, 12, 1), date(2024, 7, 31))) == 244
+        assert api_nueva.peticiones == []
+    print("✅ Segunda parcela de la celda sin peticiones; rango ampliado pide solo lo faltante")
+
+
+def test_dias_recientes_sin_publicar():
+    with tempfile.TemporaryDirectory() as tmp:
+        hoy = date.today()
+        # La API aún no publicó los últimos RETRASO_ARCHIVO_DIAS - 2 días
+        api = _OpenMeteoFalso(sin_datos_desde=hoy - timedelta(days=RETRASO_ARCHIVO_DIAS - 2))
+        almacen = AlmacenClima(tmp, paso_grados=0.1, descargar=api)
+        dias = almacen.obtener_dias(*PARCELA_A, hoy - timedelta(days=30), hoy)
+        assert len(dias) == 31 - (RETRASO_ARCHIVO_DIAS - 1)
+        almacen.obtener_dias(*PARCELA_A, hoy - timedelta(days=30), hoy)
+        assert len(api.peticiones) == 2
+        assert api.peticiones[1][2] == hoy - timedelta(days=RETRASO_ARCHIVO_DIAS - 2)
+
+        # Días antiguos sin datos sí se guardan (no se piden de nuevo)
+        api_vieja = _OpenMeteoFalso(sin_datos_desde=date(2020, 1, 15))
+        viejo = AlmacenClima(os.path.join(tmp, 'viejo'), paso_grados=0.1, descargar=api_vieja)
+        viejo.obtener_dias(*PARCELA_A, date(2020, 1, 1), date(2020, 1, 31))
+        viejo.obtener_dias(*PARCELA_A, date(2020, 1, 1), date(2020, 1, 31))
+        assert len(api_vieja.peticiones) == 1
+
+        # Error de red (lista vacía): nada se guarda y se reintenta
+        fallida = AlmacenClima(os.path.join(tmp, 'fallida'), paso_grados=0.1, descargar=lambda *a: [])
+        assert fallida.obtener_dias(*PARCELA_A, date(2020, 1, 1), date(2020, 1, 31)) == []
+        assert fallida.obtener_dias(*PARCELA_A, date(2020, 1, 1), date(2020, 1, 31)) == []
+        assert fallida.stats['peticiones'] == 2
+    print("✅ Días recientes sin publicar y errores de red se vuelven a pedir; días antiguos vacíos no")
+
+
+def test_concurrencia_y_mensual():
+    with tempfile.TemporaryDirectory() as tmp:
+        api = _OpenMeteoFalso(demora=0.2)
+        almacen = AlmacenClima(tmp, paso_grados=0.1, descargar=api)
+        parcelas = [PARCELA_A, PARCELA_B] * 3
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            mensuales = list(pool.map(
+                lambda p: almacen.clima_mensual(*p, date(2024, 1, 1), date(2024, 3, 31)), parcelas
+            ))
+        assert len(api.peticiones) == 1
+        mensual = mensuales[0]
+        assert all(m.equals(mensual) for m in mensuales)
+        assert list(mensual.index) == [(2024, 1), (2024, 2), (2024, 3)]
+        enero = mensual.loc[(2024, 1)]
+        assert abs(enero['temperatura_promedio'] - (26.0 + 1.6)) < 1e-9
+        assert enero['temperatura_maxima'] == 31.0 + 3.1 and enero['temperatura_minima'] == 21.0
+        assert enero['precipitacion_total'] == sum(float(d % 3) for d in range(1, 32))
+    print("✅ 6 parcelas simultáneas de una celda → 1 petición; agregado mensual correcto")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST ALMACÉN DE CLIMA POR CELDA")
+    print("=" * 70)
+    test_celdas_y_rangos()
+    test_comparte_celda_y_pide_solo_faltantes()
+    test_dias_recientes_sin_publicar()
+    test_concurrencia_y_mensual()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+"""
+Test de la cola de trabajos de generación
+==========================================
+
+Verifica deduplicación de peticiones idénticas en curso, reclamo por un
+worker, reintento con espera exponencial, fallo definitivo, registro de
+tiempos y latido (solo se liberan trabajos cuyo worker dejó de latir;
+sin intentos restantes quedan fallidos, y el worker viejo ya no puede
+guardar su resultado). No genera PDFs ni videos: usa un ejecutor falso.
+
+Ejecutar:
+    python tests/test_cola_trabajos.py
+"""
+
+import os
+import sys
+import time
+import django
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrotech_historico.settings')
+django.setup()
+
+from django.db.models import F
+from django.utils import timezone
+from informes.models import Parcela, TrabajoGeneracion, TipoTrabajo, EstadoTrabajo
+from informes.services import trabajos_generacion
+
+
+def _parcela():
+    parcela = Parcela.objects.filter(activa=True).first()
+    if not parcela:
+        print("❌ No hay parcelas activas en el sistema")
+        sys.exit(1)
+    return parcela
+
+
+def _limpiar(parcela):
+    TrabajoGeneracion.objects.filter(parcela=parcela, worker__startswith='test').delete()
+    TrabajoGeneracion.objects.filter(parcela=parcela, estado=EstadoTrabajo.PENDIENTE).delete()
+
+
+def test_deduplicacion(parcela):
+    t1, creado1 = TrabajoGeneracion.encolar(TipoTrabajo.INFORME_PDF, parcela, parametros={'meses': 12})
+    t2, creado2 = TrabajoGeneracion.encolar(TipoTrabajo.INFORME_PDF, parcela, parametros={'meses': 12})
+    t3, creado3 = TrabajoGeneracion.encolar(TipoTrabajo.INFORME_PDF, parcela, parametros={'meses': 6})
+
+    assert creado1 and not creado2 and creado3
+    assert t1.pk == t2.pk != t3.pk
+    print("✅ Petición idéntica en curso reutiliza el trabajo; parámetros distintos crean otro")
+    return t1, t3
+
+
+def test_reintento_y_fallo(parcela):
+    trabajo, _ = TrabajoGeneracion.encolar(TipoTrabajo.VIDEO_TIMELINE, parcela,
+                                           parametros={'indice': 'ndvi'}, max_intentos=2)
+
+    def ejecutor_roto(_trabajo):
+        raise RuntimeError("ffmpeg no disponible")
+
+    original = trabajos_generacion.EJECUTORES[TipoTrabajo.VIDEO_TIMELINE]
+    trabajos_generacion.EJECUTORES[TipoTrabajo.VIDEO_TIMELINE] = ejecutor_roto
+    try:
+        reclamado = TrabajoGeneracion.reclamar_siguiente('test:0', tipos=[TipoTrabajo.VIDEO_TIMELINE])
+        assert reclamado.pk == trabajo.pk and reclamado.intentos == 1
+        assert not trabajos_generacion.ejecutar_trabajo(reclamado)
+
+        reclamado.refresh_from_db()
+        assert reclamado.estado == EstadoTrabajo.PENDIENTE
+        assert reclamado.disponible_desde > timezone.now()
+        # Mientras espera el reintento nadie lo puede reclamar
+        assert TrabajoGeneracion.reclamar_siguiente('test:1', tipos=[TipoTrabajo.VIDEO_TIMELINE]) is None
+        print("✅ Primer fallo: vuelve a la cola con espera")
+
+        TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(
+            disponible_desde=timezone.now() - timedelta(seconds=1)
+        )
+        reclamado = TrabajoGeneracion.reclamar_siguiente('test:1', tipos=[TipoTrabajo.VIDEO_TIMELINE])
+        assert not trabajos_generacion.ejecutar_trabajo(reclamado)
+        reclamado.refresh_from_db()
+        assert reclamado.estado == EstadoTrabajo.FALLIDO and reclamado.intentos == 2
+        assert 'ffmpeg no disponible' in reclamado.mensaje_error
+        print("✅ Intentos agotados: trabajo fallido con el error registrado")
+    finally:
+        trabajos_generacion.EJECUTORES[TipoTrabajo.VIDEO_TIMELINE] = original
+
+
+def test_completado_con_tiempos(parcela, trabajo):
+    def ejecutor_ok(_trabajo):
+        return {'archivo': '/tmp/informe.pdf', 'nombre_descarga': 'informe.pdf', 'resultado': {'ok': True}}
+
+    original = trabajos_generacion.EJECUTORES[TipoTrabajo.INFORME_PDF]
+    trabajos_generacion.EJECUTORES[TipoTrabajo.INFORME_PDF] = ejecutor_ok
+    try:
+        contadores = trabajos_generacion.procesar_cola(
+            'test:2', tipos=[TipoTrabajo.INFORME_PDF], hasta_vaciar=True
+        )
+    finally:
+        trabajos_generacion.EJECUTORES[TipoTrabajo.INFORME_PDF] = original
+
+    trabajo.refresh_from_db()
+    assert contadores['completados'] >= 1
+    assert trabajo.estado == EstadoTrabajo.COMPLETADO
+    assert trabajo.tiempo_cola is not None and trabajo.tiempo_ejecucion is not None
+
+    # Completado ya no deduplica: una nueva petición crea otro trabajo
+    nuevo, creado = TrabajoGeneracion.encolar(TipoTrabajo.INFORME_PDF, parcela, parametros={'meses': 12})
+    assert creado and nuevo.pk != trabajo.pk
+    nuevo.delete()
+    print(f"✅ Completado: cola {trabajo.tiempo_cola:.2f}s, ejecución {trabajo.tiempo_ejecucion:.3f}s")
+
+
+def test_latido_y_huerfanos(parcela):
+    trabajo, _ = TrabajoGeneracion.encolar(TipoTrabajo.INFORME_LEGAL_PDF, parcela, parametros={'test': 'latido'})
+    reclamado = TrabajoGeneracion.reclamar_siguiente('test:latido', tipos=[TipoTrabajo.INFORME_LEGAL_PDF])
+    assert reclamado.pk == trabajo.pk and reclamado.latido is not None
+
+    # Render largo con el worker vivo: iniciado hace 2 h, latido reciente → no se libera
+    hace_2h = timezone.now() - timedelta(hours=2)
+    TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(iniciado_en=hace_2h)
+    with trabajos_generacion.LatidoTrabajo(reclamado, intervalo=0.1):
+        time.sleep(0.35)
+    reclamado.refresh_from_db()
+    assert reclamado.latido > timezone.now() - timedelta(seconds=5)
+    assert TrabajoGeneracion.liberar_huerfanos(minutos=5) == {'devueltos': 0, 'fallidos': 0}
+    assert TrabajoGeneracion.objects.get(pk=trabajo.pk).estado == EstadoTrabajo.EN_PROCESO
+
+    # Worker muerto: sin latido hace más de 5 minutos → vuelve a la cola
+    TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(latido=timezone.now() - timedelta(minutes=10))
+    assert TrabajoGeneracion.liberar_huerfanos(minutos=5) == {'devueltos': 1, 'fallidos': 0}
+    trabajo.refresh_from_db()
+    assert trabajo.estado == EstadoTrabajo.PENDIENTE and trabajo.worker == ''
+    assert not reclamado.registrar_latido()  # El worker viejo ya no es dueño del trabajo
+
+    # Otro worker lo reclama; el viejo termina tarde y no pisa su estado
+    nuevo = TrabajoGeneracion.reclamar_siguiente('test:latido2', tipos=[TipoTrabajo.INFORME_LEGAL_PDF])
+    assert nuevo.pk == trabajo.pk
+    assert not reclamado.marcar_completado('/tmp/viejo.pdf')
+    assert not reclamado.marcar_fallido('error del worker viejo')
+    trabajo.refresh_from_db()
+    assert trabajo.estado == EstadoTrabajo.EN_PROCESO and trabajo.worker == 'test:latido2'
+    assert trabajo.archivo_resultado == '' and trabajo.mensaje_error == ''
+
+    # Sin intentos restantes (p. ej. el render tumba al worker): fallido, no vuelve a la cola
+    TrabajoGeneracion.objects.filter(pk=trabajo.pk).update(
+        latido=timezone.now() - timedelta(minutes=10), intentos=F('max_intentos')
+    )
+    assert TrabajoGeneracion.liberar_huerfanos(minutos=5) == {'devueltos': 0, 'fallidos': 1}
+    trabajo.refresh_from_db()
+    assert trabajo.estado == EstadoTrabajo.FALLIDO and 'latido' in trabajo.mensaje_error
+    assert trabajo.finalizado_en is not None
+    assert not nuevo.marcar_completado('/tmp/tarde.pdf')
+    trabajo.delete()
+    print("✅ Latido: worker vivo no se libera; sin latido vuelve a la cola o queda fallido sin intentos; "
+          "el worker viejo no pisa al nuevo")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST COLA DE TRABAJOS DE GENERACIÓN")
+    print("=" * 70)
+    parcela = _parcela()
+    _limpiar(parcela)
+    try:
+        trabajo_12, _ = test_deduplicacion(parcela)
+        test_reintento_y_fallo(parcela)
+        test_completado_con_tiempos(parcela, trabajo_12)
+        test_latido_y_huerfanos(parcela)
+        print("\n🎉 Todos los tests pasaron")
+    finally:
+        _limpiar(parcela)
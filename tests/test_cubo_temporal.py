@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+Test del cubo temporal persistente por parcela
+===============================================
+
+- Agregar meses escribe al final de cada banda (sin reescribir el cubo)
+- Un mes anterior se intercala en orden; uno existente se reemplaza
+- Lecturas por memmap: rebanadas consecutivas son vistas, no copias
+- Serie de promedios mensuales con máscara para AnalizadorSeriesTemporal
+- Sincronización desde rasters EOSDA: solo descarga los meses que faltan
+  o cuya escena (view_id) cambió
+- Un cambio de geometría de la parcela descarta el cubo
+
+Ejecutar:
+    python tests/test_cubo_temporal.py
+"""
+
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from informes.motor_analisis.analizador_series_temporal import AnalizadorSeriesTemporal
+from informes.services.cubo_temporal import CuboTemporalParcela, huella_geometria
+from informes.services.eosda_poller import LimitadorTokenBucket
+from informes.services.rasters_eosda import CacheRastersEOSDA, DescargadorRastersEOSDA
+from servidor_eosda_local import ServidorEOSDALocal
+
+SHAPE = (16, 20)
+GEO_TRANSFORM = (-72.5, 0.001, 0.0, 5.3, 0.0, -0.001)
+
+
+def _capa(valor):
+    return {indice: np.full(SHAPE, valor + desfase, dtype=np.float32)
+            for indice, desfase in (('ndvi', 0.0), ('ndmi', -0.4), ('savi', -0.2))}
+
+
+def test_agregar_y_leer():
+    with tempfile.TemporaryDirectory() as directorio:
+        cubo = CuboTemporalParcela.para_parcela(1, directorio)
+        assert not cubo.existe and cubo.banda('ndvi') is None
+
+        nuevas = cubo.agregar_meses([('2025-01', _capa(0.5)), ('2025-02', _capa(0.6))], GEO_TRANSFORM)
+        assert nuevas == ['2025-01', '2025-02']
+        lector = cubo.banda('ndvi')
+        assert isinstance(lector, np.memmap) and lector.shape == (2,) + SHAPE
+
+        cubo.agregar_meses([('2025-03', _capa(0.7))])
+        ruta = os.path.join(cubo.directorio, 'ndvi.f32')
+        assert os.path.getsize(ruta) == 3 * SHAPE[0] * SHAPE[1] * 4
+        assert np.allclose(lector[1], 0.6)  # Un memmap abierto antes sigue siendo válido
+
+        # Otra instancia (otro proceso) ve los tres meses
+        otro = CuboTemporalParcela.para_parcela(1, directorio)
+        assert otro.fechas == ['2025-01', '2025-02', '2025-03']
+        assert otro.geo_transform == GEO_TRANSFORM
+        assert np.allclose(otro.mes('ndmi', '2025-03'), 0.3)
+    print("✅ Meses agregados al final de cada banda y leídos por memmap")
+
+
+def test_intercalar_y_reemplazar():
+    with tempfile.TemporaryDirectory() as directorio:
+        cubo = CuboTemporalParcela.para_parcela(2, directorio)
+        cubo.agregar_meses([('2025-03', _capa(0.7)), ('2025-05', _capa(0.8))], GEO_TRANSFORM)
+        cubo.agregar_meses([('2025-01', _capa(0.4)), ('2025-05', _capa(0.9))])
+        assert cubo.fechas == ['2025-01', '2025-03', '2025-05']
+        valores = [float(cubo.banda('ndvi')[i].mean()) for i in range(3)]
+        assert np.allclose(valores, [0.4, 0.7, 0.9])
+
+        try:
+            cubo.agregar_meses([('2025-06', {i: np.zeros((2, 2)) for i in ('ndvi', 'ndmi', 'savi')})])
+            raise AssertionError("Debió rechazar una capa con otra rejilla")
+        except ValueError:
+            pass
+    print("✅ Mes anterior intercalado en orden; mes existente reemplazado")
+
+
+def test_rebanadas_sin_copia_y_series():
+    with tempfile.TemporaryDirectory() as directorio:
+        cubo = CuboTemporalParcela.para_parcela(3, directorio)
+        capas = []
+        for mes in range(1, 7):
+            capa = _capa(0.3 + mes * 0.05)
+            capa['ndvi'][:4, :4] = np.nan
+            capas.append((f'2025-{mes:02d}', capa))
+        cubo.agregar_meses(capas, GEO_TRANSFORM)
+
+        consecutivos = cubo.rebanada(['2025-02', '2025-03', '2025-04'])
+        assert consecutivos['fechas'] == ['2025-02', '2025-03', '2025-04']
+        assert np.shares_memory(consecutivos['cubos']['ndvi'], cubo.banda('ndvi'))
+        salteados = cubo.rebanada(['2025-01', '2025-06', '2030-01'])
+        assert salteados['fechas'] == ['2025-01', '2025-06']
+
+        data_cubes = cubo.como_data_cubes()
+        assert data_cubes['num_meses'] == 6 and data_cubes['ndvi_cube'].shape == (6,) + SHAPE
+
+        mascara = np.zeros(SHAPE, dtype=bool)
+        mascara[:8, :8] = True
+        valores, fechas = AnalizadorSeriesTemporal().serie_desde_cubo(cubo, 'ndvi', mascara=mascara)
+        assert len(fechas) == 6 and fechas[0].month == 1
+        assert np.allclose(valores, [0.3 + m * 0.05 for m in range(1, 7)])  # NaN ignorados
+    print("✅ Rebanadas consecutivas son vistas; serie mensual con máscara y NaN")
+
+
+def test_sincronizar_desde_rasters():
+    meses = [SimpleNamespace(año=2025, mes=m, view_id_imagen=f'S2/{m}') for m in (1, 2, 3)]
+    meses.append(SimpleNamespace(año=2025, mes=4, view_id_imagen=None))
+    with tempfile.TemporaryDirectory() as directorio, ServidorEOSDALocal() as servidor:
+        descargador = DescargadorRastersEOSDA(
+            requests.Session(), servidor.url,
+            cache=CacheRastersEOSDA(os.path.join(directorio, 'rasters')),
+            limitador=LimitadorTokenBucket(peticiones_por_minuto=60000, capacidad=1000),
+            espera_inicial=0.01, espera_maxima=0.02
+        )
+        cubo = CuboTemporalParcela.para_parcela(4, os.path.join(directorio, 'cubos'))
+
+        resultado = cubo.sincronizar_desde_rasters(meses[:2], 'campo1', descargador)
+        assert resultado == {'nuevos': ['2025-01', '2025-02'], 'actualizados': [], 'sin_raster': []}
+        assert descargador.descargas == 6
+
+        resultado = cubo.sincronizar_desde_rasters(meses, 'campo1', descargador)
+        assert resultado == {'nuevos': ['2025-03'], 'actualizados': [], 'sin_raster': ['2025-04']}
+        assert descargador.descargas == 9  # Solo el mes nuevo
+        assert cubo.num_meses == 3 and cubo.shape == (64, 80)
+        assert cubo.view_ids == {'2025-01': 'S2/1', '2025-02': 'S2/2', '2025-03': 'S2/3'}
+
+        # EOSDA reprocesó la escena de febrero: el mes se reescribe en su lugar
+        febrero_antes = np.array(cubo.mes('ndvi', '2025-02'))
+        meses[1] = SimpleNamespace(año=2025, mes=2, view_id_imagen='S2/2-v2')
+        resultado = CuboTemporalParcela.para_parcela(4, os.path.join(directorio, 'cubos')).sincronizar_desde_rasters(
+            meses, 'campo1', descargador)
+        assert resultado == {'nuevos': [], 'actualizados': ['2025-02'], 'sin_raster': ['2025-04']}
+        assert descargador.descargas == 12
+        cubo.recargar()
+        assert cubo.fechas == ['2025-01', '2025-02', '2025-03'] and cubo.view_ids['2025-02'] == 'S2/2-v2'
+        assert not np.allclose(np.array(cubo.mes('ndvi', '2025-02')), febrero_antes, equal_nan=True)
+    print("✅ Sincronización: solo se descargan los meses que faltan o cuya escena cambió")
+
+
+def test_cambio_de_geometria():
+    parcela = 'POLYGON((-72.5 5.3, -72.4 5.3, -72.4 5.2, -72.5 5.3))'
+    ampliada = 'POLYGON((-72.5 5.3, -72.3 5.3, -72.3 5.1, -72.5 5.3))'
+    assert huella_geometria(parcela) == huella_geometria(parcela) != huella_geometria(ampliada)
+    with tempfile.TemporaryDirectory() as directorio:
+        cubo = CuboTemporalParcela.para_parcela(5, directorio, geometria=parcela)
+        cubo.agregar_meses([('2025-01', _capa(0.5)), ('2025-02', _capa(0.6))], GEO_TRANSFORM)
+        assert cubo.meta['geometria'] == huella_geometria(parcela)
+
+        # Misma geometría: se reutiliza
+        assert CuboTemporalParcela.para_parcela(5, directorio, geometria=parcela).num_meses == 2
+
+        # Otra geometría: el cubo anterior se descarta y el nuevo toma su rejilla
+        nuevo = CuboTemporalParcela.para_parcela(5, directorio, geometria=ampliada)
+        assert not nuevo.existe and not os.path.exists(os.path.join(nuevo.directorio, 'ndvi.f32'))
+        capa = {indice: np.full((8, 8), 0.4, dtype=np.float32) for indice in ('ndvi', 'ndmi', 'savi')}
+        nuevo.agregar_meses([('2025-03', capa)], GEO_TRANSFORM)
+        assert nuevo.fechas == ['2025-03'] and nuevo.shape == (8, 8)
+
+        # Un proceso que aún tiene la geometría anterior no mezcla rejillas:
+        # al escribir empieza un cubo nuevo en lugar de agregar al existente
+        viejo = CuboTemporalParcela(nuevo.directorio, geometria=huella_geometria(parcela))
+        viejo.agregar_meses([('2025-04', _capa(0.7))], GEO_TRANSFORM)
+        assert viejo.fechas == ['2025-04'] and viejo.shape == SHAPE
+        assert os.path.getsize(os.path.join(viejo.directorio, 'ndvi.f32')) == SHAPE[0] * SHAPE[1] * 4
+    print("✅ Cambio de geometría: el cubo guardado se descarta en lugar de leerse con otra rejilla")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST CUBO TEMPORAL POR PARCELA")
+    print("=" * 70)
+    test_agregar_y_leer()
+    test_intercalar_y_reemplazar()
+    test_rebanadas_sin_copia_y_series()
+    test_sincronizar_desde_rasters()
+    test_cambio_de_geometria()
+    print("\n🎉 Todos los tests pasaron")
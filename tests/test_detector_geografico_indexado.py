@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Test del detector geográfico indexado
+=====================================
+
+Sobre capas GADM y red hídrica sintéticas (shapefiles en un directorio
+temporal con la misma estructura que datos_geograficos/):
+
+- Departamento/municipio por STRtree = filtro `contains` sobre toda la capa
+- Memo por hash de geometría: la segunda consulta no toca el índice
+- Red hídrica municipal = `.cx` por bbox; recortar=True la deja dentro del
+  municipio; precalentar() precalcula las mismas selecciones
+- obtener_detector_geografico() devuelve una instancia por directorio
+
+Ejecutar:
+    python tests/test_detector_geografico_indexado.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geopandas as gpd
+from shapely.geometry import LineString, Point, box
+
+from detector_geografico import DetectorGeografico, obtener_detector_geografico
+
+
+def _crear_datos(directorio):
+    """2 departamentos de 3x4 municipios de 0.1° y ríos diagonales"""
+    gadm = os.path.join(directorio, 'limites_departamentales', 'gadm_extract')
+    red = os.path.join(directorio, 'red_hidrica')
+    os.makedirs(gadm)
+    os.makedirs(red)
+
+    departamentos, municipios = [], []
+    for d, nombre in enumerate(('Meta', 'Casanare')):
+        x0 = -73.0 + d * 0.3
+        departamentos.append({'NAME_1': nombre, 'geometry': box(x0, 4.0, x0 + 0.3, 4.4)})
+        for i in range(3):
+            for j in range(4):
+                municipios.append({'NAME_1': nombre, 'NAME_2': f'{nombre}-{i}{j}',
+                                   'geometry': box(x0 + i * 0.1, 4.0 + j * 0.1, x0 + (i + 1) * 0.1, 4.0 + (j + 1) * 0.1)})
+    gpd.GeoDataFrame(departamentos, crs='EPSG:4326').to_file(os.path.join(gadm, 'gadm41_COL_1.shp'))
+    gpd.GeoDataFrame(municipios, crs='EPSG:4326').to_file(os.path.join(gadm, 'gadm41_COL_2.shp'))
+
+    rios = [{'NOMBRE': f'Caño {k}' if k % 3 == 0 else None,
+             'geometry': LineString([(-73.0 + k * 0.013, 4.0), (-72.9 + k * 0.013, 4.4)])} for k in range(40)]
+    gpd.GeoDataFrame(rios, crs='EPSG:4326').to_file(
+        os.path.join(red, 'red_hidrica_casanare_meta_igac_2024.shp'))
+
+
+def test_ubicacion_y_memo():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        detector = DetectorGeografico(tmp)
+        municipios = detector.municipios_gdf
+        for x, y in ((-72.95, 4.05), (-72.55, 4.35), (-72.81, 4.22)):
+            parcela = box(x - 0.004, y - 0.004, x + 0.004, y + 0.004)
+            resultado = detector.detectar_ubicacion(parcela)
+            esperado = municipios[municipios.contains(parcela.centroid)]
+            assert resultado['municipio'] == esperado.iloc[0]['NAME_2']
+            assert resultado['municipio_gdf'].index.tolist() == esperado.index.tolist()
+            assert resultado['departamento'] == esperado.iloc[0]['NAME_1']
+            assert detector.detectar_ubicacion(parcela)['municipio'] == resultado['municipio']
+        assert detector.stats['misses'] == 3 and detector.stats['hits'] == 3
+
+        fuera = detector.detectar_ubicacion(Point(-60.0, 4.0).buffer(0.01))
+        assert fuera['departamento'] is None and fuera['municipio'] is None
+    print("✅ STRtree = contains sobre toda la capa; memo por hash de geometría")
+
+
+def test_red_hidrica_municipal():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        detector = DetectorGeografico(tmp)
+        red = detector._capa_red_hidrica().gdf
+        municipio = detector.detectar_ubicacion(box(-72.66, 4.21, -72.64, 4.23))['municipio_gdf']
+
+        b = municipio.total_bounds
+        esperado = red.cx[b[0]:b[2], b[1]:b[3]]
+        red_municipal = detector.cargar_red_hidrica_municipal(municipio)
+        assert red_municipal.index.tolist() == esperado.index.tolist() and len(esperado) > 0
+        assert detector.cargar_red_hidrica_municipal(municipio) is red_municipal
+        assert detector.stats['redes_hits'] == 1
+
+        recortada = detector.cargar_red_hidrica_municipal(municipio, recortar=True)
+        poligono = municipio.geometry.iloc[0].buffer(1e-9)
+        assert len(recortada) > 0 and all(poligono.contains(g) for g in recortada.geometry)
+
+        # Precalentar: mismas selecciones para todos los municipios
+        frio = DetectorGeografico(tmp)
+        assert frio.precalentar() == len(frio.municipios_gdf)
+        for _, fila in frio.municipios_gdf.iterrows():
+            x0, y0, x1, y1 = fila.geometry.bounds
+            gdf_mun = frio.municipios_gdf.loc[[fila.name]]
+            assert frio.cargar_red_hidrica_municipal(gdf_mun).index.tolist() == red.cx[x0:x1, y0:y1].index.tolist()
+        assert frio.stats['redes_misses'] == 0
+    print("✅ Red hídrica por municipio: bbox = .cx, recorte al polígono y precálculo masivo")
+
+
+def test_singleton():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        assert obtener_detector_geografico(tmp) is obtener_detector_geografico(tmp + os.sep)
+        assert obtener_detector_geografico(tmp) is not obtener_detector_geografico()
+    print("✅ Una instancia del detector por directorio de datos")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST DETECTOR GEOGRÁFICO INDEXADO")
+    print("=" * 70)
+    test_ubicacion_y_memo()
+    test_red_hidrica_municipal()
+    test_singleton()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+"""
+Test del poller asíncrono de tareas EOSDA
+==========================================
+
+Usa una sesión HTTP falsa (sin red ni API key) para verificar:
+- Varias tareas esperadas en paralelo (tiempo total ≈ la más lenta)
+- 429 con Retry-After pausa a todos y luego se recupera
+- Token bucket compartido entre instancias vía archivo de estado
+- Wrapper síncrono
+
+Ejecutar:
+    python tests/test_eosda_poller.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from informes.services.eosda_poller import (
+    LimitadorTokenBucket, esperar_tareas_sync, calcular_retry_after
+)
+
+
+class RespuestaFalsa:
+    def __init__(self, status_code, data=None, headers=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.headers = headers or {}
+        self.text = str(self._data)
+
+    def json(self):
+        return self._data
+
+
+class SesionFalsa:
+    """Cada tarea responde 'processing' N veces y luego el resultado"""
+
+    def __init__(self, consultas_hasta_listo, rate_limit_en=None):
+        self.consultas_hasta_listo = consultas_hasta_listo
+        self.rate_limit_en = rate_limit_en or {}
+        self.consultas = {}
+        self._lock = threading.Lock()
+
+    def get(self, url, timeout=None):
+        task_id = url.rsplit('/', 1)[-1]
+        with self._lock:
+            n = self.consultas[task_id] = self.consultas.get(task_id, 0) + 1
+        if self.rate_limit_en.get(task_id) == n:
+            return RespuestaFalsa(429, headers={'Retry-After': '0.2'})
+        if task_id == 'tarea_con_error':
+            return RespuestaFalsa(200, {'status': 'failed', 'errors': ['geometría inválida']})
+        if n >= self.consultas_hasta_listo.get(task_id, 1):
+            return RespuestaFalsa(200, {'status': 'finished', 'result': [{'date': '2025-01-05', 'task': task_id}]})
+        return RespuestaFalsa(200, {'status': 'processing'})
+
+
+def _limitador_sin_limite():
+    return LimitadorTokenBucket(peticiones_por_minuto=60000, capacidad=1000)
+
+
+def test_tareas_en_paralelo():
+    sesion = SesionFalsa({'a': 3, 'b': 3, 'c': 3, 'd': 3})
+    inicio = time.time()
+    resultados = esperar_tareas_sync(sesion, 'https://eosda.test', ['a', 'b', 'c', 'd'],
+                                     limitador=_limitador_sin_limite(), espera_inicial=0.1,
+                                     espera_maxima=0.2, max_consultas=10)
+    duracion = time.time() - inicio
+
+    assert all(r.exitosa for r in resultados.values())
+    assert all(r.consultas == 3 for r in resultados.values())
+    # En serie serían ~4 × 2 esperas; en paralelo ≈ 2 esperas
+    assert duracion < 0.8, duracion
+    print(f"✅ 4 tareas en paralelo en {duracion:.2f}s")
+
+
+def test_retry_after_y_errores():
+    sesion = SesionFalsa({'lenta': 2}, rate_limit_en={'lenta': 1})
+    limitador = _limitador_sin_limite()
+    inicio = time.time()
+    resultados = esperar_tareas_sync(sesion, 'https://eosda.test', ['lenta', 'tarea_con_error'],
+                                     limitador=limitador, espera_inicial=0.05, max_consultas=10)
+
+    lenta = resultados['lenta']
+    assert lenta.exitosa and lenta.rate_limits == 1
+    assert time.time() - inicio >= 0.2  # Se respetó el Retry-After
+    assert resultados['tarea_con_error'].estado == 'error'
+    assert 'geometría' in resultados['tarea_con_error'].mensaje
+    print("✅ 429/Retry-After respetado y errores de tarea reportados")
+
+
+def test_timeout_por_consultas():
+    sesion = SesionFalsa({'eterna': 99})
+    resultados = esperar_tareas_sync(sesion, 'https://eosda.test', ['eterna'],
+                                     limitador=_limitador_sin_limite(), espera_inicial=0.01,
+                                     max_consultas=4)
+    assert resultados['eterna'].estado == 'timeout' and resultados['eterna'].consultas == 4
+    print("✅ Timeout tras max_consultas")
+
+
+def test_token_bucket_compartido():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'limitador.json')
+        # Dos "procesos" con el mismo archivo comparten 3 tokens
+        lim1 = LimitadorTokenBucket(peticiones_por_minuto=6, capacidad=3, ruta_estado=ruta)
+        lim2 = LimitadorTokenBucket(peticiones_por_minuto=6, capacidad=3, ruta_estado=ruta)
+
+        tomados = [lim1.intentar_adquirir(), lim2.intentar_adquirir(), lim1.intentar_adquirir()]
+        assert tomados == [0.0, 0.0, 0.0]
+        espera = lim2.intentar_adquirir()
+        assert 9 < espera <= 10, espera  # 6/min → 1 token cada 10s
+
+        lim1.pausar(30)
+        assert lim2.intentar_adquirir() > 29
+    print("✅ Token bucket compartido entre instancias y pausa global")
+
+
+def test_retry_after_formatos():
+    assert calcular_retry_after('12', 5) == 12
+    assert calcular_retry_after(None, 5) == 5
+    assert calcular_retry_after('basura', 5) == 5
+    assert calcular_retry_after('Wed, 21 Oct 2015 07:28:00 GMT', 5) == 0
+    print("✅ Retry-After en segundos y en fecha HTTP")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST POLLER ASÍNCRONO EOSDA")
+    print("=" * 70)
+    test_tareas_en_paralelo()
+    test_retry_after_y_errores()
+    test_timeout_por_consultas()
+    test_token_bucket_compartido()
+    test_retry_after_formatos()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+"""
+Test del índice de cercanía sobre capas legales
+===============================================
+
+Compara IndiceCercania contra la fuerza bruta que usaba el generador PDF
+(`.cx` por bbox + `distance()` a todos los elementos + ordenar):
+
+- k más cercanos iguales (posición y distancia) con y sin bbox
+- Distancia máxima: nada fuera del radio; lista vacía si no hay nada
+- Azimut y dirección cardinal hacia el elemento
+- desde_capa() reutiliza los árboles del registro y memoriza el índice
+
+Ejecutar:
+    python tests/test_indice_cercania.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import geopandas as gpd
+from shapely.geometry import LineString, Point, box
+
+from indice_cercania import IndiceCercania, direccion_cardinal
+from registro_capas import CRS_METRICO, obtener_registro_capas
+
+BBOX_CASANARE = [-73.0, 5.0, -69.0, 6.5]
+
+
+def _capa_sintetica(n=1500, semilla=3):
+    """Polígonos y líneas dispersos entre Meta y Casanare"""
+    rng = np.random.default_rng(semilla)
+    origenes = rng.uniform((-74.5, 2.0), (-69.0, 7.0), (n, 2))
+    geometrias = [box(x, y, x + 0.03, y + 0.02) if i % 2 else LineString([(x, y), (x + 0.05, y + 0.04)])
+                  for i, (x, y) in enumerate(origenes)]
+    return gpd.GeoDataFrame({'NOMBRE': [f'Elemento {i}' for i in range(n)]}, geometry=geometrias, crs='EPSG:4326')
+
+
+def _fuerza_bruta(gdf, geometria_metrica, k, bbox=None, distancia_max_m=None):
+    candidatos = gdf.cx[bbox[0]:bbox[2], bbox[1]:bbox[3]] if bbox else gdf
+    distancias = candidatos.to_crs(CRS_METRICO).distance(geometria_metrica)
+    if distancia_max_m is not None:
+        distancias = distancias[distancias <= distancia_max_m]
+    posiciones = gdf.index.get_indexer(distancias.index)
+    orden = np.lexsort((posiciones, distancias.to_numpy()))[:k]
+    return [(int(posiciones[i]), float(distancias.iloc[i])) for i in orden]
+
+
+def _punto_metrico(lon, lat):
+    return gpd.GeoSeries([Point(lon, lat)], crs='EPSG:4326').to_crs(CRS_METRICO).iloc[0]
+
+
+def test_igual_a_fuerza_bruta():
+    gdf = _capa_sintetica()
+    indice = IndiceCercania.desde_gdf(gdf)
+    for lon, lat in ((-72.3, 5.4), (-70.1, 6.2), (-73.9, 3.1), (-75.5, 8.0)):
+        punto = _punto_metrico(lon, lat)
+        for k in (1, 3, 10):
+            for bbox in (None, BBOX_CASANARE):
+                obtenido = [(c.posicion, c.distancia_m) for c in indice.mas_cercanos(punto, k=k, bbox=bbox)]
+                esperado = _fuerza_bruta(gdf, punto, k, bbox)
+                assert [p for p, _ in obtenido] == [p for p, _ in esperado], (lon, lat, k, bbox)
+                assert np.allclose([d for _, d in obtenido], [d for _, d in esperado])
+
+    # Consulta con el polígono de la parcela (caso páramos)
+    parcela = gpd.GeoSeries([box(-72.31, 5.39, -72.29, 5.41)], crs='EPSG:4326').to_crs(CRS_METRICO).iloc[0]
+    obtenido = [c.posicion for c in indice.mas_cercanos(parcela, k=5, bbox=BBOX_CASANARE)]
+    assert obtenido == [p for p, _ in _fuerza_bruta(gdf, parcela, 5, BBOX_CASANARE)]
+    print("✅ k más cercanos = fuerza bruta (con y sin bbox, punto y polígono)")
+
+
+def test_distancia_maxima_y_vacios():
+    gdf = _capa_sintetica()
+    indice = IndiceCercania.desde_gdf(gdf)
+    punto = _punto_metrico(-72.3, 5.4)
+    cercanos = indice.mas_cercanos(punto, k=50, distancia_max_m=15000)
+    assert cercanos and all(c.distancia_m <= 15000 for c in cercanos)
+    assert [c.posicion for c in cercanos] == [p for p, _ in _fuerza_bruta(gdf, punto, 50, distancia_max_m=15000)]
+    assert indice.mas_cercanos(_punto_metrico(-60.0, 0.0), k=3, distancia_max_m=50000) == []
+
+    # Menos elementos en el bbox que k: devuelve los que hay
+    pocos = IndiceCercania.desde_gdf(gdf.iloc[:4])
+    permitidos = int(pocos._permitidos(BBOX_CASANARE).sum())
+    assert len(pocos.mas_cercanos(punto, k=10, bbox=BBOX_CASANARE)) == permitidos
+    assert pocos.hay_elementos([-60.0, 0.0, -59.0, 1.0]) is False
+    print("✅ Distancia máxima respetada; sin resultados fuera de rango o fuera del bbox")
+
+
+def test_rumbo():
+    assert direccion_cardinal(0, 10) == 'Norte' and direccion_cardinal(-10, 1) == 'Oeste'
+    assert direccion_cardinal(5, -5) == 'Sureste'
+
+    gdf = gpd.GeoDataFrame(geometry=[box(-72.0, 5.5, -71.9, 5.6), box(-72.25, 5.0, -72.15, 5.05)], crs='EPSG:4326')
+    indice = IndiceCercania.desde_gdf(gdf)
+    este, sur = indice.mas_cercanos(_punto_metrico(-72.2, 5.55), k=2)
+    assert este.posicion == 0 and este.direccion == 'Este' and 80 < este.azimut_grados < 100
+    assert sur.posicion == 1 and sur.direccion == 'Sur' and 170 < sur.azimut_grados < 190
+
+    dentro = indice.mas_cercanos(_punto_metrico(-71.95, 5.55), k=1)[0]
+    assert dentro.distancia_m == 0 and dentro.posicion == 0
+    print("✅ Azimut y dirección cardinal hacia el elemento más cercano")
+
+
+def test_desde_capa_del_registro():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'runap.shp')
+        gdf = _capa_sintetica(n=300)
+        gdf.to_file(ruta)
+        capa = obtener_registro_capas().obtener(ruta)
+        indice = IndiceCercania.desde_capa(capa)
+        assert IndiceCercania.desde_capa(capa) is indice
+        assert indice.arbol_metrico is capa.arbol_metrico and indice.arbol is capa.arbol
+
+        punto = _punto_metrico(-72.3, 5.4)
+        obtenido = [c.posicion for c in indice.mas_cercanos(punto, k=4, bbox=BBOX_CASANARE)]
+        assert obtenido == [p for p, _ in _fuerza_bruta(capa.gdf, punto, 4, BBOX_CASANARE)]
+    print("✅ Índice sobre la capa del registro sin reproyectar ni reconstruir árboles")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST ÍNDICE DE CERCANÍA")
+    print("=" * 70)
+    test_igual_a_fuerza_bruta()
+    test_distancia_maxima_y_vacios()
+    test_rumbo()
+    test_desde_capa_del_registro()
+    print("\n🎉 Todos los tests pasaron")
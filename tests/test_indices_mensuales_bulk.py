@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Test del guardado masivo de IndiceMensual
+==========================================
+
+Verifica que 24 meses de escenas + clima se guarden con un puñado de
+queries (bulk upsert), que una segunda corrida actualice en lugar de
+duplicar y que el clima no pise la fuente de los meses satelitales.
+
+Ejecutar:
+    python tests/test_indices_mensuales_bulk.py
+"""
+
+import os
+import sys
+import django
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrotech_historico.settings')
+django.setup()
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from informes.models import Parcela, IndiceMensual
+from informes.services.indices_mensuales import (
+    guardar_escenas_en_indices, guardar_clima_mensual, agregar_clima_por_mes
+)
+
+AÑOS = (2017, 2018)
+
+
+def _escenas():
+    escenas = []
+    for año in AÑOS:
+        for mes in range(1, 13):
+            for dia, nubes in ((5, 40.0), (20, 8.0)):
+                escenas.append({
+                    'date': date(año, mes, dia).isoformat(),
+                    'view_id': f'S2/{año}/{mes}/{dia}',
+                    'cloud': nubes,
+                    'indexes': {
+                        'NDVI': {'average': 0.6, 'max': 0.9, 'min': 0.2},
+                        'NDMI': {'average': 0.1, 'max': 0.3, 'min': -0.1},
+                        'SAVI': {'average': 0.4, 'max': 0.6, 'min': 0.1},
+                    }
+                })
+    return escenas
+
+
+def _clima():
+    # Un mes más que los satelitales: debe crearse como 'Solo Clima'
+    dias = []
+    dia = date(AÑOS[0], 1, 1)
+    while dia <= date(AÑOS[-1] + 1, 1, 31):
+        dias.append({'fecha': dia.isoformat(), 'temperatura_promedio': 26.0,
+                     'temperatura_maxima': 31.0, 'temperatura_minima': 21.0,
+                     'precipitacion_total': 2.0})
+        dia += timedelta(days=1)
+    return dias
+
+
+def _limpiar(parcela):
+    IndiceMensual.objects.filter(parcela=parcela, año__in=AÑOS + (AÑOS[-1] + 1,)).delete()
+
+
+def test_pocas_queries(parcela):
+    with CaptureQueriesContext(connection) as queries:
+        resumen = guardar_escenas_en_indices(parcela, _escenas())
+        meses_clima = guardar_clima_mensual(parcela, agregar_clima_por_mes(_clima()))
+
+    assert resumen == {'creados': 24, 'procesados': 24}, resumen
+    assert meses_clima == 25
+    assert len(queries) <= 6, len(queries)
+    print(f"✅ 24 meses + clima guardados con {len(queries)} queries")
+
+
+def test_valores_y_reejecucion(parcela):
+    enero = IndiceMensual.objects.get(parcela=parcela, año=AÑOS[0], mes=1)
+    assert abs(enero.ndvi_promedio - 0.6) < 1e-9 and enero.ndvi_maximo == 0.9
+    assert enero.view_id_imagen == f'S2/{AÑOS[0]}/1/20'  # Escena con menos nubes
+    assert enero.calidad_datos == 'buena' and enero.fuente_datos == 'EOSDA'
+    assert abs(enero.precipitacion_total - 62.0) < 1e-9
+
+    solo_clima = IndiceMensual.objects.get(parcela=parcela, año=AÑOS[-1] + 1, mes=1)
+    assert solo_clima.fuente_datos == 'Solo Clima' and solo_clima.ndvi_promedio is None
+
+    resumen = guardar_escenas_en_indices(parcela, _escenas())
+    assert resumen['creados'] == 0
+    assert IndiceMensual.objects.filter(parcela=parcela, año__in=AÑOS).count() == 24
+    enero.refresh_from_db()
+    assert abs(enero.precipitacion_total - 62.0) < 1e-9  # El clima no se pierde al actualizar
+    print("✅ Valores correctos; la segunda corrida actualiza sin duplicar")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST GUARDADO MASIVO DE ÍNDICES MENSUALES")
+    print("=" * 70)
+    parcela = Parcela.objects.filter(activa=True).first()
+    if not parcela:
+        print("❌ No hay parcelas activas en el sistema")
+        sys.exit(1)
+    _limpiar(parcela)
+    try:
+        test_pocas_queries(parcela)
+        test_valores_y_reejecucion(parcela)
+        print("\n🎉 Todos los tests pasaron")
+    finally:
+        _limpiar(parcela)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+Test del rasterizador vectorizado de máscaras de cultivo
+========================================================
+
+Verifica que ``generar_mascara_desde_geometria`` (scanline NumPy) produce la
+misma máscara que el bucle píxel a píxel con Shapely, incluyendo
+MultiPolygons con huecos, y que el modo all-touched coincide con
+``intersects`` por píxel.
+
+Ejecutar:
+    python tests/test_mascara_cultivo_rasterizador.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import Polygon, MultiPolygon, box
+
+from informes.motor_analisis.mascara_cultivo import (
+    generar_mascara_desde_geometria,
+    _generar_mascara_por_puntos,
+)
+
+
+def _geo_transform(geometria, n):
+    min_x, min_y, max_x, max_y = geometria.bounds
+    return (min_x, (max_x - min_x) / n, 0, max_y, 0, -(max_y - min_y) / n)
+
+
+def _multipoligono_con_hueco():
+    rng = np.random.default_rng(7)
+    angulos = np.sort(rng.uniform(0, 2 * np.pi, 30))
+    radios = rng.uniform(0.5, 1.0, 30)
+    exterior = np.c_[np.cos(angulos) * radios, np.sin(angulos) * radios]
+    hueco = [(-0.2, -0.2), (-0.2, 0.2), (0.2, 0.2), (0.2, -0.2)]
+    return MultiPolygon([
+        Polygon(exterior, [hueco]),
+        Polygon([(1.2, 1.2), (1.6, 1.2), (1.6, 1.7)]),
+    ])
+
+
+def test_1_centro_pixel_igual_a_referencia():
+    """Test 1: Modo centro de píxel == bucle contains/touches"""
+    geometria = _multipoligono_con_hueco()
+    for n in (32, 97, 128):
+        geo_transform = _geo_transform(geometria, n)
+        referencia = _generar_mascara_por_puntos(geometria, geo_transform, (n, n))
+        mascara = generar_mascara_desde_geometria(geometria, geo_transform, (n, n))
+        assert mascara.dtype == bool
+        assert mascara.shape == (n, n)
+        assert np.array_equal(mascara, referencia), f"{n}x{n}: {np.sum(mascara != referencia)} píxeles distintos"
+    print("✅ Modo centro de píxel coincide con la referencia Shapely")
+
+
+def test_2_hueco_excluido():
+    """Test 2: Los píxeles del hueco quedan fuera de la máscara"""
+    cuadrado = Polygon([(0, 0), (10, 0), (10, 10), (0, 10)], [[(4, 4), (6, 4), (6, 6), (4, 6)]])
+    geo_transform = (0, 1, 0, 10, 0, -1)
+    mascara = generar_mascara_desde_geometria(cuadrado, geo_transform, (10, 10))
+    assert not mascara[4:6, 4:6].any()
+    assert mascara.sum() == 96
+    print("✅ Huecos excluidos correctamente")
+
+
+def test_3_todos_tocados_igual_a_intersects():
+    """Test 3: Modo all-touched == intersects() con el cuadro de cada píxel"""
+    geometria = _multipoligono_con_hueco()
+    n = 48
+    geo_transform = _geo_transform(geometria, n)
+    min_x, _, _, max_y = geometria.bounds
+    
+    referencia = np.zeros((n, n), dtype=bool)
+    for fila in range(n):
+        for col in range(n):
+            x0 = min_x + col * geo_transform[1]
+            y0 = max_y + fila * geo_transform[5]
+            referencia[fila, col] = geometria.intersects(box(x0, y0 + geo_transform[5], x0 + geo_transform[1], y0))
+    
+    mascara = generar_mascara_desde_geometria(geometria, geo_transform, (n, n), todos_tocados=True)
+    centro = generar_mascara_desde_geometria(geometria, geo_transform, (n, n))
+    assert np.array_equal(mascara, referencia)
+    assert not np.any(centro & ~mascara)
+    print("✅ Modo all-touched coincide con intersects por píxel")
+
+
+def test_4_geometria_fuera_del_raster():
+    """Test 4: Geometría parcialmente fuera del raster se recorta sin error"""
+    poligono = Polygon([(-5, -5), (5, -5), (5, 5), (-5, 5)])
+    geo_transform = (0, 1, 0, 10, 0, -1)
+    mascara = generar_mascara_desde_geometria(poligono, geo_transform, (10, 10))
+    assert mascara[5:, :5].all()
+    assert mascara.sum() == 25
+    print("✅ Geometría fuera del raster recortada")
+
+
+def main():
+    print("=" * 80)
+    print("🧪 TEST RASTERIZADOR DE MÁSCARA DE CULTIVO")
+    print("=" * 80)
+    test_1_centro_pixel_igual_a_referencia()
+    test_2_hueco_excluido()
+    test_3_todos_tocados_igual_a_intersects()
+    test_4_geometria_fuera_del_raster()
+    print("\n✅ TODOS LOS TESTS PASARON")
+
+
+if __name__ == '__main__':
+    main()
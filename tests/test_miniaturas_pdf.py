@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+"""
+Test de las miniaturas de imágenes del informe PDF
+==================================================
+
+Sobre informes/services/miniaturas_pdf.py (sin BD):
+
+- Píxeles objetivo = tamaño impreso × DPI, proporcionales y sin ampliar
+- Derivados PNG (sin pérdida, por defecto), PNG indexado (paleta, con
+  transparencia) y JPEG
+- Caché por hash del contenido: el segundo informe no recodifica; una
+  imagen reemplazada en disco genera un derivado nuevo
+- Archivos ilegibles y derivados más pesados que el original → original
+- El derivado se inserta con ReportLab y el PDF pesa menos
+- Caché acotado: al superar max_bytes se borran los derivados menos usados
+
+Ejecutar:
+    python tests/test_miniaturas_pdf.py
+"""
+
+import io
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PIL import Image as PILImage
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, SimpleDocTemplate
+
+from informes.services.miniaturas_pdf import FORMATO_POR_DEFECTO, MiniaturasPDF, pixeles_objetivo
+
+
+def _png(ruta, ancho=900, alto=600, semilla=0):
+    rng = np.random.default_rng(semilla)
+    rgba = rng.integers(0, 256, (alto, ancho, 4), dtype=np.uint8)
+    rgba[..., 3] = 255
+    rgba[:alto // 4, :, 3] = 0  # Franja transparente (fuera del lote)
+    PILImage.fromarray(rgba, 'RGBA').save(ruta)
+    return ruta
+
+
+def _abrir(datos):
+    imagen = PILImage.open(io.BytesIO(datos))
+    imagen.load()
+    return imagen
+
+
+def test_pixeles_objetivo():
+    # 5 cm a 200 DPI = 394 px; imagen 3:2 limitada por el ancho
+    assert pixeles_objetivo((900, 600), 5*cm, 5*cm, 200) == (394, 262)
+    assert pixeles_objetivo((600, 900), 5*cm, 5*cm, 200) == (262, 394)
+    assert pixeles_objetivo((200, 100), 5*cm, 5*cm, 200) == (200, 100)  # No amplía
+    print("✅ Píxeles objetivo según tamaño impreso y DPI, proporcionales y sin ampliar")
+
+
+def test_formatos():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = _png(os.path.join(tmp, 'ndvi.png'))
+        for formato, formato_pil, modo in (('png', 'PNG', 'RGBA'), ('png_indexado', 'PNG', 'P'),
+                                           ('jpeg', 'JPEG', 'RGB')):
+            miniaturas = MiniaturasPDF(os.path.join(tmp, formato), dpi=200, formato=formato, calidad=80)
+            imagen = _abrir(miniaturas.miniatura(ruta, 5*cm, 5*cm))
+            assert imagen.format == formato_pil and imagen.mode == modo, (formato, imagen.format, imagen.mode)
+            assert imagen.size == (394, 262)
+        indexada = _abrir(MiniaturasPDF(os.path.join(tmp, 'png_indexado'), 200, 'png_indexado', 80)
+                          .miniatura(ruta, 5*cm, 5*cm))
+        assert 'transparency' in indexada.info  # Conserva el fondo transparente
+        jpeg = np.asarray(_abrir(MiniaturasPDF(os.path.join(tmp, 'jpeg'), 200, 'jpeg', 80)
+                                 .miniatura(ruta, 5*cm, 5*cm)))
+        assert jpeg[:50].min() > 240  # Transparente → fondo blanco
+        try:
+            MiniaturasPDF(tmp, 200, 'webp', 80)
+            assert False, "Formato inválido aceptado"
+        except ValueError:
+            pass
+    print("✅ Derivados PNG, PNG indexado (con transparencia) y JPEG (fondo blanco)")
+
+
+def test_cache_por_contenido():
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = _png(os.path.join(tmp, 'ndmi.png'))
+        miniaturas = MiniaturasPDF(os.path.join(tmp, 'cache'), dpi=150, formato='png_indexado', calidad=85)
+        primera = miniaturas.miniatura(ruta, 5*cm, 5*cm)
+        segunda = MiniaturasPDF(os.path.join(tmp, 'cache'), 150, 'png_indexado', 85).miniatura(ruta, 5*cm, 5*cm)
+        assert primera == segunda
+        assert miniaturas.stats['generadas'] == 1
+
+        otra = MiniaturasPDF(os.path.join(tmp, 'cache'), 150, 'png_indexado', 85)
+        otra.miniatura(ruta, 5*cm, 5*cm)
+        assert otra.stats == dict(otra.stats, generadas=0, reutilizadas=1)
+
+        # Imagen reemplazada (mismo nombre): derivado nuevo
+        _png(ruta, semilla=1)
+        os.utime(ruta, (time.time() + 5, time.time() + 5))
+        assert otra.miniatura(ruta, 5*cm, 5*cm) != primera and otra.stats['generadas'] == 1
+        # Otro tamaño impreso u otro DPI: otro derivado
+        assert _abrir(otra.miniatura(ruta, 3*cm, 3*cm)).size == (177, 118)
+    print("✅ Caché por hash del contenido; imagen reemplazada o tamaño distinto → derivado nuevo")
+
+
+def test_respaldo_al_original():
+    with tempfile.TemporaryDirectory() as tmp:
+        miniaturas = MiniaturasPDF(os.path.join(tmp, 'cache'), dpi=200, formato='png', calidad=85)
+        corrupta = os.path.join(tmp, 'corrupta.png')
+        with open(corrupta, 'wb') as f:
+            f.write(b'no es una imagen')
+        assert miniaturas.miniatura(corrupta, 5*cm, 5*cm) == b'no es una imagen'
+        assert miniaturas.stats['originales'] == 1
+
+        # Imagen pequeña y ya comprimida: recodificar no la achica
+        pequena = os.path.join(tmp, 'pequena.png')
+        PILImage.new('RGB', (40, 40), (20, 120, 40)).save(pequena, optimize=True)
+        with open(pequena, 'rb') as f:
+            original = f.read()
+        assert len(miniaturas.miniatura(pequena, 5*cm, 5*cm)) <= len(original)
+    print("✅ Archivos ilegibles o derivados más pesados: se inserta el original")
+
+
+def test_pdf_mas_liviano():
+    with tempfile.TemporaryDirectory() as tmp:
+        rutas = [_png(os.path.join(tmp, f'savi_{i}.png'), 1200, 1200, semilla=i) for i in range(3)]
+        miniaturas = MiniaturasPDF(os.path.join(tmp, 'cache'), dpi=200, formato='jpeg', calidad=85)
+        tamanos = []
+        for fuente in (lambda r: r, lambda r: io.BytesIO(miniaturas.miniatura(r, 5*cm, 5*cm))):
+            buffer = io.BytesIO()
+            SimpleDocTemplate(buffer).build([Image(fuente(r), width=5*cm, height=5*cm, kind='proportional')
+                                             for r in rutas])
+            tamanos.append(len(buffer.getvalue()))
+        assert tamanos[1] < tamanos[0] / 3, tamanos
+        assert 'menos' in miniaturas.resumen()
+    print(f"✅ PDF con miniaturas: {tamanos[0] / 1e6:.2f} MB → {tamanos[1] / 1e6:.2f} MB")
+
+
+def test_cache_acotado():
+    assert FORMATO_POR_DEFECTO == 'png'  # Con pérdida solo si se pide (PDF_MINIATURAS_FORMATO)
+    with tempfile.TemporaryDirectory() as tmp:
+        rutas = [_png(os.path.join(tmp, f'ndvi_{i}.png'), 400, 400, semilla=i) for i in range(6)]
+        medida = MiniaturasPDF(os.path.join(tmp, 'medida'), 100, 'png', 85, max_bytes=10 ** 9)
+        tamano = len(medida.miniatura(rutas[0], 5*cm, 5*cm))
+
+        # Espacio para ~3 derivados
+        miniaturas = MiniaturasPDF(os.path.join(tmp, 'cache'), 100, 'png', 85, max_bytes=int(tamano * 3.5))
+        vistos = set()
+        for i, ruta in enumerate(rutas[:3]):
+            miniaturas.miniatura(ruta, 5*cm, 5*cm)
+            nuevo, = {archivo for _, _, archivo in miniaturas._entradas()} - vistos
+            os.utime(nuevo, (time.time() - 100 + i, time.time() - 100 + i))
+            vistos.add(nuevo)
+        miniaturas.miniatura(rutas[0], 5*cm, 5*cm)  # La primera pasa a ser la más reciente
+        assert miniaturas.stats['reutilizadas'] == 1 and miniaturas.stats['desalojos'] == 0
+        for ruta in rutas[3:]:
+            miniaturas.miniatura(ruta, 5*cm, 5*cm)
+        assert miniaturas.stats['desalojos'] >= 2
+        assert miniaturas.tamano_total() <= miniaturas.max_bytes
+
+        # La recién usada sobrevive; la más vieja (ndvi_1) se desalojó
+        otra = MiniaturasPDF(os.path.join(tmp, 'cache'), 100, 'png', 85, max_bytes=int(tamano * 3.5))
+        otra.miniatura(rutas[5], 5*cm, 5*cm)
+        otra.miniatura(rutas[1], 5*cm, 5*cm)
+        assert otra.stats['reutilizadas'] == 1 and otra.stats['generadas'] == 1
+    print(f"✅ Caché acotado a {miniaturas.max_bytes / 1e3:.0f} KB: "
+          f"{miniaturas.stats['desalojos']} derivados menos usados desalojados")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST MINIATURAS PDF")
+    print("=" * 70)
+    test_pixeles_objetivo()
+    test_formatos()
+    test_cache_por_contenido()
+    test_respaldo_al_original()
+    test_pdf_mas_liviano()
+    test_cache_acotado()
+    print("\n🎉 Todos los tests pasaron")
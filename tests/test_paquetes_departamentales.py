@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Test de los paquetes departamentales GeoParquet
+===============================================
+
+Sobre capas nacionales sintéticas (shapefiles/GeoJSON en un directorio
+temporal con la misma estructura que datos_geograficos/):
+
+- construir_paquetes() escribe un .parquet por capa y el manifiesto, solo
+  con los elementos que tocan el bbox del departamento + margen
+- geometry_3116 = reproyección de la capa nacional; el registro la usa tal
+  cual; columnas nombre_norm/categoria_norm/tipo_fuente precalculadas
+- El verificador con el paquete da las mismas restricciones que con las
+  capas nacionales (y la nota del páramo vacío se conserva)
+- Una parcela fuera del bbox del paquete usa las capas nacionales
+
+Ejecutar:
+    python tests/test_paquetes_departamentales.py
+"""
+
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geopandas as gpd
+from shapely.geometry import LineString, box
+
+from paquetes_departamentales import (
+    PYARROW_AVAILABLE, capas_desactualizadas, construir_paquetes, leer_manifiesto, ruta_capa_paquete, slug_departamento
+)
+from registro_capas import obtener_registro_capas
+from verificador_legal import VerificadorRestriccionesLegales
+
+
+def _crear_datos(directorio):
+    """Casanare y Meta contiguos; ríos, áreas y resguardos en ambos"""
+    for sub in ('limites_departamentales/gadm_extract', 'red_hidrica', 'runap', 'resguardos_indigenas', 'paramos'):
+        os.makedirs(os.path.join(directorio, sub))
+    gpd.GeoDataFrame([{'NAME_1': 'Casanare', 'geometry': box(-72.5, 5.0, -72.0, 5.5)},
+                      {'NAME_1': 'Meta', 'geometry': box(-74.0, 3.0, -73.0, 4.0)}], crs='EPSG:4326').to_file(
+        os.path.join(directorio, 'limites_departamentales', 'gadm_extract', 'gadm41_COL_1.shp'))
+
+    nombres = ['Río Cusiana', 'Caño Seco', None, 'Quebrada Honda', 'Laguna Verde']
+    rios = [{'NOMBRE': nombres[k % 5], 'geometry': LineString([(x, 5.0), (x + 0.01, 5.5)])}
+            for k, x in enumerate([-72.45 + 0.02 * i for i in range(20)] + [-73.9 + 0.05 * i for i in range(15)])]
+    gpd.GeoDataFrame(rios, crs='EPSG:4326').to_file(
+        os.path.join(directorio, 'red_hidrica', 'red_hidrica_casanare_meta_igac_2024.shp'))
+
+    areas = [{'ap_nombre': 'DMI Casanare', 'ap_categor': 'Distritos de Manejo Integrado', 'geometry': box(-72.3, 5.2, -72.2, 5.3)},
+             {'ap_nombre': 'PNN Meta', 'ap_categor': 'Parque Nacional Natural', 'geometry': box(-73.8, 3.2, -73.5, 3.5)}]
+    gpd.GeoDataFrame(areas, crs='EPSG:4326').to_file(os.path.join(directorio, 'runap', 'runap.shp'))
+
+    resguardos = [{'NOMBRE': 'Resguardo Caño Mochuelo', 'geometry': box(-72.15, 5.05, -72.05, 5.15)},
+                  {'NOMBRE': 'Resguardo Meta', 'geometry': box(-73.4, 3.4, -73.3, 3.5)}]
+    gpd.GeoDataFrame(resguardos, crs='EPSG:4326').to_file(
+        os.path.join(directorio, 'resguardos_indigenas', 'Resguardo_Indigena_Formalizado.shp'))
+
+    with open(os.path.join(directorio, 'paramos', 'paramos_casanare.geojson'), 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': [],
+                   'metadata': {'note': 'Región sin páramos (llanura)'}}, f)
+
+
+def test_slug():
+    assert slug_departamento('Norte de Santander') == 'norte_de_santander'
+    assert slug_departamento('Bogotá D.C.') == 'bogota_d_c'
+    print("✅ Slug de departamento sin tildes ni espacios")
+
+
+def test_construccion_y_registro():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        manifiestos = construir_paquetes(tmp, departamentos=['Casanare'])
+        assert list(manifiestos) == ['casanare']
+
+        manifiesto = leer_manifiesto('Casanare', tmp)
+        capas = manifiesto['capas']
+        assert capas['red_hidrica']['elementos'] == 20
+        assert capas['areas_protegidas']['elementos'] == 1
+        assert capas['resguardos_indigenas']['elementos'] == 1
+        assert capas['paramos']['elementos'] == 0 and capas['paramos']['nota']
+        assert capas['red_hidrica']['fuente'].endswith('red_hidrica_casanare_meta_igac_2024.shp')
+
+        ruta = ruta_capa_paquete('Casanare', 'red_hidrica', tmp)
+        assert ruta is not None and ruta_capa_paquete('Meta', 'red_hidrica', tmp) is None
+        crudo = gpd.read_parquet(ruta)
+        nacional = obtener_registro_capas().obtener(capas['red_hidrica']['fuente'])
+        por_id = nacional.gdf_metrico.geometry.loc[crudo['id_fuente'].astype(int)].values
+        assert all(a.equals_exact(b, 1e-6) for a, b in zip(gpd.GeoSeries(crudo['geometry_3116']), por_id))
+        assert {'nombre_norm', 'categoria_norm', 'tipo_fuente', 'justificacion_retiro'} <= set(crudo.columns)
+
+        capa = obtener_registro_capas().obtener(ruta)
+        assert 'geometry_3116' not in capa.gdf.columns
+        assert str(capa.gdf_metrico.crs) == 'EPSG:3116' and len(capa.gdf_metrico) == 20
+    print("✅ Paquete con elementos del departamento, geometría 3116 precalculada y columnas normalizadas")
+
+
+def test_verificador_paquete_igual_a_nacional():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        construir_paquetes(tmp, departamentos=['Casanare'])
+        limites = (-72.33, 5.18, -72.27, 5.24)
+        parcela = box(*limites).__geo_interface__
+
+        nacional = VerificadorRestriccionesLegales(tmp)
+        assert nacional.cargar_capas() is False
+        paquete = VerificadorRestriccionesLegales(tmp)
+        assert paquete.cargar_capas('Casanare', limites_parcela=limites) is True
+        assert paquete.capas_registro['red_hidrica'].ruta.endswith('.parquet')
+        assert paquete.niveles_confianza['areas_protegidas']['tipo_dato'] == 'RUNAP nacional'
+        assert paquete.niveles_confianza['paramos']['confianza'] == 'Alta'
+
+        resultados = []
+        for verificador in (nacional, paquete):
+            resultado = verificador.verificar_parcela(1, parcela, 'Lote prueba')
+            resumen = sorted((r['tipo'], r.get('subtipo'), r['nombre'], round(r['area_afectada_ha'], 6))
+                             for r in resultado.restricciones_encontradas)
+            resultados.append((resumen, round(resultado.area_restringida_ha, 6)))
+        assert resultados[0] == resultados[1] and len(resultados[0][0]) > 0
+    print(f"✅ Verificador con paquete = capas nacionales ({len(resultados[0][0])} restricciones)")
+
+
+def test_fuente_actualizada():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        construir_paquetes(tmp, departamentos=['Casanare'])
+        limites = (-72.33, 5.18, -72.27, 5.24)
+        assert capas_desactualizadas('Casanare', tmp) == []
+
+        # La capa nacional de áreas protegidas se actualiza después de construir el paquete
+        areas = [{'ap_nombre': 'DMI Casanare', 'ap_categor': 'Distritos de Manejo Integrado', 'geometry': box(-72.3, 5.2, -72.2, 5.3)},
+                 {'ap_nombre': 'Reserva Nueva', 'ap_categor': 'Reservas Naturales', 'geometry': box(-72.32, 5.19, -72.3, 5.21)}]
+        ruta_runap = os.path.join(tmp, 'runap', 'runap.shp')
+        gpd.GeoDataFrame(areas, crs='EPSG:4326').to_file(ruta_runap)
+        futuro = os.path.getmtime(ruta_runap) + 10
+        for ext in ('.shp', '.shx', '.dbf'):
+            os.utime(ruta_runap[:-4] + ext, (futuro, futuro))
+
+        assert capas_desactualizadas('Casanare', tmp) == ['areas_protegidas']
+        assert ruta_capa_paquete('Casanare', 'areas_protegidas', tmp) is None
+        assert ruta_capa_paquete('Casanare', 'red_hidrica', tmp) is not None
+
+        verificador = VerificadorRestriccionesLegales(tmp)
+        assert verificador.cargar_capas('Casanare', limites_parcela=limites) is True
+        assert verificador.capas_registro['red_hidrica'].ruta.endswith('.parquet')
+        assert verificador.capas_registro['areas_protegidas'].ruta == ruta_runap
+        resultado = verificador.verificar_parcela(3, box(*limites).__geo_interface__, 'Lote actualizado')
+        assert any(r['nombre'] == 'Reserva Nueva' for r in resultado.restricciones_encontradas)
+    print("✅ Capa fuente más nueva que el paquete → esa capa se lee de la nacional (reserva nueva detectada)")
+
+
+def test_parcela_fuera_del_paquete():
+    with tempfile.TemporaryDirectory() as tmp:
+        _crear_datos(tmp)
+        construir_paquetes(tmp, departamentos=['Casanare'])
+        # Parcela en Meta con el departamento equivocado: no debe verificarse con capas de Casanare
+        limites = (-73.75, 3.3, -73.6, 3.45)
+        verificador = VerificadorRestriccionesLegales(tmp)
+        assert verificador.cargar_paquete_departamento('Casanare', limites) is False
+        assert verificador.cargar_capas('Casanare', limites_parcela=limites) is False
+        assert not verificador.capas_registro['red_hidrica'].ruta.endswith('.parquet')
+        resultado = verificador.verificar_parcela(2, box(*limites).__geo_interface__, 'Lote Meta')
+        assert any(r['nombre'] == 'PNN Meta' for r in resultado.restricciones_encontradas)
+
+        # Parcela que se sale del bbox (+ margen) aunque empiece dentro; sin límites tampoco
+        assert verificador.cargar_paquete_departamento('Casanare', (-72.3, 5.2, -71.5, 5.3)) is False
+        assert VerificadorRestriccionesLegales(tmp).cargar_capas('Casanare') is False
+    print("✅ Parcela fuera del bbox del paquete → capas nacionales (PNN Meta detectado)")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST PAQUETES DEPARTAMENTALES")
+    print("=" * 70)
+    if not PYARROW_AVAILABLE:
+        print("⚠️  pyarrow no disponible: se omite el test")
+        sys.exit(0)
+    test_slug()
+    test_construccion_y_registro()
+    test_verificador_paquete_igual_a_nacional()
+    test_parcela_fuera_del_paquete()
+    test_fuente_actualizada()
+    print("\n🎉 Todos los tests pasaron")
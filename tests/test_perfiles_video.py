@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Test de perfiles de codificación y exportación multi-índice
+============================================================
+
+- Cada perfil fija preset, CRF, GOP, tune stillimage y escala de salida
+- crf/bitrate explícitos reemplazan los del perfil; perfil desconocido → ValueError
+- export_timeline_multi: 3 videos de una sola invocación de FFmpeg, cada uno
+  con la resolución del perfil, la duración exacta y su propia franja
+
+Requiere FFmpeg en PATH.
+
+Ejecutar:
+    python tests/test_perfiles_video.py
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+
+DIRECTORIO_MEDIA = tempfile.mkdtemp(prefix='test_perfiles_media_')
+if not settings.configured:
+    settings.configure(MEDIA_ROOT=DIRECTORIO_MEDIA)
+
+from informes.exporters.perfiles_video import PERFILES_CODIFICACION, obtener_perfil
+from informes.exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
+
+COLORES = {'ndvi': (0, 200, 0), 'ndmi': (0, 0, 200), 'savi': (200, 0, 0)}
+
+
+def _timeline():
+    frames = []
+    for mes in (1, 2):
+        imagenes = {}
+        for indice, color in COLORES.items():
+            nombre = f'{indice}_{mes}.png'
+            Image.new('RGB', (64, 48), color).save(os.path.join(DIRECTORIO_MEDIA, nombre))
+            imagenes[indice] = f'/media/{nombre}'
+        frames.append({
+            'año': 2025, 'mes': mes, 'periodo_texto': f'Mes {mes} 2025',
+            'ndvi': {'promedio': 0.6}, 'ndmi': {'promedio': 0.2}, 'savi': {'promedio': 0.4},
+            'imagenes': imagenes, 'imagen_metadata': {'nubosidad': 0.1},
+            'clasificaciones': {}, 'comparacion': None,
+        })
+    return frames
+
+
+def _sondear(ruta, segundo):
+    """(ancho, alto, duración, color medio del centro del frame en `segundo`)"""
+    salida = subprocess.run(['ffmpeg', '-i', ruta], stdout=subprocess.PIPE, stderr=subprocess.PIPE).stderr.decode()
+    ancho, alto = (int(v) for v in salida.split('yuv420p')[1].split(',')[1].split('[')[0].strip().split('x'))
+    h, m, s = salida.split('Duration:')[1].split(',')[0].strip().split(':')
+    crudo = subprocess.run(['ffmpeg', '-loglevel', 'error', '-ss', str(segundo), '-i', ruta, '-frames:v', '1',
+                            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-'], stdout=subprocess.PIPE).stdout
+    frame = np.frombuffer(crudo, dtype=np.uint8).reshape(alto, ancho, 3)
+    centro = frame[alto // 2 - 10:alto // 2 + 10, ancho // 2 - 10:ancho // 2 + 10].reshape(-1, 3).mean(axis=0)
+    return ancho, alto, int(h) * 3600 + int(m) * 60 + float(s), centro
+
+
+def test_argumentos_por_perfil():
+    draft = obtener_perfil('draft')
+    argumentos = draft.argumentos_x264(fps=24)
+    assert argumentos[argumentos.index('-preset') + 1] == 'ultrafast'
+    assert argumentos[argumentos.index('-tune') + 1] == 'stillimage'
+    assert argumentos[argumentos.index('-g') + 1] == '240'
+    assert draft.filtro_escala(1920, 1080) == 'scale=-2:720:flags=lanczos'
+    assert PERFILES_CODIFICACION['archive'].filtro_escala(1920, 1080) is None
+    # Lienzos más chicos no se amplían; otras proporciones no se deforman
+    web = PERFILES_CODIFICACION['web']
+    assert web.filtro_escala(960, 540) is None and web.dimensiones_salida(960, 540) == (960, 540)
+    assert draft.filtro_escala(1080, 1080) == 'scale=-2:720:flags=lanczos'
+    assert draft.dimensiones_salida(1080, 1080) == (720, 720)
+    assert web.filtro_escala(2560, 1080) == 'scale=1920:-2:flags=lanczos'
+    assert web.dimensiones_salida(2560, 1080) == (1920, 810)
+
+    exporter = TimelineVideoExporterMultiScene(perfil='web', crf=20)
+    comando = exporter._comando_ffmpeg([], 'salida.mp4')
+    assert comando[comando.index('-crf') + 1] == '20' and exporter.bitrate == '4000k'
+    try:
+        obtener_perfil('ultra')
+        raise AssertionError("Debió rechazar un perfil desconocido")
+    except ValueError:
+        pass
+    print("✅ Perfiles draft/web/archive con preset, CRF, GOP, tune y escala")
+
+
+def test_tres_indices_una_invocacion():
+    exporter = TimelineVideoExporterMultiScene(width=640, height=360, fps=4, perfil='draft')
+    llamadas = []
+    original = exporter._ejecutar_ffmpeg
+    exporter._ejecutar_ffmpeg = lambda comando, frames: (llamadas.append(comando), original(comando, frames))
+
+    with tempfile.TemporaryDirectory() as salida:
+        rutas = exporter.export_timeline_multi(
+            _timeline(), output_paths={i: os.path.join(salida, f'{i}.mp4') for i in COLORES})
+        assert len(llamadas) == 1 and list(rutas) == list(COLORES)
+
+        # Portada 4s + explicación 5s → el primer mapa mensual empieza en 9s
+        duracion_esperada = sum(e.duracion for e in exporter._generate_all_scenes(_timeline(), 'ndvi'))
+        for indice, ruta in rutas.items():
+            ancho, alto, duracion, centro = _sondear(ruta, 10)
+            assert (ancho, alto) == (640, 360)  # Lienzo menor que el perfil: no se amplía
+            assert abs(duracion - duracion_esperada) < 0.3
+            assert int(np.argmax(centro)) == int(np.argmax(COLORES[indice])), (indice, centro)
+    print(f"✅ NDVI/NDMI/SAVI en una invocación: 640x360, {duracion_esperada:g}s, cada uno con su imagen")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST PERFILES DE VIDEO")
+    print("=" * 70)
+    test_argumentos_por_perfil()
+    test_tres_indices_una_invocacion()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+Test del planificador de figuras de los informes PDF
+====================================================
+
+- Figuras matplotlib renderizadas en procesos hijos (Agg) = mismos PNG
+  que en el proceso principal
+- Las tareas reciben objetos no serializables (lambdas, locks) porque se
+  heredan por fork; solo vuelve el resultado
+- Concurrencia: N figuras lentas tardan ~lo de una, no la suma
+- Un error en una figura se relanza al obtenerla sin afectar a las demás
+- max_procesos=1 y figuras no planificadas se renderizan en el proceso actual
+- Desglose de tiempos con la figura, el proceso y el tiempo de pared
+
+Ejecutar:
+    python tests/test_planificador_figuras.py
+"""
+
+import os
+import sys
+import time
+import threading
+import multiprocessing
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from informes.services.planificador_figuras import PlanificadorFiguras, _PLANES
+
+HAY_FORK = 'fork' in multiprocessing.get_all_start_methods()
+
+
+def _grafico(desplazamiento):
+    fig, ax = plt.subplots(figsize=(4, 3))
+    ax.plot(range(12), [0.5 + 0.02 * ((m + desplazamiento) % 5) for m in range(12)], marker='o')
+    buffer = BytesIO()
+    fig.savefig(buffer, format='png', dpi=80, metadata={'Software': None})
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _lento(segundos):
+    time.sleep(segundos)
+    return os.getpid()
+
+
+def _falla():
+    raise ValueError("capa sin geometrías")
+
+
+def test_resultados_iguales_al_secuencial():
+    figuras = PlanificadorFiguras(max_procesos=3)
+    lock = threading.Lock()  # No serializable: se hereda por fork
+    for i in range(4):
+        figuras.agregar(f'grafico_{i}', lambda i=i: (lock is not None) and _grafico(i))
+    figuras.iniciar()
+    try:
+        local = [_grafico(i) for i in range(4)]
+    finally:
+        figuras.finalizar()
+    assert [figuras.obtener(f'grafico_{i}') for i in range(4)] == local
+    if HAY_FORK:
+        assert all(f.proceso != os.getpid() for f in figuras.figuras.values())
+    assert not _PLANES
+    print("✅ PNG renderizados en procesos hijos = PNG del proceso principal")
+
+
+def test_concurrencia():
+    if not HAY_FORK:
+        print("⚠️  Sin fork en esta plataforma: se omite la prueba de concurrencia")
+        return
+    figuras = PlanificadorFiguras(max_procesos=4)
+    for i in range(4):
+        figuras.agregar(f'lenta_{i}', _lento, 0.5)
+    inicio = time.perf_counter()
+    figuras.iniciar()
+    local = figuras.ejecutar_local('diagnostico', _lento, 0.5)
+    figuras.finalizar()
+    pared = time.perf_counter() - inicio
+    procesos = {figuras.obtener(f'lenta_{i}') for i in range(4)}
+    assert len(procesos) == 4 and local == os.getpid()
+    assert pared < 1.5, pared
+    print(f"✅ 4 figuras de 0.5 s + 0.5 s locales en {pared:.2f} s de pared")
+
+
+def test_errores_y_secuencial():
+    for procesos in (2, 1):
+        figuras = PlanificadorFiguras(max_procesos=procesos)
+        figuras.agregar('mapa_municipal', _falla)
+        figuras.agregar('mapa_departamental', _grafico, 1)
+        figuras.iniciar()
+        resumen = figuras.finalizar()
+        try:
+            figuras.obtener('mapa_municipal')
+            assert False, "Debió relanzar el error"
+        except Exception as e:
+            assert 'capa sin geometrías' in str(e)
+        assert figuras.obtener('mapa_departamental') == _grafico(1)
+        assert '❌ mapa_municipal' in resumen and '✅ mapa_departamental' in resumen
+    assert figuras.figuras['mapa_departamental'].proceso == os.getpid()
+
+    # Figura fuera del plan: se genera aquí con el respaldo
+    assert figuras.obtener('grafico_extra', lambda: b'png') == b'png'
+    try:
+        figuras.agregar('tarde', _grafico, 0)
+        assert False, "No debe aceptar figuras después de iniciar"
+    except RuntimeError:
+        pass
+    print("✅ Errores relanzados por figura; modo secuencial y figuras fuera del plan")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST PLANIFICADOR DE FIGURAS")
+    print("=" * 70)
+    test_resultados_iguales_al_secuencial()
+    test_concurrencia()
+    test_errores_y_secuencial()
+    print("\n🎉 Todos los tests pasaron")
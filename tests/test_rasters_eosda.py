@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+"""
+Test de la ingesta de rasters EOSDA
+====================================
+
+Contra el servidor local (tests/servidor_eosda_local.py), sin red ni API key:
+- GeoTIFF float32 decodificado con geo_transform y nodata → NaN
+- Una sola descarga por view_id/índice; después se sirve del caché (memmap)
+- Descargas concurrentes de la misma escena se coalescen
+- Rasters idénticos se guardan una vez (direccionado por contenido)
+- Cubos [meses, alto, ancho] con remuestreo a la rejilla del último mes
+
+Ejecutar:
+    python tests/test_rasters_eosda.py
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import requests
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from informes.services.eosda_poller import LimitadorTokenBucket
+from informes.services.rasters_eosda import (
+    CacheRastersEOSDA, DescargadorRastersEOSDA, construir_cubos_desde_rasters, decodificar_raster
+)
+from servidor_eosda_local import (
+    ServidorEOSDALocal, GEO_TRANSFORM_BASE, array_escena, generar_geotiff
+)
+
+
+def _descargador(servidor, directorio, **kwargs):
+    return DescargadorRastersEOSDA(
+        requests.Session(), servidor.url,
+        cache=CacheRastersEOSDA(directorio, **kwargs),
+        limitador=LimitadorTokenBucket(peticiones_por_minuto=60000, capacidad=1000),
+        espera_inicial=0.01, espera_maxima=0.02
+    )
+
+
+def test_decodificar_geotiff():
+    original = array_escena('S2/1', 'NDVI')
+    array, geo_transform = decodificar_raster(generar_geotiff(original, GEO_TRANSFORM_BASE))
+    assert array.dtype == np.float32 and array.shape == original.shape
+    assert np.allclose(geo_transform, GEO_TRANSFORM_BASE)
+    assert np.isnan(array[:4, :4]).all()  # nodata → NaN
+    assert np.allclose(array[10:, 10:], original[10:, 10:])
+    print("✅ GeoTIFF float32 con geo_transform y nodata")
+
+
+def test_decodificar_png():
+    rgba = np.zeros((4, 4, 4), dtype=np.uint8)
+    rgba[..., 0] = 255
+    rgba[..., 3] = 255
+    rgba[0, 0, 3] = 0
+    buffer = io.BytesIO()
+    Image.fromarray(rgba, mode='RGBA').save(buffer, format='PNG')
+    array, geo_transform = decodificar_raster(buffer.getvalue())
+    assert geo_transform is None and np.isnan(array[0, 0]) and np.isclose(array[1, 1], 1.0)
+    print("✅ PNG: canal R → [-1, 1], transparente → NaN")
+
+
+def test_descarga_unica_y_memmap():
+    with tempfile.TemporaryDirectory() as directorio, ServidorEOSDALocal(consultas_hasta_listo=3) as servidor:
+        descargador = _descargador(servidor, directorio)
+        primero = descargador.obtener('campo1', 'S2/2025-01-10', 'ndvi')
+        assert primero is not None and servidor.posts == 1 and servidor.gets == 3
+        assert primero.bbox is not None
+
+        segundo = descargador.obtener('campo1', 'S2/2025-01-10', 'ndvi')
+        assert servidor.posts == 1  # Servido del caché
+        assert isinstance(segundo.array, np.memmap)
+        assert segundo.hash_contenido == primero.hash_contenido
+
+        # Otro proceso (otra instancia) con el mismo directorio tampoco descarga
+        otro = _descargador(servidor, directorio)
+        assert otro.obtener('campo1', 'S2/2025-01-10', 'NDVI') is not None
+        assert servidor.posts == 1
+    print("✅ Una descarga por view_id/índice; lecturas siguientes por memmap")
+
+
+def test_descargas_concurrentes_coalescen():
+    with tempfile.TemporaryDirectory() as directorio, ServidorEOSDALocal(consultas_hasta_listo=2) as servidor:
+        descargador = _descargador(servidor, directorio)
+        resultados = []
+        hilos = [threading.Thread(target=lambda: resultados.append(
+            descargador.obtener('campo1', 'S2/2025-02-01', 'ndmi'))) for _ in range(4)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert servidor.posts == 1 and all(r is not None for r in resultados)
+    print("✅ 4 hilos pidiendo la misma escena → 1 descarga")
+
+
+def test_direccionado_por_contenido():
+    with tempfile.TemporaryDirectory() as directorio, ServidorEOSDALocal() as servidor:
+        descargador = _descargador(servidor, directorio, comprimir=True)
+        servidor.contenido_fijo = generar_geotiff(array_escena('X', 'NDVI'), GEO_TRANSFORM_BASE)
+        a = descargador.obtener('campo1', 'S2/a', 'ndvi')
+        b = descargador.obtener('campo2', 'S2/b', 'ndvi')
+        assert a.hash_contenido == b.hash_contenido
+        objetos = [f for _, _, archivos in os.walk(os.path.join(directorio, 'objetos'))
+                   for f in archivos if f.endswith('.npz')]
+        assert len(objetos) == 1
+    print("✅ Rasters idénticos comparten un solo objeto comprimido")
+
+
+def test_cubos_con_remuestreo():
+    meses = [
+        SimpleNamespace(año=2025, mes=1, view_id_imagen='S2/enero'),
+        SimpleNamespace(año=2025, mes=2, view_id_imagen=None),  # Sin escena
+        SimpleNamespace(año=2025, mes=3, view_id_imagen='S2/marzo'),
+    ]
+    with tempfile.TemporaryDirectory() as directorio, \
+            ServidorEOSDALocal(shapes={'S2/enero': (32, 40)}) as servidor:
+        resultado = construir_cubos_desde_rasters(meses, 'campo1', _descargador(servidor, directorio))
+
+    assert resultado['fechas'] == ['2025-01', '2025-03']
+    assert resultado['meses_sin_raster'] == ['2025-02']
+    assert resultado['shape'] == (64, 80)
+    for cubo in resultado['cubos'].values():
+        assert cubo.shape == (2, 64, 80) and cubo.dtype == np.float32
+    # Enero tenía la mitad de filas/columnas: fuera de su extensión queda NaN
+    assert np.isnan(resultado['cubos']['ndvi'][0, 40:, :]).all()
+    assert np.nanmean(resultado['cubos']['ndvi'][1]) > 0.5
+    print("✅ Cubos NDVI/NDMI/SAVI con meses sin escena omitidos y remuestreo por coordenadas")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST INGESTA DE RASTERS EOSDA")
+    print("=" * 70)
+    test_decodificar_geotiff()
+    test_decodificar_png()
+    test_descarga_unica_y_memmap()
+    test_descargas_concurrentes_coalescen()
+    test_direccionado_por_contenido()
+    test_cubos_con_remuestreo()
+    print("\n🎉 Todos los tests pasaron")
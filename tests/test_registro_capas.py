@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+Test del registro compartido de capas espaciales
+================================================
+
+Verifica carga perezosa, contadores hit/miss, reproyección a EPSG:3116,
+STRtree prebuilt y recarga automática cuando cambia el mtime del archivo.
+
+Ejecutar:
+    python tests/test_registro_capas.py
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shapely.geometry import Point, box
+
+from registro_capas import RegistroCapasEspaciales, obtener_registro_capas
+
+
+def _escribir_geojson(ruta, num_poligonos):
+    features = []
+    for i in range(num_poligonos):
+        geom = box(-72.5 + i * 0.01, 5.0, -72.495 + i * 0.01, 5.005)
+        features.append({
+            'type': 'Feature',
+            'properties': {'NOMBRE': f'Elemento {i}'},
+            'geometry': json.loads(json.dumps(geom.__geo_interface__)),
+        })
+    with open(ruta, 'w') as f:
+        json.dump({'type': 'FeatureCollection', 'features': features}, f)
+
+
+def test_1_hit_miss_y_crs():
+    """Test 1: Primera consulta carga (miss), siguientes son hits"""
+    registro = RegistroCapasEspaciales()
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'capa.geojson')
+        _escribir_geojson(ruta, 5)
+        
+        capa = registro.obtener(ruta)
+        assert capa is not None and capa.num_elementos == 5
+        assert str(capa.gdf.crs) == 'EPSG:4326'
+        assert str(capa.gdf_metrico.crs) == 'EPSG:3116'
+        
+        assert registro.obtener(ruta) is capa
+        assert registro.obtener(ruta) is capa
+        
+        stats = registro.estadisticas()
+        assert stats['misses'] == 1 and stats['hits'] == 2
+        assert stats['tasa_hit'] > 0.6
+    print("✅ Hit/miss y CRS correctos")
+
+
+def test_2_strtree_prebuilt():
+    """Test 2: El STRtree responde consultas sobre la capa"""
+    registro = RegistroCapasEspaciales()
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'capa.geojson')
+        _escribir_geojson(ruta, 10)
+        capa = registro.obtener(ruta)
+        
+        indices = capa.arbol.query(Point(-72.4975, 5.0025), predicate='intersects')
+        assert list(indices) == [0]
+    print("✅ STRtree prebuilt funcional")
+
+
+def test_3_recarga_por_mtime():
+    """Test 3: Cambiar el archivo en disco invalida la capa"""
+    registro = RegistroCapasEspaciales()
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, 'capa.geojson')
+        _escribir_geojson(ruta, 3)
+        assert registro.obtener(ruta).num_elementos == 3
+        
+        _escribir_geojson(ruta, 7)
+        futuro = time.time() + 10
+        os.utime(ruta, (futuro, futuro))
+        
+        assert registro.obtener(ruta).num_elementos == 7
+        assert registro.estadisticas()['recargas_por_mtime'] == 1
+    print("✅ Recarga por mtime")
+
+
+def test_4_archivo_inexistente_y_singleton():
+    """Test 4: Archivo inexistente devuelve None; registro global es único"""
+    registro = RegistroCapasEspaciales()
+    assert registro.obtener('/no/existe/capa.shp') is None
+    assert obtener_registro_capas() is obtener_registro_capas()
+    print("✅ Archivo inexistente y singleton")
+
+
+def main():
+    print("=" * 80)
+    print("🧪 TEST REGISTRO DE CAPAS ESPACIALES")
+    print("=" * 80)
+    test_1_hit_miss_y_crs()
+    test_2_strtree_prebuilt()
+    test_3_recarga_por_mtime()
+    test_4_archivo_inexistente_y_singleton()
+    print("\n✅ TODOS LOS TESTS PASARON")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+"""
+Test del render paralelo de escenas de video
+=============================================
+
+- Con procesos > 1 las escenas salen idénticas y en el mismo orden que en
+  modo secuencial (multi-escena y exportador de un frame por mes)
+- Las imágenes satelitales se decodifican solo en el proceso padre: los
+  workers reciben la imagen ya decodificada
+- Los meses sin PNG se pintan desde el cubo temporal sin enviarlo al pool
+
+Requiere FFmpeg en PATH (los exportadores lo verifican al crearse).
+
+Ejecutar:
+    python tests/test_render_paralelo_video.py
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from django.conf import settings
+
+DIRECTORIO_MEDIA = tempfile.mkdtemp(prefix='test_render_media_')
+if not settings.configured:
+    settings.configure(MEDIA_ROOT=DIRECTORIO_MEDIA)
+
+from informes.exporters.video_exporter import TimelineVideoExporter
+from informes.exporters.video_exporter_multiscene import TimelineVideoExporterMultiScene
+from informes.services.cubo_temporal import CuboTemporalParcela
+
+REGISTRO_LECTURAS = os.path.join(DIRECTORIO_MEDIA, 'lecturas.txt')
+
+
+class _RegistraLecturas:
+    """Anota el PID de cada lectura de imagen satelital"""
+
+    def _load_satellite_image(self, url):
+        with open(REGISTRO_LECTURAS, 'a') as archivo:
+            archivo.write(f"{os.getpid()}\n")
+        return super()._load_satellite_image(url)
+
+
+class MultiEscenaInstrumentado(_RegistraLecturas, TimelineVideoExporterMultiScene):
+    pass
+
+
+class FramesInstrumentado(_RegistraLecturas, TimelineVideoExporter):
+    pass
+
+
+def _lecturas():
+    if not os.path.exists(REGISTRO_LECTURAS):
+        return []
+    with open(REGISTRO_LECTURAS) as archivo:
+        pids = [int(linea) for linea in archivo]
+    os.remove(REGISTRO_LECTURAS)
+    return pids
+
+
+def _timeline(meses=6):
+    rng = np.random.default_rng(3)
+    os.makedirs(os.path.join(DIRECTORIO_MEDIA, 'imagenes'), exist_ok=True)
+    frames = []
+    for mes in range(1, meses + 1):
+        nombre = f'imagenes/ndvi_2025_{mes:02d}.png'
+        Image.fromarray((rng.random((48, 64, 3)) * 255).astype(np.uint8)).save(
+            os.path.join(DIRECTORIO_MEDIA, nombre))
+        frames.append({
+            'año': 2025, 'mes': mes, 'periodo_texto': f'Mes {mes} 2025',
+            'ndvi': {'promedio': 0.5 + mes / 100, 'maximo': 0.8, 'minimo': 0.2},
+            'temperatura': 25.0, 'precipitacion': 100.0,
+            # Mes 3 sin PNG (se pinta desde el cubo); mes 5 nublado
+            'imagenes': {'ndvi': f'/media/{nombre}'} if mes != 3 else {},
+            'imagen_metadata': {'nubosidad': 0.9 if mes == 5 else 0.1},
+            'clasificaciones': {'ndvi': {'etiqueta': 'Bueno'}},
+            'comparacion': None,
+        })
+    return frames
+
+
+def test_multiescena_paralelo_identico():
+    frames = _timeline()
+    cubo = CuboTemporalParcela.para_parcela(1, os.path.join(DIRECTORIO_MEDIA, 'cubos'))
+    capa = {i: np.full((16, 20), 0.6, dtype=np.float32) for i in ('ndvi', 'ndmi', 'savi')}
+    cubo.agregar_meses([('2025-03', capa)], (-72.5, 0.001, 0.0, 5.3, 0.0, -0.001))
+
+    argumentos = dict(frames_data=frames, indice='ndvi', parcela_info={'nombre': 'Lote Test'},
+                      analisis_texto='Desarrollo estable del cultivo.')
+    secuencial = MultiEscenaInstrumentado(width=320, height=180, procesos=1)
+    secuencial._cubo_temporal = cubo
+    esperadas = secuencial._generate_all_scenes(**argumentos)
+    _lecturas()
+
+    paralelo = MultiEscenaInstrumentado(width=320, height=180, procesos=3)
+    paralelo._cubo_temporal = cubo
+    obtenidas = paralelo._generate_all_scenes(**argumentos)
+    pids = _lecturas()
+
+    assert [e.nombre for e in obtenidas] == [e.nombre for e in esperadas]
+    assert [e.duracion for e in obtenidas] == [e.duracion for e in esperadas]
+    assert all(a.imagen.tobytes() == b.imagen.tobytes() for a, b in zip(obtenidas, esperadas))
+    assert 'imagen_no_disponible' in [e.nombre for e in obtenidas]
+    assert pids == [os.getpid()] * 4  # 4 meses con PNG, leídos solo en el padre
+    print(f"✅ Multi-escena: {len(obtenidas)} escenas idénticas y en orden con 3 procesos")
+
+
+def test_frames_paralelo_identico():
+    frames = _timeline(4)
+    with tempfile.TemporaryDirectory() as secuencial_dir, tempfile.TemporaryDirectory() as paralelo_dir:
+        rutas_a = FramesInstrumentado(width=320, height=180, procesos=1)._generate_frames(
+            frames, 'ndvi', secuencial_dir)
+        _lecturas()
+        rutas_b = FramesInstrumentado(width=320, height=180, procesos=2)._generate_frames(
+            frames, 'ndvi', paralelo_dir)
+        pids = _lecturas()
+
+        assert [os.path.basename(r) for r in rutas_a] == [os.path.basename(r) for r in rutas_b]
+        for a, b in zip(rutas_a, rutas_b):
+            assert Image.open(a).tobytes() == Image.open(b).tobytes()
+        assert pids == [os.getpid()] * 3
+    print("✅ Frame por mes: PNGs idénticos y en orden con 2 procesos")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST RENDER PARALELO DE VIDEO")
+    print("=" * 70)
+    test_multiescena_paralelo_identico()
+    test_frames_paralelo_identico()
+    print("\n🎉 Todos los tests pasaron")
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+"""
+Test del motor de retiros hídricos por lotes
+============================================
+
+Verifica que ``_clasificar_fuentes_hidricas`` (vectorizado) coincide con
+``_clasificar_fuente_hidrica`` elemento a elemento, y que
+``verificar_retiros_hidricos`` devuelve las mismas restricciones que la
+implementación de referencia con iterrows.
+
+Ejecutar:
+    python tests/test_retiros_hidricos_lotes.py
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import geopandas as gpd
+from shapely.geometry import LineString, box
+
+from verificador_legal import VerificadorRestriccionesLegales
+
+
+def _red_sintetica():
+    """Cauces alrededor de (-72.4, 5.3) con atributos variados"""
+    filas = [
+        {'NOMBRE': 'Río Cusiana', 'TIPO': '', 'ORDEN': 5},
+        {'NOMBRE': 'Caño Seco', 'TIPO': '', 'ORDEN': 3},
+        {'NOMBRE': 'Sin dato', 'TIPO': '', 'ORDEN': 1},
+        {'NOMBRE': 'Nacimiento El Alto', 'TIPO': '', 'ORDEN': 0},
+        {'NOMBRE': 'Laguna Verde', 'TIPO': '', 'ORDEN': 0},
+        {'NOMBRE': 'X', 'TIPO': 'humedal', 'ORDEN': 0},
+        {'NOMBRE': 'Canal Norte', 'TIPO': '', 'ORDEN': 0},
+        {'NOMBRE': 'Rio Chiquito', 'TIPO': '', 'ORDEN': 0},
+        {'NOMBRE': 'Quebrada Honda', 'TIPO': '', 'ORDEN': 0},
+        {'NOMBRE': None, 'TIPO': None, 'ORDEN': 0},
+    ]
+    geometrias = [
+        LineString([(-72.41 + i * 0.002, 5.29), (-72.41 + i * 0.002, 5.31)])
+        for i in range(len(filas))
+    ]
+    return gpd.GeoDataFrame(filas, geometry=geometrias, crs='EPSG:4326')
+
+
+def test_1_clasificacion_vectorizada():
+    """Test 1: Clasificación en lote == clasificación por elemento"""
+    verificador = VerificadorRestriccionesLegales()
+    red = _red_sintetica()
+    
+    tipos, justificaciones = verificador._clasificar_fuentes_hidricas(red)
+    referencia = [verificador._clasificar_fuente_hidrica(e) for _, e in red.iterrows()]
+    
+    assert list(zip(tipos, justificaciones)) == referencia
+    assert tipos[:3] == ['rio_principal', 'rio_secundario', 'quebrada']
+    assert tipos[-1] == 'quebrada'
+    print("✅ Clasificación vectorizada coincide con la referencia")
+
+
+def test_2_restricciones_iguales_a_referencia():
+    """Test 2: Motor por lotes == iterrows (sin registro de capas)"""
+    verificador = VerificadorRestriccionesLegales()
+    verificador.red_hidrica = _red_sintetica()
+    parcela = box(-72.405, 5.295, -72.395, 5.305).__geo_interface__
+    
+    ref_rest, ref_area = verificador._verificar_retiros_hidricos_por_elemento(parcela)
+    rest, area = verificador.verificar_retiros_hidricos(parcela)
+    
+    assert len(rest) == len(ref_rest) > 0
+    assert abs(area - ref_area) < 1e-9
+    for a, b in zip(rest, ref_rest):
+        for clave in ('subtipo', 'retiro_minimo_m', 'area_afectada_ha', 'nombre',
+                      'severidad', 'distancia_real_m', 'tipo_geometria',
+                      'longitud_cauce_m', 'justificacion_retiro'):
+            assert a[clave] == b[clave], (clave, a[clave], b[clave])
+    assert verificador.red_hidrica_cercana is not None
+    print(f"✅ {len(rest)} restricciones idénticas a la referencia ({area:.2f} ha)")
+
+
+def test_3_sin_cauces_cercanos():
+    """Test 3: Parcela lejos de la red no genera restricciones"""
+    verificador = VerificadorRestriccionesLegales()
+    verificador.red_hidrica = _red_sintetica()
+    parcela = box(-70.0, 3.0, -69.99, 3.01).__geo_interface__
+    
+    rest, area = verificador.verificar_retiros_hidricos(parcela)
+    assert rest == [] and area == 0.0
+    print("✅ Sin cauces cercanos")
+
+
+def main():
+    print("=" * 80)
+    print("🧪 TEST MOTOR DE RETIROS HÍDRICOS POR LOTES")
+    print("=" * 80)
+    test_1_clasificacion_vectorizada()
+    test_2_restricciones_iguales_a_referencia()
+    test_3_sin_cauces_cercanos()
+    print("\n✅ TODOS LOS TESTS PASARON")
+
+
+if __name__ == '__main__':
+    main()
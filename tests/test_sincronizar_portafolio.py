@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+"""
+Test de la sincronización masiva del portafolio
+================================================
+
+Usa un servicio EOSDA falso (sin red ni API key) sobre las parcelas
+activas para verificar:
+- Una tarea por hueco, varias en vuelo a la vez
+- Interrupción (timeout de una tarea): la parcela queda pendiente y su
+  task_id en el checkpoint
+- Reanudación: no se crea la tarea de nuevo, solo se vuelve a consultar,
+  y las parcelas terminadas se omiten
+- IndiceMensual poblado y métricas de consumo
+- Firma y claves de tarea por mes: reanudar otro día del mismo mes
+  encuentra el checkpoint
+
+Ejecutar:
+    python tests/test_sincronizar_portafolio.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import django
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Configurar Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'agrotech_historico.settings')
+django.setup()
+
+from informes.models import Parcela, IndiceMensual, CacheMesEOSDA
+from informes.services.eosda_poller import LimitadorTokenBucket
+from informes.services.sincronizacion_portafolio import CheckpointSincronizacion, SincronizadorPortafolio
+
+FECHA_INICIO = date(2019, 1, 1)
+FECHA_FIN = date(2019, 3, 31)
+
+
+class RespuestaFalsa:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data or {}
+        self.headers = {}
+        self.text = str(self._data)
+
+    def json(self):
+        return self._data
+
+
+class ServicioFalso:
+    """Crea tareas en memoria; las tareas 'colgadas' nunca terminan"""
+
+    base_url = 'https://eosda.test'
+
+    def __init__(self, colgar_field=None):
+        self.colgar_field = colgar_field
+        self.tareas = {}
+        self.posts = 0
+        self._lock = threading.Lock()
+        self.session = self
+
+    def _crear_tarea_estadisticas(self, geometria, field_id, desde, hasta, indices,
+                                  max_nubosidad, limitador=None):
+        with self._lock:
+            self.posts += 1
+            task_id = f"t{self.posts}_{field_id}"
+            self.tareas[task_id] = (field_id, desde)
+        return {'task_id': task_id, 'codigo_respuesta': 202}
+
+    def get(self, url, timeout=None):
+        task_id = url.rsplit('/', 1)[-1]
+        field_id, desde = self.tareas[task_id]
+        if field_id == self.colgar_field:
+            return RespuestaFalsa(200, {'status': 'processing'})
+        escenas = [{
+            'date': date(desde.year, mes, 10).isoformat(),
+            'view_id': f'S2/{mes}',
+            'cloud': 10.0,
+            'indexes': {nombre: {'average': 0.5, 'max': 0.8, 'min': 0.2} for nombre in ('NDVI', 'NDMI', 'SAVI')}
+        } for mes in (1, 2, 3)]
+        return RespuestaFalsa(200, {'status': 'finished', 'result': escenas})
+
+
+def _field_id(parcela):
+    return parcela.eosda_field_id or f"parcela_{parcela.id}"
+
+
+def _limpiar(parcelas):
+    for parcela in parcelas:
+        CacheMesEOSDA.objects.filter(field_id=_field_id(parcela), año=2019).delete()
+        IndiceMensual.objects.filter(parcela=parcela, año=2019).delete()
+
+
+def _sincronizador(parcelas, checkpoint, servicio):
+    return SincronizadorPortafolio(
+        parcelas, FECHA_INICIO, FECHA_FIN, checkpoint,
+        max_concurrentes=2,
+        limitador=LimitadorTokenBucket(peticiones_por_minuto=60000, capacidad=1000),
+        incluir_clima=False,
+        servicio=servicio,
+        opciones_poller={'espera_inicial': 0.01, 'espera_maxima': 0.02, 'max_consultas': 3}
+    )
+
+
+def test_interrupcion_y_reanudacion(parcelas, directorio):
+    firma = CheckpointSincronizacion.calcular_firma(
+        [p.id for p in parcelas], FECHA_INICIO, FECHA_FIN, ['NDVI', 'NDMI', 'SAVI'], 50
+    )
+    colgada = parcelas[-1]
+
+    # 1ª corrida: la última parcela no termina (simula corte / timeout)
+    checkpoint = CheckpointSincronizacion.para_corrida(firma, directorio)
+    servicio = ServicioFalso(colgar_field=_field_id(colgada))
+    metricas = _sincronizador(parcelas, checkpoint, servicio).ejecutar()
+
+    assert metricas.parcelas_completadas == len(parcelas) - 1
+    assert metricas.parcelas_fallidas == 1
+    assert metricas.tareas_creadas == len(parcelas) == servicio.posts
+    assert metricas.consultas_estado >= len(parcelas)
+    assert len(checkpoint.tareas) == 1  # Solo queda la tarea colgada
+    assert IndiceMensual.objects.filter(parcela=parcelas[0], año=2019).count() == 3
+    assert not IndiceMensual.objects.filter(parcela=colgada, año=2019, fuente_datos='EOSDA').exists()
+    print(f"✅ 1ª corrida: {metricas.parcelas_completadas} parcelas, 1 pendiente en el checkpoint")
+
+    # 2ª corrida (nuevo proceso): la tarea ya responde
+    checkpoint = CheckpointSincronizacion.para_corrida(firma, directorio)
+    servicio.colgar_field = None
+    posts_antes = servicio.posts
+    metricas = _sincronizador(parcelas, checkpoint, servicio).ejecutar()
+
+    assert metricas.parcelas_omitidas == len(parcelas) - 1
+    assert metricas.parcelas_completadas == 1
+    assert metricas.tareas_creadas == 0 and metricas.tareas_reanudadas == 1
+    assert servicio.posts == posts_antes  # Nada facturable de nuevo
+    assert IndiceMensual.objects.filter(parcela=colgada, año=2019, fuente_datos='EOSDA').count() == 3
+    assert not checkpoint.tareas
+    print("✅ Reanudación: tarea retomada sin volver a crearla, parcelas terminadas omitidas")
+
+    # 3ª corrida desde cero: todo sale del caché mensual, 0 tareas
+    checkpoint = CheckpointSincronizacion.para_corrida(firma, directorio)
+    checkpoint.eliminar()
+    metricas = _sincronizador(parcelas, checkpoint, servicio).ejecutar()
+    assert metricas.tareas_creadas == 0
+    assert metricas.meses_desde_cache == metricas.meses_solicitados == 3 * len(parcelas)
+    print(f"✅ Corrida repetida: {metricas.requests_totales} requests "
+          f"({metricas.parcelas_por_minuto:.0f} parcelas/min)")
+
+
+def test_checkpoint_por_mes(parcelas, directorio):
+    ids = [p.id for p in parcelas]
+    # El fin del rango es "hoy": reanudar al día siguiente no cambia la firma ni la clave
+    assert CheckpointSincronizacion.calcular_firma(ids, date(2019, 1, 16), date(2019, 3, 30), ['NDVI'], 50) == \
+        CheckpointSincronizacion.calcular_firma(ids, date(2019, 1, 17), date(2019, 3, 31), ['NDVI'], 50)
+    assert CheckpointSincronizacion.clave_tarea(1, date(2019, 1, 1), date(2019, 3, 30)) == \
+        CheckpointSincronizacion.clave_tarea(1, date(2019, 1, 1), date(2019, 3, 31))
+    assert CheckpointSincronizacion.clave_tarea(1, date(2019, 1, 1), date(2019, 3, 31)) != \
+        CheckpointSincronizacion.clave_tarea(1, date(2019, 1, 1), date(2019, 4, 1))
+
+    firma = CheckpointSincronizacion.calcular_firma(ids, FECHA_INICIO, FECHA_FIN, ['NDVI', 'NDMI', 'SAVI'], 50)
+    checkpoint = CheckpointSincronizacion.para_corrida(firma, directorio)
+    checkpoint.tareas[CheckpointSincronizacion.clave_tarea(1, FECHA_INICIO, date(2019, 3, 30))] = {
+        'task_id': 'tarea-1', 'desde': '2019-01-01', 'hasta': '2019-03-30'
+    }
+    checkpoint.guardar()
+    reanudado = CheckpointSincronizacion.para_corrida(firma, directorio)
+    assert reanudado.tareas[CheckpointSincronizacion.clave_tarea(1, FECHA_INICIO, FECHA_FIN)]['task_id'] == 'tarea-1'
+    reanudado.eliminar()
+    print("✅ Checkpoint por mes: reanudar otro día del mismo mes retoma la tarea pagada")
+
+
+if __name__ == '__main__':
+    print("\n" + "=" * 70)
+    print("🧪 TEST SINCRONIZACIÓN DEL PORTAFOLIO")
+    print("=" * 70)
+    parcelas = list(Parcela.objects.filter(activa=True).order_by('id')[:3])
+    if len(parcelas) < 2:
+        print("❌ Se necesitan al menos 2 parcelas activas")
+        sys.exit(1)
+    _limpiar(parcelas)
+    try:
+        with tempfile.TemporaryDirectory() as directorio:
+            test_interrupcion_y_reanudacion(parcelas, directorio)
+            test_checkpoint_por_mes(parcelas, directorio)
+        print("\n🎉 Todos los tests pasaron")
+    finally:
+        _limpiar(parcelas)
@@ -34,6 +34,11 @@ except ImportError:
     GEOPANDAS_AVAILABLE = False
     print("⚠️  GeoPandas no disponible. Instalar con: pip install geopandas")
 
+from registro_capas import obtener_registro_capas
+from paquetes_departamentales import (
+    CAPAS_PAQUETE, capas_desactualizadas, info_capa_paquete, leer_manifiesto, ruta_capa_paquete
+)
+
 
 @dataclass
 class ResultadoVerificacion:
@@ -99,6 +104,9 @@ class VerificadorRestriccionesLegales:
         self.resguardos_indigenas = None
         self.paramos = None
         
+        # Capas del registro compartido (incluyen versión EPSG:3116 y STRtree)
+        self.capas_registro = {}
+        
         # NUEVO: Para almacenar datos usados en última verificación (para mapas)
         self.red_hidrica_cercana = None
         self.metadata_verificacion = {}
@@ -186,12 +194,11 @@ class VerificadorRestriccionesLegales:
                     
                     archivo = archivo_seleccionado
             
-            if archivo and os.path.exists(archivo):
-                self.red_hidrica = gpd.read_file(archivo)
-                
-                # Asegurar que está en WGS84 (EPSG:4326)
-                if self.red_hidrica.crs != 'EPSG:4326':
-                    self.red_hidrica = self.red_hidrica.to_crs('EPSG:4326')
+            capa = obtener_registro_capas().obtener(archivo) if archivo else None
+            if capa is not None:
+                # Registro compartido: ya viene en WGS84 (EPSG:4326)
+                self.capas_registro['red_hidrica'] = capa
+                self.red_hidrica = capa.gdf
                 
                 self.stats['red_hidrica_loaded'] = True
                 
@@ -270,8 +277,10 @@ class VerificadorRestriccionesLegales:
                                 archivo = str(geojson_files[0])
                                 print(f"⚠️  Usando GeoJSON (puede estar incompleto): {archivo}")
             
-            if archivo and os.path.exists(archivo):
-                self.areas_protegidas = gpd.read_file(archivo)
+            capa = obtener_registro_capas().obtener(archivo) if archivo else None
+            if capa is not None:
+                self.capas_registro['areas_protegidas'] = capa
+                self.areas_protegidas = capa.gdf
                 
                 # CRÍTICO: Verificar archivo vacío
                 if len(self.areas_protegidas) == 0:
@@ -283,16 +292,10 @@ class VerificadorRestriccionesLegales:
                     self.niveles_confianza['areas_protegidas']['razon'] = '❌ ARCHIVO VACÍO - No hay datos de RUNAP'
                     return False
                 
-                # Reproyectar a WGS84 si es necesario
-                crs_original = str(self.areas_protegidas.crs)
-                if self.areas_protegidas.crs != 'EPSG:4326':
-                    print(f"🔄 Reproyectando RUNAP de {crs_original} a EPSG:4326...")
-                    self.areas_protegidas = self.areas_protegidas.to_crs('EPSG:4326')
-                
                 self.stats['areas_protegidas_loaded'] = True
                 
                 # Determinar confianza según fuente
-                es_nacional = 'runap.shp' in str(archivo).lower()
+                es_nacional = 'runap.shp' in str(self._fuente_original(archivo)).lower()
                 num_areas = len(self.areas_protegidas)
                 
                 self.niveles_confianza['areas_protegidas']['cargada'] = True
@@ -347,11 +350,10 @@ class VerificadorRestriccionesLegales:
                         if geojson_files:
                             archivo = str(geojson_files[0])
             
-            if archivo and os.path.exists(archivo):
-                self.resguardos_indigenas = gpd.read_file(archivo)
-                
-                if self.resguardos_indigenas.crs != 'EPSG:4326':
-                    self.resguardos_indigenas = self.resguardos_indigenas.to_crs('EPSG:4326')
+            capa = obtener_registro_capas().obtener(archivo) if archivo else None
+            if capa is not None:
+                self.capas_registro['resguardos_indigenas'] = capa
+                self.resguardos_indigenas = capa.gdf
                 
                 # 🚨 CRÍTICO: Verificar si el archivo tiene datos REALES
                 num_features = len(self.resguardos_indigenas)
@@ -408,23 +410,27 @@ class VerificadorRestriccionesLegales:
                         if archivos_geo:
                             archivo = str(archivos_geo[0])
             
-            if archivo and os.path.exists(archivo):
-                self.paramos = gpd.read_file(archivo)
-                
-                if self.paramos.crs != 'EPSG:4326':
-                    self.paramos = self.paramos.to_crs('EPSG:4326')
+            capa = obtener_registro_capas().obtener(archivo) if archivo else None
+            if capa is not None:
+                self.capas_registro['paramos'] = capa
+                self.paramos = capa.gdf
                 
                 # 🚨 CRÍTICO: Verificar si el archivo tiene datos REALES
                 num_features = len(self.paramos)
                 
                 # Verificar si tiene metadata que explique por qué está vacío
-                import json
-                try:
-                    with open(archivo, 'r') as f:
-                        data = json.load(f)
-                        tiene_metadata = 'metadata' in data and data['metadata'].get('note')
-                except:
-                    tiene_metadata = False
+                info_paquete = info_capa_paquete(archivo)
+                if info_paquete is not None:
+                    # Paquete departamental: la nota del GeoJSON fuente queda en el manifiesto
+                    tiene_metadata = bool(info_paquete.get('nota'))
+                else:
+                    import json
+                    try:
+                        with open(archivo, 'r') as f:
+                            data = json.load(f)
+                            tiene_metadata = 'metadata' in data and data['metadata'].get('note')
+                    except:
+                        tiene_metadata = False
                 
                 if num_features == 0:
                     if tiene_metadata:
@@ -463,6 +469,72 @@ class VerificadorRestriccionesLegales:
             print(f"❌ Error cargando páramos: {e}")
             return False
     
+    def cargar_paquete_departamento(self, departamento: str, limites_parcela: Tuple[float, float, float, float]) -> bool:
+        """
+        Carga las capas desde el paquete GeoParquet del departamento
+        
+        Solo lee los elementos del departamento (+ margen), con la geometría
+        EPSG:3116 ya calculada. Ver paquetes_departamentales.py. Las capas
+        cuya fuente nacional cambió después de construir el paquete se leen
+        de la capa nacional.
+        
+        Args:
+            departamento: Nombre del departamento
+            limites_parcela: (minx, miny, maxx, maxy) de la parcela en EPSG:4326;
+                el paquete solo sirve si quedan dentro del bbox del manifiesto
+        
+        Returns:
+            True si existe el paquete, cubre la parcela y se cargaron sus capas
+        """
+        rutas = {nombre: ruta_capa_paquete(departamento, nombre, self.directorio_datos) for nombre in CAPAS_PAQUETE}
+        desactualizadas = capas_desactualizadas(departamento, self.directorio_datos)
+        if desactualizadas:
+            print(f"⚠️ Paquete {departamento} desactualizado ({', '.join(desactualizadas)}: la capa fuente cambió); "
+                  f"se usan las capas nacionales. Reconstruir con construir_paquetes_legales")
+        if not any(rutas.values()):
+            return False
+        
+        manifiesto = leer_manifiesto(departamento, self.directorio_datos)
+        x0, y0, x1, y1 = manifiesto['bbox']
+        minx, miny, maxx, maxy = limites_parcela
+        if not (x0 <= minx and y0 <= miny and maxx <= x1 and maxy <= y1):
+            print(f"⚠️ La parcela está fuera del paquete {manifiesto['departamento']}: se usan las capas nacionales")
+            return False
+        print(f"📦 Paquete departamental {manifiesto['departamento']} ({manifiesto['creado']})")
+        for nombre, (metodo, _) in CAPAS_PAQUETE.items():
+            if rutas[nombre] is not None:
+                getattr(self, metodo)(str(rutas[nombre]))
+            else:
+                getattr(self, metodo)()  # Capa nacional (fuente más nueva que el paquete o sin capa en él)
+        return True
+    
+    def cargar_capas(self, departamento: Optional[str] = None,
+                     limites_parcela: Optional[Tuple[float, float, float, float]] = None) -> bool:
+        """
+        Carga las cuatro capas legales: paquete del departamento si existe y
+        cubre la parcela, capas nacionales en caso contrario
+        
+        Args:
+            departamento: Departamento de la parcela (detectado por geometría)
+            limites_parcela: (minx, miny, maxx, maxy) de la parcela en EPSG:4326;
+                sin límites no se usa el paquete
+        
+        Returns:
+            True si se usó el paquete departamental
+        """
+        if departamento and limites_parcela is not None and \
+                self.cargar_paquete_departamento(departamento, limites_parcela):
+            return True
+        for metodo, _ in CAPAS_PAQUETE.values():
+            getattr(self, metodo)()
+        return False
+    
+    @staticmethod
+    def _fuente_original(archivo) -> str:
+        """Archivo fuente de una capa (el shapefile nacional si viene de un paquete)"""
+        info = info_capa_paquete(archivo) if archivo else None
+        return info['fuente'] if info else str(archivo)
+    
     def verificar_retiros_hidricos(
         self, 
         geometria_parcela,  # Django GEOS o Dict GeoJSON
@@ -471,6 +543,12 @@ class VerificadorRestriccionesLegales:
         """
         Verifica cumplimiento de retiros obligatorios de fuentes hídricas
         
+        Motor por lotes: los cauces candidatos se obtienen del STRtree del
+        registro de capas (ya proyectados a EPSG:3116), se clasifican de una
+        vez con ``_clasificar_fuentes_hidricas`` y los buffers de retiro,
+        distancias e intersecciones se calculan con funciones vectorizadas
+        de Shapely 2. Sin ``iterrows`` ni ``to_crs`` por elemento.
+        
         Args:
             geometria_parcela: Django GEOS Polygon o GeoJSON dict
             distancia_maxima_km: Radio de búsqueda (km)
@@ -482,109 +560,186 @@ class VerificadorRestriccionesLegales:
             return [], 0.0
         
         try:
-            # Convertir geometría a Shapely
-            from shapely import wkt
+            import numpy as np
+            import shapely
+            
+            parcela_geom, parcela_metric, buffer_busqueda_wgs84 = self._preparar_busqueda_hidrica(
+                geometria_parcela, distancia_maxima_km
+            )
             
-            if hasattr(geometria_parcela, 'wkt'):
-                # Django GEOS
-                parcela_geom = wkt.loads(geometria_parcela.wkt)
+            # Candidatos: STRtree del registro si la capa viene de ahí,
+            # filtro directo sobre la capa en caso contrario
+            capa = self.capas_registro.get('red_hidrica')
+            if capa is not None and capa.gdf is self.red_hidrica:
+                indices = np.sort(capa.arbol.query(buffer_busqueda_wgs84, predicate='intersects'))
+                red_cercana = self.red_hidrica.iloc[indices]
+                geoms_metric = np.asarray(capa.gdf_metrico.geometry.values)[indices]
             else:
-                # GeoJSON dict
-                parcela_geom = shape(geometria_parcela)
+                red_cercana = self.red_hidrica[self.red_hidrica.intersects(buffer_busqueda_wgs84)]
+                geoms_metric = np.asarray(red_cercana.geometry.to_crs('EPSG:3116').values)
             
-            # Crear GeoDataFrame temporal para la parcela
-            parcela_gdf = gpd.GeoDataFrame(
-                [{'geometry': parcela_geom}], 
-                crs='EPSG:4326'
-            )
+            # Guardar red hídrica cercana para el mapa
+            self.red_hidrica_cercana = red_cercana
             
-            # Proyectar a métrica (MAGNA-SIRGAS / Colombia Bogotá zone)
-            # EPSG:3116 para cálculos precisos en metros
-            parcela_metric = parcela_gdf.to_crs('EPSG:3116')
+            if len(red_cercana) == 0:
+                return [], 0.0
             
-            # Buffer de búsqueda (convertir km a metros)
-            buffer_busqueda = parcela_metric.buffer(distancia_maxima_km * 1000)
-            buffer_busqueda_wgs84 = gpd.GeoDataFrame(
-                [{'geometry': buffer_busqueda.iloc[0]}],
-                crs='EPSG:3116'
-            ).to_crs('EPSG:4326')
+            # Clasificación y retiro por elemento (vectorizado)
+            if 'tipo_fuente' in red_cercana.columns:  # Precalculada en el paquete departamental
+                tipos = red_cercana['tipo_fuente'].tolist()
+                justificaciones = red_cercana['justificacion_retiro'].tolist()
+            else:
+                tipos, justificaciones = self._clasificar_fuentes_hidricas(red_cercana)
+            retiros = np.array([self.RETIROS_MINIMOS.get(t, 30) for t in tipos], dtype=float)
             
-            # Filtrar elementos de red hídrica dentro del buffer
-            red_cercana = self.red_hidrica[
-                self.red_hidrica.intersects(buffer_busqueda_wgs84.iloc[0].geometry)
-            ]
+            # Buffers por clase de retiro, distancias e intersecciones en bloque
+            # (quad_segs=16 = resolución por defecto de GeoSeries.buffer)
+            buffers_retiro = shapely.buffer(geoms_metric, retiros, quad_segs=16)
+            distancias_m = shapely.distance(parcela_metric, geoms_metric)
+            intersecciones = shapely.intersection(parcela_metric, buffers_retiro)
+            areas_m2 = shapely.area(intersecciones)
+            afectan = ~shapely.is_empty(intersecciones)
             
-            restricciones = []
-            areas_restriccion = []
+            geoms_wgs84 = np.asarray(red_cercana.geometry.values)
+            tipos_geometria = shapely.get_type_id(geoms_wgs84)
+            es_linea = np.isin(tipos_geometria, [1, 5])  # LineString, MultiLineString
+            longitudes_m = shapely.length(geoms_wgs84) * 111320  # Aprox m
             
-            for idx, elemento in red_cercana.iterrows():
-                # Determinar tipo de fuente hídrica CON JUSTIFICACIÓN
-                tipo_fuente, justificacion = self._clasificar_fuente_hidrica(elemento)
-                retiro_minimo = self.RETIROS_MINIMOS.get(tipo_fuente, 30)
-                
-                # NUEVO: Obtener información detallada del elemento
-                nombre_fuente = elemento.get('NOMBRE', elemento.get('nombre', 'Sin nombre'))
-                tipo_geometria = elemento.geometry.geom_type
-                
-                # Proyectar elemento a métrica
-                elemento_gdf = gpd.GeoDataFrame(
-                    [{'geometry': elemento.geometry}],
-                    crs='EPSG:4326'
-                ).to_crs('EPSG:3116')
-                
-                # NUEVO: Calcular distancia REAL a la parcela
-                distancia_real_m = parcela_metric.iloc[0].geometry.distance(elemento_gdf.iloc[0].geometry)
-                
-                # Crear buffer de retiro
-                buffer_retiro = elemento_gdf.buffer(retiro_minimo)
-                
-                # Verificar intersección con parcela
-                interseccion = parcela_metric.iloc[0].geometry.intersection(
-                    buffer_retiro.iloc[0]
-                )
+            columna_nombre = 'NOMBRE' if 'NOMBRE' in red_cercana.columns else (
+                'nombre' if 'nombre' in red_cercana.columns else None
+            )
+            nombres = red_cercana[columna_nombre].values if columna_nombre else None
+            
+            restricciones = []
+            for i in np.flatnonzero(afectan):
+                area_afectada_ha = areas_m2[i] / 10000
+                nombre_fuente = nombres[i] if nombres is not None else 'Sin nombre'
+                longitud_cauce_m = longitudes_m[i] if es_linea[i] else None
                 
-                if not interseccion.is_empty:
-                    area_afectada_m2 = interseccion.area
-                    area_afectada_ha = area_afectada_m2 / 10000
-                    
-                    # NUEVO: Información detallada
-                    longitud_cauce_m = None
-                    if tipo_geometria in ['LineString', 'MultiLineString']:
-                        longitud_cauce_m = elemento.geometry.length * 111320  # Aprox m
-                    
-                    restricciones.append({
-                        'tipo': 'retiro_hidrico',
-                        'subtipo': tipo_fuente,
-                        'retiro_minimo_m': retiro_minimo,
-                        'area_afectada_ha': round(area_afectada_ha, 4),
-                        'nombre': str(nombre_fuente) if nombre_fuente else 'Sin nombre',
-                        'normativa': 'Decreto 1541/1978 Art. 83',
-                        'severidad': 'ALTA' if area_afectada_ha > 1 else 'MEDIA',
-                        'distancia_real_m': round(distancia_real_m, 2),  # NUEVO
-                        'tipo_geometria': tipo_geometria,  # NUEVO
-                        'longitud_cauce_m': round(longitud_cauce_m, 2) if longitud_cauce_m else None,  # NUEVO
-                        'geometria_fuente': elemento.geometry,  # NUEVO: Para dibujar en el mapa
-                        'justificacion_retiro': justificacion,  # NUEVO: Por qué se clasificó así
-                        'nota_preliminar': 'Retiro preliminar - requiere validación CAR'  # NUEVO
-                    })
-                    
-                    areas_restriccion.append(interseccion)
+                restricciones.append({
+                    'tipo': 'retiro_hidrico',
+                    'subtipo': tipos[i],
+                    'retiro_minimo_m': self.RETIROS_MINIMOS.get(tipos[i], 30),
+                    'area_afectada_ha': round(area_afectada_ha, 4),
+                    'nombre': str(nombre_fuente) if nombre_fuente else 'Sin nombre',
+                    'normativa': 'Decreto 1541/1978 Art. 83',
+                    'severidad': 'ALTA' if area_afectada_ha > 1 else 'MEDIA',
+                    'distancia_real_m': round(float(distancias_m[i]), 2),
+                    'tipo_geometria': geoms_wgs84[i].geom_type,
+                    'longitud_cauce_m': round(longitud_cauce_m, 2) if longitud_cauce_m else None,
+                    'geometria_fuente': geoms_wgs84[i],  # Para dibujar en el mapa
+                    'justificacion_retiro': justificaciones[i],  # Por qué se clasificó así
+                    'nota_preliminar': 'Retiro preliminar - requiere validación CAR'
+                })
             
             # Calcular área total restringida (unir geometrías solapadas)
-            if areas_restriccion:
-                area_total_restringida = unary_union(areas_restriccion).area / 10000
+            if np.any(afectan):
+                area_total_restringida = shapely.union_all(intersecciones[afectan]).area / 10000
             else:
                 area_total_restringida = 0.0
             
-            # NUEVO: Guardar red hídrica cercana para el mapa
-            self.red_hidrica_cercana = red_cercana  # Almacenar para uso en mapa
-            
             return restricciones, area_total_restringida
             
         except Exception as e:
             print(f"❌ Error verificando retiros hídricos: {e}")
             return [], 0.0
     
+    def _preparar_busqueda_hidrica(self, geometria_parcela, distancia_maxima_km: float):
+        """
+        Convierte la parcela a Shapely y construye su buffer de búsqueda
+        
+        Returns:
+            (parcela_geom EPSG:4326, parcela_metric EPSG:3116, buffer de búsqueda EPSG:4326)
+        """
+        from shapely import wkt
+        
+        if hasattr(geometria_parcela, 'wkt'):
+            # Django GEOS
+            parcela_geom = wkt.loads(geometria_parcela.wkt)
+        else:
+            # GeoJSON dict
+            parcela_geom = shape(geometria_parcela)
+        
+        # Proyectar a métrica (MAGNA-SIRGAS / Colombia Bogotá zone)
+        # EPSG:3116 para cálculos precisos en metros
+        parcela_metric = gpd.GeoSeries([parcela_geom], crs='EPSG:4326').to_crs('EPSG:3116')
+        
+        # Buffer de búsqueda (convertir km a metros)
+        buffer_busqueda_wgs84 = parcela_metric.buffer(distancia_maxima_km * 1000).to_crs('EPSG:4326').iloc[0]
+        
+        return parcela_geom, parcela_metric.iloc[0], buffer_busqueda_wgs84
+    
+    def _verificar_retiros_hidricos_por_elemento(
+        self,
+        geometria_parcela,
+        distancia_maxima_km: float = 5.0
+    ) -> Tuple[List[Dict], float]:
+        """
+        Implementación de referencia elemento a elemento (iterrows + to_crs)
+        
+        Se conserva solo para validar y comparar tiempos contra el motor por
+        lotes (ver scripts/benchmarks/benchmark_retiros_hidricos.py).
+        """
+        if self.red_hidrica is None:
+            return [], 0.0
+        
+        parcela_geom, parcela_metric_geom, buffer_busqueda_wgs84 = self._preparar_busqueda_hidrica(
+            geometria_parcela, distancia_maxima_km
+        )
+        parcela_metric = gpd.GeoDataFrame([{'geometry': parcela_metric_geom}], crs='EPSG:3116')
+        
+        red_cercana = self.red_hidrica[self.red_hidrica.intersects(buffer_busqueda_wgs84)]
+        
+        restricciones = []
+        areas_restriccion = []
+        
+        for idx, elemento in red_cercana.iterrows():
+            tipo_fuente, justificacion = self._clasificar_fuente_hidrica(elemento)
+            retiro_minimo = self.RETIROS_MINIMOS.get(tipo_fuente, 30)
+            
+            nombre_fuente = elemento.get('NOMBRE', elemento.get('nombre', 'Sin nombre'))
+            tipo_geometria = elemento.geometry.geom_type
+            
+            elemento_gdf = gpd.GeoDataFrame(
+                [{'geometry': elemento.geometry}],
+                crs='EPSG:4326'
+            ).to_crs('EPSG:3116')
+            
+            distancia_real_m = parcela_metric.iloc[0].geometry.distance(elemento_gdf.iloc[0].geometry)
+            buffer_retiro = elemento_gdf.buffer(retiro_minimo)
+            interseccion = parcela_metric.iloc[0].geometry.intersection(buffer_retiro.iloc[0])
+            
+            if not interseccion.is_empty:
+                area_afectada_ha = interseccion.area / 10000
+                
+                longitud_cauce_m = None
+                if tipo_geometria in ['LineString', 'MultiLineString']:
+                    longitud_cauce_m = elemento.geometry.length * 111320
+                
+                restricciones.append({
+                    'tipo': 'retiro_hidrico',
+                    'subtipo': tipo_fuente,
+                    'retiro_minimo_m': retiro_minimo,
+                    'area_afectada_ha': round(area_afectada_ha, 4),
+                    'nombre': str(nombre_fuente) if nombre_fuente else 'Sin nombre',
+                    'normativa': 'Decreto 1541/1978 Art. 83',
+                    'severidad': 'ALTA' if area_afectada_ha > 1 else 'MEDIA',
+                    'distancia_real_m': round(distancia_real_m, 2),
+                    'tipo_geometria': tipo_geometria,
+                    'longitud_cauce_m': round(longitud_cauce_m, 2) if longitud_cauce_m else None,
+                    'geometria_fuente': elemento.geometry,
+                    'justificacion_retiro': justificacion,
+                    'nota_preliminar': 'Retiro preliminar - requiere validación CAR'
+                })
+                areas_restriccion.append(interseccion)
+        
+        if areas_restriccion:
+            area_total_restringida = unary_union(areas_restriccion).area / 10000
+        else:
+            area_total_restringida = 0.0
+        
+        return restricciones, area_total_restringida
+    
     def verificar_areas_protegidas(
         self,
         geometria_parcela  # Django GEOS o Dict GeoJSON
@@ -735,6 +890,9 @@ class VerificadorRestriccionesLegales:
     
     def _extraer_nombre_elemento(self, elemento, tipo_capa: str) -> str:
         """Extrae el nombre del elemento con múltiples intentos de campos"""
+        if 'nombre_norm' in elemento.index:  # Normalizado en el paquete departamental
+            return elemento['nombre_norm']
+        
         # Intentar campos comunes según el tipo de capa
         campos_nombre = []
         
@@ -757,6 +915,9 @@ class VerificadorRestriccionesLegales:
     
     def _extraer_categoria_elemento(self, elemento, tipo_capa: str) -> str:
         """Extrae la categoría del elemento (para áreas protegidas principalmente)"""
+        if 'categoria_norm' in elemento.index:
+            return elemento['categoria_norm']
+        
         if tipo_capa == 'area_protegida':
             campos_categoria = ['ap_categor', 'CATEGORIA', 'categoria', 'TIPO', 'tipo']
             for campo in campos_categoria:
@@ -803,6 +964,80 @@ class VerificadorRestriccionesLegales:
         # Por defecto, asumir quebrada (más restrictivo es mejor)
         return 'quebrada', 'Clasificación por defecto (criterio conservador)'
     
+    def _clasificar_fuentes_hidricas(self, gdf) -> Tuple[List[str], List[str]]:
+        """
+        Versión vectorizada de ``_clasificar_fuente_hidrica`` para un lote
+        
+        Aplica las mismas reglas y el mismo orden de prioridad (orden de
+        Strahler, luego nombre/tipo, luego criterio conservador) con
+        operaciones de pandas sobre columnas completas.
+        
+        Returns:
+            Tuple[List[str], List[str]]: (tipos_fuente, justificaciones)
+        """
+        import numpy as np
+        import pandas as pd
+        
+        n = len(gdf)
+        
+        def columna_texto(campo):
+            if campo in gdf.columns:
+                return gdf[campo].astype(str).str.lower()
+            return pd.Series([''] * n, index=gdf.index)
+        
+        nombre = columna_texto('NOMBRE')
+        tipo = columna_texto('TIPO')
+        
+        if 'ORDEN' in gdf.columns:
+            orden = gdf['ORDEN']
+            orden_num = pd.to_numeric(orden, errors='coerce')
+            orden_txt = orden.astype(str)
+        else:
+            orden_num = pd.Series([0] * n, index=gdf.index)
+            orden_txt = pd.Series(['0'] * n, index=gdf.index)
+        
+        def contiene(serie, texto):
+            return serie.str.contains(texto, regex=False).values
+        
+        orden_vals = orden_num.values
+        condiciones = [
+            orden_vals >= 4,
+            orden_vals == 3,
+            np.isin(orden_vals, [1, 2]),
+            contiene(nombre, 'nacimiento') | contiene(tipo, 'nacimiento'),
+            contiene(nombre, 'laguna') | contiene(nombre, 'ciénaga'),
+            contiene(nombre, 'humedal') | contiene(tipo, 'humedal'),
+            contiene(nombre, 'canal'),
+            contiene(nombre, 'río') | contiene(nombre, 'rio'),
+            contiene(nombre, 'quebrada') | contiene(nombre, 'caño'),
+        ]
+        tipos_fuente = [
+            'rio_principal', 'rio_secundario', 'quebrada', 'nacimiento', 'laguna',
+            'humedal', 'canal_riego', 'rio_secundario', 'quebrada',
+        ]
+        prefijo_orden = ('Orden de Strahler ' + orden_txt).values
+        justificaciones = [
+            prefijo_orden + ' (río grande)',
+            prefijo_orden + ' (río mediano)',
+            prefijo_orden + ' (quebrada menor)',
+            'Identificado como nacimiento por nombre/tipo',
+            'Identificado como laguna/ciénaga por nombre',
+            'Identificado como humedal por nombre/tipo',
+            'Identificado como canal artificial por nombre',
+            'Identificado como río por nombre',
+            'Identificado como quebrada/caño por nombre',
+        ]
+        
+        # Por defecto, asumir quebrada (más restrictivo es mejor)
+        tipo_resultado = np.select(condiciones, tipos_fuente, default='quebrada')
+        justificacion_resultado = np.select(
+            condiciones,
+            [np.broadcast_to(np.asarray(j, dtype=object), (n,)) for j in justificaciones],
+            default='Clasificación por defecto (criterio conservador)'
+        )
+        
+        return tipo_resultado.tolist(), justificacion_resultado.tolist()
+    
     def verificar_parcela(
         self,
         parcela_id: int,